@@ -84,14 +84,23 @@ def run_cli() -> int:
     """
     Run in CLI mode (no GUI).
     
+    Subcommands (scan/import/index/tag/search/export/jobs) are handled by
+    ``transcriptionist_v3.cli`` without importing the Qt UI.
+    
     Returns:
         int: Exit code.
     """
     import argparse
     
+    from transcriptionist_v3 import cli
+    
+    if len(sys.argv) > 1 and sys.argv[1] in cli.COMMANDS:
+        return cli.main(sys.argv[1:])
+    
     parser = argparse.ArgumentParser(
         prog="transcriptionist",
-        description="Professional Sound Effects Management Platform"
+        description="Professional Sound Effects Management Platform",
+        epilog="Headless commands: " + ", ".join(cli.COMMANDS) + " (see '<command> --help')"
     )
     
     parser.add_argument(
@@ -103,13 +112,13 @@ def run_cli() -> int:
     parser.add_argument(
         "--scan",
         metavar="PATH",
-        help="Scan a directory for audio files"
+        help="Scan a directory and import it (same as: scan PATH)"
     )
     
     parser.add_argument(
         "--search",
         metavar="QUERY",
-        help="Search the library"
+        help="Search the library (same as: search QUERY)"
     )
     
     parser.add_argument(
@@ -131,6 +140,12 @@ def run_cli() -> int:
         print(f"Transcriptionist v{__version__}")
         return 0
     
+    if args.scan:
+        return cli.main(["scan", args.scan])
+    
+    if args.search:
+        return cli.main(["search", args.search])
+    
     if args.diagnose:
         from transcriptionist_v3.runtime.recovery import generate_diagnostic_report
         print(generate_diagnostic_report())
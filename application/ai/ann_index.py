@@ -0,0 +1,421 @@
+"""
+IVF-Flat approximate nearest-neighbour index for CLAP embeddings.
+
+纯 NumPy 实现（无新增依赖）：
+- 训练：在 EmbeddingStore 的抽样行上做球面 k-means，得到 n_lists 个质心
+- 分配：每个存储行归属最近的质心，结果按存储行号追加到 ``{base}_ivf_assign.bin``（int32），
+  与 IndexShard 的 row_start/row_end 对齐，因此每个新分片只需分配新增行即可增量构建
+- 检索：query 与质心打分取前 nprobe 个倒排表，仅对候选行做精确内积；nprobe 越大召回越高、耗时越长
+
+磁盘文件（与列式存储同目录）：
+- ``{base}_ivf.json``           manifest：n_lists、dim、已分配行数、模型版本、训练时的存储代号
+- ``{base}_ivf_centroids.npy``  (n_lists, dim) float32 归一化质心
+- ``{base}_ivf_assign.bin``     每个存储行的倒排表编号（int32）
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import math
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from transcriptionist_v3.application.search_engine.query_orchestrator import QueryObservation
+
+logger = logging.getLogger(__name__)
+
+IVF_VERSION = 1
+DEFAULT_NPROBE = 32
+# 低于该行数时暴力检索已足够快，不值得训练 IVF
+DEFAULT_MIN_ROWS = 200_000
+_ASSIGN_BLOCK_ROWS = 65536
+
+
+def recommended_n_lists(rows: int) -> int:
+    """经验值：约 4·sqrt(N) 个倒排表，限制在 [16, 4096]。"""
+    if rows <= 0:
+        return 16
+    return int(min(4096, max(16, round(4 * math.sqrt(rows)))))
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.array(matrix, dtype=np.float32, copy=True)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def _assign(matrix: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """按最大内积分配（输入已归一化），分块避免 (N × n_lists) 分数矩阵过大。"""
+    out = np.empty(matrix.shape[0], dtype=np.int32)
+    for start in range(0, matrix.shape[0], _ASSIGN_BLOCK_ROWS):
+        block = matrix[start : start + _ASSIGN_BLOCK_ROWS]
+        out[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def train_spherical_kmeans(
+    sample: np.ndarray,
+    n_lists: int,
+    iterations: int = 12,
+    seed: int = 0,
+) -> np.ndarray:
+    """球面 k-means：返回 (n_lists, dim) 归一化质心。"""
+    rng = np.random.default_rng(seed)
+    sample = _normalize_rows(sample)
+    n = sample.shape[0]
+    n_lists = max(1, min(int(n_lists), n))
+    centroids = sample[rng.choice(n, size=n_lists, replace=False)].copy()
+    for _ in range(max(1, int(iterations))):
+        labels = _assign(sample, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, labels, sample)
+        counts = np.bincount(labels, minlength=n_lists)
+        empty = np.where(counts == 0)[0]
+        if len(empty):
+            # 空簇用随机样本重新播种，避免倒排表退化
+            sums[empty] = sample[rng.choice(n, size=len(empty), replace=False)]
+        centroids = _normalize_rows(sums)
+    return centroids
+
+
+class IVFFlatIndex:
+    """基于 EmbeddingStore 行号持久化的 IVF-Flat 索引。"""
+
+    def __init__(
+        self,
+        index_dir: Path,
+        base_name: str = "clap_embeddings",
+        nprobe: int = DEFAULT_NPROBE,
+    ):
+        self.index_dir = Path(index_dir)
+        self.base_name = base_name
+        self.nprobe = max(1, int(nprobe))
+        self.manifest_path = self.index_dir / f"{base_name}_ivf.json"
+        self.centroids_path = self.index_dir / f"{base_name}_ivf_centroids.npy"
+        self.assign_path = self.index_dir / f"{base_name}_ivf_assign.bin"
+
+        self._lock = threading.RLock()
+        self._manifest = {"version": IVF_VERSION, "n_lists": 0, "dim": 0, "assigned": 0, "model_version": "", "store_generation": ""}
+        self._centroids: Optional[np.ndarray] = None
+        # 挂载到检索引擎后的 CSR 倒排表（元素为引擎矩阵中的位置）
+        self._engine = None
+        self._list_offsets: Optional[np.ndarray] = None
+        self._list_members: Optional[np.ndarray] = None
+        self._load_manifest()
+
+    # ------------------------------------------------------------------
+    # persistence
+    # ------------------------------------------------------------------
+
+    @property
+    def is_trained(self) -> bool:
+        return int(self._manifest.get("n_lists", 0)) > 0 and self.centroids_path.exists()
+
+    @property
+    def assigned(self) -> int:
+        return int(self._manifest.get("assigned", 0))
+
+    @property
+    def n_lists(self) -> int:
+        return int(self._manifest.get("n_lists", 0))
+
+    def matches_store(self, store) -> bool:
+        """分配是否基于同一份存储：模型版本与存储代号一致，且未超出存储行数（可能仍有未分配的新行）。"""
+        return (
+            self.is_trained
+            and str(self._manifest.get("model_version", "") or "") == store.model_version
+            and str(self._manifest.get("store_generation", "") or "") == store.generation
+            and self.assigned <= store.count
+        )
+
+    def is_current(self, store) -> bool:
+        """分配与存储完全一致（同一份存储且每一行都已分配），可直接复用倒排表。"""
+        return self.matches_store(store) and self.assigned == store.count
+
+    def reload(self) -> None:
+        """重新读取 manifest（其他线程训练/增量分配后调用），变化时丢弃缓存的质心与倒排表。"""
+        with self._lock:
+            before = dict(self._manifest)
+            if not self.manifest_path.exists():
+                self._manifest.update({"n_lists": 0, "dim": 0, "assigned": 0})
+            else:
+                self._load_manifest()
+            if self._manifest != before:
+                self._centroids = None
+                self.detach()
+
+    def _load_manifest(self) -> None:
+        if not self.manifest_path.exists():
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._manifest.update(data)
+        except Exception as e:
+            logger.warning(f"IVF manifest unreadable, ignoring: {e}")
+
+    def _write_manifest(self) -> None:
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+
+    def centroids(self) -> np.ndarray:
+        with self._lock:
+            if self._centroids is None:
+                self._centroids = np.load(str(self.centroids_path)).astype(np.float32)
+            return self._centroids
+
+    def assignments(self) -> np.ndarray:
+        """每个已分配存储行的倒排表编号（内存映射）。"""
+        assigned = self.assigned
+        if assigned == 0 or not self.assign_path.exists():
+            return np.zeros(0, dtype=np.int32)
+        return np.memmap(self.assign_path, dtype=np.int32, mode="r", shape=(assigned,))
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in (self.manifest_path, self.centroids_path, self.assign_path):
+                try:
+                    if path.exists():
+                        path.unlink()
+                except Exception as e:
+                    logger.warning(f"Failed to remove {path}: {e}")
+            self._manifest.update({"n_lists": 0, "dim": 0, "assigned": 0})
+            self._centroids = None
+            self.detach()
+
+    # ------------------------------------------------------------------
+    # build
+    # ------------------------------------------------------------------
+
+    def train(
+        self,
+        store,
+        n_lists: Optional[int] = None,
+        sample_size: Optional[int] = None,
+        iterations: int = 12,
+        seed: int = 0,
+    ) -> None:
+        """在存储的抽样行上训练质心，并从头重新分配全部行。"""
+        rows = store.live_rows()
+        if len(rows) == 0:
+            raise ValueError("Cannot train IVF index on an empty embedding store")
+        n_lists = int(n_lists or recommended_n_lists(len(rows)))
+        sample_size = int(sample_size or min(len(rows), max(n_lists * 40, 50_000)))
+        rng = np.random.default_rng(seed)
+        picked = np.sort(rng.choice(rows, size=min(sample_size, len(rows)), replace=False))
+        t0 = time.perf_counter()
+        centroids = train_spherical_kmeans(
+            np.asarray(store.matrix()[picked]), n_lists, iterations=iterations, seed=seed
+        )
+        logger.info(
+            "IVF trained: %d lists on %d samples in %.1fs", len(centroids), len(picked), time.perf_counter() - t0
+        )
+        with self._lock:
+            self.clear()
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            np.save(str(self.centroids_path), centroids)
+            self._centroids = centroids
+            self._manifest.update(
+                {
+                    "n_lists": int(len(centroids)),
+                    "dim": int(centroids.shape[1]),
+                    "assigned": 0,
+                    "model_version": store.model_version,
+                    "store_generation": store.generation,
+                }
+            )
+            self._write_manifest()
+        self.update(store)
+
+    def update(self, store, progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """增量分配存储中尚未分配的行（即新追加的分片），返回新增行数。"""
+        if not self.is_trained:
+            return 0
+        with self._lock:
+            start = self.assigned
+            total = store.count
+            if not self.matches_store(store):
+                # 存储被重建过（代号/模型版本变化或行数回退）：旧分配失效
+                logger.warning("IVF assignments do not match the embedding store, store was rebuilt; retrain required")
+                self.clear()
+                return 0
+            if start == total:
+                return 0
+            centroids = self.centroids()
+            matrix = store.matrix()
+            with open(self.assign_path, "r+b" if self.assign_path.exists() else "wb") as f:
+                f.truncate(start * 4)
+                f.seek(start * 4)
+                for block_start in range(start, total, _ASSIGN_BLOCK_ROWS):
+                    block_stop = min(block_start + _ASSIGN_BLOCK_ROWS, total)
+                    block = _normalize_rows(matrix[block_start:block_stop])
+                    f.write(_assign(block, centroids).tobytes())
+                    if progress_callback:
+                        progress_callback(block_stop - start, total - start)
+            self._manifest["assigned"] = total
+            self._write_manifest()
+            self.detach()
+            return total - start
+
+    # ------------------------------------------------------------------
+    # search
+    # ------------------------------------------------------------------
+
+    def detach(self) -> None:
+        self._engine = None
+        self._list_offsets = None
+        self._list_members = None
+
+    def attach(self, engine, store) -> bool:
+        """
+        把倒排表挂到常驻 SemanticSearchEngine 上（引擎矩阵顺序 = store.live_rows() 顺序）。
+
+        Returns:
+            是否可用（未训练、存储已重建或仍有未分配的行时返回 False，调用方应退回精确检索）
+        """
+        with self._lock:
+            if not self.is_current(store):
+                self.detach()
+                return False
+            if self._engine is engine and self._list_offsets is not None:
+                return True
+            rows = store.live_rows()
+            if len(rows) != engine.size:
+                return False
+            labels = np.asarray(self.assignments())[rows]
+            order = np.argsort(labels, kind="stable").astype(np.int64)
+            counts = np.bincount(labels, minlength=self.n_lists)
+            offsets = np.zeros(self.n_lists + 1, dtype=np.int64)
+            np.cumsum(counts, out=offsets[1:])
+            self._engine = engine
+            self._list_offsets = offsets
+            self._list_members = order
+            return True
+
+    @classmethod
+    def from_engine(
+        cls,
+        engine,
+        n_lists: Optional[int] = None,
+        nprobe: int = DEFAULT_NPROBE,
+        iterations: int = 12,
+        seed: int = 0,
+    ) -> "IVFFlatIndex":
+        """仅内存、不落盘的 IVF（用于压测与临时矩阵）。"""
+        ann = cls(Path("."), base_name="__memory__", nprobe=nprobe)
+        n_lists = int(n_lists or recommended_n_lists(engine.size))
+        rng = np.random.default_rng(seed)
+        sample_size = min(engine.size, max(n_lists * 40, 50_000))
+        picked = np.sort(rng.choice(engine.size, size=sample_size, replace=False))
+        centroids = train_spherical_kmeans(engine.matrix[picked], n_lists, iterations=iterations, seed=seed)
+        labels = _assign(engine.matrix, centroids)
+        counts = np.bincount(labels, minlength=len(centroids))
+        offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        ann._centroids = centroids
+        ann._manifest.update({"n_lists": int(len(centroids)), "dim": int(centroids.shape[1])})
+        ann._engine = engine
+        ann._list_offsets = offsets
+        ann._list_members = np.argsort(labels, kind="stable").astype(np.int64)
+        return ann
+
+    def _candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        centroids = self.centroids()
+        nprobe = max(1, min(int(nprobe), len(centroids)))
+        coarse = centroids @ query
+        lists = np.argpartition(coarse, len(coarse) - nprobe)[len(coarse) - nprobe :]
+        offsets = self._list_offsets
+        members = self._list_members
+        parts = [members[offsets[i] : offsets[i + 1]] for i in lists.tolist()]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 500,
+        nprobe: Optional[int] = None,
+        mask: Optional[np.ndarray] = None,
+        observation: Optional[QueryObservation] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        近似 top-k：只对 nprobe 个倒排表中的候选做精确内积。
+
+        给出 ``mask`` 时改为在引擎上精确检索：被选中的行可能不在探测的倒排表里，近似检索会漏掉它们。
+        """
+        started = time.perf_counter()
+        engine = self._engine
+        if engine is None or self._list_offsets is None:
+            raise RuntimeError("IVF index is not attached to a search engine")
+        if mask is not None:
+            return engine.search(query, top_k=top_k, mask=mask, observation=observation)
+        query = np.asarray(query, dtype=np.float32).reshape(-1)
+        qn = float(np.linalg.norm(query))
+        if qn > 0:
+            query = query / qn
+        cand = self._candidates(query, nprobe or self.nprobe)
+        results: List[Tuple[str, float]] = []
+        if len(cand):
+            scores = engine.matrix[cand] @ query
+            k = min(max(1, int(top_k)), len(cand))
+            top = np.argpartition(scores, len(scores) - k)[len(scores) - k :]
+            top = top[np.argsort(scores[top])[::-1]]
+            keys = engine.keys
+            results = [(keys[int(cand[i])], float(scores[i])) for i in top]
+        if observation is not None:
+            observation.semantic_ms = (time.perf_counter() - started) * 1000.0
+            observation.semantic_count = len(results)
+        return results
+
+
+def recall_at_k(approx: List[Tuple[str, float]], exact: List[Tuple[str, float]], k: int) -> float:
+    """近似结果相对精确检索的 recall@k。"""
+    truth = {key for key, _ in exact[:k]}
+    if not truth:
+        return 1.0
+    return len(truth & {key for key, _ in approx[:k]}) / len(truth)
+
+
+_ann_cache: Dict[Tuple[str, str], IVFFlatIndex] = {}
+_ann_cache_lock = threading.Lock()
+
+
+def get_store_ann(store, engine, nprobe: int = DEFAULT_NPROBE) -> Optional[IVFFlatIndex]:
+    """返回已挂载到引擎的 IVF 索引；未训练或落后于存储时返回 None（调用方退回精确检索）。"""
+    key = (str(store.index_dir), store.base_name)
+    with _ann_cache_lock:
+        ann = _ann_cache.get(key)
+        if ann is None:
+            ann = IVFFlatIndex(store.index_dir, base_name=store.base_name, nprobe=nprobe)
+            _ann_cache[key] = ann
+    ann.nprobe = max(1, int(nprobe))
+    ann.reload()
+    return ann if ann.attach(engine, store) else None
+
+
+def update_store_ann(store, min_rows: int = DEFAULT_MIN_ROWS) -> int:
+    """
+    索引任务写入新分片后调用：已训练则增量分配新行；未训练且行数达到 min_rows 时首次训练。
+
+    Returns:
+        新分配的行数
+    """
+    ann = IVFFlatIndex(store.index_dir, base_name=store.base_name)
+    if ann.is_trained and not ann.matches_store(store):
+        ann.clear()
+    if not ann.is_trained:
+        if len(store.live_rows()) < max(1, int(min_rows)):
+            return 0
+        ann.train(store)
+        return ann.assigned
+    return ann.update(store)
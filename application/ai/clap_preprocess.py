@@ -15,8 +15,10 @@ from __future__ import annotations
 
 import json
 import logging
+import threading
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import numpy as np
 
@@ -110,6 +112,28 @@ def window_function_hann(frame_length: int) -> np.ndarray:
     return window.astype(np.float64)
 
 
+@lru_cache(maxsize=8)
+def _cached_hann_window(frame_length: int) -> np.ndarray:
+    window = window_function_hann(frame_length)
+    window.flags.writeable = False
+    return window
+
+
+@lru_cache(maxsize=8)
+def _cached_mel_filters(
+    num_frequency_bins: int,
+    num_mel_filters: int,
+    min_frequency: float,
+    max_frequency: float,
+    sampling_rate: int,
+) -> np.ndarray:
+    filters = mel_filter_bank_slaney(
+        num_frequency_bins, num_mel_filters, min_frequency, max_frequency, sampling_rate
+    )
+    filters.flags.writeable = False
+    return filters
+
+
 def trim_silence_start(
     waveform: np.ndarray,
     sample_rate: int,
@@ -164,7 +188,10 @@ def spectrogram_impl(
 ) -> np.ndarray:
     """
     与 HuggingFace audio_utils.spectrogram 一致的 STFT + mel + log。
-    返回 (num_mel_filters, time) 或 (num_freq_bins, time)。
+
+    waveform 可以是单条 (samples,) 或等长批量 (batch, samples)：分帧用 stride 视图，
+    整批帧一次 ``np.fft.rfft``，不再逐帧循环。
+    返回 (num_mel_filters, time) / (num_freq_bins, time)；批量输入时前面多一维 batch。
     """
     if fft_length is None:
         fft_length = frame_length
@@ -172,29 +199,31 @@ def spectrogram_impl(
     if window_length != frame_length:
         raise ValueError(f"window length {window_length} != frame_length {frame_length}")
 
+    waveform = np.asarray(waveform)
+    batched = waveform.ndim == 2
+    if not batched:
+        waveform = waveform[np.newaxis, :]
+
     if center:
-        padding = [(int(frame_length // 2), int(frame_length // 2))]
+        padding = [(0, 0), (int(frame_length // 2), int(frame_length // 2))]
         waveform = np.pad(waveform, padding, mode=pad_mode)
 
     waveform = waveform.astype(np.float64)
     window = window.astype(np.float64)
-    num_frames = int(1 + np.floor((waveform.size - frame_length) / hop_length))
-    num_frequency_bins = (fft_length // 2) + 1
-    spec = np.empty((num_frames, num_frequency_bins), dtype=np.complex64)
-    buffer = np.zeros(fft_length)
-    timestep = 0
-    for frame_idx in range(num_frames):
-        buffer[:frame_length] = waveform[timestep : timestep + frame_length]
-        buffer[:frame_length] *= window
-        spec[frame_idx] = np.fft.rfft(buffer)
-        timestep += hop_length
+    num_frames = int(1 + np.floor((waveform.shape[-1] - frame_length) / hop_length))
+
+    # (batch, num_frames, frame_length) 的只读 stride 视图，乘窗后才产生一份拷贝
+    frames = np.lib.stride_tricks.sliding_window_view(waveform, frame_length, axis=-1)
+    frames = frames[:, : num_frames * hop_length : hop_length, :]
+    # 与原逐帧实现保持一致：float64 FFT，结果先落到 complex64 再取模
+    spec = np.fft.rfft(frames * window, n=fft_length, axis=-1).astype(np.complex64)
 
     spec = np.abs(spec, dtype=np.float64) ** power
-    spec = spec.T
+    spec = np.swapaxes(spec, -1, -2)
 
     if mel_filters is not None:
-        spec = np.maximum(mel_floor, np.dot(mel_filters.T, spec))
-
+        mel_t = mel_filters.T
+        spec = np.stack([np.maximum(mel_floor, np.dot(mel_t, item)) for item in spec])
 
     if log_mel == "dB":
         # LAION-CLAP 官方使用 torchaudio.transforms.AmplitudeToDB(top_db=None)
@@ -204,7 +233,8 @@ def spectrogram_impl(
         spec = np.clip(spec, a_min=min_value, a_max=None)
         spec = 10.0 * (np.log10(spec) - np.log10(reference))
 
-    return spec.astype(np.float32)
+    spec = spec.astype(np.float32)
+    return spec if batched else spec[0]
 
 
 def power_to_db_impl(
@@ -238,8 +268,18 @@ DEFAULT_CONFIG = {
 
 
 def load_preprocessor_config(model_dir: str | Path) -> Dict[str, Any]:
-    """从模型目录加载 preprocessor_config.json，缺失键用 DEFAULT_CONFIG 补全。"""
+    """从模型目录加载 preprocessor_config.json，缺失键用 DEFAULT_CONFIG 补全（按文件 mtime 进程内缓存）。"""
     path = Path(model_dir) / "preprocessor_config.json"
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = 0
+    return dict(_load_preprocessor_config_cached(str(path), mtime_ns))
+
+
+@lru_cache(maxsize=8)
+def _load_preprocessor_config_cached(path_str: str, mtime_ns: int) -> Dict[str, Any]:
+    path = Path(path_str)
     cfg = dict(DEFAULT_CONFIG)
     if path.exists():
         try:
@@ -284,8 +324,8 @@ class CLAPPreprocessor:
         self.truncation = self.config.get("truncation", "rand_trunc")
 
         self.nb_frequency_bins = (self.fft_window_size >> 1) + 1
-        self._window = window_function_hann(self.fft_window_size)
-        self._mel_filters = mel_filter_bank_slaney(
+        self._window = _cached_hann_window(self.fft_window_size)
+        self._mel_filters = _cached_mel_filters(
             self.nb_frequency_bins,
             self.feature_size,
             self.frequency_min,
@@ -341,6 +381,71 @@ class CLAPPreprocessor:
         # 不进行额外归一化，此模型直接使用 dB 值
         return log_mel.astype(np.float32)
 
+    def extract_mel_batch(
+        self,
+        waveforms: list,
+        deterministic_truncate: bool = True,
+        max_batch: int = 16,
+    ) -> np.ndarray:
+        """
+        批量波形 -> (batch, n_mels, time) log-mel，与逐条 extract_mel 数值一致。
+
+        各波形先 pad/截断到 nb_max_samples 再拼成二维数组整体做 STFT；
+        max_batch 限制单次 FFT 的帧数，避免大批量时中间复数矩阵占用过多内存。
+        """
+        padded = []
+        for waveform in waveforms:
+            waveform = np.asarray(waveform, dtype=np.float64)
+            if waveform.ndim > 1:
+                waveform = np.mean(waveform, axis=0)
+            padded.append(self._pad_waveform(waveform, deterministic_truncate=deterministic_truncate))
+        if not padded:
+            return np.zeros((0, self.feature_size, 0), dtype=np.float32)
+        outputs = []
+        step = max(1, int(max_batch))
+        for start in range(0, len(padded), step):
+            outputs.append(
+                spectrogram_impl(
+                    np.stack(padded[start : start + step]),
+                    self._window,
+                    self.fft_window_size,
+                    self.hop_length,
+                    fft_length=self.fft_window_size,
+                    power=2.0,
+                    center=True,
+                    pad_mode="reflect",
+                    mel_filters=self._mel_filters,
+                    mel_floor=1e-10,
+                    log_mel="dB",
+                    reference=1.0,
+                    min_value=1e-10,
+                )
+            )
+        return np.concatenate(outputs, axis=0)
+
+
+_preprocessor_cache: Dict[Tuple[str, int], CLAPPreprocessor] = {}
+_preprocessor_cache_lock = threading.Lock()
+
+
+def get_preprocessor(model_dir: str | Path) -> CLAPPreprocessor:
+    """
+    进程内缓存的 CLAPPreprocessor：多进程 worker 每个文件调用一次，避免重复读取
+    preprocessor_config.json 与重建 Hann 窗 / Slaney mel 滤波器组。
+    """
+    path = Path(model_dir) / "preprocessor_config.json"
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = 0
+    key = (str(Path(model_dir).resolve()), mtime_ns)
+    with _preprocessor_cache_lock:
+        preprocessor = _preprocessor_cache.get(key)
+        if preprocessor is None:
+            preprocessor = CLAPPreprocessor(config=load_preprocessor_config(model_dir))
+            _preprocessor_cache[key] = preprocessor
+        return preprocessor
+
 
 
 def extract_mel_from_config(waveform: np.ndarray, config: Dict[str, Any]) -> np.ndarray:
@@ -1,23 +1,34 @@
 
 import os
+import queue
+import threading
 import time
 import logging
 import json
 import numpy as np
 from pathlib import Path
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Callable, Dict, List, Optional, Union
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 
 # Third-party imports
 try:
     import onnxruntime as ort
-    import librosa
     from tokenizers import Tokenizer
 except ImportError as e:
     logging.getLogger(__name__).warning(f"AI dependencies missing: {e}")
 
 # 官方对齐预处理（与 HuggingFace ClapFeatureExtractor 逐 op 一致，无 PyTorch 依赖）
-from transcriptionist_v3.application.ai.clap_preprocess import load_preprocessor_config, CLAPPreprocessor, trim_silence_start
+from transcriptionist_v3.application.ai.clap_preprocess import (
+    CLAPPreprocessor,
+    get_preprocessor,
+    trim_silence_start,
+)
+from transcriptionist_v3.application.ai.audio_decode import load_audio_head
+from transcriptionist_v3.application.ai.text_embedding_cache import TextEmbeddingCache, model_fingerprint
+from transcriptionist_v3.application.ai.preprocess_pool import PreprocessPool
+
+# 预处理→推理流水线队列容量（以 batch 为单位）：内存中最多驻留这么多个 batch 的 mel
+PIPELINE_QUEUE_BATCHES = 4
 
 # 多进程 worker 内懒加载的 ONNX 预处理会话（每进程一份，DirectML 加速）
 _worker_preprocess_onnx_session: Optional["ort.InferenceSession"] = None
@@ -72,12 +83,13 @@ def _preprocess_audio_static(audio_path: str, model_dir: str) -> Optional[np.nda
                         return None
             except Exception as e:
                 logger.debug(f"Format check failed for {Path(audio_path).name}, trying to load anyway: {e}")
-        config = load_preprocessor_config(model_dir)
-        sr = int(config["sampling_rate"])
+        # 进程内缓存：配置 JSON、Hann 窗与 mel 滤波器组每个 worker 只构建一次
+        preprocessor = get_preprocessor(model_dir)
+        sr = int(preprocessor.sampling_rate)
         t0 = time.perf_counter() if do_timing else None
         # 只加载前 10 秒：CLAP 的感受野大约为 10 秒左右，再多只是浪费解码时间
-        # 之前这里使用 20 秒会显著放大 librosa/audioread 的解码耗时（你当前环境里单文件可达 10 秒）
-        y, _ = librosa.load(audio_path, sr=sr, duration=10)
+        # WAV/FLAC 走 soundfile 帧 seek + 48k 直通 / 多相重采样，压缩格式才回退 librosa
+        y, decode_timing = load_audio_head(audio_path, sr=sr, duration=10)
         if do_timing:
             t1 = time.perf_counter()
         if y.ndim > 1:
@@ -89,7 +101,6 @@ def _preprocess_audio_static(audio_path: str, model_dir: str) -> Optional[np.nda
         y = quantize_audio(y)
         if do_timing:
             t2 = time.perf_counter()
-        preprocessor = CLAPPreprocessor(config=config)
         # 仅当 GPU 加速开启时尝试 ONNX + DirectML 预处理（每进程懒加载一次）
         try:
             from transcriptionist_v3.core.config import AppConfig
@@ -123,8 +134,9 @@ def _preprocess_audio_static(audio_path: str, model_dir: str) -> Optional[np.nda
                 t3 = time.perf_counter()
                 _timing_logged_pids.add(os.getpid())
                 logger.info(
-                    "[CLAP 预处理耗时] 单文件(PID=%s) load=%.2fs trim=%.2fs mel(ONNX)=%.2fs",
-                    os.getpid(), t1 - t0, t2 - t1, t3 - t2
+                    "[CLAP 预处理耗时] 单文件(PID=%s) load=%.2fs(%s/%s decode=%.3fs resample=%.3fs) trim=%.2fs mel(ONNX)=%.2fs",
+                    os.getpid(), t1 - t0, file_ext, decode_timing.path, decode_timing.decode_s,
+                    decode_timing.resample_s, t2 - t1, t3 - t2
                 )
             return mel_log.astype(np.float32)
         # 无 preprocess_audio.onnx 或 GPU 关闭时回退到 CPU（NumPy）
@@ -133,8 +145,9 @@ def _preprocess_audio_static(audio_path: str, model_dir: str) -> Optional[np.nda
             t3 = time.perf_counter()
             _timing_logged_pids.add(os.getpid())
             logger.info(
-                "[CLAP 预处理耗时] 单文件(PID=%s) load=%.2fs trim=%.2fs mel(CPU)=%.2fs",
-                os.getpid(), t1 - t0, t2 - t1, t3 - t2
+                "[CLAP 预处理耗时] 单文件(PID=%s) load=%.2fs(%s/%s decode=%.3fs resample=%.3fs) trim=%.2fs mel(CPU)=%.2fs",
+                os.getpid(), t1 - t0, file_ext, decode_timing.path, decode_timing.decode_s,
+                decode_timing.resample_s, t2 - t1, t3 - t2
             )
         return mel_log
     except FileNotFoundError as e:
@@ -184,13 +197,17 @@ class CLAPInferenceService:
         self.tokenizer: Optional[Tokenizer] = None
         self._is_ready = False
         self._preprocessor: Optional[CLAPPreprocessor] = None
-        self._text_embedding_cache: Dict[str, np.ndarray] = {}
+        # 文本 embedding 缓存（按模型指纹持久化到 data/cache/clap_text，内存 LRU 有上限）
+        self._text_embedding_cache = TextEmbeddingCache(None, "")
+        self._text_batch_supported = True
+        # 常驻预处理进程池：跨块、跨任务复用，worker 内的预处理器 / ONNX 会话只加载一次
+        self._preprocess_pool: Optional[PreprocessPool] = None
         
     def initialize(self) -> bool:
         """Load model.onnx (统一的双编码器) 与 tokenizer"""
         if self._is_ready:
             return True
-        self._text_embedding_cache.clear()
+        self._text_embedding_cache.clear_memory()
         try:
             # 优先检查统一模型，若不存在则检查分开的模型
             unified_onnx = self.model_dir / "onnx" / "model.onnx"
@@ -282,7 +299,14 @@ class CLAPInferenceService:
                 logger.warning(f"CLAP embedding validation skipped: {e}")
             
             # 5. 官方对齐预处理
-            self._preprocessor = CLAPPreprocessor(model_dir=self.model_dir)
+            self._preprocessor = get_preprocessor(self.model_dir)
+            
+            # 文本 embedding 持久化缓存：模型/tokenizer 文件变化时指纹随之变化，旧缓存自然失效
+            text_model_file = unified_onnx if use_unified_model else text_onnx
+            self._text_embedding_cache = TextEmbeddingCache(
+                self._text_cache_dir(),
+                model_fingerprint(text_model_file, tokenizer_path),
+            )
             
             # 6. 可选的 ONNX 预处理加速（打包时优先 _MEIPASS，否则 onnx_preprocess / 模型内 onnx）
             if use_gpu:
@@ -310,52 +334,104 @@ class CLAPInferenceService:
             logger.error(f"Failed to initialize CLAP service: {e}", exc_info=True)
             return False
 
+    @staticmethod
+    def _text_cache_dir() -> Optional[Path]:
+        try:
+            from transcriptionist_v3.runtime.runtime_config import get_data_dir
+            return get_data_dir() / "cache" / "clap_text"
+        except Exception as e:
+            logger.debug(f"Text embedding cache not persisted: {e}")
+            return None
+
+    def _get_preprocess_pool(self, cpu_processes: int) -> PreprocessPool:
+        """返回常驻预处理进程池；进程数设置变化时重建。"""
+        cpu_processes = max(1, int(cpu_processes))
+        if self._preprocess_pool is not None and self._preprocess_pool.processes != cpu_processes:
+            self._preprocess_pool.close()
+            self._preprocess_pool = None
+        if self._preprocess_pool is None:
+            self._preprocess_pool = PreprocessPool(cpu_processes)
+        return self._preprocess_pool
+
+    def shutdown_preprocess_pool(self) -> None:
+        """释放常驻预处理进程（页面销毁 / 应用退出时调用；进程退出时也会自动回收）。"""
+        if self._preprocess_pool is not None:
+            self._preprocess_pool.close()
+            self._preprocess_pool = None
+
     def get_text_embedding(self, text: str) -> Optional[np.ndarray]:
         """Generate embedding for text query。
         统一 model.onnx 需同时提供 dummy 音频输入（input_features），否则 ONNX 会报缺输入。
         **CRITICAL: Returns L2-normalized embedding for cosine similarity**
-        使用 _text_embedding_cache 避免重复计算，加速 classify_audio。
+        命中持久化文本缓存时不跑模型，加速 classify_audio 与重复查询。
         """
-        if not self._is_ready or not self.tokenizer or not self.session_text:
-            return None
-        try:
-            if text in self._text_embedding_cache:
-                return self._text_embedding_cache[text].copy()
-        except Exception:
-            pass
-        try:
-            encoded = self.tokenizer.encode(text)
-            input_ids = np.array([encoded.ids], dtype=np.int64)
-            attention_mask = np.array([encoded.attention_mask], dtype=np.int64)
-            model_inputs = [i.name for i in self.session_text.get_inputs()]
-            inputs = {}
-            if "input_ids" in model_inputs:
-                inputs["input_ids"] = input_ids
-            if "attention_mask" in model_inputs:
-                inputs["attention_mask"] = attention_mask
-            # 统一 model.onnx 同时包含文本/音频输入，仅传文本会报缺 input_features
-            if "input_features" in model_inputs:
-                inputs["input_features"] = np.zeros((1, 1, 1001, 64), dtype=np.float32)
+        return self.get_text_embeddings([text])[0]
 
-            outputs = self.session_text.run(None, inputs)
-            output_names = [o.name for o in self.session_text.get_outputs()]
-            if "text_embeds" in output_names:
-                idx = output_names.index("text_embeds")
-                embedding = outputs[idx][0]
-            else:
-                embedding = outputs[0][0]
-            
-            # CRITICAL FIX: L2 normalize text embedding for accurate cosine similarity
-            norm = np.linalg.norm(embedding)
-            if norm > 0:
-                embedding = embedding / norm
-            self._text_embedding_cache[text] = embedding.copy()
-            return embedding
+    def get_text_embeddings(self, texts: List[str], batch_size: int = 64) -> List[Optional[np.ndarray]]:
+        """
+        批量文本 embedding（L2 归一化），与 texts 一一对应，失败项为 None。
 
+        先查缓存，未命中的文本去重后按真实 batch 送入文本编码器，结果写回缓存。
+        """
+        if not self._is_ready or not self.tokenizer or not self.session_text:
+            return [None] * len(texts)
+        texts = [str(t) for t in texts]
+        cached = self._text_embedding_cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t in texts if t not in cached))
+        batch_size = max(1, int(batch_size))
+        for start in range(0, len(missing), batch_size):
+            batch = missing[start : start + batch_size]
+            embeddings = self._encode_text_batch(batch)
+            if embeddings is None:
+                continue
+            self._text_embedding_cache.put_many(batch, embeddings)
+            for text, embedding in zip(batch, embeddings):
+                cached[text] = embedding
+        return [cached[t].copy() if t in cached else None for t in texts]
+
+    def _encode_text_batch(self, texts: List[str]) -> Optional[np.ndarray]:
+        """运行文本编码器，返回 (len(texts), dim) 的 L2 归一化矩阵；失败返回 None。"""
+        if self._text_batch_supported and len(texts) > 1:
+            try:
+                return self._run_text_inference(texts)
+            except Exception as e:
+                # 部分导出的模型 batch 维固定为 1：之后逐条推理
+                logger.warning(f"Batched text inference failed, falling back to batch size 1: {e}")
+                self._text_batch_supported = False
+        try:
+            return np.concatenate([self._run_text_inference([t]) for t in texts], axis=0)
         except Exception as e:
             logger.error(f"Text embedding failed: {e}")
             return None
 
+    def _run_text_inference(self, texts: List[str]) -> np.ndarray:
+        # tokenizer 已启用定长 padding（77），批内各行等长
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        model_inputs = [i.name for i in self.session_text.get_inputs()]
+        inputs = {}
+        if "input_ids" in model_inputs:
+            inputs["input_ids"] = input_ids
+        if "attention_mask" in model_inputs:
+            inputs["attention_mask"] = attention_mask
+        # 统一 model.onnx 同时包含文本/音频输入，仅传文本会报缺 input_features
+        if "input_features" in model_inputs:
+            inputs["input_features"] = np.zeros((len(texts), 1, 1001, 64), dtype=np.float32)
+
+        outputs = self.session_text.run(None, inputs)
+        output_names = [o.name for o in self.session_text.get_outputs()]
+        if "text_embeds" in output_names:
+            embeddings = outputs[output_names.index("text_embeds")]
+        else:
+            embeddings = outputs[0]
+        embeddings = np.asarray(embeddings, dtype=np.float32).reshape(len(texts), -1)
+
+        # CRITICAL FIX: L2 normalize text embedding for accurate cosine similarity
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return embeddings / norms
+
     def get_audio_embedding(self, audio_path: str) -> Optional[np.ndarray]:
         """Generate embedding for audio file. 使用官方对齐预处理（preprocessor_config.json）。"""
         if not self._is_ready:
@@ -440,7 +516,6 @@ class CLAPInferenceService:
         
         if cpu_processes > 1 and len(audio_paths) > 1:
             try:
-                from multiprocessing import Pool
                 from functools import partial
                 
                 # CRITICAL: 确保在 PyInstaller 打包后能正确导入
@@ -449,67 +524,38 @@ class CLAPInferenceService:
                 
                 preprocess_func = partial(_preprocess_audio_static, model_dir=str(self.model_dir))
                 
-                # 使用 imap 保持路径与结果一一对应（imap_unordered 会打乱顺序）
-                t_preprocess_start = time.perf_counter()
-                with Pool(processes=cpu_processes) as pool:
-                    mel_results = [None] * total
-                    processed = 0
-                    for idx, result in enumerate(pool.imap(preprocess_func, audio_paths, chunksize=max(1, total // (cpu_processes * 4)))):
-                        mel_results[idx] = result
-                        processed += 1
-                        # 每100个文件或每10%更新一次进度
-                        if processed % max(1, total // 10) == 0 or processed == total:
-                            progress = 0.0 + (processed / total) * 0.4  # 0-40%
-                            if progress_callback:
-                                try:
-                                    progress_callback(progress, f"步骤 1/4：预处理音频 {processed}/{total}")
-                                except Exception:
-                                    pass
-                
-                # 过滤失败的结果
-                valid_mels = []
-                valid_paths = []
-                for path, mel_log in zip(audio_paths, mel_results):
-                    if mel_log is not None:
-                        valid_mels.append(mel_log)
-                        valid_paths.append(path)
-                
-                t_preprocess_end = time.perf_counter()
-                if not valid_mels:
-                    return {}
-                
-                # 步骤2：批量 GPU 推理 (40-80%)
-                total_batches = (len(valid_mels) + batch_size - 1) // batch_size
-                t_inference_start = time.perf_counter()
-                for batch_idx, i in enumerate(range(0, len(valid_mels), batch_size)):
-                    batch_mels = valid_mels[i:i + batch_size]
-                    batch_paths = valid_paths[i:i + batch_size]
-                    
-                    batch_features = np.stack([mel[np.newaxis, :, :] for mel in batch_mels], axis=0)
-                    batch_features = batch_features.transpose(0, 1, 3, 2)
-                    
-                    embeddings = self._run_audio_inference(batch_features)
-                    
-                    if embeddings is not None:
-                        if embeddings.ndim == 1:
-                            results[batch_paths[0]] = embeddings
-                        else:
-                            for path, emb in zip(batch_paths, embeddings):
-                                results[path] = emb
-                    
-                    # 更新GPU推理进度
-                    progress = 0.4 + ((batch_idx + 1) / total_batches) * 0.4  # 40-80%
-                    if progress_callback:
-                        try:
-                            progress_callback(progress, f"步骤 2/4：GPU推理 batch {batch_idx + 1}/{total_batches}")
-                        except Exception:
-                            pass
-                
-                t_inference_end = time.perf_counter()
+                pool = self._get_preprocess_pool(cpu_processes)
+                preprocessed = [0]
+
+                def _mel_stream():
+                    for index, mel_log, timed_out in pool.map_unordered(preprocess_func, audio_paths):
+                        preprocessed[0] += 1
+                        if timed_out:
+                            logger.warning(f"Preprocessing timeout, skipping: {Path(audio_paths[index]).name}")
+                            continue
+                        if mel_log is not None:
+                            yield audio_paths[index], mel_log
+
+                def _stage_progress(inferred: int) -> None:
+                    done = preprocessed[0]
+                    # 每10%更新一次进度；预处理与推理同时进行，共占 0-80%
+                    if done % max(1, total // 10) == 0 or done == total:
+                        if progress_callback:
+                            try:
+                                progress_callback(
+                                    (done + inferred) / (2 * total) * 0.8,
+                                    f"步骤 1-2/4：预处理 {done}/{total}，GPU推理 {inferred}",
+                                )
+                            except Exception:
+                                pass
+
+                results, stats = self._pipelined_inference(_mel_stream(), batch_size, _stage_progress)
                 logger.info(
-                    "[CLAP 阶段耗时] 预处理=%.1fs, GPU推理=%.1fs, 有效文件=%d | 若预处理远大于推理则瓶颈在 CPU/IO(librosa)",
-                    t_preprocess_end - t_preprocess_start, t_inference_end - t_inference_start, len(valid_mels)
+                    "[CLAP 阶段耗时] 总耗时=%.1fs（预处理与推理重叠）, GPU推理=%.1fs, 等待预处理=%.1fs, 有效文件=%d | 若等待预处理远大于推理则瓶颈在 CPU/IO",
+                    stats["wall_s"], stats["infer_s"], stats["starved_s"], stats["inferred"]
                 )
+                if not results:
+                    return {}
                 # 步骤3：归一化已在_run_audio_inference中完成 (80-90%)
                 if progress_callback:
                     try:
@@ -629,7 +675,6 @@ class CLAPInferenceService:
         
         if cpu_processes > 1 and len(chunk_paths) > 1:
             try:
-                from multiprocessing import Pool, TimeoutError as MPTimeoutError
                 from functools import partial
                 
                 # CRITICAL: 确保在 PyInstaller 打包后能正确导入
@@ -637,72 +682,37 @@ class CLAPInferenceService:
                 
                 preprocess_func = partial(_preprocess_audio_static, model_dir=str(self.model_dir))
                 
-                valid_mels = []
-                valid_paths = []
-                
-                t_preprocess_start = time.perf_counter()
-                with Pool(processes=cpu_processes) as pool:
-                    # 用 apply_async + get(timeout) 实现单文件超时，避免一个坏文件卡住整块
-                    pending = [(path, pool.apply_async(preprocess_func, (path,))) for path in chunk_paths]
-                    processed = 0
-                    for path, ar in pending:
-                        try:
-                            mel_log = ar.get(timeout=per_file_timeout)
-                            if mel_log is not None:
-                                valid_mels.append(mel_log)
-                                valid_paths.append(path)
-                        except MPTimeoutError:
-                            logger.warning(f"[Chunk {chunk_num}] Preprocessing timeout ({per_file_timeout}s), skipping: {Path(path).name}")
-                        except Exception as e:
-                            logger.debug(f"Preprocessing failed for {Path(path).name}: {e}")
-                        processed += 1
-                        # 每约 10% 或每 100 个更新一次进度
-                        if processed % max(1, min(100, total // 10)) == 0 or processed == total:
-                            progress = 0.0 + (processed / total) * 0.4  # 0-40%
-                            if progress_callback:
-                                try:
-                                    progress_callback(progress, f"块 {chunk_num}：预处理 {processed}/{total}")
-                                except Exception:
-                                    pass
-                
-                t_preprocess_end = time.perf_counter()
-                # 失败/超时的已跳过，valid_mels/valid_paths 已按路径一一对应
-                
-                if not valid_mels:
-                    return {}
-                
-                # 步骤2：批量 GPU 推理 (40-80%)
-                total_batches = (len(valid_mels) + batch_size - 1) // batch_size
-                t_inference_start = time.perf_counter()
-                for batch_idx, i in enumerate(range(0, len(valid_mels), batch_size)):
-                    batch_mels = valid_mels[i:i + batch_size]
-                    batch_paths = valid_paths[i:i + batch_size]
-                    
-                    batch_features = np.stack([mel[np.newaxis, :, :] for mel in batch_mels], axis=0)
-                    batch_features = batch_features.transpose(0, 1, 3, 2)
-                    
-                    embeddings = self._run_audio_inference(batch_features)
-                    
-                    if embeddings is not None:
-                        if embeddings.ndim == 1:
-                            results[batch_paths[0]] = embeddings
-                        else:
-                            for path, emb in zip(batch_paths, embeddings):
-                                results[path] = emb
-                    
-                    # 更新GPU推理进度
-                    progress = 0.4 + ((batch_idx + 1) / total_batches) * 0.4  # 40-80%
-                    if progress_callback:
-                        try:
-                            progress_callback(progress, f"块 {chunk_num}：GPU推理 batch {batch_idx + 1}/{total_batches}")
-                        except Exception:
-                            pass
-                
-                t_inference_end = time.perf_counter()
+                pool = self._get_preprocess_pool(cpu_processes)
+                preprocessed = [0]
+
+                def _mel_stream():
+                    # 常驻进程池按完成顺序流式返回 (下标, mel)；单文件超时只跳过该文件，不阻塞块内其他文件
+                    for index, mel_log, timed_out in pool.map_unordered(preprocess_func, chunk_paths, timeout=per_file_timeout):
+                        preprocessed[0] += 1
+                        if timed_out:
+                            logger.warning(f"[Chunk {chunk_num}] Preprocessing timeout ({per_file_timeout}s), skipping: {Path(chunk_paths[index]).name}")
+                        elif mel_log is not None:
+                            yield chunk_paths[index], mel_log
+
+                def _stage_progress(inferred: int) -> None:
+                    done = preprocessed[0]
+                    # 每约 10% 或每 100 个更新一次进度；预处理与推理同时进行，共占 0-80%
+                    if done % max(1, min(100, total // 10)) == 0 or done == total:
+                        progress = (done + inferred) / (2 * total) * 0.8
+                        if progress_callback:
+                            try:
+                                progress_callback(progress, f"块 {chunk_num}：预处理 {done}/{total}，推理 {inferred}")
+                            except Exception:
+                                pass
+
+                # 步骤1+2：CPU 预处理与 GPU 推理流水线重叠（有界队列，凑满 batch_size 立即推理）
+                results, stats = self._pipelined_inference(_mel_stream(), batch_size, _stage_progress)
                 logger.info(
-                    "[CLAP 阶段耗时] 块%d 预处理=%.1fs, GPU推理=%.1fs, 有效文件=%d",
-                    chunk_num, t_preprocess_end - t_preprocess_start, t_inference_end - t_inference_start, len(valid_mels)
+                    "[CLAP 阶段耗时] 块%d 总耗时=%.1fs（预处理与推理重叠）, GPU推理=%.1fs, 等待预处理=%.1fs, 有效文件=%d",
+                    chunk_num, stats["wall_s"], stats["infer_s"], stats["starved_s"], stats["inferred"]
                 )
+                if not results:
+                    return {}
                 # 步骤3：归一化已在_run_audio_inference中完成 (80-90%)
                 if progress_callback:
                     try:
@@ -719,6 +729,91 @@ class CLAPInferenceService:
         # 单进程模式
         return self._process_single_thread(chunk_paths, batch_size)
     
+    def _pipelined_inference(
+        self,
+        mel_stream: Iterator[Tuple[str, np.ndarray]],
+        batch_size: int,
+        progress: Optional[Callable[[int], None]] = None,
+    ) -> Tuple[Dict[str, np.ndarray], Dict[str, float]]:
+        """
+        生产者/消费者流水线：调用线程消费 mel_stream（CPU 预处理结果），经有界队列送入推理线程，
+        推理线程凑满 batch_size 立即跑 ONNX。内存中最多驻留约 PIPELINE_QUEUE_BATCHES 个 batch 的 mel，
+        总耗时趋近 max(预处理, 推理) 而非两者之和。
+
+        Returns:
+            ({path: embedding}, {"wall_s", "infer_s", "starved_s", "inferred"})
+        """
+        batch_size = max(1, int(batch_size))
+        mel_queue: "queue.Queue[Optional[Tuple[str, np.ndarray]]]" = queue.Queue(
+            maxsize=batch_size * PIPELINE_QUEUE_BATCHES
+        )
+        results: Dict[str, np.ndarray] = {}
+        stats = {"wall_s": 0.0, "infer_s": 0.0, "starved_s": 0.0, "inferred": 0}
+        t_start = time.perf_counter()
+
+        def _flush(batch_paths: list, batch_mels: list) -> None:
+            t0 = time.perf_counter()
+            try:
+                batch_features = np.stack([mel[np.newaxis, :, :] for mel in batch_mels], axis=0)
+                batch_features = batch_features.transpose(0, 1, 3, 2)
+                embeddings = self._run_audio_inference(batch_features)
+            except Exception as e:
+                logger.error(f"Batch inference failed: {e}")
+                embeddings = None
+            if embeddings is not None:
+                if embeddings.ndim == 1:
+                    results[batch_paths[0]] = embeddings
+                else:
+                    for path, emb in zip(batch_paths, embeddings):
+                        results[path] = emb
+            stats["infer_s"] += time.perf_counter() - t0
+            stats["inferred"] += len(batch_paths)
+
+        def _consumer() -> None:
+            batch_paths: list = []
+            batch_mels: list = []
+            while True:
+                t0 = time.perf_counter()
+                item = mel_queue.get()
+                stats["starved_s"] += time.perf_counter() - t0
+                if item is None:
+                    break
+                batch_paths.append(item[0])
+                batch_mels.append(item[1])
+                if len(batch_mels) >= batch_size:
+                    _flush(batch_paths, batch_mels)
+                    batch_paths, batch_mels = [], []
+            if batch_mels:
+                _flush(batch_paths, batch_mels)
+
+        consumer = threading.Thread(target=_consumer, name="clap-inference", daemon=True)
+        consumer.start()
+        try:
+            for item in mel_stream:
+                # 队列满时生产者阻塞（进程池也随之停止派发），实现背压
+                while True:
+                    try:
+                        mel_queue.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        if not consumer.is_alive():
+                            raise RuntimeError("CLAP inference thread exited unexpectedly")
+                if progress:
+                    progress(int(stats["inferred"]))
+        finally:
+            # 结束标记：消费线程已退出时队列可能一直是满的，不能无限阻塞
+            while consumer.is_alive():
+                try:
+                    mel_queue.put(None, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+            consumer.join()
+        if progress:
+            progress(int(stats["inferred"]))
+        stats["wall_s"] = time.perf_counter() - t_start
+        return results, stats
+
     def _process_single_thread(self, audio_paths: list[str], batch_size: int) -> dict[str, np.ndarray]:
         """
         单进程模式处理（回退方案）
@@ -788,7 +883,7 @@ class CLAPInferenceService:
                     logger.debug(f"Format check failed for {Path(audio_path).name}, trying to load anyway: {e}")
             sr = self._preprocessor.sampling_rate
             # 与多进程版本保持一致：仅加载前 10 秒，避免对长文件做不必要的全长解码
-            y, _ = librosa.load(audio_path, sr=sr, duration=10)
+            y, _ = load_audio_head(audio_path, sr=sr, duration=10)
             if y.ndim > 1:
                 y = np.mean(y, axis=0)
             y = trim_silence_start(y, sr)
@@ -904,8 +999,7 @@ class CLAPInferenceService:
             try:
                 emb_list = []
                 valid_labels = []
-                for label in candidate_labels:
-                    text_embed = self.get_text_embedding(label)
+                for label, text_embed in zip(candidate_labels, self.get_text_embeddings(list(candidate_labels))):
                     if text_embed is not None:
                         emb_list.append(text_embed)
                         valid_labels.append(label)
@@ -0,0 +1,160 @@
+"""
+Persistent preprocessing worker pool for CLAP indexing.
+
+原实现每个块新建一个 ``multiprocessing.Pool``：每个 worker 都要重新 import librosa/onnxruntime、
+重新加载 preprocess ONNX 会话，并且按提交顺序 ``get()`` 等待。这里改为服务持有的常驻进程池：
+
+- 跨块、跨任务复用 worker（进程内的预处理器 / ONNX 会话缓存得以保留）
+- 任务带下标提交（``apply_async`` 完成回调），按完成顺序流式返回结果，完成一个处理一个
+- 有界提交窗口：在途任务数 = worker 数，派发时刻即开始时刻，可做准确的单任务超时
+- 单任务超时只跳过该任务；所有 worker 都卡死时终止进程池并重建，继续处理剩余任务
+"""
+
+from __future__ import annotations
+
+import atexit
+import logging
+import queue
+import threading
+import time
+import weakref
+from collections import deque
+from multiprocessing import Pool
+from typing import Any, Callable, Dict, Iterator, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 单任务默认超时（秒）：某个文件解码卡住（损坏/异常编码）时跳过
+DEFAULT_TASK_TIMEOUT = 90.0
+# 结果轮询的最小等待，避免超时临界时忙等
+_MIN_WAIT = 0.05
+
+_live_pools: "weakref.WeakSet[PreprocessPool]" = weakref.WeakSet()
+
+
+def _call_indexed(task: Tuple[Callable[[Any], Any], int, Any]) -> Tuple[int, Any]:
+    """worker 端：执行任务并带回下标（imap_unordered 结果乱序）。"""
+    func, index, arg = task
+    try:
+        return index, func(arg)
+    except Exception as e:
+        logging.getLogger(__name__).debug(f"Preprocess task {index} failed: {e}")
+        return index, None
+
+
+class PreprocessPool:
+    """常驻进程池：``map_unordered`` 流式产出 (index, result, timed_out)。"""
+
+    def __init__(self, processes: int):
+        self.processes = max(1, int(processes))
+        self._pool = None
+        self._lock = threading.Lock()
+        _live_pools.add(self)
+
+    @property
+    def started(self) -> bool:
+        return self._pool is not None
+
+    def _ensure_pool(self):
+        with self._lock:
+            if self._pool is None:
+                t0 = time.perf_counter()
+                self._pool = Pool(processes=self.processes)
+                logger.info(
+                    "Preprocess pool started: %d workers in %.2fs", self.processes, time.perf_counter() - t0
+                )
+            return self._pool
+
+    def _terminate(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            try:
+                pool.terminate()
+                pool.join()
+            except Exception as e:
+                logger.debug(f"Preprocess pool terminate failed: {e}")
+
+    def close(self) -> None:
+        """关闭并回收所有 worker（服务释放或进程退出时调用）。"""
+        self._terminate()
+
+    def map_unordered(
+        self,
+        func: Callable[[Any], Any],
+        items: Sequence[Any],
+        timeout: float = DEFAULT_TASK_TIMEOUT,
+    ) -> Iterator[Tuple[int, Any, bool]]:
+        """
+        对 items 并行执行 func，按完成顺序产出 (下标, 结果, 是否超时)。
+
+        func 必须可 pickle（模块顶层函数或其 functools.partial）。每个下标恰好产出一次；
+        超时任务产出 (index, None, True)，其 worker 卡住期间不再向它派发任务。
+        """
+        pending = deque(range(len(items)))
+        timeout = max(_MIN_WAIT, float(timeout))
+        while pending:
+            pool = self._ensure_pool()
+            done: "queue.Queue[Tuple[int, Any]]" = queue.Queue()
+            dispatched: Dict[int, float] = {}  # 在途任务 -> 派发时刻
+            abandoned: set = set()             # 已判超时、结果到达时丢弃
+            finished = False
+
+            try:
+                while True:
+                    # 有界窗口：在途任务数（含卡住的）不超过 worker 数
+                    while pending and len(dispatched) < self.processes:
+                        index = pending.popleft()
+                        dispatched[index] = time.monotonic()
+                        pool.apply_async(
+                            _call_indexed,
+                            ((func, index, items[index]),),
+                            callback=done.put,
+                            error_callback=_error_callback(done, index),
+                        )
+                    live = [t for i, t in dispatched.items() if i not in abandoned]
+                    if not pending and not live:
+                        break
+                    if not live and len(abandoned) >= self.processes:
+                        break
+                    wait = timeout - (time.monotonic() - min(live)) if live else timeout
+                    try:
+                        index, result = done.get(timeout=max(_MIN_WAIT, wait))
+                    except queue.Empty:
+                        now = time.monotonic()
+                        expired = [i for i, t in dispatched.items() if i not in abandoned and now - t >= timeout]
+                        abandoned.update(expired)
+                        for i in expired:
+                            yield i, None, True
+                        continue
+                    dispatched.pop(index, None)
+                    if index in abandoned:
+                        abandoned.discard(index)
+                        continue
+                    yield index, result, False
+                finished = not abandoned
+            finally:
+                if not finished:
+                    # 有 worker 卡死或调用方提前放弃迭代：终止进程池（杀掉卡住的进程），
+                    # 在途但未超时的任务放回队首，在新池中继续
+                    requeue = [i for i in dispatched if i not in abandoned]
+                    pending.extendleft(reversed(requeue))
+                    if abandoned:
+                        logger.warning("Preprocess pool: %d hung task(s), restarting workers", len(abandoned))
+                    self._terminate()
+
+
+def _error_callback(done: "queue.Queue[Tuple[int, Any]]", index: int) -> Callable[[BaseException], None]:
+    """任务异常时记录日志，并按失败（结果为 None）回报；队列与下标在创建时绑定。"""
+
+    def _on_error(exc: BaseException) -> None:
+        logger.warning(f"Preprocess task {index} failed: {exc}")
+        done.put((index, None))
+
+    return _on_error
+
+
+@atexit.register
+def _shutdown_pools() -> None:
+    for pool in list(_live_pools):
+        pool.close()
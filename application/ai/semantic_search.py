@@ -0,0 +1,275 @@
+"""
+Vectorized semantic search over CLAP embeddings.
+
+所有音频 embedding 预先 L2 归一化后放在一个连续的 float32 矩阵里：
+- 单条查询：一次 GEMV（matrix @ q）
+- 多条查询：按行分块 GEMM（block @ Q.T），分块合并 top-k，分数矩阵内存受控
+- top-k 选择用 ``np.argpartition``（O(n)），只对最终 k 个结果排序
+
+检索耗时写入 ``QueryObservation.semantic_ms / semantic_count``，与 QueryOrchestrator 统计口径一致。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from transcriptionist_v3.application.search_engine.query_orchestrator import QueryObservation
+
+logger = logging.getLogger(__name__)
+
+# GEMM 分块行数：block_rows × n_queries 的分数矩阵常驻内存
+DEFAULT_BLOCK_ROWS = 65536
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix /= norms
+    return matrix
+
+
+def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """返回分数最高的 k 个下标（降序）。"""
+    n = scores.shape[0]
+    if n == 0 or k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < n:
+        idx = np.argpartition(scores, n - k)[n - k :]
+    else:
+        idx = np.arange(n)
+    return idx[np.argsort(scores[idx])[::-1]]
+
+
+class SemanticSearchEngine:
+    """常驻内存的向量化 top-k 语义检索引擎。"""
+
+    def __init__(self, block_rows: int = DEFAULT_BLOCK_ROWS):
+        self.block_rows = max(1, int(block_rows))
+        self._keys: List[str] = []
+        self._ids: Optional[np.ndarray] = None
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # loading
+    # ------------------------------------------------------------------
+
+    @property
+    def size(self) -> int:
+        return len(self._keys)
+
+    @property
+    def dim(self) -> int:
+        return int(self._matrix.shape[1]) if self._matrix.ndim == 2 else 0
+
+    @property
+    def keys(self) -> List[str]:
+        return self._keys
+
+    @property
+    def ids(self) -> Optional[np.ndarray]:
+        return self._ids
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """预归一化的 (size, dim) float32 矩阵（只读使用）。"""
+        return self._matrix
+
+    def set_embeddings(
+        self,
+        keys: Sequence[str],
+        matrix: np.ndarray,
+        ids: Optional[np.ndarray] = None,
+    ) -> None:
+        matrix = np.asarray(matrix)
+        if matrix.ndim != 2 or matrix.shape[0] != len(keys):
+            raise ValueError(f"Embedding matrix shape {matrix.shape} does not match {len(keys)} keys")
+        normalized = _normalize_rows(np.array(matrix, dtype=np.float32, copy=True))
+        with self._lock:
+            self._keys = [str(k) for k in keys]
+            self._matrix = normalized
+            self._ids = None if ids is None else np.asarray(ids, dtype=np.int64)
+
+    @classmethod
+    def from_dict(cls, embeddings: Dict[str, np.ndarray], **kwargs) -> "SemanticSearchEngine":
+        engine = cls(**kwargs)
+        if embeddings:
+            keys = [str(k) for k in embeddings.keys()]
+            matrix = np.asarray([np.asarray(v, dtype=np.float32).reshape(-1) for v in embeddings.values()])
+            engine.set_embeddings(keys, matrix)
+        return engine
+
+    @classmethod
+    def from_store(cls, store, **kwargs) -> "SemanticSearchEngine":
+        """从 EmbeddingStore 的最新行构建（每个文件只保留最后一次写入）。"""
+        engine = cls(**kwargs)
+        rows = store.live_rows()
+        if len(rows) == 0:
+            return engine
+        all_paths = store.paths()
+        source = store.matrix()
+        matrix = np.empty((len(rows), store.dim), dtype=np.float32)
+        for start in range(0, len(rows), engine.block_rows):
+            block = rows[start : start + engine.block_rows]
+            matrix[start : start + len(block)] = source[block]
+        engine.set_embeddings(
+            [all_paths[int(r)] for r in rows],
+            matrix,
+            ids=np.asarray(store.ids())[rows],
+        )
+        return engine
+
+    def build_mask(self, predicate: Callable[[str], bool]) -> np.ndarray:
+        """按路径谓词构建布尔掩码（用于“仅检索所选文件”）。"""
+        return np.fromiter((bool(predicate(k)) for k in self._keys), dtype=bool, count=len(self._keys))
+
+    # ------------------------------------------------------------------
+    # search
+    # ------------------------------------------------------------------
+
+    def search(
+        self,
+        query: np.ndarray,
+        top_k: int = 500,
+        mask: Optional[np.ndarray] = None,
+        observation: Optional[QueryObservation] = None,
+    ) -> List[Tuple[str, float]]:
+        """单条查询：一次 GEMV + argpartition，返回 [(key, cosine)] 降序。"""
+        return self.search_many(
+            np.asarray(query, dtype=np.float32).reshape(1, -1),
+            top_k=top_k,
+            mask=mask,
+            observation=observation,
+        )[0]
+
+    def search_many(
+        self,
+        queries: np.ndarray,
+        top_k: int = 500,
+        mask: Optional[np.ndarray] = None,
+        observation: Optional[QueryObservation] = None,
+    ) -> List[List[Tuple[str, float]]]:
+        """多条查询：按行分块 GEMM，逐块合并 top-k。"""
+        started = time.perf_counter()
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float32))
+        n_queries = queries.shape[0]
+        with self._lock:
+            matrix = self._matrix
+            keys = self._keys
+        if n_queries == 0:
+            return []
+        if len(keys) == 0:
+            results: List[List[Tuple[str, float]]] = [[] for _ in range(n_queries)]
+            self._observe(observation, started, results)
+            return results
+        if queries.shape[1] != matrix.shape[1]:
+            raise ValueError(f"Query dim {queries.shape[1]} != index dim {matrix.shape[1]}")
+
+        qn = np.linalg.norm(queries, axis=1, keepdims=True)
+        qn[qn == 0] = 1.0
+        queries = queries / qn
+        k = max(1, int(top_k))
+        n = matrix.shape[0]
+
+        if n <= self.block_rows:
+            scores = matrix @ queries.T  # (n, q)
+            if mask is not None:
+                scores[~mask] = -np.inf
+            results = [self._collect(scores[:, j], np.arange(n), k, keys) for j in range(n_queries)]
+        else:
+            best_scores = [np.zeros(0, dtype=np.float32) for _ in range(n_queries)]
+            best_rows = [np.zeros(0, dtype=np.int64) for _ in range(n_queries)]
+            for start in range(0, n, self.block_rows):
+                stop = min(start + self.block_rows, n)
+                scores = matrix[start:stop] @ queries.T
+                if mask is not None:
+                    scores[~mask[start:stop]] = -np.inf
+                for j in range(n_queries):
+                    col = scores[:, j]
+                    local = _top_k_indices(col, k)
+                    cand_scores = np.concatenate([best_scores[j], col[local]])
+                    cand_rows = np.concatenate([best_rows[j], local + start])
+                    keep = _top_k_indices(cand_scores, k)
+                    best_scores[j] = cand_scores[keep]
+                    best_rows[j] = cand_rows[keep]
+            results = [
+                [
+                    (keys[int(r)], float(s))
+                    for r, s in zip(best_rows[j], best_scores[j])
+                    if np.isfinite(s)
+                ]
+                for j in range(n_queries)
+            ]
+
+        self._observe(observation, started, results)
+        return results
+
+    @staticmethod
+    def _collect(
+        scores: np.ndarray, rows: np.ndarray, k: int, keys: List[str]
+    ) -> List[Tuple[str, float]]:
+        top = _top_k_indices(scores, k)
+        return [(keys[int(rows[i])], float(scores[i])) for i in top if np.isfinite(scores[i])]
+
+    @staticmethod
+    def _observe(
+        observation: Optional[QueryObservation],
+        started: float,
+        results: List[List[Tuple[str, float]]],
+    ) -> None:
+        if observation is None:
+            return
+        observation.semantic_ms = (time.perf_counter() - started) * 1000.0
+        observation.semantic_count = len(results[0]) if results else 0
+
+    def as_retriever(
+        self,
+        text_encoder: Callable[[str], Optional[np.ndarray]],
+        mask: Optional[np.ndarray] = None,
+    ) -> Callable[[str, int], List[Tuple[str, float]]]:
+        """包装为 QueryOrchestrator 的 semantic_retriever(query_text, top_k)。"""
+
+        def _retrieve(query_text: str, top_k: int) -> List[Tuple[str, float]]:
+            query = text_encoder(query_text)
+            if query is None:
+                return []
+            return self.search(query, top_k=top_k, mask=mask)
+
+        return _retrieve
+
+
+# 常驻引擎缓存：同一存储在 manifest 未变化时复用已归一化的矩阵，避免每次检索重新加载
+_engine_cache: Dict[Tuple[str, str], Tuple[int, SemanticSearchEngine]] = {}
+_engine_cache_lock = threading.Lock()
+
+
+def get_store_engine(store) -> SemanticSearchEngine:
+    """获取（或构建）某个 EmbeddingStore 对应的常驻检索引擎。"""
+    key = (str(store.index_dir), store.base_name)
+    try:
+        stamp = store.manifest_path.stat().st_mtime_ns
+    except OSError:
+        stamp = 0
+    with _engine_cache_lock:
+        cached = _engine_cache.get(key)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+    t0 = time.perf_counter()
+    engine = SemanticSearchEngine.from_store(store)
+    logger.info(
+        "Semantic engine loaded %d embeddings in %.1f ms", engine.size, (time.perf_counter() - t0) * 1000.0
+    )
+    with _engine_cache_lock:
+        _engine_cache[key] = (stamp, engine)
+    return engine
+
+
+def invalidate_store_engine(index_dir, base_name: str = "clap_embeddings") -> None:
+    with _engine_cache_lock:
+        _engine_cache.pop((str(index_dir), base_name), None)
@@ -0,0 +1,228 @@
+"""
+Persistent text-embedding cache for CLAP label sets and queries.
+
+按模型指纹（文本模型 / tokenizer 文件的大小与 mtime）分文件持久化：
+- ``text_{model}_vectors.bin``  追加写入的 (N, dim) float32 矩阵，读取时内存映射
+- ``text_{model}_keys.bin``     与矩阵行对齐的 64 位文本哈希（blake2b），启动时载入为 {hash: row}
+- ``text_{model}.json``         manifest：行数、维度、模型版本（行数以 manifest 为准，崩溃后多余尾部会被截断）
+
+内存中再套一层有上限的 LRU，避免十万级标签/查询把进程内缓存撑爆。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+# 内存 LRU 上限（条）；512 维 float32 约 2 KB/条
+DEFAULT_MEMORY_LIMIT = 20000
+
+
+def text_key(text: str) -> int:
+    """文本的 64 位哈希（无符号整数）。"""
+    return int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def model_fingerprint(*files: Union[str, Path]) -> str:
+    """根据模型文件名、大小与 mtime 生成版本指纹；模型替换后缓存自动失效。"""
+    h = hashlib.sha1()
+    for f in files:
+        path = Path(f)
+        try:
+            st = path.stat()
+            h.update(f"{path.name}:{st.st_size}:{st.st_mtime_ns};".encode("utf-8"))
+        except OSError:
+            h.update(f"{path.name}:missing;".encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+class TextEmbeddingCache:
+    """磁盘持久化 + 内存 LRU 的文本 embedding 缓存。"""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]],
+        model_version: str,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+    ):
+        self.model_version = model_version or "default"
+        self.memory_limit = max(1, int(memory_limit))
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self._lock = threading.RLock()
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._index: Dict[int, int] = {}
+        self._count = 0
+        self._dim = 0
+        self._matrix: Optional[np.ndarray] = None
+
+        if self.cache_dir is not None:
+            base = f"text_{self.model_version}"
+            self.manifest_path = self.cache_dir / f"{base}.json"
+            self.vectors_path = self.cache_dir / f"{base}_vectors.bin"
+            self.keys_path = self.cache_dir / f"{base}_keys.bin"
+            self._load()
+
+    # ------------------------------------------------------------------
+    # persistence
+    # ------------------------------------------------------------------
+
+    @property
+    def persistent(self) -> bool:
+        return self.cache_dir is not None
+
+    @property
+    def dim(self) -> int:
+        return self._dim
+
+    def __len__(self) -> int:
+        return self._count if self.persistent else len(self._lru)
+
+    def _load(self) -> None:
+        if not self.manifest_path.exists():
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            count = int(manifest.get("count", 0))
+            dim = int(manifest.get("dim", 0))
+            if manifest.get("version") != CACHE_VERSION or manifest.get("model_version") != self.model_version:
+                raise ValueError("cache version mismatch")
+            if count and (
+                not self.keys_path.exists()
+                or not self.vectors_path.exists()
+                or self.keys_path.stat().st_size < count * 8
+                or self.vectors_path.stat().st_size < count * dim * 4
+            ):
+                raise ValueError("cache files shorter than manifest")
+            keys = np.fromfile(self.keys_path, dtype="<u8", count=count) if count else np.zeros(0, dtype="<u8")
+            self._index = {int(k): i for i, k in enumerate(keys.tolist())}
+            self._count = count
+            self._dim = dim
+            logger.info("Text embedding cache loaded: %d entries (%s)", count, self.model_version)
+        except Exception as e:
+            logger.warning(f"Text embedding cache unreadable, starting empty: {e}")
+            self._index = {}
+            self._count = 0
+            self._dim = 0
+
+    def _write_manifest(self) -> None:
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": CACHE_VERSION,
+                    "model_version": self.model_version,
+                    "count": self._count,
+                    "dim": self._dim,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+    def _rows(self) -> np.ndarray:
+        if self._matrix is None or self._matrix.shape[0] != self._count:
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(self._count, self._dim))
+        return self._matrix
+
+    # ------------------------------------------------------------------
+    # lookup
+    # ------------------------------------------------------------------
+
+    def _remember(self, text: str, vector: np.ndarray) -> None:
+        self._lru[text] = vector
+        self._lru.move_to_end(text)
+        while len(self._lru) > self.memory_limit:
+            self._lru.popitem(last=False)
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text]).get(text)
+
+    def get_many(self, texts: Sequence[str]) -> Dict[str, np.ndarray]:
+        """返回已缓存的 {text: vector}（副本），未命中的文本不在结果中。"""
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            disk_hits: List[tuple] = []
+            for text in texts:
+                if text in found:
+                    continue
+                vector = self._lru.get(text)
+                if vector is not None:
+                    self._lru.move_to_end(text)
+                    found[text] = vector.copy()
+                    continue
+                if self._count:
+                    row = self._index.get(text_key(text))
+                    if row is not None:
+                        disk_hits.append((text, row))
+            if disk_hits:
+                matrix = self._rows()
+                rows = np.asarray([row for _, row in disk_hits], dtype=np.int64)
+                block = np.array(matrix[rows], dtype=np.float32)
+                for (text, _), vector in zip(disk_hits, block):
+                    self._remember(text, vector)
+                    found[text] = vector.copy()
+        return found
+
+    def put_many(self, texts: Sequence[str], matrix: np.ndarray) -> None:
+        """写入新的 embedding（已存在的文本跳过），持久化模式下追加到磁盘。"""
+        matrix = np.asarray(matrix, dtype=np.float32)
+        if len(texts) == 0:
+            return
+        if matrix.ndim != 2 or matrix.shape[0] != len(texts):
+            raise ValueError(f"Embedding matrix shape {matrix.shape} does not match {len(texts)} texts")
+        with self._lock:
+            for text, vector in zip(texts, matrix):
+                self._remember(text, vector.copy())
+            if not self.persistent:
+                return
+            if self._dim and matrix.shape[1] != self._dim:
+                logger.warning(f"Text embedding dim changed {self._dim} -> {matrix.shape[1]}, cache not persisted")
+                return
+            new_rows = []
+            new_keys = []
+            seen = set()
+            for i, text in enumerate(texts):
+                key = text_key(text)
+                if key in self._index or key in seen:
+                    continue
+                seen.add(key)
+                new_rows.append(i)
+                new_keys.append(key)
+            if not new_rows:
+                return
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                dim = int(matrix.shape[1])
+                # 以 manifest 行数为准截断尾部（上次写入中断时可能残留半行）
+                for path, row_bytes, payload in (
+                    (self.vectors_path, dim * 4, np.ascontiguousarray(matrix[new_rows]).tobytes()),
+                    (self.keys_path, 8, np.asarray(new_keys, dtype="<u8").tobytes()),
+                ):
+                    with open(path, "r+b" if path.exists() else "wb") as f:
+                        f.truncate(self._count * row_bytes)
+                        f.seek(self._count * row_bytes)
+                        f.write(payload)
+                for offset, key in enumerate(new_keys):
+                    self._index[key] = self._count + offset
+                self._count += len(new_keys)
+                self._dim = dim
+                self._matrix = None
+                self._write_manifest()
+            except Exception as e:
+                logger.warning(f"Failed to persist text embeddings: {e}")
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._lru.clear()
+            self._matrix = None
@@ -7,10 +7,12 @@ HY-MT1.5 ONNX Translation Service
 
 from __future__ import annotations
 
+import json
 import logging
 import re
+import time
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 import numpy as np
 
@@ -52,12 +54,22 @@ class HyMT15OnnxService(TranslationService):
     SERVICE_NAME = "HY-MT1.5 ONNX"
     SERVICE_DESC = "腾讯开源专用翻译模型 (ONNX Runtime)"
     
+    # 文件名翻译的生成长度上限（文件名通常很短，15 个 token 足够）
+    MAX_NEW_TOKENS = 15
+    # 至少生成这么多 token 后才按句末标点提前停止
+    MIN_TOKENS_BEFORE_MARKER_STOP = 6
+    STOP_MARKERS = ('。', '\n', '\r', '.', '！', '？')
+    
     def __init__(self, config: AIServiceConfig):
         super().__init__(config)
         self._session: Optional[ort.InferenceSession] = None
         self._tokenizer = None
         self._model_path: Optional[Path] = None
         self._providers = []
+        # KV cache 布局（past_key_values.* -> present.*）；None 表示模型不支持，退回无缓存逐条生成
+        self._kv_layout: Optional[dict] = None
+        self._logits_name: str = "logits"
+        self._eos_token_ids: set = set()
         
     def _get_model_path(self) -> Optional[Path]:
         """获取模型路径"""
@@ -141,6 +153,18 @@ class HyMT15OnnxService(TranslationService):
             # 加载 tokenizer
             self._load_tokenizer()
             
+            output_names = [out.name for out in self._session.get_outputs()]
+            self._logits_name = "logits" if "logits" in output_names else output_names[0]
+            self._kv_layout = self._detect_kv_layout()
+            self._eos_token_ids = self._load_eos_token_ids()
+            if self._kv_layout is not None:
+                logger.info(
+                    "HY-MT1.5 ONNX: KV cache enabled (%d layers, heads=%d, head_dim=%d)",
+                    len(self._kv_layout["pairs"]) // 2, self._kv_layout["heads"], self._kv_layout["head_dim"],
+                )
+            else:
+                logger.info("HY-MT1.5 ONNX: model has no usable past_key_values, using uncached generation")
+            
         except Exception as e:
             logger.error(f"Failed to initialize ONNX model: {e}")
             raise
@@ -286,10 +310,11 @@ class HyMT15OnnxService(TranslationService):
         批量翻译
         
         实现步骤：
-        1. 使用 tokenizer 编码输入文本为 token IDs
-        2. 准备模型输入（input_ids, attention_mask 等）
-        3. 调用 ONNX 模型进行推理
-        4. 解码输出 token IDs 为文本
+        1. 使用 tokenizer 编码输入文本为 token IDs，按长度排序分批
+        2. 每批左填充后一次前向 prompt，随后复用 past_key_values 逐 token 生成（逐行 EOS）
+        3. 解码输出 token IDs 为文本，按原顺序返回
+        
+        进度回调的消息中附带生成吞吐（tokens/s）。
         """
         if not texts:
             return AIResult(status=AIResultStatus.SUCCESS, data=[])
@@ -308,8 +333,6 @@ class HyMT15OnnxService(TranslationService):
             logger.debug(f"Model inputs: {list(model_inputs.keys())}")
             logger.debug(f"Model outputs: {model_outputs}")
             
-            results: List[TranslationResult] = []
-            
             # 批量处理（根据用户设置的批次大小）
             from transcriptionist_v3.core.config import AppConfig, get_recommended_translate_chunk_size
             batch_size = AppConfig.get("ai.translate_chunk_size", None)
@@ -333,102 +356,52 @@ class HyMT15OnnxService(TranslationService):
                 logger.info(f"HY-MT1.5 ONNX: clamp batch_size from {batch_size} to 80 for stability")
                 batch_size = 80
             
-            for batch_start in range(0, len(texts), batch_size):
-                batch_texts = texts[batch_start:batch_start + batch_size]
+            # 1. 按官方模板构建 prompt 并编码；按 prompt 长度排序后再分批，使同批长度接近、左填充最少
+            prompts: List[List[int]] = []
+            for text in texts:
+                prompt_text = self._build_prompt(text, source_lang, target_lang)
+                prompts.append(list(self._tokenizer.encode(prompt_text).ids))
+            order = sorted(range(len(texts)), key=lambda i: len(prompts[i]))
+            translated: List[str] = [""] * len(texts)
+            
+            num_batches = (len(order) + batch_size - 1) // batch_size
+            generated_tokens = 0
+            started = time.perf_counter()
+            
+            for batch_no, batch_start in enumerate(range(0, len(order), batch_size), start=1):
+                batch_idx = order[batch_start:batch_start + batch_size]
                 
                 if progress_callback:
-                    progress_callback(batch_start, len(texts), f"翻译批次 {batch_start // batch_size + 1}...")
-                
-                batch_results: List[TranslationResult] = []
+                    progress_callback(
+                        batch_start,
+                        len(texts),
+                        f"翻译批次 {batch_no}/{num_batches}...{self._format_rate(generated_tokens, started)}",
+                    )
                 
-                # 目前以“逐条”方式推理，先保证稳定性
-                for text in batch_texts:
-                    try:
-                        # 1. 按官方模板构建 prompt，并编码为 token id 序列
-                        prompt_text = self._build_prompt(text, source_lang, target_lang)
-                        if not self._tokenizer:
-                            raise RuntimeError("Tokenizer not loaded")
-                        encoding = self._tokenizer.encode(prompt_text)
-                        curr_ids: List[int] = list(encoding.ids)
-                        prompt_len = len(curr_ids)
-                        
-                        # 为文件名翻译设置较小的生成长度（文件名通常很短，15个token足够）
-                        max_new_tokens = 15
-                        
-                        # 动态调整 max_length：prompt + 生成部分，但不超过128
-                        # 这样可以减少每一步的计算量
-                        dynamic_max_length = min(128, prompt_len + max_new_tokens + 10)
-                        
-                        # 尝试获取 EOS token ID（如果 tokenizer 支持）
-                        eos_token_id = None
-                        try:
-                            # 某些 tokenizer 可能有 eos_token_id 属性
-                            if hasattr(self._tokenizer, 'eos_token_id') and self._tokenizer.eos_token_id is not None:
-                                eos_token_id = self._tokenizer.eos_token_id
-                        except:
-                            pass
-                        
-                        # 2. 优化的贪心自回归生成循环
-                        for step in range(max_new_tokens):
-                            inputs, seq_len = self._build_step_inputs(curr_ids, model_inputs, max_length=dynamic_max_length)
-                            outputs = self._session.run(None, inputs)
-                            
-                            if not outputs:
-                                logger.warning("HY-MT1.5 ONNX model returned no outputs during generation")
-                                break
-                            
-                            logits = outputs[0]
-                            if not isinstance(logits, np.ndarray) or logits.ndim != 3:
-                                logger.warning(f"Unexpected logits shape from HY-MT1.5 ONNX: {getattr(logits, 'shape', None)}")
-                                break
-                            
-                            # 取当前序列最后一个位置的 logits 做贪心选取
-                            last_pos = min(seq_len - 1, logits.shape[1] - 1)
-                            next_token_id = int(logits[0, last_pos].argmax(axis=-1))
-                            curr_ids.append(next_token_id)
-                            
-                            # 优化的停止条件：
-                            # 1. EOS token
-                            if eos_token_id is not None and next_token_id == eos_token_id:
-                                break
-                            # 2. Padding token（通常表示结束）
-                            if next_token_id == 0:
-                                break
-                            # 3. 提前解码检查：如果已经生成了足够的内容（检测到句号、换行等），提前停止
-                            if step >= 5:  # 至少生成5个token后再检查
-                                try:
-                                    temp_decoded = self._tokenizer.decode(curr_ids[prompt_len:], skip_special_tokens=False)
-                                    # 检测常见结束标志
-                                    if any(marker in temp_decoded for marker in ['。', '\n', '\r', '.', '！', '？']):
-                                        break
-                                except:
-                                    pass
-                        
-                        # 3. 只解码“新生成的部分”作为翻译结果
-                        gen_ids = curr_ids[prompt_len:]
-                        if not gen_ids:
-                            translated = ""
-                        else:
-                            token_arr = np.array([gen_ids], dtype=np.int64)
-                            translated = self._decode_tokens(token_arr)
-                        
-                        batch_results.append(TranslationResult(
-                            original=text,
-                            translated=translated or text,
-                        ))
-                    
-                    except Exception as e:
-                        logger.error(f"Translation failed for '{text}': {e}")
-                        # 失败时返回原文，避免整批报错
-                        batch_results.append(TranslationResult(
-                            original=text,
-                            translated=text,
-                        ))
+                # 2. 批量贪心生成（左填充 + KV cache，逐行 EOS）；失败时整批返回原文
+                try:
+                    batch_generated = self._generate([prompts[i] for i in batch_idx], model_inputs)
+                except Exception as e:
+                    logger.error(f"Translation failed for batch {batch_no}: {e}")
+                    batch_generated = [[] for _ in batch_idx]
                 
-                results.extend(batch_results)
+                # 3. 只解码“新生成的部分”作为翻译结果
+                for i, gen_ids in zip(batch_idx, batch_generated):
+                    generated_tokens += len(gen_ids)
+                    if gen_ids:
+                        translated[i] = self._decode_tokens(np.array([gen_ids], dtype=np.int64))
+            
+            results: List[TranslationResult] = [
+                TranslationResult(original=text, translated=translated[i] or text)
+                for i, text in enumerate(texts)
+            ]
+            logger.info(
+                "HY-MT1.5 ONNX: translated %d texts, %d tokens%s",
+                len(texts), generated_tokens, self._format_rate(generated_tokens, started),
+            )
             
             if progress_callback:
-                progress_callback(len(texts), len(texts), "翻译完成")
+                progress_callback(len(texts), len(texts), f"翻译完成{self._format_rate(generated_tokens, started)}")
             
             return AIResult(status=AIResultStatus.SUCCESS, data=results)
             
@@ -439,6 +412,232 @@ class HyMT15OnnxService(TranslationService):
                 error=str(e)
             )
     
+    @staticmethod
+    def _format_rate(tokens: int, started: float) -> str:
+        """进度消息中的生成吞吐（tokens/s）。"""
+        elapsed = time.perf_counter() - started
+        if tokens <= 0 or elapsed <= 0:
+            return ""
+        return f"（{tokens / elapsed:.1f} tokens/s）"
+    
+    def _read_model_json(self, name: str) -> dict:
+        """读取模型目录下的 config.json / generation_config.json，缺失或损坏时返回空 dict。"""
+        if self._model_path is None:
+            return {}
+        path = self._model_path.parent / name
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            logger.debug(f"Failed to read {path}: {e}")
+            return {}
+    
+    def _load_eos_token_ids(self) -> set:
+        """EOS token：优先 generation_config.json / config.json，其次 tokenizer 属性。"""
+        eos: set = set()
+        for name in ("generation_config.json", "config.json"):
+            value = self._read_model_json(name).get("eos_token_id")
+            if isinstance(value, int):
+                eos.add(value)
+            elif isinstance(value, list):
+                eos.update(int(v) for v in value if isinstance(v, int))
+        try:
+            if getattr(self._tokenizer, "eos_token_id", None) is not None:
+                eos.add(int(self._tokenizer.eos_token_id))
+        except Exception:
+            pass
+        return eos
+    
+    def _detect_kv_layout(self) -> Optional[dict]:
+        """
+        识别 past_key_values.* 输入与 present.* 输出的对应关系，以及 KV 的 head 数 / head 维度。
+        
+        形状里 head 维是动态轴时从 config.json 读取；无法确定时返回 None（退回无缓存生成）。
+        """
+        output_names = {out.name for out in self._session.get_outputs()}
+        pairs: List[Tuple[str, str]] = []
+        heads = head_dim = None
+        dtype = np.float32
+        for meta in self._session.get_inputs():
+            if not meta.name.startswith("past_key_values"):
+                continue
+            present = "present" + meta.name[len("past_key_values"):]
+            if present not in output_names:
+                return None
+            pairs.append((meta.name, present))
+            dtype = np.float16 if meta.type == "tensor(float16)" else np.float32
+            shape = list(meta.shape)
+            if len(shape) == 4:
+                if isinstance(shape[1], int) and shape[1] > 0:
+                    heads = shape[1]
+                if isinstance(shape[3], int) and shape[3] > 0:
+                    head_dim = shape[3]
+        if not pairs:
+            return None
+        if heads is None or head_dim is None:
+            cfg = self._read_model_json("config.json")
+            n_heads = cfg.get("num_attention_heads")
+            heads = heads or cfg.get("num_key_value_heads") or n_heads
+            if head_dim is None:
+                head_dim = cfg.get("head_dim") or (
+                    cfg["hidden_size"] // n_heads if cfg.get("hidden_size") and n_heads else None
+                )
+        if not heads or not head_dim:
+            logger.warning("HY-MT1.5 ONNX: cannot infer KV cache shape, KV cache disabled")
+            return None
+        return {"pairs": pairs, "heads": int(heads), "head_dim": int(head_dim), "dtype": dtype}
+    
+    def _is_finished(self, gen_ids: List[int]) -> bool:
+        """逐行停止条件：EOS / padding token / 已生成足够内容且出现句末标点。"""
+        token = gen_ids[-1]
+        if token in self._eos_token_ids or token == 0:
+            return True
+        if len(gen_ids) >= self.MIN_TOKENS_BEFORE_MARKER_STOP:
+            try:
+                temp_decoded = self._tokenizer.decode(gen_ids, skip_special_tokens=False)
+                return any(marker in temp_decoded for marker in self.STOP_MARKERS)
+            except Exception:
+                return False
+        return False
+    
+    def _generate(self, prompts: List[List[int]], model_inputs: dict) -> List[List[int]]:
+        """批量贪心生成，返回每条 prompt 新生成的 token id。"""
+        if self._kv_layout is not None:
+            try:
+                return self._generate_with_cache(prompts, model_inputs)
+            except Exception as e:
+                # 导出的图与推断的 KV 形状不匹配等情况：本次会话内永久退回无缓存路径
+                logger.warning(f"HY-MT1.5 ONNX: KV cache generation failed, falling back to uncached: {e}")
+                self._kv_layout = None
+        results: List[List[int]] = []
+        for ids in prompts:
+            try:
+                results.append(self._generate_without_cache(ids, model_inputs))
+            except Exception as e:
+                logger.error(f"Translation generation failed: {e}")
+                results.append([])
+        return results
+    
+    def _generate_with_cache(self, prompts: List[List[int]], model_inputs: dict) -> List[List[int]]:
+        """
+        左填充多序列批量生成 + past_key_values 复用。
+        
+        首步送入完整 prompt（左填充，使每行最后一个位置都是真实 token），之后每步只送入
+        上一步生成的 1 个 token 与 present.* 作为新的 past；某行结束后即从批中移除，
+        后续步骤只为仍在生成的行计算。
+        """
+        layout = self._kv_layout
+        batch = len(prompts)
+        max_len = max(len(ids) for ids in prompts)
+        input_ids = np.zeros((batch, max_len), dtype=np.int64)
+        attention_mask = np.zeros((batch, max_len), dtype=np.int64)
+        for row, ids in enumerate(prompts):
+            input_ids[row, max_len - len(ids):] = ids
+            attention_mask[row, max_len - len(ids):] = 1
+        position_ids = np.clip(np.cumsum(attention_mask, axis=1) - 1, 0, None)
+        past: Dict[str, np.ndarray] = {
+            name: np.zeros((batch, layout["heads"], 0, layout["head_dim"]), dtype=layout["dtype"])
+            for name, _ in layout["pairs"]
+        }
+        output_names = [self._logits_name] + [present for _, present in layout["pairs"]]
+        
+        generated: List[List[int]] = [[] for _ in range(batch)]
+        active = np.arange(batch)  # 批内行号 -> 原始 prompt 下标
+        for step in range(self.MAX_NEW_TOKENS):
+            feed = self._build_cached_inputs(model_inputs, input_ids, attention_mask, position_ids, past, step)
+            outputs = self._session.run(output_names, feed)
+            logits = outputs[0]
+            if not isinstance(logits, np.ndarray) or logits.ndim != 3:
+                raise RuntimeError(f"Unexpected logits shape: {getattr(logits, 'shape', None)}")
+            next_ids = logits[:, -1, :].argmax(axis=-1).astype(np.int64)
+            
+            keep = np.ones(len(active), dtype=bool)
+            for row, prompt_idx in enumerate(active):
+                gen_ids = generated[prompt_idx]
+                gen_ids.append(int(next_ids[row]))
+                if self._is_finished(gen_ids):
+                    keep[row] = False
+            if not keep.any():
+                break
+            
+            past = {name: out for (name, _), out in zip(layout["pairs"], outputs[1:])}
+            if not keep.all():
+                active = active[keep]
+                next_ids = next_ids[keep]
+                attention_mask = attention_mask[keep]
+                position_ids = position_ids[keep]
+                past = {name: arr[keep] for name, arr in past.items()}
+            input_ids = next_ids[:, None]
+            attention_mask = np.concatenate(
+                [attention_mask, np.ones((len(active), 1), dtype=np.int64)], axis=1
+            )
+            position_ids = position_ids[:, -1:] + 1
+        return generated
+    
+    @staticmethod
+    def _build_cached_inputs(
+        model_inputs: dict,
+        input_ids: np.ndarray,
+        attention_mask: np.ndarray,
+        position_ids: np.ndarray,
+        past: Dict[str, np.ndarray],
+        step: int,
+    ) -> dict:
+        """按模型声明的输入名/类型组装带 KV cache 的单步输入。"""
+        inputs: dict = {}
+        for name, meta in model_inputs.items():
+            ort_type = meta.type
+            if name in past:
+                inputs[name] = past[name]
+            elif name == "input_ids":
+                inputs[name] = input_ids.astype(np.int32 if ort_type == "tensor(int32)" else np.int64)
+            elif name == "attention_mask":
+                inputs[name] = attention_mask.astype(np.int32 if ort_type == "tensor(int32)" else np.int64)
+            elif name == "position_ids":
+                inputs[name] = position_ids.astype(np.int32 if ort_type == "tensor(int32)" else np.int64)
+            elif name == "use_cache_branch":
+                # optimum merged decoder：首步走无缓存分支
+                inputs[name] = np.array([step > 0], dtype=bool)
+            elif ort_type in ("tensor(int64)", "tensor(int32)", "tensor(float16)", "tensor(float)"):
+                shape = [dim if isinstance(dim, int) and dim > 0 else 1 for dim in meta.shape]
+                if ort_type == "tensor(int64)":
+                    dtype = np.int64
+                elif ort_type == "tensor(int32)":
+                    dtype = np.int32
+                else:
+                    dtype = np.float16 if "16" in ort_type else np.float32
+                inputs[name] = np.zeros(shape, dtype=dtype)
+        return inputs
+    
+    def _generate_without_cache(self, prompt_ids: List[int], model_inputs: dict) -> List[int]:
+        """
+        无 KV cache 的逐条贪心生成（模型未导出 present.* 时的兼容路径）：
+        每一步都把当前完整序列送入模型，仅取最后一个位置的 logits。
+        """
+        curr_ids: List[int] = list(prompt_ids)
+        prompt_len = len(curr_ids)
+        # 动态调整 max_length：prompt + 生成部分，但不超过128，减少每一步的计算量
+        dynamic_max_length = min(128, prompt_len + self.MAX_NEW_TOKENS + 10)
+        for _ in range(self.MAX_NEW_TOKENS):
+            inputs, seq_len = self._build_step_inputs(curr_ids, model_inputs, max_length=dynamic_max_length)
+            outputs = self._session.run(None, inputs)
+            if not outputs:
+                logger.warning("HY-MT1.5 ONNX model returned no outputs during generation")
+                break
+            logits = outputs[0]
+            if not isinstance(logits, np.ndarray) or logits.ndim != 3:
+                logger.warning(f"Unexpected logits shape from HY-MT1.5 ONNX: {getattr(logits, 'shape', None)}")
+                break
+            # 取当前序列最后一个位置的 logits 做贪心选取
+            last_pos = min(seq_len - 1, logits.shape[1] - 1)
+            curr_ids.append(int(logits[0, last_pos].argmax(axis=-1)))
+            if self._is_finished(curr_ids[prompt_len:]):
+                break
+        return curr_ids[prompt_len:]
+    
     def _build_prompt(self, text: str, source_lang: str, target_lang: str) -> str:
         """
         按照 HY-MT 官方 README 中的提示词模板构建输入。
@@ -549,10 +748,9 @@ class HyMT15OnnxService(TranslationService):
         max_length: int = 128,
     ) -> tuple[dict, int]:
         """
-        为自回归生成的单步前向构建输入张量。
+        为无缓存的自回归生成构建单步前向输入张量。
         
-        为了简化逻辑，这里不复用 past_key_values，而是每一步都把
-        当前完整序列送入模型，仅取最后一个位置的 logits。
+        不复用 past_key_values，每一步都把当前完整序列送入模型，仅取最后一个位置的 logits。
         
         优化：使用较小的 max_length（128）以减少计算量，文件名翻译场景足够。
         """
@@ -2,25 +2,49 @@
 Translation Cache
 
 翻译缓存服务，避免重复翻译相同内容。
+
+存储为 SQLite 表（标准库 sqlite3，WAL 模式），主键 (provider, model, source_lang, target_lang, text_hash)：
+
+- 查询走主键索引，``get_many`` / ``put_many`` 按批 IN 查询 / 单事务写入，不再把整个缓存读进内存
+- 写入即持久化（增量），不再整体重写 JSON 文件
+- 近似 LRU：最近使用时间按小时分桶，命中次数与 last_used 在内存中攒批，``save`` 或攒满时一次写回；
+  超出容量时沿 (last_used, created_at) 索引删除最旧的一批，不做全量排序；同一小时桶内先删写入最早的
+- 首次打开时把旧版 ``translation_cache.json`` 一次性导入，原文件改名为 ``.imported`` 保留
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
-import hashlib
-from pathlib import Path
-from typing import Dict, Optional
-from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+import sqlite3
 import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# IN 列表分批（SQLite 变量数上限）
+SQLITE_IN_BATCH = 500
+# 默认容量（条）
+DEFAULT_MAX_SIZE = 1_000_000
+# 超出容量时一次淘汰的比例
+EVICT_FRACTION = 0.1
+# last_used 分桶粒度（秒）
+LRU_BUCKET_SECONDS = 3600
+# 命中统计 / last_used 写回缓冲上限（超过即提交）
+TOUCH_FLUSH_SIZE = 2000
+# 旧版 JSON 导入的写入批量
+IMPORT_BATCH = 5000
+DEFAULT_SOURCE_LANG = "en"
+DEFAULT_TARGET_LANG = "zh"
+
 
 @dataclass
 class CacheEntry:
-    """缓存条目"""
+    """缓存条目（旧版 JSON 格式）"""
     original: str
     translated: str
     provider_id: str
@@ -28,35 +52,55 @@ class CacheEntry:
     hit_count: int = 0
 
 
+def _text_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def _bucket(now: Optional[float] = None) -> int:
+    return int((now if now is not None else time.time()) // LRU_BUCKET_SECONDS)
+
+
+def _is_valid(original: str, translated: Optional[str]) -> bool:
+    """原文 == 译文 或译文为空说明翻译失败，不缓存。"""
+    return bool(translated) and translated != original
+
+
 class TranslationCache:
     """
     翻译缓存
-    
+
     功能：
-    - 内存缓存 + 持久化存储
-    - LRU淘汰策略
-    - 按提供者分离缓存
+    - SQLite 持久化存储，按主键 O(1) 查询
+    - 批量读写（get_many / put_many）
+    - 近似 LRU 淘汰
+    - 按提供者、模型、语言对分离缓存
     """
-    
+
     _instance: Optional['TranslationCache'] = None
     _lock = threading.Lock()
-    
-    def __init__(self, cache_dir: Optional[Path] = None, max_size: int = 10000):
-        self._cache: Dict[str, CacheEntry] = {}
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_size: int = DEFAULT_MAX_SIZE):
         self._max_size = max_size
-        self._dirty = False
-        
+
         # 缓存文件路径
         if cache_dir is None:
             from ...core.config import get_data_dir
             cache_dir = get_data_dir() / "cache"
-        
+
         self._cache_dir = cache_dir
-        self._cache_file = cache_dir / "translation_cache.json"
-        
-        # 加载缓存
-        self._load()
-    
+        self._db_file = cache_dir / "translation_cache.sqlite3"
+        self._legacy_file = cache_dir / "translation_cache.json"
+
+        self._db_lock = threading.RLock()
+        # 待写回的命中：{主键: 命中次数}
+        self._touches: Dict[Tuple[str, str, str, str, bytes], int] = {}
+        self._conn = self._open()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+        # 一次性导入旧版 JSON 缓存
+        if self._legacy_file.exists():
+            self.import_json(self._legacy_file)
+
     @classmethod
     def instance(cls) -> 'TranslationCache':
         """获取单例实例"""
@@ -65,123 +109,262 @@ class TranslationCache:
                 if cls._instance is None:
                     cls._instance = cls()
         return cls._instance
-    
-    def _make_key(self, text: str, provider_id: str = "") -> str:
-        """生成缓存键"""
-        content = f"{provider_id}:{text}"
-        return hashlib.md5(content.encode()).hexdigest()
-    
-    def get(self, text: str, provider_id: str = "") -> Optional[str]:
+
+    def _open(self) -> sqlite3.Connection:
+        self._cache_dir.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self._db_file), timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                provider TEXT NOT NULL,
+                model TEXT NOT NULL,
+                source_lang TEXT NOT NULL,
+                target_lang TEXT NOT NULL,
+                text_hash BLOB NOT NULL,
+                original TEXT NOT NULL,
+                translated TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used INTEGER NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (provider, model, source_lang, target_lang, text_hash)
+            )
+            """
+        )
+        # 淘汰顺序：小时桶 + 写入时间（桶内不会先删刚写入的条目）
+        conn.execute("DROP INDEX IF EXISTS idx_translations_last_used")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_translations_lru ON translations (last_used, created_at)")
+        conn.commit()
+        return conn
+
+    # ------------------------------------------------------------------
+    # 批量接口
+    # ------------------------------------------------------------------
+
+    def get_many(
+        self,
+        texts: Iterable[str],
+        provider_id: str = "",
+        model: str = "",
+        source_lang: str = DEFAULT_SOURCE_LANG,
+        target_lang: str = DEFAULT_TARGET_LANG,
+    ) -> Dict[str, str]:
+        """批量获取缓存的翻译，返回 {原文: 译文}（只包含命中的）。"""
+        by_hash = {_text_hash(t): t for t in dict.fromkeys(texts)}
+        found: Dict[str, str] = {}
+        if not by_hash:
+            return found
+
+        # 旧版缓存不区分模型（导入时 model 为空）：当前模型未命中时再查一次
+        models = [model, ""] if model else [""]
+        bucket = _bucket()
+        invalid: List[Tuple[str, str, str, str, bytes]] = []
+        with self._db_lock:
+            for m in models:
+                pending = [h for h, t in by_hash.items() if t not in found]
+                for i in range(0, len(pending), SQLITE_IN_BATCH):
+                    batch = pending[i : i + SQLITE_IN_BATCH]
+                    rows = self._conn.execute(
+                        "SELECT text_hash, original, translated FROM translations "
+                        "WHERE provider = ? AND model = ? AND source_lang = ? AND target_lang = ? "
+                        f"AND text_hash IN ({', '.join('?' * len(batch))})",
+                        (provider_id, m, source_lang, target_lang, *batch),
+                    ).fetchall()
+                    for text_hash, original, translated in rows:
+                        text = by_hash[text_hash]
+                        key = (provider_id, m, source_lang, target_lang, text_hash)
+                        if original != text:
+                            continue
+                        if not _is_valid(original, translated):
+                            invalid.append(key)
+                            continue
+                        found[text] = translated
+                        self._touches[key] = self._touches.get(key, 0) + 1
+            if invalid:
+                self._conn.executemany(
+                    "DELETE FROM translations WHERE provider = ? AND model = ? AND source_lang = ? "
+                    "AND target_lang = ? AND text_hash = ?",
+                    invalid,
+                )
+                self._conn.commit()
+                self._count -= len(invalid)
+                logger.debug(f"Removed {len(invalid)} invalid cache entries (original == translated)")
+            if len(self._touches) >= TOUCH_FLUSH_SIZE:
+                self._flush_touches(bucket)
+        return found
+
+    def put_many(
+        self,
+        items: Iterable[Tuple[str, str]],
+        provider_id: str = "",
+        model: str = "",
+        source_lang: str = DEFAULT_SOURCE_LANG,
+        target_lang: str = DEFAULT_TARGET_LANG,
+    ) -> int:
+        """批量写入 (原文, 译文)，单个事务提交；返回写入条数。"""
+        return self._upsert(
+            ((original, translated, 0) for original, translated in items),
+            provider_id, model, source_lang, target_lang,
+        )
+
+    def _upsert(
+        self,
+        items: Iterable[Tuple[str, str, int]],
+        provider_id: str,
+        model: str,
+        source_lang: str,
+        target_lang: str,
+    ) -> int:
+        """写入 (原文, 译文, 命中次数)；已有条目的命中次数累加。"""
+        now = time.time()
+        bucket = _bucket(now)
+        rows = [
+            (provider_id, model, source_lang, target_lang, _text_hash(original), original, translated, now, bucket,
+             max(0, int(hits or 0)))
+            for original, translated, hits in items
+            if _is_valid(original, translated)
+        ]
+        if not rows:
+            return 0
+        with self._db_lock:
+            self._conn.executemany(
+                "INSERT INTO translations "
+                "(provider, model, source_lang, target_lang, text_hash, original, translated, created_at, last_used, "
+                "hit_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (provider, model, source_lang, target_lang, text_hash) DO UPDATE SET "
+                "original = excluded.original, translated = excluded.translated, "
+                "created_at = excluded.created_at, last_used = excluded.last_used, "
+                "hit_count = translations.hit_count + excluded.hit_count",
+                rows,
+            )
+            self._conn.commit()
+            # 覆盖已有条目不增加行数：计数按上界累加，超过容量时再精确重数
+            self._count += len(rows)
+            if self._count > self._max_size:
+                self._count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+                if self._count > self._max_size:
+                    self._evict()
+        return len(rows)
+
+    # ------------------------------------------------------------------
+    # 单条接口（兼容旧调用）
+    # ------------------------------------------------------------------
+
+    def get(self, text: str, provider_id: str = "", model: str = "") -> Optional[str]:
         """获取缓存的翻译"""
-        key = self._make_key(text, provider_id)
-        entry = self._cache.get(key)
-        
-        if entry:
-            # 检测无效缓存：如果原文 == 译文，说明之前翻译失败，删除并返回 None
-            if entry.original == entry.translated:
-                del self._cache[key]
-                self._dirty = True
-                logger.debug(f"Removed invalid cache entry (original == translated): {text[:30]}...")
-                return None
-            
-            entry.hit_count += 1
-            self._dirty = True
-            return entry.translated
-        
-        return None
-    
-    def has(self, text: str, provider_id: str = "") -> bool:
-        """检查是否有缓存"""
-        key = self._make_key(text, provider_id)
-        return key in self._cache
-    
-    def set(self, text: str, translated: str, provider_id: str = "") -> None:
+        return self.get_many([text], provider_id, model).get(text)
+
+    def has(self, text: str, provider_id: str = "", model: str = "") -> bool:
+        """检查是否有缓存（与 get_many 一致：当前模型未命中时再查不区分模型的旧版条目）"""
+        models = [model, ""] if model else [""]
+        with self._db_lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM translations WHERE provider = ? AND source_lang = ? AND target_lang = ? "
+                f"AND text_hash = ? AND model IN ({', '.join('?' * len(models))}) LIMIT 1",
+                (provider_id, DEFAULT_SOURCE_LANG, DEFAULT_TARGET_LANG, _text_hash(text), *models),
+            ).fetchone()
+        return row is not None
+
+    def set(self, text: str, translated: str, provider_id: str = "", model: str = "") -> None:
         """设置缓存"""
-        key = self._make_key(text, provider_id)
-        
-        self._cache[key] = CacheEntry(
-            original=text,
-            translated=translated,
-            provider_id=provider_id,
-            created_at=datetime.now().isoformat(),
-        )
-        self._dirty = True
-        
-        # 检查是否需要淘汰
-        if len(self._cache) > self._max_size:
-            self._evict()
-    
+        self.put_many([(text, translated)], provider_id, model)
+
+    # ------------------------------------------------------------------
+    # 淘汰与持久化
+    # ------------------------------------------------------------------
+
     def _evict(self) -> None:
-        """淘汰最少使用的条目"""
-        if not self._cache:
-            return
-        
-        # 按hit_count排序，删除最少使用的20%
-        sorted_keys = sorted(
-            self._cache.keys(),
-            key=lambda k: self._cache[k].hit_count,
+        """沿 (last_used, created_at) 索引删除最久未使用的一批（近似 LRU，同一小时桶内先删写入最早的）。"""
+        evict_count = max(1, int(self._max_size * EVICT_FRACTION), self._count - self._max_size)
+        self._flush_touches(_bucket())
+        self._conn.execute(
+            "DELETE FROM translations WHERE rowid IN "
+            "(SELECT rowid FROM translations ORDER BY last_used, created_at LIMIT ?)",
+            (evict_count,),
         )
-        
-        evict_count = len(sorted_keys) // 5
-        for key in sorted_keys[:evict_count]:
-            del self._cache[key]
-        
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
         logger.debug(f"Evicted {evict_count} cache entries")
-    
+
+    def _flush_touches(self, bucket: int) -> None:
+        """把攒下的命中次数与 last_used 写回（调用方持有锁）。"""
+        if not self._touches:
+            return
+        rows = [(hits, bucket, *key) for key, hits in self._touches.items()]
+        self._touches.clear()
+        self._conn.executemany(
+            "UPDATE translations SET hit_count = hit_count + ?, last_used = MAX(last_used, ?) "
+            "WHERE provider = ? AND model = ? AND source_lang = ? "
+            "AND target_lang = ? AND text_hash = ?",
+            rows,
+        )
+        self._conn.commit()
+
     def clear(self) -> None:
         """清空缓存"""
-        self._cache.clear()
-        self._dirty = True
-    
-    def _load(self) -> None:
-        """从文件加载缓存"""
-        if not self._cache_file.exists():
-            return
-        
+        with self._db_lock:
+            self._touches.clear()
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+            self._count = 0
+
+    def save(self) -> None:
+        """提交待写回的命中统计（翻译结果在 put 时已持久化）"""
         try:
-            with open(self._cache_file, "r", encoding="utf-8") as f:
+            with self._db_lock:
+                self._flush_touches(_bucket())
+        except sqlite3.Error as e:
+            logger.error(f"Failed to save cache: {e}")
+
+    def import_json(self, json_file: Path) -> int:
+        """
+        一次性导入旧版 JSON 缓存，完成后把原文件改名为 ``*.imported``。
+
+        旧版键为 md5(provider:text)，不区分模型与语言对：导入为 model=""、默认语言对，命中次数保留。
+        """
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
-            
-            for key, entry_data in data.items():
-                self._cache[key] = CacheEntry(**entry_data)
-            
-            logger.info(f"Loaded {len(self._cache)} cache entries")
-            
         except Exception as e:
-            logger.warning(f"Failed to load cache: {e}")
-    
-    def save(self) -> None:
-        """保存缓存到文件"""
-        if not self._dirty:
-            return
-        
+            logger.warning(f"Failed to load legacy cache {json_file}: {e}")
+            return 0
+
+        by_provider: Dict[str, List[Tuple[str, str, int]]] = {}
+        for entry_data in data.values():
+            try:
+                entry = CacheEntry(**entry_data)
+            except TypeError:
+                continue
+            by_provider.setdefault(entry.provider_id, []).append((entry.original, entry.translated, entry.hit_count))
+
+        imported = 0
+        for provider_id, items in by_provider.items():
+            for i in range(0, len(items), IMPORT_BATCH):
+                imported += self._upsert(
+                    items[i : i + IMPORT_BATCH], provider_id, "", DEFAULT_SOURCE_LANG, DEFAULT_TARGET_LANG
+                )
+
         try:
-            self._cache_dir.mkdir(parents=True, exist_ok=True)
-            
-            data = {
-                key: asdict(entry)
-                for key, entry in self._cache.items()
-            }
-            
-            with open(self._cache_file, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-            
-            self._dirty = False
-            logger.debug(f"Saved {len(self._cache)} cache entries")
-            
-        except Exception as e:
-            logger.error(f"Failed to save cache: {e}")
-    
+            json_file.replace(json_file.with_name(json_file.name + ".imported"))
+        except OSError as e:
+            logger.warning(f"Failed to rename legacy cache {json_file}: {e}")
+        logger.info(f"Imported {imported} legacy translation cache entries from {json_file.name}")
+        return imported
+
     @property
     def size(self) -> int:
         """缓存大小"""
-        return len(self._cache)
-    
+        return self._count
+
     def get_stats(self) -> Dict:
         """获取缓存统计"""
-        total_hits = sum(e.hit_count for e in self._cache.values())
+        with self._db_lock:
+            self._flush_touches(_bucket())
+            total_hits = self._conn.execute("SELECT COALESCE(SUM(hit_count), 0) FROM translations").fetchone()[0]
         return {
-            "size": len(self._cache),
+            "size": self._count,
             "max_size": self._max_size,
             "total_hits": total_hits,
         }
@@ -241,14 +241,16 @@ class TranslationManager:
             return AIResult(status=AIResultStatus.SUCCESS, data=[])
         
         provider_id = self._config.provider_id if self._config else ""
+        model = self._config.model_name if self._config else ""
         results: List[TranslationResult] = []
         texts_to_translate: List[str] = []
         cache_hits = 0
         
         # 1. 检查缓存
         if use_cache:
+            cached_map = self._cache.get_many(texts, provider_id, model)
             for text in texts:
-                cached = self._cache.get(text, provider_id)
+                cached = cached_map.get(text)
                 if cached:
                     results.append(TranslationResult(
                         original=text,
@@ -287,10 +289,11 @@ class TranslationManager:
         
         # 3. 更新缓存并合并结果
         if api_result.data:
-            for tr in api_result.data:
-                if use_cache:
-                    self._cache.set(tr.original, tr.translated, provider_id)
-                results.append(tr)
+            results.extend(api_result.data)
+            if use_cache:
+                self._cache.put_many(
+                    ((tr.original, tr.translated) for tr in api_result.data), provider_id, model
+                )
         
         # 保存缓存
         self._cache.save()
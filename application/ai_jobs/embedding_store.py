@@ -0,0 +1,464 @@
+"""
+Columnar embedding store for CLAP embeddings.
+
+磁盘布局（均位于 index_dir 下，以 base_name 为前缀）：
+- ``{base}_store.json``   manifest：版本、维度、dtype、行数、模型版本、代号、路径表已提交字节数
+- ``{base}_vectors.bin``  连续的 (rows × dim) 矩阵，float32/float16，按行追加
+- ``{base}_ids.bin``      与矩阵逐行对应的 audio_file_id（int64，未知为 -1）
+- ``{base}_paths.txt``    与矩阵逐行对应的文件路径（每行一个，UTF-8）
+
+读取时矩阵与 id 列通过 ``np.memmap`` 映射，加载耗时与内存只与实际访问的行相关，
+不再需要把整个 pickled dict 分片反序列化进 Python。manifest 中的 ``count`` 是唯一可信的行数：
+追加时先写数据再原子替换 manifest，崩溃后多出的尾部数据会在下次追加前按 manifest 记录的长度截断（不重读路径表）。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+_DTYPE_SUFFIX = {"float32": "f32", "float16": "f16"}
+
+
+class EmbeddingStore:
+    """追加写入、内存映射读取的 embedding 列式存储。"""
+
+    def __init__(
+        self,
+        index_dir: Path,
+        base_name: str = "clap_embeddings",
+        dtype: str = "float32",
+    ):
+        if dtype not in _DTYPE_SUFFIX:
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        self.index_dir = Path(index_dir)
+        self.base_name = base_name
+        self.manifest_path = self.index_dir / f"{base_name}_store.json"
+        self.vectors_path = self.index_dir / f"{base_name}_vectors.bin"
+        self.ids_path = self.index_dir / f"{base_name}_ids.bin"
+        self.paths_path = self.index_dir / f"{base_name}_paths.txt"
+
+        self._lock = threading.RLock()
+        self._manifest = {
+            "version": STORE_VERSION,
+            "dim": 0,
+            "dtype": dtype,
+            "count": 0,
+            "model_version": "",
+            "generation": "",
+        }
+        self._matrix: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+        self._paths: Optional[List[str]] = None
+        self._live_rows: Optional[np.ndarray] = None
+        self._manifest_mtime_ns = 0
+        self._load_manifest()
+
+    # ------------------------------------------------------------------
+    # manifest
+    # ------------------------------------------------------------------
+
+    @property
+    def exists(self) -> bool:
+        return self.manifest_path.exists()
+
+    @property
+    def count(self) -> int:
+        return int(self._manifest.get("count", 0))
+
+    @property
+    def dim(self) -> int:
+        return int(self._manifest.get("dim", 0))
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype(self._manifest.get("dtype", "float32"))
+
+    @property
+    def model_version(self) -> str:
+        return str(self._manifest.get("model_version", "") or "")
+
+    @property
+    def generation(self) -> str:
+        """存储代号：每次从空存储开始写入（clear/compact 后重建）时重新生成，派生索引据此判断行号是否仍然有效。"""
+        return str(self._manifest.get("generation", "") or "")
+
+    @property
+    def manifest(self) -> dict:
+        return dict(self._manifest)
+
+    def _load_manifest(self) -> None:
+        if not self.manifest_path.exists():
+            return
+        try:
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and "count" in data:
+                self._manifest.update(data)
+            self._manifest_mtime_ns = self.manifest_path.stat().st_mtime_ns
+        except Exception as e:
+            logger.warning(f"Embedding store manifest unreadable, ignoring: {e}")
+
+    def _write_manifest(self) -> None:
+        tmp_path = self.manifest_path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+        self._manifest_mtime_ns = self.manifest_path.stat().st_mtime_ns
+
+    def refresh(self) -> bool:
+        """若其他线程/进程追加了数据则重新加载 manifest，返回是否有变化。"""
+        with self._lock:
+            if not self.manifest_path.exists():
+                changed = self.count > 0
+                if changed:
+                    self._manifest["count"] = 0
+                    self._invalidate()
+                return changed
+            mtime_ns = self.manifest_path.stat().st_mtime_ns
+            if mtime_ns == self._manifest_mtime_ns:
+                return False
+            old_count = self.count
+            self._load_manifest()
+            self._invalidate()
+            return self.count != old_count
+
+    def _invalidate(self) -> None:
+        self._matrix = None
+        self._ids = None
+        self._paths = None
+        self._live_rows = None
+
+    # ------------------------------------------------------------------
+    # write
+    # ------------------------------------------------------------------
+
+    def _truncate_to_count(self) -> None:
+        """截断崩溃遗留的、未被 manifest 记录的尾部数据。"""
+        count = self.count
+        dim = self.dim
+        if dim <= 0:
+            return
+        expected_vec = count * dim * self.dtype.itemsize
+        expected_ids = count * 8
+        for path, expected in ((self.vectors_path, expected_vec), (self.ids_path, expected_ids)):
+            if path.exists() and path.stat().st_size > expected:
+                with open(path, "r+b") as f:
+                    f.truncate(expected)
+        if not self.paths_path.exists():
+            return
+        committed = self._manifest.get("paths_bytes")
+        if committed is None:
+            # 旧 manifest 未记录路径表字节数：仅此一次按行扫描，之后以字节数截断
+            with open(self.paths_path, "r", encoding="utf-8") as f:
+                lines = f.read().split("\n")
+            if lines and lines[-1] == "":
+                lines.pop()
+            if len(lines) != count:
+                with open(self.paths_path, "w", encoding="utf-8", newline="\n") as f:
+                    for line in lines[:count]:
+                        f.write(line + "\n")
+            self._manifest["paths_bytes"] = self.paths_path.stat().st_size
+        elif self.paths_path.stat().st_size > int(committed):
+            with open(self.paths_path, "r+b") as f:
+                f.truncate(int(committed))
+
+    def append(
+        self,
+        embeddings: Dict[str, np.ndarray],
+        ids: Optional[Dict[str, int]] = None,
+        model_version: Optional[str] = None,
+    ) -> Tuple[int, int]:
+        """追加一批 embedding，返回写入的行区间 [row_start, row_end)。"""
+        if not embeddings:
+            return self.count, self.count
+        ids = ids or {}
+        paths = [str(p) for p in embeddings.keys()]
+        matrix = np.asarray([np.asarray(v).reshape(-1) for v in embeddings.values()])
+        return self.append_matrix(
+            paths,
+            matrix,
+            np.asarray([int(ids.get(p, -1)) for p in paths], dtype=np.int64),
+            model_version=model_version,
+        )
+
+    def append_matrix(
+        self,
+        paths: List[str],
+        matrix: np.ndarray,
+        ids: Optional[np.ndarray] = None,
+        model_version: Optional[str] = None,
+    ) -> Tuple[int, int]:
+        """以矩阵形式追加（行与 paths 一一对应），返回行区间 [row_start, row_end)。"""
+        if len(paths) == 0:
+            return self.count, self.count
+        matrix = np.ascontiguousarray(matrix, dtype=self.dtype)
+        if matrix.ndim != 2 or matrix.shape[0] != len(paths):
+            raise ValueError(f"Embedding matrix shape {matrix.shape} does not match {len(paths)} paths")
+        if ids is None:
+            ids = np.full(len(paths), -1, dtype=np.int64)
+        ids = np.ascontiguousarray(ids, dtype=np.int64)
+        if "\n" in "".join(paths):
+            raise ValueError("Embedding store paths must not contain newlines")
+
+        with self._lock:
+            if self.dim == 0:
+                self._manifest["dim"] = int(matrix.shape[1])
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dim {matrix.shape[1]} != store dim {self.dim}")
+
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            self._truncate_to_count()
+            row_start = self.count
+            if row_start == 0:
+                self._manifest["generation"] = uuid.uuid4().hex
+
+            with open(self.vectors_path, "ab") as f:
+                f.write(matrix.tobytes())
+            with open(self.ids_path, "ab") as f:
+                f.write(ids.tobytes())
+            paths_bytes = ("\n".join(paths) + "\n").encode("utf-8")
+            paths_start = self.paths_path.stat().st_size if self.paths_path.exists() else 0
+            with open(self.paths_path, "ab") as f:
+                f.write(paths_bytes)
+
+            self._manifest["count"] = row_start + len(paths)
+            self._manifest["paths_bytes"] = paths_start + len(paths_bytes)
+            if model_version is not None:
+                self._manifest["model_version"] = model_version
+            self._write_manifest()
+
+            if self._paths is not None:
+                self._paths.extend(paths)
+            self._matrix = None
+            self._ids = None
+            self._live_rows = None
+            return row_start, self.count
+
+    def clear(self) -> None:
+        """删除存储的全部文件。"""
+        with self._lock:
+            self._invalidate()
+            for path in (self.manifest_path, self.vectors_path, self.ids_path, self.paths_path):
+                try:
+                    if path.exists():
+                        path.unlink()
+                except Exception as e:
+                    logger.warning(f"Failed to remove {path}: {e}")
+            self._manifest["count"] = 0
+            self._manifest["dim"] = 0
+            self._manifest.pop("paths_bytes", None)
+            self._manifest_mtime_ns = 0
+
+    def compact(self) -> int:
+        """仅保留每个路径的最新一行并重写存储，返回剩余行数（行号变化，IVF 分配随之清除）。"""
+        from transcriptionist_v3.application.ai.ann_index import IVFFlatIndex
+
+        with self._lock:
+            rows = self.live_rows()
+            if len(rows) == self.count:
+                return self.count
+            matrix = np.array(self.matrix()[rows])
+            ids = np.array(self.ids()[rows])
+            all_paths = self.paths()
+            paths = [all_paths[i] for i in rows]
+            model_version = self.model_version
+            dtype = self._manifest.get("dtype", "float32")
+            self.clear()
+            IVFFlatIndex(self.index_dir, base_name=self.base_name).clear()
+            self._manifest["dtype"] = dtype
+            self.append_matrix(paths, matrix, ids, model_version=model_version)
+            return self.count
+
+    # ------------------------------------------------------------------
+    # read
+    # ------------------------------------------------------------------
+
+    def matrix(self) -> np.ndarray:
+        """返回 (count, dim) 的只读内存映射矩阵。"""
+        with self._lock:
+            if self._matrix is None:
+                if self.count == 0 or self.dim == 0 or not self.vectors_path.exists():
+                    return np.zeros((0, max(self.dim, 0)), dtype=self.dtype)
+                self._matrix = np.memmap(
+                    self.vectors_path, dtype=self.dtype, mode="r", shape=(self.count, self.dim)
+                )
+            return self._matrix
+
+    def ids(self) -> np.ndarray:
+        """返回与矩阵逐行对应的 audio_file_id（int64，未知为 -1）。"""
+        with self._lock:
+            if self._ids is None:
+                if self.count == 0 or not self.ids_path.exists():
+                    return np.zeros(0, dtype=np.int64)
+                self._ids = np.memmap(self.ids_path, dtype=np.int64, mode="r", shape=(self.count,))
+            return self._ids
+
+    def paths(self) -> List[str]:
+        """返回与矩阵逐行对应的路径表（首次访问时读入内存）。"""
+        with self._lock:
+            if self._paths is None:
+                if self.count == 0 or not self.paths_path.exists():
+                    self._paths = []
+                else:
+                    with open(self.paths_path, "r", encoding="utf-8") as f:
+                        lines = f.read().split("\n")
+                    self._paths = lines[: self.count]
+            return self._paths
+
+    def live_rows(self) -> np.ndarray:
+        """
+        每个文件最新一次写入的行号（升序）。
+
+        增量索引会为同一文件追加新行，旧行保留在文件中直到 compact()；检索/打标只应使用最新行。
+        """
+        with self._lock:
+            if self._live_rows is not None:
+                return self._live_rows
+            count = self.count
+            if count == 0:
+                self._live_rows = np.zeros(0, dtype=np.int64)
+                return self._live_rows
+            ids = np.asarray(self.ids())
+            if len(ids) == count and bool(np.all(ids >= 0)):
+                # 从尾部取 unique 的首次出现 = 正向的最后一次出现
+                _, rev_idx = np.unique(ids[::-1], return_index=True)
+                rows = (count - 1 - rev_idx).astype(np.int64)
+            else:
+                latest: Dict[str, int] = {}
+                for row, path in enumerate(self.paths()):
+                    latest[path] = row
+                rows = np.fromiter(latest.values(), dtype=np.int64, count=len(latest))
+            rows.sort()
+            self._live_rows = rows
+            return rows
+
+    def iter_blocks(
+        self, block_rows: int = 65536, rows: Optional[np.ndarray] = None
+    ) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+        """按块遍历 (row_indices, float32 矩阵块)，默认遍历 live_rows()。"""
+        matrix = self.matrix()
+        if rows is None:
+            rows = self.live_rows()
+        block_rows = max(1, int(block_rows))
+        for start in range(0, len(rows), block_rows):
+            block_idx = rows[start : start + block_rows]
+            yield block_idx, np.asarray(matrix[block_idx], dtype=np.float32)
+
+    def rows_for_paths(self, paths: Iterable[str]) -> Dict[str, int]:
+        """路径 -> 最新行号。"""
+        wanted = {str(p) for p in paths}
+        all_paths = self.paths()
+        out: Dict[str, int] = {}
+        for row in self.live_rows():
+            path = all_paths[int(row)]
+            if path in wanted:
+                out[path] = int(row)
+        return out
+
+    def to_dict(self, rows: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """导出为 {path: vector}（仅用于小规模兼容路径）。"""
+        matrix = self.matrix()
+        all_paths = self.paths()
+        if rows is None:
+            rows = self.live_rows()
+        return {all_paths[int(r)]: np.asarray(matrix[int(r)], dtype=np.float32) for r in rows}
+
+
+def _load_pickled_dict(path: Path) -> dict:
+    data = np.load(str(path), allow_pickle=True)
+    obj = data.item() if data.ndim == 0 else {}
+    return obj if isinstance(obj, dict) else {}
+
+
+def has_legacy_index(index_dir: Path, base_name: str = "clap_embeddings") -> bool:
+    """是否存在旧版 pickled dict 索引（单文件或 manifest + 分片）。"""
+    index_dir = Path(index_dir)
+    return (index_dir / f"{base_name}_meta.npy").exists() or (index_dir / f"{base_name}.npy").exists()
+
+
+def remove_legacy_index(index_dir: Path, base_name: str = "clap_embeddings") -> None:
+    """删除旧版索引文件（manifest + 所有分片 + 单文件）。"""
+    index_dir = Path(index_dir)
+    meta_path = index_dir / f"{base_name}_meta.npy"
+    if meta_path.exists():
+        try:
+            meta = _load_pickled_dict(meta_path)
+            for name in meta.get("chunk_files", []):
+                p = index_dir / name
+                if p.exists():
+                    p.unlink()
+            meta_path.unlink()
+        except Exception as e:
+            logger.warning(f"Failed to remove legacy chunked index: {e}")
+    single = index_dir / f"{base_name}.npy"
+    if single.exists():
+        try:
+            single.unlink()
+        except Exception as e:
+            logger.warning(f"Failed to remove legacy index file: {e}")
+
+
+def migrate_legacy_index(
+    index_dir: Path,
+    base_name: str = "clap_embeddings",
+    id_lookup: Optional[Callable[[List[str]], Dict[str, int]]] = None,
+    remove_legacy: bool = False,
+    progress_callback: Optional[Callable[[int, int], None]] = None,
+) -> int:
+    """
+    将旧版 ``{base}_meta.npy`` manifest + pickled 分片（或单个 ``{base}.npy``）迁移到 EmbeddingStore。
+
+    Args:
+        id_lookup: 可选，路径列表 -> {path: audio_file_id}，用于填充 id 列
+        remove_legacy: 迁移成功后删除旧文件
+        progress_callback: (已完成分片数, 总分片数)
+
+    Returns:
+        迁移的行数
+    """
+    index_dir = Path(index_dir)
+    meta_path = index_dir / f"{base_name}_meta.npy"
+    single_path = index_dir / f"{base_name}.npy"
+
+    sources: List[Path] = []
+    if meta_path.exists():
+        meta = _load_pickled_dict(meta_path)
+        sources = [index_dir / name for name in meta.get("chunk_files", [])]
+    elif single_path.exists():
+        sources = [single_path]
+    if not sources:
+        return 0
+
+    from transcriptionist_v3.application.ai.ann_index import IVFFlatIndex
+
+    store = EmbeddingStore(index_dir, base_name=base_name)
+    store.clear()
+    IVFFlatIndex(index_dir, base_name=base_name).clear()
+    migrated = 0
+    for i, src in enumerate(sources):
+        if src.exists():
+            chunk = {str(k): v for k, v in _load_pickled_dict(src).items()}
+            if chunk:
+                ids = id_lookup(list(chunk.keys())) if id_lookup else None
+                store.append(chunk, ids=ids)
+                migrated += len(chunk)
+        if progress_callback:
+            progress_callback(i + 1, len(sources))
+
+    logger.info(f"Migrated {migrated} embeddings from legacy index to columnar store")
+    if remove_legacy and store.count == migrated:
+        remove_legacy_index(index_dir, base_name)
+    return migrated
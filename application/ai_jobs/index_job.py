@@ -0,0 +1,241 @@
+"""
+Indexing job.
+
+任务化索引构建：分批生成 CLAP embedding → 追加写入列式存储分片 → 更新文件索引状态与任务检查点。
+界面（``IndexingJobWorker``）与无界面命令行共用；不依赖 Qt，进度经回调上报，取消经 ``is_cancelled()`` 轮询。
+取消时任务记录置为 paused 并保存检查点（``last_id``），用同一 ``job_id`` 再次运行即从断点继续。
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+INDEX_BASE_NAME = "clap_embeddings"
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+class IndexJob:
+    """分批生成 embedding + 分片持久化 + 可断点恢复。"""
+
+    def __init__(
+        self,
+        engine,
+        selection: dict,
+        index_dir: Path,
+        model_version: str,
+        batch_size: int = 2000,
+        chunk_size: int = 2000,
+        job_id: Optional[int] = None,
+        progress_callback: Optional[ProgressCallback] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ):
+        self.engine = engine
+        self.selection = selection or {}
+        self.index_dir = Path(index_dir)
+        self.model_version = model_version or ""
+        self.batch_size = max(1, int(batch_size))
+        self.chunk_size = max(1, int(chunk_size))
+        self.job_id = job_id
+        self._progress = progress_callback or (lambda *_args: None)
+        self._is_cancelled = is_cancelled or (lambda: False)
+
+    def run(self) -> Dict:
+        """
+        执行（或恢复）索引任务。
+
+        Returns:
+            {"job_id", "processed", "failed", "status"}；status 为 done 或 paused（被取消）
+        Raises:
+            RuntimeError: 模型初始化失败；其他异常在标记任务失败后原样抛出
+        """
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import Job
+
+        if not self.engine.initialize():
+            raise RuntimeError("CLAP 模型初始化失败")
+
+        try:
+            return self._run()
+        except Exception as e:
+            logger.error(f"Indexing job error: {e}", exc_info=True)
+            from transcriptionist_v3.application.ai_jobs.job_store import mark_job_failed
+
+            with session_scope() as session:
+                job = session.get(Job, self.job_id) if self.job_id else None
+                if job:
+                    mark_job_failed(session, job, str(e))
+            raise
+
+    def _run(self) -> Dict:
+        from sqlalchemy import or_
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import AudioFile, Job, IndexShard
+        from transcriptionist_v3.core.config import AppConfig
+        from transcriptionist_v3.application.ai_jobs.selection import apply_selection_filters
+        from transcriptionist_v3.application.ai_jobs.index_writer import ChunkedIndexWriter
+        from transcriptionist_v3.application.ai.ann_index import IVFFlatIndex, update_store_ann
+        from transcriptionist_v3.application.ai_jobs.job_constants import (
+            JOB_TYPE_INDEX,
+            JOB_STATUS_PAUSED,
+            JOB_STATUS_DONE,
+            FILE_STATUS_DONE,
+            FILE_STATUS_FAILED,
+        )
+        from transcriptionist_v3.application.ai_jobs.job_store import (
+            create_job,
+            start_job,
+            update_job_progress,
+            mark_job_paused,
+            mark_job_done,
+        )
+
+        with session_scope() as session:
+            job = session.get(Job, self.job_id) if self.job_id else None
+            if job is None:
+                job = create_job(session, JOB_TYPE_INDEX, self.selection, params={"model_version": self.model_version})
+            self.job_id = job.id
+
+            base_query = session.query(AudioFile)
+            base_query = apply_selection_filters(base_query, self.selection)
+            base_query = base_query.filter(
+                or_(
+                    AudioFile.index_status != FILE_STATUS_DONE,
+                    AudioFile.index_version != self.model_version
+                )
+            )
+            try:
+                total = base_query.count()
+            except Exception:
+                total = int(self.selection.get("count", 0) or 0)
+            total = max(0, int(total or 0))
+            start_job(session, job, total=total)
+            session.commit()
+
+        writer = ChunkedIndexWriter(
+            self.index_dir,
+            base_name=INDEX_BASE_NAME,
+            chunk_size=self.chunk_size,
+            model_version=self.model_version,
+        )
+        ann = IVFFlatIndex(self.index_dir, base_name=INDEX_BASE_NAME)
+        processed = 0
+        failed = 0
+        last_id = 0
+
+        while True:
+            if self._is_cancelled():
+                with session_scope() as session:
+                    job = session.get(Job, self.job_id)
+                    if job:
+                        job.checkpoint = {"last_id": last_id}
+                        mark_job_paused(session, job)
+                return {"job_id": self.job_id, "processed": processed, "failed": failed, "status": JOB_STATUS_PAUSED}
+
+            with session_scope() as session:
+                job = session.get(Job, self.job_id)
+                if job and job.checkpoint:
+                    last_id = int(job.checkpoint.get("last_id", last_id) or last_id)
+
+                query = session.query(AudioFile)
+                query = apply_selection_filters(query, self.selection)
+                query = query.filter(AudioFile.id > last_id)
+                query = query.filter(
+                    or_(
+                        AudioFile.index_status != FILE_STATUS_DONE,
+                        AudioFile.index_version != self.model_version
+                    )
+                )
+                batch = query.order_by(AudioFile.id).limit(self.batch_size).all()
+
+            if not batch:
+                break
+
+            file_paths = [str(f.file_path) for f in batch]
+
+            # 接入 CLAP 内部的分阶段进度（预处理 / GPU 推理），避免长时间无反馈导致“卡死”错觉。
+            # progress_ratio 为当前 batch 内 0.0–1.0 的进度，这里转换为全局文件数进度后上报。
+            batch_total = len(file_paths)
+
+            def on_batch_progress(
+                progress_ratio: float, msg: str, base: int = processed, batch_total: int = batch_total
+            ) -> None:
+                try:
+                    # 估算当前 batch 已完成的文件数，并折算到全局 processed/total
+                    # （base / batch_total 以默认参数绑定本批的值，不随循环变量变化）
+                    local_done = int(progress_ratio * batch_total)
+                    self._progress(base + local_done, total, msg)
+                except Exception as e:
+                    # 进度更新失败不影响主流程
+                    logger.debug(f"Index progress callback failed: {e}")
+
+            results = self.engine.get_audio_embeddings_batch(
+                file_paths,
+                batch_size=AppConfig.get("ai.batch_size", 4),
+                progress_callback=on_batch_progress,
+            )
+
+            row_start, row_end = writer.append(
+                results, ids={str(f.file_path): f.id for f in batch}
+            )
+            if row_end > row_start and ann.is_trained:
+                try:
+                    ann.update(writer.store)
+                except Exception as e:
+                    logger.warning(f"ANN incremental update failed: {e}")
+
+            with session_scope() as session:
+                job = session.get(Job, self.job_id)
+                for f in batch:
+                    path_str = str(f.file_path)
+                    if path_str in results:
+                        f.index_status = FILE_STATUS_DONE
+                        f.index_version = self.model_version
+                    else:
+                        f.index_status = FILE_STATUS_FAILED
+                        f.index_version = self.model_version
+                        failed += 1
+                processed += len(batch)
+                last_id = batch[-1].id
+
+                if row_end > row_start:
+                    shard = IndexShard(
+                        job_id=self.job_id,
+                        shard_path=writer.shard_path,
+                        count=row_end - row_start,
+                        start_id=batch[0].id,
+                        end_id=batch[-1].id,
+                        row_start=row_start,
+                        row_end=row_end,
+                        model_version=self.model_version,
+                    )
+                    session.add(shard)
+
+                if job:
+                    update_job_progress(
+                        session,
+                        job,
+                        processed=processed,
+                        failed=failed,
+                        checkpoint={"last_id": last_id},
+                    )
+
+            self._progress(processed, total, f"已处理 {processed}")
+
+        if AppConfig.get("ai.ann_enabled", True):
+            try:
+                self._progress(processed, total, "正在更新近似检索索引...")
+                update_store_ann(writer.store, min_rows=int(AppConfig.get("ai.ann_min_rows", 200000)))
+            except Exception as e:
+                logger.warning(f"ANN index build failed, exact search will be used: {e}")
+
+        with session_scope() as session:
+            job = session.get(Job, self.job_id)
+            if job:
+                mark_job_done(session, job)
+
+        return {"job_id": self.job_id, "processed": processed, "failed": failed, "status": JOB_STATUS_DONE}
@@ -8,6 +8,10 @@ JOB_TYPE_TAG = "tag"
 JOB_TYPE_TRANSLATE = "translate"
 JOB_TYPE_CLEAR_TAGS = "clear_tags"
 JOB_TYPE_APPLY_TRANSLATION = "apply_translation"
+JOB_TYPE_NEAR_DUPLICATES = "near_duplicates"
+# 命令行导入：扫描入队 / 处理导入队列
+JOB_TYPE_SCAN = "scan"
+JOB_TYPE_IMPORT = "import"
 
 # Job status
 JOB_STATUS_PENDING = "pending"
@@ -0,0 +1,398 @@
+"""
+Acoustic near-duplicate detection over stored CLAP embeddings.
+
+同一声音在不同厂商音效包里常以不同格式/采样率/文件名出现，内容哈希无法识别。
+这里在 ``EmbeddingStore`` 的最新行上做“相似度高于阈值”的自连接：
+
+- 行数较少（≤ ``EXACT_MAX_ROWS``）：分块精确自连接，每次只计算 block × block 的分数矩阵
+- 行数较多：按倒排表分区（优先复用已持久化的 IVF 索引，否则临时训练一组质心），
+  每个倒排表只与自身及质心最近的 ``probe_lists - 1`` 个表做分块连接，
+  代价约为 N × (N / n_lists) × probe_lists，而不是 N²
+- 高于阈值的配对即时并入并查集，不保存配对本身；内存上限约为
+  分块分数矩阵 + 每行一个分区号 + 重复文件的并查集节点
+
+并查集的连通分量即重复组（传递闭包：A≈B、B≈C 时 A、B、C 同组，组内成员与 keeper 的
+最小相似度记录在 ``min_similarity`` 中）。每组按“无损格式 > 采样率 > 位深 > 声道 > 时长 > 文件大小 > id 小”
+选出保留文件（keeper）。
+"""
+
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from transcriptionist_v3.infrastructure.database.models import AudioFile, DuplicateGroup, DuplicateMember
+
+logger = logging.getLogger(__name__)
+
+# SQLite 默认 SQLITE_MAX_VARIABLE_NUMBER 较小，IN 列表分批
+SQLITE_IN_BATCH = 500
+# 默认余弦相似度阈值（CLAP 音频 embedding 对格式/采样率转换很稳定，同源文件通常 > 0.98）
+DEFAULT_THRESHOLD = 0.97
+# 分区模式下每个倒排表连接的表数（含自身）
+DEFAULT_PROBE_LISTS = 4
+# 不超过此行数时直接分块精确自连接
+EXACT_MAX_ROWS = 50_000
+# 分块连接的块行数：2048 × 2048 的 float32 分数矩阵约 16 MB
+JOIN_BLOCK_ROWS = 2048
+# 临时训练质心时的抽样行数上限
+PARTITION_SAMPLE_ROWS = 100_000
+# 写库批量
+GROUP_INSERT_BATCH = 2000
+
+LOSSLESS_FORMATS = {"wav", "wave", "flac", "aif", "aiff", "w64", "bwf", "rf64", "caf", "alac", "ape", "wv"}
+
+
+@dataclass
+class DuplicateCluster:
+    """一个近似重复组。"""
+
+    member_ids: List[int]
+    keeper_id: int
+    # audio_file_id -> 与 keeper 的余弦相似度
+    similarities: Dict[int, float] = field(default_factory=dict)
+
+    @property
+    def min_similarity(self) -> float:
+        others = [s for fid, s in self.similarities.items() if fid != self.keeper_id]
+        return float(min(others)) if others else 1.0
+
+
+class _UnionFind:
+    """只为出现在配对中的节点分配状态的并查集。"""
+
+    def __init__(self) -> None:
+        self.parent: Dict[int, int] = {}
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        root = parent.get(x, x)
+        if root == x:
+            return x
+        while True:
+            up = parent.get(root, root)
+            if up == root:
+                break
+            root = up
+        # 路径压缩
+        while x != root:
+            nxt = parent[x]
+            parent[x] = root
+            x = nxt
+        return root
+
+    def union(self, a: int, b: int) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return
+        if ra > rb:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        self.parent.setdefault(ra, ra)
+
+    def groups(self) -> List[List[int]]:
+        out: Dict[int, List[int]] = {}
+        for node in list(self.parent):
+            out.setdefault(self.find(node), []).append(node)
+        return [sorted(members) for members in out.values() if len(members) > 1]
+
+
+def _normalize(block: np.ndarray) -> np.ndarray:
+    block = np.asarray(block, dtype=np.float32)
+    norms = np.linalg.norm(block, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return block / norms
+
+
+class NearDuplicateFinder:
+    """
+    在一组存储行上查找近似重复。
+
+    用法::
+
+        finder = NearDuplicateFinder(store, threshold=0.97)
+        groups = finder.find()            # [[store_row, ...], ...]；取消时返回 None
+        clusters = build_clusters(session, store, groups)
+    """
+
+    def __init__(
+        self,
+        store,
+        rows: Optional[np.ndarray] = None,
+        threshold: float = DEFAULT_THRESHOLD,
+        probe_lists: int = DEFAULT_PROBE_LISTS,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ):
+        self.store = store
+        self.rows = np.asarray(store.live_rows() if rows is None else rows, dtype=np.int64)
+        self.threshold = float(threshold)
+        self.probe_lists = max(1, int(probe_lists))
+        self._progress = progress_callback
+        self._is_cancelled = is_cancelled or (lambda: False)
+        self._matrix = store.matrix()
+        self._uf = _UnionFind()
+        self.pairs = 0
+
+    def find(self) -> Optional[List[List[int]]]:
+        """返回重复组（每组为升序的存储行号，≥2 个）；被取消时返回 None。"""
+        n = len(self.rows)
+        if n < 2:
+            return []
+        if n <= EXACT_MAX_ROWS:
+            done = self._find_exact()
+        else:
+            done = self._find_partitioned()
+        if not done:
+            return None
+        return [[int(self.rows[pos]) for pos in group] for group in self._uf.groups()]
+
+    # ------------------------------------------------------------------
+    # internal
+    # ------------------------------------------------------------------
+
+    def _load(self, positions: np.ndarray) -> np.ndarray:
+        return _normalize(self._matrix[self.rows[positions]])
+
+    def _join(self, a_pos: np.ndarray, b_pos: np.ndarray, same: bool) -> bool:
+        """分块计算 a × b 的相似度，高于阈值的配对并入并查集；same=True 时只算上三角。"""
+        for i in range(0, len(a_pos), JOIN_BLOCK_ROWS):
+            if self._is_cancelled():
+                return False
+            a_idx = a_pos[i : i + JOIN_BLOCK_ROWS]
+            a_block = self._load(a_idx)
+            for j in range(i if same else 0, len(b_pos), JOIN_BLOCK_ROWS):
+                diagonal = same and j == i
+                b_idx = a_idx if diagonal else b_pos[j : j + JOIN_BLOCK_ROWS]
+                b_block = a_block if diagonal else self._load(b_idx)
+                hit_a, hit_b = np.nonzero(a_block @ b_block.T >= self.threshold)
+                if diagonal:
+                    keep = hit_a < hit_b
+                    hit_a, hit_b = hit_a[keep], hit_b[keep]
+                self.pairs += len(hit_a)
+                for x, y in zip(a_idx[hit_a].tolist(), b_idx[hit_b].tolist()):
+                    self._uf.union(x, y)
+        return True
+
+    def _find_exact(self) -> bool:
+        positions = np.arange(len(self.rows), dtype=np.int64)
+        n_blocks = (len(positions) + JOIN_BLOCK_ROWS - 1) // JOIN_BLOCK_ROWS
+        for b in range(n_blocks):
+            start = b * JOIN_BLOCK_ROWS
+            # 行块 b 与自身及其后的所有块连接
+            if not self._join(positions[start : start + JOIN_BLOCK_ROWS], positions[start:], same=True):
+                return False
+            if self._progress:
+                self._progress(b + 1, n_blocks)
+        return True
+
+    def _find_partitioned(self) -> bool:
+        assign, centroids = self._partition()
+        n_lists = len(centroids)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.zeros(n_lists + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(assign, minlength=n_lists))
+
+        # 每个表的相邻表（按质心相似度），转成无序表对，避免 (a, b) 与 (b, a) 重复计算
+        probe = min(self.probe_lists, n_lists)
+        neighbours: Dict[int, set] = {a: set() for a in range(n_lists)}
+        for start in range(0, n_lists, JOIN_BLOCK_ROWS):
+            sims = centroids[start : start + JOIN_BLOCK_ROWS] @ centroids.T
+            if probe < n_lists:
+                top = np.argpartition(-sims, probe - 1, axis=1)[:, :probe]
+            else:
+                top = np.broadcast_to(np.arange(n_lists), sims.shape)
+            for offset, lists in enumerate(top.tolist()):
+                a = start + offset
+                for b in lists:
+                    neighbours[min(a, b)].add(max(a, b))
+                neighbours[a].add(a)
+
+        for a in range(n_lists):
+            a_pos = order[offsets[a] : offsets[a + 1]]
+            if len(a_pos):
+                for b in sorted(neighbours[a]):
+                    b_pos = a_pos if b == a else order[offsets[b] : offsets[b + 1]]
+                    if len(b_pos) and not self._join(a_pos, b_pos, same=(b == a)):
+                        return False
+            if self._progress:
+                self._progress(a + 1, n_lists)
+        return True
+
+    def _partition(self):
+        """返回 (每个位置的表号, 归一化质心)；优先复用与存储同步的 IVF 索引。"""
+        from transcriptionist_v3.application.ai.ann_index import (
+            IVFFlatIndex,
+            recommended_n_lists,
+            train_spherical_kmeans,
+        )
+
+        ann = IVFFlatIndex(self.store.index_dir, base_name=self.store.base_name)
+        if ann.is_current(self.store):
+            logger.info("Near-duplicate scan reuses IVF partition (%d lists)", ann.n_lists)
+            return np.asarray(ann.assignments()[self.rows], dtype=np.int64), ann.centroids()
+
+        n = len(self.rows)
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(self.rows, size=min(n, PARTITION_SAMPLE_ROWS), replace=False))
+        centroids = train_spherical_kmeans(np.asarray(self._matrix[sample]), recommended_n_lists(n), iterations=8)
+        assign = np.empty(n, dtype=np.int64)
+        for start in range(0, n, JOIN_BLOCK_ROWS * 4):
+            positions = np.arange(start, min(start + JOIN_BLOCK_ROWS * 4, n))
+            assign[start : start + len(positions)] = np.argmax(self._load(positions) @ centroids.T, axis=1)
+        logger.info("Near-duplicate scan trained a transient partition (%d lists)", len(centroids))
+        return assign, centroids
+
+
+def _keeper_rank(row) -> tuple:
+    fmt = (row.format or "").lower().lstrip(".")
+    return (
+        fmt in LOSSLESS_FORMATS,
+        int(row.sample_rate or 0),
+        int(row.bit_depth or 0),
+        int(row.channels or 0),
+        float(row.duration or 0.0),
+        int(row.file_size or 0),
+        -int(row.id),
+    )
+
+
+def resolve_row_ids(session: Session, store, rows: Iterable[int]) -> Dict[int, int]:
+    """存储行号 → audio_file_id；id 未知（-1）的行按路径回查，库中已不存在的行不出现在结果中。"""
+    ids = store.ids()
+    paths = store.paths()
+    row_to_id: Dict[int, int] = {}
+    unknown: Dict[str, int] = {}
+    for r in rows:
+        r = int(r)
+        file_id = int(ids[r]) if r < len(ids) else -1
+        if file_id >= 0:
+            row_to_id[r] = file_id
+        elif r < len(paths):
+            unknown[paths[r]] = r
+    path_list = list(unknown)
+    for i in range(0, len(path_list), SQLITE_IN_BATCH):
+        batch = path_list[i : i + SQLITE_IN_BATCH]
+        for file_id, file_path in session.query(AudioFile.id, AudioFile.file_path).filter(
+            AudioFile.file_path.in_(batch)
+        ):
+            row_to_id[unknown[file_path]] = file_id
+    return row_to_id
+
+
+def build_clusters(session: Session, store, groups: Sequence[Sequence[int]]) -> List[DuplicateCluster]:
+    """
+    把存储行号组解析为 audio_file_id，选出 keeper 并计算成员与 keeper 的相似度。
+
+    存储中 id 未知（-1）的行按路径回查；已从库中删除的文件被丢弃，不足 2 个成员的组一并丢弃。
+    """
+    row_to_id = resolve_row_ids(session, store, (r for group in groups for r in group))
+
+    wanted = sorted(set(row_to_id.values()))
+    info = {}
+    for i in range(0, len(wanted), SQLITE_IN_BATCH):
+        batch = wanted[i : i + SQLITE_IN_BATCH]
+        for row in session.query(
+            AudioFile.id,
+            AudioFile.format,
+            AudioFile.sample_rate,
+            AudioFile.bit_depth,
+            AudioFile.channels,
+            AudioFile.duration,
+            AudioFile.file_size,
+        ).filter(AudioFile.id.in_(batch)):
+            info[row.id] = row
+
+    matrix = store.matrix()
+    clusters: List[DuplicateCluster] = []
+    for group in groups:
+        # 同一文件只保留一行（live_rows 已去重，这里防御旧索引的重复路径）
+        members: Dict[int, int] = {}
+        for r in group:
+            file_id = row_to_id.get(r)
+            if file_id is not None and file_id in info:
+                members.setdefault(file_id, r)
+        if len(members) < 2:
+            continue
+        keeper_id = max(members, key=lambda fid: _keeper_rank(info[fid]))
+        member_ids = sorted(members)
+        vectors = _normalize(matrix[np.asarray([members[fid] for fid in member_ids], dtype=np.int64)])
+        sims = vectors @ vectors[member_ids.index(keeper_id)]
+        clusters.append(
+            DuplicateCluster(
+                member_ids=member_ids,
+                keeper_id=keeper_id,
+                similarities={fid: float(min(1.0, s)) for fid, s in zip(member_ids, sims.tolist())},
+            )
+        )
+    return clusters
+
+
+def save_duplicate_groups(
+    session: Session,
+    clusters: Sequence[DuplicateCluster],
+    job_id: Optional[int],
+    threshold: float,
+    scope_ids: Optional[Iterable[int]] = None,
+) -> int:
+    """
+    用本次结果替换 duplicate_groups / duplicate_members（不提交），返回写入的组数。
+
+    Args:
+        scope_ids: 本次扫描覆盖的 audio_file_id；None 表示全库扫描（整体替换）。
+            给出时只删除含有其中任一成员的旧组，范围外的组保持不变
+    """
+    if scope_ids is None:
+        session.execute(delete(DuplicateMember))
+        session.execute(delete(DuplicateGroup))
+    else:
+        scope = sorted(set(int(i) for i in scope_ids))
+        stale_groups = set()
+        for i in range(0, len(scope), SQLITE_IN_BATCH):
+            batch = scope[i : i + SQLITE_IN_BATCH]
+            stale_groups.update(
+                session.execute(
+                    select(DuplicateMember.group_id).where(DuplicateMember.audio_file_id.in_(batch))
+                ).scalars()
+            )
+        stale = sorted(stale_groups)
+        for i in range(0, len(stale), SQLITE_IN_BATCH):
+            batch = stale[i : i + SQLITE_IN_BATCH]
+            session.execute(delete(DuplicateMember).where(DuplicateMember.group_id.in_(batch)))
+            session.execute(delete(DuplicateGroup).where(DuplicateGroup.id.in_(batch)))
+    members: List[dict] = []
+    for start in range(0, len(clusters), GROUP_INSERT_BATCH):
+        batch = clusters[start : start + GROUP_INSERT_BATCH]
+        # executemany + RETURNING 按参数顺序返回主键（SQLAlchemy ≥ 2.0.10）
+        group_ids = session.execute(
+            insert(DuplicateGroup).returning(DuplicateGroup.id, sort_by_parameter_order=True),
+            [
+                {
+                    "job_id": job_id,
+                    "keeper_id": c.keeper_id,
+                    "size": len(c.member_ids),
+                    "threshold": float(threshold),
+                    "min_similarity": c.min_similarity,
+                }
+                for c in batch
+            ],
+        ).scalars().all()
+        for group_id, cluster in zip(group_ids, batch):
+            for file_id in cluster.member_ids:
+                members.append(
+                    {
+                        "group_id": group_id,
+                        "audio_file_id": file_id,
+                        "similarity": cluster.similarities.get(file_id, 0.0),
+                        "is_keeper": file_id == cluster.keeper_id,
+                    }
+                )
+        for i in range(0, len(members), GROUP_INSERT_BATCH):
+            session.execute(insert(DuplicateMember), members[i : i + GROUP_INSERT_BATCH])
+        members = []
+    return len(clusters)
@@ -0,0 +1,96 @@
+"""
+Batched zero-shot tagging helpers.
+
+整块打分：(files × dim) @ (dim × labels) 一次 GEMM，``np.argpartition`` 取每行 top-k；
+写库：按 audio_file_id 批量 DELETE / executemany INSERT / 一条 UPDATE 更新状态。
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+from sqlalchemy import delete, insert, update
+from sqlalchemy.orm import Session
+
+from transcriptionist_v3.infrastructure.database.models import AudioFile, AudioFileTag
+
+# SQLite 默认 SQLITE_MAX_VARIABLE_NUMBER 较小，IN 列表分批
+SQLITE_IN_BATCH = 500
+# 每个文件最多保留的标签数
+DEFAULT_TOP_K = 10
+# 打分分块行数：block_rows × labels 的 float32 分数矩阵常驻内存
+SCORE_BLOCK_ROWS = 8192
+
+
+def score_top_tags(
+    embeddings: np.ndarray,
+    tag_matrix: np.ndarray,
+    min_confidence: float,
+    top_k: int = DEFAULT_TOP_K,
+) -> List[List[int]]:
+    """
+    对一批音频 embedding 做零样本打分，返回每个文件的标签下标（按分数降序、已按 min_confidence 过滤）。
+
+    Args:
+        embeddings: (n, dim) 音频 embedding（未必归一化）
+        tag_matrix: (labels, dim) 已归一化的文本 embedding
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    tag_matrix = np.asarray(tag_matrix, dtype=np.float32)
+    n = embeddings.shape[0] if embeddings.ndim == 2 else 0
+    n_labels = tag_matrix.shape[0] if tag_matrix.ndim == 2 else 0
+    if n == 0 or n_labels == 0:
+        return [[] for _ in range(n)]
+    k = max(1, min(int(top_k), n_labels))
+    tag_t = np.ascontiguousarray(tag_matrix.T)
+
+    results: List[List[int]] = []
+    for start in range(0, n, SCORE_BLOCK_ROWS):
+        block = embeddings[start : start + SCORE_BLOCK_ROWS]
+        norms = np.linalg.norm(block, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        scores = (block / norms) @ tag_t  # (rows, labels)
+        if k < n_labels:
+            top = np.argpartition(scores, n_labels - k, axis=1)[:, n_labels - k :]
+        else:
+            top = np.broadcast_to(np.arange(n_labels), scores.shape)
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind="stable")
+        top = np.take_along_axis(top, order, axis=1)
+        keep = np.take_along_axis(top_scores, order, axis=1) >= min_confidence
+        results.extend(row[mask].tolist() for row, mask in zip(top, keep))
+    return results
+
+
+def write_tags_bulk(
+    session: Session,
+    assignments: Dict[int, Sequence[str]],
+    tag_status: str,
+    tag_version: str,
+) -> None:
+    """
+    批量替换标签并更新打标状态（不提交，由调用方 commit）。
+
+    assignments: {audio_file_id: [tag, ...]}；空列表表示清空该文件的标签。
+    """
+    if not assignments:
+        return
+    file_ids = list(assignments.keys())
+    for i in range(0, len(file_ids), SQLITE_IN_BATCH):
+        batch = file_ids[i : i + SQLITE_IN_BATCH]
+        session.execute(delete(AudioFileTag).where(AudioFileTag.audio_file_id.in_(batch)))
+        session.execute(
+            update(AudioFile)
+            .where(AudioFile.id.in_(batch))
+            .values(tag_status=tag_status, tag_version=tag_version)
+            .execution_options(synchronize_session=False)
+        )
+    rows = [
+        {"audio_file_id": file_id, "tag": tag}
+        for file_id, tags in assignments.items()
+        for tag in tags
+    ]
+    if rows:
+        # 列表参数 → executemany
+        session.execute(insert(AudioFileTag), rows)
@@ -0,0 +1,367 @@
+"""
+Tagging job.
+
+任务化 AI 打标：基于分片索引逐块 GEMM 打分，按 audio_file_id 批量写库，支持断点与选择规则。
+界面（``TaggingJobWorker``）与无界面命令行共用；不依赖 Qt，进度 / 日志 / 批次结果均经回调上报。
+已按当前标签集（``tag_version``）打过标的文件会被跳过，因此取消后用同一 ``job_id`` 重跑即从断点继续。
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# SQLite 单条 SQL 变量数上限约 999，IN 查询需分批
+SQLITE_IN_BATCH = 500
+# 打标时每次从列式存储读取并整块打分的行数
+TAGGING_BLOCK_ROWS = 8192
+
+# 影视音效行业专用提示：批量标签翻译，返回 JSON 格式
+TAG_TRANSLATION_SYSTEM_PROMPT = """你是一位专业的影视音效标签翻译专家。
+
+### 任务
+将给定的英文音效标签列表翻译为极短的中文标签（2~6 个字），用于影视/游戏音效分类。
+
+### 翻译规则
+1. 每个标签翻译为 2~6 个汉字的短词组
+2. 若英文有多义，只取与声音、乐器、动作声、环境声相关的含义
+3. 不要输出解释、科普或完整句子
+
+### 输出格式
+必须返回 JSON 对象：{"translations": [{"original": "英文", "translated": "中文"}, ...]}
+
+### 示例
+输入: ["Truck", "Rain"]
+输出: {"translations": [{"original": "Truck", "translated": "卡车声"}, {"original": "Rain", "translated": "雨声"}]}"""
+
+
+def translate_tags_batch(tags: list) -> dict:
+    """
+    批量翻译标签，走「设置 -> AI 批量翻译性能」的批次与并发。
+    使用「设置 -> AI 服务商配置」选中的模型（含本地 Ollama/LM Studio），非 DeepSeek 硬编码。
+    返回 { 英文标签: 中文翻译 }，未翻出的保留英文。
+    """
+    if not tags:
+        return {}
+    from transcriptionist_v3.application.ai_engine.translation_manager import (
+        get_translation_config_from_app,
+        TranslationManager,
+    )
+    import asyncio
+
+    config, err = get_translation_config_from_app(system_prompt=TAG_TRANSLATION_SYSTEM_PROMPT)
+    if err or not config:
+        return {t: t for t in tags}
+
+    # 批量翻译标签时需要足够的输出空间：
+    # - 每个标签的 JSON 对象约 {"original": "xxx", "translated": "yyy"} ≈ 50 字符 ≈ 15 tokens
+    # - 40 个标签 ≈ 600 tokens，加上 JSON 结构开销，至少需要 1000+ tokens
+    # - 设置 2048 确保不会被截断导致 JSON 解析失败
+    config.max_tokens = 2048
+    config.temperature = 0.2
+
+    if not TranslationManager.instance().configure(config):
+        return {t: t for t in tags}
+
+    async def _run():
+        result = await TranslationManager.instance().translate_batch(
+            list(tags), use_cache=True, progress_callback=None
+        )
+        if not result.success or not result.data:
+            return {t: t for t in tags}
+        out = {}
+        for r in result.data:
+            orig = getattr(r, "original", None)
+            raw = getattr(r, "translated", None)
+            if orig is None:
+                continue
+            tr = (str(raw or "").strip().split("\n")[0].strip().strip("。，、；："))[:12] if raw else ""
+            out[orig] = tr if tr else orig
+        return out
+
+    try:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        return loop.run_until_complete(_run())
+    except Exception as e:
+        logger.debug(f"Tag batch translate error: {e}")
+        return {t: t for t in tags}
+    finally:
+        try:
+            loop.close()
+        except Exception:
+            pass
+
+
+class TaggingJob:
+    """任务化 AI 打标：基于分片索引逐块处理，支持断点与选择规则。"""
+
+    def __init__(
+        self,
+        engine,
+        selection: dict,
+        chunked_index: Optional[dict],
+        audio_embeddings: Optional[dict],
+        tag_list: list,
+        tag_matrix,
+        tag_translations: dict,
+        min_confidence: float = 0.35,
+        tag_version: str = "",
+        job_id: Optional[int] = None,
+        translate_tags: Optional[Callable[[list], dict]] = None,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None,
+        log_callback: Optional[Callable[[str], None]] = None,
+        batch_callback: Optional[Callable[[List[dict]], None]] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ):
+        """
+        Args:
+            translate_tags: 批量翻译函数（英文标签列表 → {英文: 中文}）；为 None 时保留英文标签
+            batch_callback: 每块写库后回调 [{"file_path", "tags"}, ...]，供界面增量刷新
+        """
+        self.engine = engine
+        self.selection = selection or {}
+        self.chunked_index = chunked_index
+        self.audio_embeddings = audio_embeddings or {}
+        self.tag_list = tag_list
+        self.tag_matrix = tag_matrix
+        self.tag_translations = tag_translations if tag_translations is not None else {}
+        self.min_confidence = min_confidence
+        self.tag_version = tag_version
+        self.job_id = job_id
+        self._translate_tags = translate_tags
+        self._progress = progress_callback or (lambda *_args: None)
+        self._log = log_callback or (lambda *_args: None)
+        self._batch = batch_callback or (lambda *_args: None)
+        self._is_cancelled = is_cancelled or (lambda: False)
+        self._processed = 0
+
+    def run(self) -> Dict:
+        """
+        执行（或恢复）打标任务。
+
+        Returns:
+            {"job_id", "processed", "failed", "status"}；status 为 done 或 paused（被取消）
+        Raises:
+            RuntimeError: 引擎未初始化；其他异常在标记任务失败后原样抛出
+        """
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import Job
+        from transcriptionist_v3.application.ai_jobs.job_store import mark_job_failed
+
+        if not self.engine:
+            raise RuntimeError("CLAP 引擎未初始化")
+
+        try:
+            return self._run()
+        except Exception as e:
+            logger.error(f"Tagging job error: {e}", exc_info=True)
+            with session_scope() as session:
+                job = session.get(Job, self.job_id) if self.job_id else None
+                if job:
+                    mark_job_failed(session, job, str(e))
+            raise
+
+    def _pause(self) -> Dict:
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import Job
+        from transcriptionist_v3.application.ai_jobs.job_constants import JOB_STATUS_PAUSED
+        from transcriptionist_v3.application.ai_jobs.job_store import mark_job_paused
+
+        with session_scope() as session:
+            job = session.get(Job, self.job_id)
+            if job:
+                mark_job_paused(session, job)
+        return {"job_id": self.job_id, "processed": self._processed, "failed": 0, "status": JOB_STATUS_PAUSED}
+
+    def _run(self) -> Dict:
+        import numpy as np
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import AudioFile, Job
+        from transcriptionist_v3.application.ai_jobs.selection import SelectionFilter, normalize_path
+        from transcriptionist_v3.application.ai_jobs.tagging import score_top_tags, write_tags_bulk
+        from transcriptionist_v3.application.ai_jobs.job_constants import (
+            JOB_TYPE_TAG,
+            JOB_STATUS_DONE,
+            FILE_STATUS_DONE,
+        )
+        from transcriptionist_v3.application.ai_jobs.job_store import (
+            create_job,
+            start_job,
+            mark_job_done,
+        )
+
+        selection_filter = SelectionFilter(self.selection)
+
+        with session_scope() as session:
+            job = session.get(Job, self.job_id) if self.job_id else None
+            if job is None:
+                job = create_job(session, JOB_TYPE_TAG, self.selection, params={"tag_version": self.tag_version})
+            self.job_id = job.id
+            total = int(self.selection.get("count", 0) or 0)
+            start_job(session, job, total=total)
+            session.commit()
+
+        self._processed = 0
+        failed = 0
+        total_count = int(self.selection.get("count", 0) or 0)
+        last_logged_at = [0]  # 每 200 个文件向实时分析发一次日志
+
+        def process_chunk(paths: list, matrix, batch_updates: list) -> None:
+            """整块打标：一次 (files × labels) GEMM 打分，按 audio_file_id 批量写库。"""
+            if not paths:
+                return
+
+            # 先按 selection 过滤；numpy 加载的 key 可能是 np.str_，统一转成 str 避免 DB 查询不匹配
+            selected_rows = []
+            selected_paths = []
+            for i, path_str in enumerate(paths):
+                path_str = str(path_str).strip()
+                if not path_str or not selection_filter.matches(path_str):
+                    continue
+                selected_rows.append(i)
+                selected_paths.append(path_str)
+            if not selected_paths:
+                return
+
+            # 查询 DB 获取 id 与状态（索引与 DB 可能一种用 / 一种用 \，两种形式都查；分批避免 too many SQL variables）
+            query_paths = set(selected_paths)
+            for p in selected_paths:
+                query_paths.add(p.replace("\\", "/"))
+                query_paths.add(p.replace("/", "\\"))
+            query_path_list = list(query_paths)
+
+            with session_scope() as session:
+                id_map = {}
+                for i in range(0, len(query_path_list), SQLITE_IN_BATCH):
+                    batch = query_path_list[i : i + SQLITE_IN_BATCH]
+                    rows = (
+                        session.query(AudioFile.id, AudioFile.file_path, AudioFile.tag_status, AudioFile.tag_version)
+                        .filter(AudioFile.file_path.in_(batch))
+                        .all()
+                    )
+                    for row in rows:
+                        id_map[normalize_path(row.file_path)] = row
+
+                # 同一文件在块内只处理一次（后出现的行覆盖先出现的）
+                targets = {}
+                for matrix_row, path_str in zip(selected_rows, selected_paths):
+                    row = id_map.get(normalize_path(path_str))
+                    if not row:
+                        continue
+                    if row.tag_status == FILE_STATUS_DONE and row.tag_version == self.tag_version:
+                        continue
+                    targets[row.id] = (row, matrix_row)
+                if not targets:
+                    return
+
+                # 整块打分：(files × dim) @ (dim × labels)，argpartition 取 top-10
+                target_list = list(targets.values())
+                block = np.asarray(matrix[[matrix_row for _, matrix_row in target_list]], dtype=np.float32)
+                top_indices = score_top_tags(block, self.tag_matrix, self.min_confidence, top_k=10)
+
+                # 收集需要翻译的标签（走「设置 -> AI 批量翻译性能」的批次与并发）
+                pending: list = []
+                unique_to_translate: set = set()
+                for (row, _), indices in zip(target_list, top_indices):
+                    top_tags = [self.tag_list[idx] for idx in indices]
+                    for tag_en in top_tags:
+                        cached = self.tag_translations.get(tag_en)
+                        # 检测无效缓存：如果缓存的翻译 == 原文，说明之前失败，需要重新翻译
+                        if cached is None or cached == tag_en:
+                            if cached == tag_en:
+                                del self.tag_translations[tag_en]  # 清除无效缓存
+                            unique_to_translate.add(tag_en)
+                    pending.append((row, top_tags))
+
+                # 批量翻译本 chunk 缺失的标签（使用设置中的批次与并发、当前选中的模型）
+                if unique_to_translate and self._translate_tags:
+                    batch_result = self._translate_tags(list(unique_to_translate))
+                    for k, v in batch_result.items():
+                        if v and v != k:
+                            self.tag_translations[k] = v
+
+                # 批量写库：DELETE/UPDATE 按 id 分批，标签行 executemany INSERT
+                assignments = {}
+                for row, top_tags in pending:
+                    final_tags = [
+                        self.tag_translations.get(tag_en, tag_en) for tag_en in top_tags
+                    ]
+                    assignments[row.id] = final_tags
+                    batch_updates.append({"file_path": row.file_path, "tags": final_tags})
+                write_tags_bulk(session, assignments, FILE_STATUS_DONE, self.tag_version)
+                session.commit()
+                self._processed += len(assignments)
+
+        def after_chunk(batch_updates: list) -> None:
+            processed = self._processed
+            if batch_updates:
+                self._batch(batch_updates)
+                self._log(f"已更新 {len(batch_updates)} 个文件的标签")
+            # 每 200 个文件向实时分析页发一次进度，避免“卡住”错觉
+            if total_count > 0 and processed - last_logged_at[0] >= 200:
+                last_logged_at[0] = processed
+                self._log(f"已处理 {processed}/{total_count} 个文件…")
+            self._progress(processed, total_count, f"正在打标… {processed}/{total_count}")
+
+        if self.chunked_index and self.chunked_index.get("_store"):
+            from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore
+
+            store = EmbeddingStore(
+                Path(self.chunked_index.get("index_dir", "")),
+                base_name=self.chunked_index.get("base_name", "clap_embeddings"),
+            )
+            store_paths = store.paths()
+            self._log(f"开始打标，共 {total_count} 个文件（每 200 个更新一次实时分析）")
+            # 只处理每个文件的最新行；整块读取后一次 GEMM 打分
+            for rows, block in store.iter_blocks(block_rows=TAGGING_BLOCK_ROWS):
+                if self._is_cancelled():
+                    return self._pause()
+                batch_updates: list = []
+                process_chunk([store_paths[r] for r in rows.tolist()], block, batch_updates)
+                after_chunk(batch_updates)
+        elif self.chunked_index and self.chunked_index.get("_chunked"):
+            index_dir = Path(self.chunked_index.get("index_dir", ""))
+            chunk_files = self.chunked_index.get("chunk_files", [])
+            self._log(f"开始打标，共 {total_count} 个文件（每 200 个更新一次实时分析）")
+            for chunk_name in chunk_files:
+                if self._is_cancelled():
+                    return self._pause()
+                chunk_path = index_dir / chunk_name
+                if not chunk_path.exists():
+                    continue
+                data = np.load(str(chunk_path), allow_pickle=True)
+                chunk = data.item() if data.ndim == 0 else {}
+                batch_updates: list = []
+                if chunk:
+                    process_chunk(list(chunk.keys()), np.asarray(list(chunk.values()), dtype=np.float32), batch_updates)
+                after_chunk(batch_updates)
+        else:
+            # 非分片索引：小规模直接处理
+            self._log(f"开始打标，共 {total_count} 个文件")
+            batch_updates: list = []
+            if self.audio_embeddings:
+                process_chunk(
+                    list(self.audio_embeddings.keys()),
+                    np.asarray(list(self.audio_embeddings.values()), dtype=np.float32),
+                    batch_updates,
+                )
+            if batch_updates:
+                self._batch(batch_updates)
+            self._progress(self._processed, total_count, f"已处理 {self._processed}/{total_count}")
+
+        with session_scope() as session:
+            job = session.get(Job, self.job_id)
+            if job:
+                mark_job_done(session, job)
+
+        processed = self._processed
+        if processed == 0 and total_count > 0:
+            self._log(
+                "⚠️ 打标成功 0 项。可能原因：① 索引中的路径与当前音效库路径不一致（请先重新「建立索引」）；② 所有文件已用当前标签集打标过。"
+            )
+        self._log(f"✅ 打标完成：成功 {processed} 项")
+        return {"job_id": self.job_id, "processed": processed, "failed": failed, "status": JOB_STATUS_DONE}
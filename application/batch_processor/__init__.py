@@ -6,14 +6,14 @@ Inspired by Quod Libet's copool patterns for background processing.
 
 Features:
 - Format conversion using ffmpeg
-- Loudness normalization using pyloudnorm
+- Streaming loudness normalization (BS.1770) with a process pool and analysis cache
 - Batch metadata editing
 - Parallel processing with worker pool
 - Progress tracking and cancellation
 - Undo support for metadata operations
 """
 
-from .converter import FormatConverter, ConversionOptions, ConversionResult, AudioFormat, AudioCodec
+from .converter import FormatConverter, ConversionOptions, ConversionResult, ConversionThroughput, AudioFormat, AudioCodec
 from .normalizer import LoudnessNormalizer, NormalizationOptions, NormalizationResult, NormalizationStandard
 from .metadata_editor import BatchMetadataEditor, MetadataOperation, MetadataEditResult, OperationType, MetadataField
 from .worker_pool import WorkerPool, BatchTask, TaskStatus
@@ -24,6 +24,7 @@ __all__ = [
     'FormatConverter',
     'ConversionOptions',
     'ConversionResult',
+    'ConversionThroughput',
     'AudioFormat',
     'AudioCodec',
     # Normalizer
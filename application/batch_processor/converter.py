@@ -2,20 +2,32 @@
 Format Converter
 
 Audio format conversion using ffmpeg.
+
+批量转换以有界并发运行多个 ffmpeg 子进程（数量取自 ``max_workers``）：
+每个文件先写入同目录下的临时文件，成功后 ``os.replace`` 到目标路径，
+失败、超时或取消时删除临时文件，目标目录里不会留下半截文件。
 """
 
 import asyncio
 import logging
+import os
 import shutil
 import subprocess
+import time
+import uuid
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Any
+from typing import Callable, Dict, List, Optional, Any, Set
 
 logger = logging.getLogger(__name__)
 
 
+def default_max_workers() -> int:
+    """默认并发 ffmpeg 进程数：逻辑核数（音频编码基本是单线程）。"""
+    return max(1, os.cpu_count() or 1)
+
+
 class AudioFormat(Enum):
     """Supported audio formats."""
     WAV = "wav"
@@ -64,6 +76,9 @@ class ConversionOptions:
     # Metadata
     copy_metadata: bool = True
     
+    # 单个文件的 ffmpeg 超时（秒），None = 不限
+    timeout_seconds: Optional[float] = None
+    
     def get_codec(self) -> str:
         """Get the codec string for ffmpeg."""
         if self.codec:
@@ -107,6 +122,52 @@ class ConversionResult:
         }
 
 
+@dataclass
+class ConversionThroughput:
+    """批量转换的聚合吞吐与预计剩余时间。"""
+    
+    total_files: int = 0
+    completed_files: int = 0
+    failed_files: int = 0
+    running_files: int = 0
+    input_bytes: int = 0
+    started_at: float = 0.0
+    
+    @property
+    def elapsed_seconds(self) -> float:
+        return time.monotonic() - self.started_at if self.started_at else 0.0
+    
+    @property
+    def files_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.completed_files / elapsed if elapsed > 0 else 0.0
+    
+    @property
+    def bytes_per_second(self) -> float:
+        elapsed = self.elapsed_seconds
+        return self.input_bytes / elapsed if elapsed > 0 else 0.0
+    
+    @property
+    def eta_seconds(self) -> Optional[float]:
+        rate = self.files_per_second
+        if rate <= 0:
+            return None
+        return (self.total_files - self.completed_files) / rate
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary."""
+        return {
+            'total_files': self.total_files,
+            'completed_files': self.completed_files,
+            'failed_files': self.failed_files,
+            'running_files': self.running_files,
+            'elapsed_seconds': self.elapsed_seconds,
+            'files_per_second': self.files_per_second,
+            'bytes_per_second': self.bytes_per_second,
+            'eta_seconds': self.eta_seconds,
+        }
+
+
 class FormatConverter:
     """
     Audio format converter using ffmpeg.
@@ -117,17 +178,24 @@ class FormatConverter:
     - Quality settings for lossy formats
     - Metadata preservation
     - Progress tracking
+    - Bounded parallel ffmpeg processes with per-file timeouts
     """
     
-    def __init__(self, ffmpeg_path: Optional[str] = None):
+    def __init__(self, ffmpeg_path: Optional[str] = None, max_workers: Optional[int] = None):
         """
         Initialize the converter.
         
         Args:
             ffmpeg_path: Path to ffmpeg executable (auto-detect if None)
+            max_workers: Concurrent ffmpeg processes for convert_batch (None = CPU count)
         """
         self.ffmpeg_path = ffmpeg_path or self._find_ffmpeg()
+        self.max_workers = max(1, int(max_workers or default_max_workers()))
+        self.throughput = ConversionThroughput()
         self._cancelled = False
+        # 正在运行的 ffmpeg 进程；取消时全部终止
+        self._processes: Set[asyncio.subprocess.Process] = set()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
     
     def _find_ffmpeg(self) -> str:
         """Find ffmpeg executable."""
@@ -160,14 +228,28 @@ class FormatConverter:
             return False
     
     def cancel(self) -> None:
-        """Cancel the current operation."""
+        """Cancel the current operation and kill running ffmpeg processes (thread-safe)."""
         self._cancelled = True
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            loop.call_soon_threadsafe(self._kill_processes)
+        else:
+            self._kill_processes()
+    
+    def _kill_processes(self) -> None:
+        for process in list(self._processes):
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
     
     async def convert(
         self,
         input_path: Path,
         options: ConversionOptions,
         progress_callback: Optional[Callable[[float, str], None]] = None,
+        output_path: Optional[Path] = None,
     ) -> ConversionResult:
         """
         Convert a single audio file.
@@ -176,19 +258,20 @@ class FormatConverter:
             input_path: Path to input file
             options: Conversion options
             progress_callback: Progress callback (progress, message)
+            output_path: Explicit output path (default: derived from options)
         
         Returns:
             ConversionResult
         """
-        import time
         start_time = time.time()
         
         result = ConversionResult(input_path=input_path)
         result.input_size = input_path.stat().st_size if input_path.exists() else 0
+        temp_path: Optional[Path] = None
         
         try:
             # Determine output path
-            output_path = self._get_output_path(input_path, options)
+            output_path = output_path or self._get_output_path(input_path, options)
             result.output_path = output_path
             
             # Check if output exists
@@ -199,25 +282,42 @@ class FormatConverter:
             # Ensure output directory exists
             output_path.parent.mkdir(parents=True, exist_ok=True)
             
+            # 写入同目录临时文件（保留扩展名供 ffmpeg 推断封装格式），成功后原子替换
+            temp_path = output_path.with_name(
+                f".{output_path.stem}.{uuid.uuid4().hex[:8]}.part{output_path.suffix}"
+            )
+            
             # Build ffmpeg command
-            cmd = self._build_command(input_path, output_path, options)
+            cmd = self._build_command(input_path, temp_path, options)
             
             if progress_callback:
                 progress_callback(0.0, f"Converting {input_path.name}...")
             
+            if self._cancelled:
+                result.error = "Cancelled"
+                return result
+            
             # Run conversion
             process = await asyncio.create_subprocess_exec(
                 *cmd,
+                stdin=asyncio.subprocess.DEVNULL,
                 stdout=asyncio.subprocess.PIPE,
                 stderr=asyncio.subprocess.PIPE,
             )
-            
-            stdout, stderr = await process.communicate()
+            self._processes.add(process)
+            try:
+                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=options.timeout_seconds)
+            except asyncio.TimeoutError:
+                process.kill()
+                await process.wait()
+                result.error = f"Timed out after {options.timeout_seconds:g}s"
+                logger.error(f"FFmpeg timeout: {input_path}")
+                return result
+            finally:
+                self._processes.discard(process)
             
             if self._cancelled:
                 result.error = "Cancelled"
-                if output_path.exists():
-                    output_path.unlink()
                 return result
             
             if process.returncode != 0:
@@ -225,6 +325,12 @@ class FormatConverter:
                 logger.error(f"FFmpeg error: {result.error}")
                 return result
             
+            if output_path.exists() and not options.overwrite:
+                result.error = "Output file already exists"
+                return result
+            os.replace(temp_path, output_path)
+            temp_path = None
+            
             result.success = True
             result.output_size = output_path.stat().st_size if output_path.exists() else 0
             
@@ -236,6 +342,11 @@ class FormatConverter:
             logger.error(f"Conversion error: {e}")
         
         finally:
+            if temp_path is not None:
+                try:
+                    temp_path.unlink(missing_ok=True)
+                except OSError as e:
+                    logger.warning(f"Failed to remove temp file {temp_path}: {e}")
             result.duration_seconds = time.time() - start_time
         
         return result
@@ -245,35 +356,88 @@ class FormatConverter:
         input_paths: List[Path],
         options: ConversionOptions,
         progress_callback: Optional[Callable[[float, str], None]] = None,
+        max_workers: Optional[int] = None,
     ) -> List[ConversionResult]:
         """
-        Convert multiple audio files.
+        Convert multiple audio files with up to ``max_workers`` concurrent ffmpeg processes.
+        
+        Files are started in input order; results are returned in input order.
+        On cancellation, files not yet started are omitted and running ones
+        are killed and reported with error "Cancelled".
         
         Args:
             input_paths: List of input file paths
             options: Conversion options
-            progress_callback: Progress callback
+            progress_callback: Progress callback (overall progress, message)
+            max_workers: Concurrent ffmpeg processes (default: self.max_workers)
         
         Returns:
             List of ConversionResults
         """
         self._cancelled = False
-        results = []
+        self._loop = asyncio.get_running_loop()
         total = len(input_paths)
+        workers = max(1, min(int(max_workers or self.max_workers), total or 1))
+        results: List[Optional[ConversionResult]] = [None] * total
+        stats = ConversionThroughput(total_files=total, started_at=time.monotonic())
+        self.throughput = stats
+        next_index = 0
+        # 多个输入映射到同一输出时（a.mp3 / a.flac -> a.wav），按输入顺序串行，保持与顺序执行相同的结果
+        output_owners: Dict[Path, asyncio.Event] = {}
         
-        for i, input_path in enumerate(input_paths):
-            if self._cancelled:
-                break
-            
-            def file_progress(progress: float, message: str):
-                overall = (i + progress) / total
-                if progress_callback:
-                    progress_callback(overall, message)
-            
-            result = await self.convert(input_path, options, file_progress)
-            results.append(result)
+        def report(message: str) -> None:
+            if not progress_callback:
+                return
+            eta = stats.eta_seconds
+            eta_text = f", ETA {eta:.0f}s" if eta is not None else ""
+            progress_callback(
+                stats.completed_files / total if total else 1.0,
+                f"{message} ({stats.completed_files}/{total}, {stats.files_per_second:.1f} files/s{eta_text})",
+            )
+        
+        async def run_worker() -> None:
+            nonlocal next_index
+            while not self._cancelled and next_index < total:
+                index = next_index
+                next_index += 1
+                input_path = input_paths[index]
+                try:
+                    output_path = self._get_output_path(input_path, options)
+                except Exception as e:
+                    # 输出路径无法确定（模板 / 目录错误）时记为该文件失败，不中断整批
+                    logger.error(f"Conversion error for {input_path.name}: {e}")
+                    result = ConversionResult(input_path=input_path, error=str(e))
+                    result.input_size = input_path.stat().st_size if input_path.exists() else 0
+                else:
+                    previous = output_owners.get(output_path)
+                    done = asyncio.Event()
+                    output_owners[output_path] = done
+                    try:
+                        if previous is not None:
+                            await previous.wait()
+                        stats.running_files += 1
+                        result = await self.convert(input_path, options, output_path=output_path)
+                    finally:
+                        done.set()
+                    stats.running_files -= 1
+                results[index] = result
+                stats.completed_files += 1
+                stats.input_bytes += result.input_size
+                if not result.success:
+                    stats.failed_files += 1
+                report(f"{'Converted' if result.success else 'Failed'} {input_path.name}")
+        
+        try:
+            await asyncio.gather(*(run_worker() for _ in range(workers)))
+        finally:
+            self._loop = None
         
-        return results
+        logger.info(
+            "Converted %d/%d files with %d workers in %.1fs (%.1f files/s, %d failed)",
+            stats.completed_files, total, workers, stats.elapsed_seconds,
+            stats.files_per_second, stats.failed_files,
+        )
+        return [r for r in results if r is not None]
     
     def _get_output_path(self, input_path: Path, options: ConversionOptions) -> Path:
         """Determine the output path for a file."""
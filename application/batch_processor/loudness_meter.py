@@ -0,0 +1,322 @@
+"""
+Streaming Loudness Meter
+
+按块流式计算 ITU-R BS.1770-4 / EBU R128 响度，内存占用与文件长度无关：
+
+- K 计权（高搁架 + 高通两个 biquad）用 ``scipy.signal.sosfilt`` 跨块携带滤波器状态
+- 每 100 ms（门限块长的 1/4）累计一次各声道均方值，400 ms 门限块 = 4 个相邻子块的平均（75% 重叠）；
+  整段只保存子块均方值（每小时约 36000 × 声道数个浮点数）
+- 积分响度：-70 LUFS 绝对门限 + 相对 -10 LU 门限
+- 响度范围（LRA，EBU Tech 3342）：3 s 短时响度，-70 LUFS 绝对门限 + 相对 -20 LU 门限，取 P95 - P10
+- 真峰值：4 倍过采样（``resample_poly``），相邻块之间保留少量样本作为滤波器上下文
+
+``LoudnessAnalysisCache`` 以采样内容指纹为键缓存测量结果（SQLite 文件），
+重新标准化同一批文件时跳过已测量的文件。
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 测量算法版本：算法变化时使旧缓存失效
+ANALYSIS_VERSION = "bs1770-stream-1"
+# 每次从文件读取的帧数
+READ_BLOCK_FRAMES = 65536
+# BS.1770 声道权重（L, R, C, Ls, Rs）；其余声道按 1.0
+CHANNEL_WEIGHTS = (1.0, 1.0, 1.0, 1.41, 1.41)
+ABSOLUTE_GATE_LUFS = -70.0
+RELATIVE_GATE_LU = -10.0
+LRA_RELATIVE_GATE_LU = -20.0
+SHORT_TERM_SECONDS = 3.0
+TRUE_PEAK_OVERSAMPLE = 4
+# 真峰值过采样在块边界两侧需要的上下文样本数（resample_poly 默认滤波器半长约 10 个原始样本）
+_TRUE_PEAK_CONTEXT = 32
+
+
+def _k_weighting_sos(sample_rate: int) -> np.ndarray:
+    """任意采样率下的 K 计权二阶节（与 pyloudnorm 的 K-weighting 设计一致）。"""
+
+    def biquad(kind: str, gain_db: float, q: float, fc: float):
+        a = 10 ** (gain_db / 40.0)
+        w0 = 2.0 * math.pi * (fc / sample_rate)
+        alpha = math.sin(w0) / (2.0 * q)
+        cos_w0 = math.cos(w0)
+        if kind == "high_shelf":
+            b0 = a * ((a + 1) + (a - 1) * cos_w0 + 2 * math.sqrt(a) * alpha)
+            b1 = -2 * a * ((a - 1) + (a + 1) * cos_w0)
+            b2 = a * ((a + 1) + (a - 1) * cos_w0 - 2 * math.sqrt(a) * alpha)
+            a0 = (a + 1) - (a - 1) * cos_w0 + 2 * math.sqrt(a) * alpha
+            a1 = 2 * ((a - 1) - (a + 1) * cos_w0)
+            a2 = (a + 1) - (a - 1) * cos_w0 - 2 * math.sqrt(a) * alpha
+        else:  # high_pass
+            b0 = (1 + cos_w0) / 2
+            b1 = -(1 + cos_w0)
+            b2 = (1 + cos_w0) / 2
+            a0 = 1 + alpha
+            a1 = -2 * cos_w0
+            a2 = 1 - alpha
+        return [b0 / a0, b1 / a0, b2 / a0, 1.0, a1 / a0, a2 / a0]
+
+    return np.array(
+        [
+            biquad("high_shelf", 4.0, 1 / math.sqrt(2.0), 1500.0),
+            biquad("high_pass", 0.0, 0.5, 38.0),
+        ],
+        dtype=np.float64,
+    )
+
+
+def _power_to_lufs(power: float) -> float:
+    return -0.691 + 10.0 * math.log10(power) if power > 0 else float("-inf")
+
+
+class StreamingLoudnessMeter:
+    """
+    流式响度表。
+
+    用法::
+
+        meter = StreamingLoudnessMeter(sample_rate, channels)
+        for block in sf.blocks(path, blocksize=65536, always_2d=True):
+            meter.feed(block)
+        values = meter.result()
+    """
+
+    def __init__(self, sample_rate: int, channels: int, block_size: float = 0.4):
+        from scipy import signal
+
+        self._signal = signal
+        self.sample_rate = int(sample_rate)
+        self.channels = max(1, int(channels))
+        self.block_size = float(block_size)
+        # 门限块 75% 重叠：步长 = 子块长 = 门限块长 / 4
+        self._sub_len = max(1, int(round(self.block_size / 4 * self.sample_rate)))
+        self._sos = _k_weighting_sos(self.sample_rate)
+        self._zi = np.zeros((self._sos.shape[0], 2, self.channels), dtype=np.float64)
+        self._weights = np.array(
+            [CHANNEL_WEIGHTS[i] if i < len(CHANNEL_WEIGHTS) else 1.0 for i in range(self.channels)]
+        )
+        self._pending = np.zeros((0, self.channels), dtype=np.float64)
+        self._sub_blocks = []
+        self._tp_buf = np.zeros((0, self.channels), dtype=np.float64)
+        self._tp_start = 0
+        self._true_peak = 0.0
+        self._sample_peak = 0.0
+        self.frames = 0
+
+    def feed(self, block: np.ndarray) -> None:
+        """送入一块 (frames, channels) 样本。"""
+        block = np.asarray(block, dtype=np.float64)
+        if block.ndim == 1:
+            block = block.reshape(-1, 1)
+        if len(block) == 0:
+            return
+        self.frames += len(block)
+        self._sample_peak = max(self._sample_peak, float(np.max(np.abs(block))))
+        self._update_true_peak(block)
+
+        filtered, self._zi = self._signal.sosfilt(self._sos, block, axis=0, zi=self._zi)
+        if len(self._pending):
+            filtered = np.concatenate([self._pending, filtered])
+        n_full = len(filtered) // self._sub_len
+        if n_full:
+            full = filtered[: n_full * self._sub_len].reshape(n_full, self._sub_len, self.channels)
+            self._sub_blocks.append(np.mean(full * full, axis=1))
+        self._pending = filtered[n_full * self._sub_len :]
+
+    def _update_true_peak(self, block: np.ndarray) -> None:
+        # _tp_buf[:_tp_start] 是已计入峰值的上下文样本，之后是尚未计入的样本
+        buf = np.concatenate([self._tp_buf, block]) if len(self._tp_buf) else block
+        stop = len(buf) - _TRUE_PEAK_CONTEXT
+        if stop > self._tp_start:
+            self._scan_true_peak(buf, self._tp_start, stop)
+            self._tp_buf = buf[stop - _TRUE_PEAK_CONTEXT :]
+            self._tp_start = _TRUE_PEAK_CONTEXT
+        else:
+            self._tp_buf = buf
+
+    def _scan_true_peak(self, buf: np.ndarray, start: int, stop: int) -> None:
+        up = self._signal.resample_poly(buf, TRUE_PEAK_OVERSAMPLE, 1, axis=0)
+        seg = up[start * TRUE_PEAK_OVERSAMPLE : stop * TRUE_PEAK_OVERSAMPLE]
+        if len(seg):
+            self._true_peak = max(self._true_peak, float(np.max(np.abs(seg))))
+
+    def _flush_true_peak(self) -> None:
+        if len(self._tp_buf) > self._tp_start:
+            self._scan_true_peak(self._tp_buf, self._tp_start, len(self._tp_buf))
+        self._tp_buf = np.zeros((0, self.channels), dtype=np.float64)
+        self._tp_start = 0
+
+    def result(self) -> Dict[str, float]:
+        """结束测量，返回 integrated_loudness / loudness_range / true_peak / short_term_max / sample_peak。"""
+        self._flush_true_peak()
+        # 真峰值不低于采样峰值（过采样滤波的纹波可能让极短信号略低）
+        true_peak = max(self._true_peak, self._sample_peak)
+        sub = np.concatenate(self._sub_blocks) if self._sub_blocks else np.zeros((0, self.channels))
+
+        integrated = float("-inf")
+        if len(sub) >= 4:
+            z = (sub[:-3] + sub[1:-2] + sub[2:-1] + sub[3:]) / 4.0  # (blocks, channels)
+            power = z @ self._weights
+            with np.errstate(divide="ignore"):
+                loudness = -0.691 + 10.0 * np.log10(power)
+            gated = loudness >= ABSOLUTE_GATE_LUFS
+            if np.any(gated):
+                relative = _power_to_lufs(float(np.mean(power[gated]))) + RELATIVE_GATE_LU
+                gated &= loudness > relative
+                if np.any(gated):
+                    integrated = _power_to_lufs(float(np.mean(power[gated])))
+
+        loudness_range, short_term_max = self._short_term_stats(sub)
+        return {
+            "integrated_loudness": integrated,
+            "loudness_range": loudness_range,
+            "true_peak": 20 * math.log10(true_peak) if true_peak > 0 else float("-inf"),
+            "short_term_max": short_term_max if short_term_max is not None else integrated,
+            "sample_peak": 20 * math.log10(self._sample_peak) if self._sample_peak > 0 else float("-inf"),
+        }
+
+    def _short_term_stats(self, sub: np.ndarray):
+        window = max(1, int(round(SHORT_TERM_SECONDS / (self.block_size / 4))))
+        if len(sub) < window:
+            return 0.0, None
+        power = sub @ self._weights
+        csum = np.concatenate([[0.0], np.cumsum(power)])
+        st_power = (csum[window:] - csum[:-window]) / window
+        with np.errstate(divide="ignore"):
+            st = -0.691 + 10.0 * np.log10(st_power)
+        short_term_max = float(np.max(st))
+        gated = st_power[st >= ABSOLUTE_GATE_LUFS]
+        if len(gated) == 0:
+            return 0.0, short_term_max
+        relative = _power_to_lufs(float(np.mean(gated))) + LRA_RELATIVE_GATE_LU
+        values = st[(st >= ABSOLUTE_GATE_LUFS) & (st >= relative)]
+        if len(values) < 2:
+            return 0.0, short_term_max
+        low, high = np.percentile(values, [10, 95])
+        return float(high - low), short_term_max
+
+
+def measure_file(
+    file_path: Union[str, Path],
+    block_size: float = 0.4,
+    read_frames: int = READ_BLOCK_FRAMES,
+) -> Dict[str, float]:
+    """流式测量一个文件的响度（不把整个文件读进内存）。"""
+    import soundfile as sf
+
+    with sf.SoundFile(str(file_path)) as f:
+        meter = StreamingLoudnessMeter(f.samplerate, f.channels, block_size=block_size)
+        for block in f.blocks(blocksize=read_frames, dtype="float32", always_2d=True):
+            meter.feed(block)
+        values = meter.result()
+        values["sample_rate"] = f.samplerate
+        values["channels"] = f.channels
+        values["frames"] = meter.frames
+    return values
+
+
+def analysis_cache_key(file_path: Union[str, Path]) -> str:
+    """
+    响度缓存键：抽样内容指纹 + 文件大小 + mtime(ns)。
+
+    抽样指纹只覆盖文件大小与首 / 中 / 尾三块，原地编辑（中段淡入淡出、EQ 等）而大小不变时指纹不变；
+    加上 mtime 后任何写入都会使缓存失效。无法读取文件时返回空串（不使用缓存）。
+    """
+    from transcriptionist_v3.application.library_manager.fingerprint import try_sampled_fingerprint
+
+    fingerprint = try_sampled_fingerprint(str(file_path))
+    if not fingerprint:
+        return ""
+    try:
+        st = os.stat(file_path)
+    except OSError:
+        return ""
+    return f"{fingerprint}:{st.st_size}:{st.st_mtime_ns}"
+
+
+class LoudnessAnalysisCache:
+    """
+    以内容指纹（含大小与 mtime，见 ``analysis_cache_key``）为键的响度测量缓存（SQLite）。
+
+    批处理 worker 进程只读，写入由主进程完成；WAL 模式下读写互不阻塞。
+    """
+
+    _COLUMNS = ("integrated_loudness", "loudness_range", "true_peak", "short_term_max", "sample_peak")
+
+    def __init__(self, db_path: Optional[Path] = None):
+        if db_path is None:
+            from transcriptionist_v3.core.config import get_data_dir
+
+            db_path = get_data_dir() / "cache" / "loudness_analysis.sqlite3"
+        self.db_path = Path(db_path)
+        self._local = threading.local()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.db_path), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS loudness_analysis (
+                    fingerprint TEXT NOT NULL,
+                    version TEXT NOT NULL,
+                    block_size REAL NOT NULL,
+                    integrated_loudness REAL,
+                    loudness_range REAL,
+                    true_peak REAL,
+                    short_term_max REAL,
+                    sample_peak REAL,
+                    analyzed_at REAL,
+                    PRIMARY KEY (fingerprint, version, block_size)
+                )
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    def get(self, fingerprint: str, block_size: float = 0.4) -> Optional[Dict[str, float]]:
+        if not fingerprint:
+            return None
+        try:
+            row = self._connect().execute(
+                f"SELECT {', '.join(self._COLUMNS)} FROM loudness_analysis "
+                "WHERE fingerprint = ? AND version = ? AND block_size = ?",
+                (fingerprint, ANALYSIS_VERSION, float(block_size)),
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.debug(f"Loudness cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        # 非有限值（静音文件的 -inf）以 NULL 存储，读回时还原为 -inf
+        return {k: (float("-inf") if v is None else float(v)) for k, v in zip(self._COLUMNS, row)}
+
+    def put(self, fingerprint: str, values: Dict[str, float], block_size: float = 0.4) -> None:
+        if not fingerprint:
+            return
+        row = [None if not math.isfinite(values.get(k, 0.0)) else float(values[k]) for k in self._COLUMNS]
+        try:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO loudness_analysis "
+                f"(fingerprint, version, block_size, {', '.join(self._COLUMNS)}, analyzed_at) "
+                f"VALUES (?, ?, ?, {', '.join('?' for _ in self._COLUMNS)}, ?)",
+                (fingerprint, ANALYSIS_VERSION, float(block_size), *row, time.time()),
+            )
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Loudness cache write failed: {e}")
@@ -1,11 +1,22 @@
 """
 Loudness Normalizer
 
-Audio loudness normalization using pyloudnorm and soundfile.
+Audio loudness normalization (ITU-R BS.1770 / EBU R128) using soundfile and scipy.
+
+- 响度按块流式测量（``loudness_meter``），不再把整个文件读进内存
+- 每个文件只测量一次：标准化后的响度由增益解析推出，不再对输出二次测量
+- 输出同样按块写入同目录临时文件，成功后 ``os.replace``，保持原格式与位深
+- 批量处理在进程池中并行（K 计权滤波与过采样是 CPU 密集的 numpy/scipy 运算）
+- 测量结果按采样内容指纹缓存，重新标准化同一批文件时跳过已测量的文件
 """
 
 import asyncio
 import logging
+import math
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass, field
 from enum import Enum
 from pathlib import Path
@@ -13,6 +24,8 @@ from typing import Callable, Dict, List, Optional, Any, Tuple
 
 import numpy as np
 
+from .loudness_meter import READ_BLOCK_FRAMES, LoudnessAnalysisCache, analysis_cache_key, measure_file
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,6 +56,7 @@ class NormalizationOptions:
     
     # Analysis
     block_size: float = 0.4  # seconds
+    use_cache: bool = True  # reuse measurements keyed by content fingerprint + size + mtime
     
     def get_target_loudness(self) -> float:
         """Get target loudness based on standard."""
@@ -107,49 +121,163 @@ class NormalizationResult:
         }
 
 
+# ----------------------------------------------------------------------
+# worker 进程端（顶层函数，可被 ProcessPoolExecutor pickle）
+# ----------------------------------------------------------------------
+
+_worker_caches: Dict[str, LoudnessAnalysisCache] = {}
+
+
+def _cached_values(cache_path: Optional[str], fingerprint: str, block_size: float) -> Optional[Dict[str, float]]:
+    if not cache_path or not fingerprint:
+        return None
+    cache = _worker_caches.get(cache_path)
+    if cache is None:
+        cache = _worker_caches[cache_path] = LoudnessAnalysisCache(Path(cache_path))
+    return cache.get(fingerprint, block_size)
+
+
+def _measure_task(input_path: str, block_size: float, cache_path: Optional[str]) -> Dict[str, Any]:
+    """测量一个文件（命中缓存则不解码）。返回 {fingerprint, values, cached}。"""
+    fingerprint = analysis_cache_key(input_path) if cache_path else ""
+    values = _cached_values(cache_path, fingerprint, block_size)
+    if values is not None:
+        return {"fingerprint": fingerprint, "values": values, "cached": True}
+    return {"fingerprint": fingerprint, "values": measure_file(input_path, block_size), "cached": False}
+
+
+def _compute_gain(values: Dict[str, float], target: float, peak_limit: float, apply_limiter: bool) -> float:
+    """目标增益；启用限幅时按真峰值整体压低增益（与原先按比例缩放的限幅方式一致）。"""
+    gain_db = target - values["integrated_loudness"]
+    if apply_limiter and values["true_peak"] + gain_db > peak_limit:
+        gain_db = peak_limit - values["true_peak"]
+    return gain_db
+
+
+def _write_gained(input_path: str, output_path: str, gain_db: float) -> None:
+    """按块读取、乘增益、写入同目录临时文件，成功后原子替换到目标路径。"""
+    import soundfile as sf
+
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    temp = output.with_name(f".{output.stem}.{uuid.uuid4().hex[:8]}.part{output.suffix}")
+    gain = 10 ** (gain_db / 20.0)
+    try:
+        with sf.SoundFile(input_path) as src:
+            # 保持原格式与位深（原实现 sf.write 会把 24 bit WAV 写成 16 bit）
+            clip = not src.subtype.startswith(("FLOAT", "DOUBLE"))
+            with sf.SoundFile(
+                str(temp), "w", samplerate=src.samplerate, channels=src.channels,
+                subtype=src.subtype, format=src.format,
+            ) as dst:
+                for block in src.blocks(blocksize=READ_BLOCK_FRAMES, dtype="float32", always_2d=True):
+                    block *= gain
+                    if clip:
+                        np.clip(block, -1.0, 1.0, out=block)
+                    dst.write(block)
+        os.replace(temp, output)
+    finally:
+        if temp.exists():
+            try:
+                temp.unlink()
+            except OSError:
+                pass
+
+
+def _normalize_task(
+    input_path: str,
+    output_path: str,
+    target: float,
+    peak_limit: float,
+    apply_limiter: bool,
+    block_size: float,
+    cache_path: Optional[str],
+) -> Dict[str, Any]:
+    """
+    标准化一个文件：一次测量（或缓存命中）→ 计算增益 → 流式写出。
+
+    标准化后的响度由增益解析推出（积分响度、真峰值、短时最大值整体平移，LRA 不变），不再二次测量。
+    """
+    try:
+        measured = _measure_task(input_path, block_size, cache_path)
+        values = measured["values"]
+        if not math.isfinite(values["integrated_loudness"]):
+            return {**measured, "error": "Audio is silent or too short to measure"}
+        gain_db = _compute_gain(values, target, peak_limit, apply_limiter)
+        _write_gained(input_path, output_path, gain_db)
+        return {**measured, "gain_db": gain_db, "error": None}
+    except Exception as e:
+        return {"error": str(e) or type(e).__name__}
+
+
+def _analysis_from_values(values: Dict[str, float], gain_db: float = 0.0) -> LoudnessAnalysis:
+    return LoudnessAnalysis(
+        integrated_loudness=values["integrated_loudness"] + gain_db,
+        loudness_range=values["loudness_range"],
+        true_peak=values["true_peak"] + gain_db,
+        short_term_max=values["short_term_max"] + gain_db,
+    )
+
+
 class LoudnessNormalizer:
     """
-    Audio loudness normalizer using pyloudnorm.
+    Audio loudness normalizer (ITU-R BS.1770 / EBU R128).
     
     Features:
-    - EBU R128 loudness measurement
-    - Integrated loudness normalization
+    - Streaming gated loudness / true peak measurement (memory independent of file length)
+    - Single measurement pass; post-gain loudness derived analytically
     - True peak limiting
     - Multiple standard presets
-    - Batch processing
+    - Batch processing across a process pool
+    - Analysis cache keyed by sampled content fingerprint, size and mtime
     """
     
-    def __init__(self):
-        """Initialize the normalizer."""
+    def __init__(self, max_workers: Optional[int] = None, cache: Optional[LoudnessAnalysisCache] = None):
+        """
+        Initialize the normalizer.
+        
+        Args:
+            max_workers: Worker processes for batch normalization (None = CPU count)
+            cache: Analysis cache (None = default cache under the data directory)
+        """
+        self.max_workers = max(1, int(max_workers or os.cpu_count() or 1))
         self._cancelled = False
-        self._meter = None
-    
-    def _get_meter(self, sample_rate: int):
-        """Get or create a loudness meter."""
-        try:
-            import pyloudnorm as pyln
-            return pyln.Meter(sample_rate, block_size=0.4)
-        except ImportError:
-            logger.warning("pyloudnorm not available, using fallback")
-            return None
+        self._cache = cache
     
     def is_available(self) -> bool:
-        """Check if pyloudnorm is available."""
+        """Check if soundfile and scipy are available."""
         try:
-            import pyloudnorm
+            import scipy.signal
             import soundfile
             return True
         except ImportError:
             return False
     
     def cancel(self) -> None:
-        """Cancel the current operation."""
+        """Cancel the current operation (files already being written are finished)."""
         self._cancelled = True
     
+    def _get_cache(self, options: Optional[NormalizationOptions] = None) -> Optional[LoudnessAnalysisCache]:
+        if options is not None and not options.use_cache:
+            return None
+        if self._cache is None:
+            try:
+                self._cache = LoudnessAnalysisCache()
+            except Exception as e:
+                logger.debug(f"Loudness cache unavailable: {e}")
+                return None
+        return self._cache
+    
+    def _store(self, cache: Optional[LoudnessAnalysisCache], outcome: Dict[str, Any], block_size: float) -> None:
+        """worker 只读缓存，新测量结果由主进程写入。"""
+        if cache is not None and outcome.get("fingerprint") and not outcome.get("cached"):
+            cache.put(outcome["fingerprint"], outcome["values"], block_size)
+    
     async def analyze(
         self,
         input_path: Path,
         progress_callback: Optional[Callable[[float, str], None]] = None,
+        block_size: float = 0.4,
     ) -> LoudnessAnalysis:
         """
         Analyze the loudness of an audio file.
@@ -157,49 +285,27 @@ class LoudnessNormalizer:
         Args:
             input_path: Path to audio file
             progress_callback: Progress callback
+            block_size: Gating block length in seconds
         
         Returns:
             LoudnessAnalysis
         """
-        try:
-            import soundfile as sf
-            import pyloudnorm as pyln
-        except ImportError:
-            raise RuntimeError("pyloudnorm and soundfile are required")
+        if not self.is_available():
+            raise RuntimeError("scipy and soundfile are required")
         
         if progress_callback:
             progress_callback(0.0, f"Analyzing {input_path.name}...")
         
-        # Read audio file
-        data, sample_rate = await asyncio.to_thread(sf.read, str(input_path))
-        
-        if progress_callback:
-            progress_callback(0.3, "Measuring loudness...")
-        
-        # Create meter
-        meter = pyln.Meter(sample_rate)
-        
-        # Measure integrated loudness
-        integrated = meter.integrated_loudness(data)
-        
-        if progress_callback:
-            progress_callback(0.6, "Calculating true peak...")
-        
-        # Calculate true peak
-        true_peak = self._calculate_true_peak(data)
-        
-        # Calculate loudness range (simplified)
-        loudness_range = self._calculate_loudness_range(data, sample_rate, meter)
+        cache = self._get_cache()
+        outcome = await asyncio.to_thread(
+            _measure_task, str(input_path), block_size, str(cache.db_path) if cache else None
+        )
+        self._store(cache, outcome, block_size)
         
         if progress_callback:
             progress_callback(1.0, "Analysis complete")
         
-        return LoudnessAnalysis(
-            integrated_loudness=integrated,
-            loudness_range=loudness_range,
-            true_peak=true_peak,
-            short_term_max=integrated + 3.0,  # Approximation
-        )
+        return _analysis_from_values(outcome["values"])
     
     async def normalize(
         self,
@@ -218,142 +324,132 @@ class LoudnessNormalizer:
         Returns:
             NormalizationResult
         """
-        import time
-        start_time = time.time()
-        
-        result = NormalizationResult(input_path=input_path)
-        
-        try:
-            import soundfile as sf
-            import pyloudnorm as pyln
-        except ImportError:
-            result.error = "pyloudnorm and soundfile are required"
-            return result
-        
-        try:
-            # Determine output path
-            output_path = self._get_output_path(input_path, options)
-            result.output_path = output_path
-            
-            # Check if output exists
-            if output_path.exists() and not options.overwrite:
-                result.error = "Output file already exists"
-                return result
-            
-            if progress_callback:
-                progress_callback(0.0, f"Reading {input_path.name}...")
-            
-            # Read audio file
-            data, sample_rate = await asyncio.to_thread(sf.read, str(input_path))
-            
-            if self._cancelled:
-                result.error = "Cancelled"
-                return result
-            
-            if progress_callback:
-                progress_callback(0.2, "Analyzing loudness...")
-            
-            # Create meter
-            meter = pyln.Meter(sample_rate)
-            
-            # Measure original loudness
-            original_loudness = meter.integrated_loudness(data)
-            result.original_loudness = LoudnessAnalysis(
-                integrated_loudness=original_loudness,
-                true_peak=self._calculate_true_peak(data),
-            )
-            
-            if progress_callback:
-                progress_callback(0.4, "Normalizing...")
-            
-            # Calculate gain
-            target = options.get_target_loudness()
-            gain_db = target - original_loudness
-            result.gain_applied = gain_db
-            
-            # Apply gain
-            gain_linear = 10 ** (gain_db / 20.0)
-            normalized_data = data * gain_linear
-            
-            if progress_callback:
-                progress_callback(0.6, "Applying peak limiter...")
-            
-            # Apply peak limiter if needed
-            if options.apply_limiter:
-                normalized_data = self._apply_limiter(
-                    normalized_data, options.peak_limit
-                )
-            
-            if self._cancelled:
-                result.error = "Cancelled"
-                return result
-            
-            if progress_callback:
-                progress_callback(0.8, "Writing output...")
-            
-            # Ensure output directory exists
-            output_path.parent.mkdir(parents=True, exist_ok=True)
-            
-            # Write output file
-            await asyncio.to_thread(
-                sf.write, str(output_path), normalized_data, sample_rate
-            )
-            
-            # Measure normalized loudness
-            normalized_loudness = meter.integrated_loudness(normalized_data)
-            result.normalized_loudness = LoudnessAnalysis(
-                integrated_loudness=normalized_loudness,
-                true_peak=self._calculate_true_peak(normalized_data),
-            )
-            
-            result.success = True
-            
-            if progress_callback:
-                progress_callback(1.0, f"Normalized {input_path.name}")
-            
-        except Exception as e:
-            result.error = str(e)
-            logger.error(f"Normalization error: {e}")
-        
-        finally:
-            result.duration_seconds = time.time() - start_time
-        
-        return result
+        results = await self._run(
+            [input_path], options, progress_callback, workers=1, use_processes=False
+        )
+        return results[0] if results else NormalizationResult(input_path=input_path, error="Cancelled")
     
     async def normalize_batch(
         self,
         input_paths: List[Path],
         options: NormalizationOptions,
         progress_callback: Optional[Callable[[float, str], None]] = None,
+        max_workers: Optional[int] = None,
     ) -> List[NormalizationResult]:
         """
-        Normalize multiple audio files.
+        Normalize multiple audio files across up to ``max_workers`` processes.
+        
+        Files are started in input order; results are returned in input order.
+        On cancellation, files not yet started are omitted; files already
+        being processed are finished.
         
         Args:
             input_paths: List of input file paths
             options: Normalization options
             progress_callback: Progress callback
+            max_workers: Worker processes (default: self.max_workers)
         
         Returns:
             List of NormalizationResults
         """
+        workers = max(1, min(int(max_workers or self.max_workers), len(input_paths) or 1))
+        return await self._run(input_paths, options, progress_callback, workers, use_processes=workers > 1)
+    
+    async def _run(
+        self,
+        input_paths: List[Path],
+        options: NormalizationOptions,
+        progress_callback: Optional[Callable[[float, str], None]],
+        workers: int,
+        use_processes: bool,
+    ) -> List[NormalizationResult]:
         self._cancelled = False
-        results = []
         total = len(input_paths)
+        results: List[Optional[NormalizationResult]] = [None] * total
+        if not self.is_available():
+            return [NormalizationResult(input_path=p, error="scipy and soundfile are required") for p in input_paths]
+        
+        loop = asyncio.get_running_loop()
+        cache = self._get_cache(options)
+        cache_path = str(cache.db_path) if cache else None
+        target = options.get_target_loudness()
+        executor = ProcessPoolExecutor(max_workers=workers) if use_processes else None
+        next_index = 0
+        completed = 0
+        cache_hits = 0
+        started_at = time.time()
+        # 多个输入映射到同一输出时按输入顺序串行（与顺序执行结果一致）
+        output_owners: Dict[Path, asyncio.Event] = {}
+        
+        async def process(input_path: Path, output_path: Path) -> NormalizationResult:
+            file_started = time.time()
+            result = NormalizationResult(input_path=input_path, output_path=output_path)
+            if output_path.exists() and not options.overwrite:
+                result.error = "Output file already exists"
+                return result
+            args = (
+                str(input_path), str(output_path), target, options.peak_limit,
+                options.apply_limiter, options.block_size, cache_path,
+            )
+            if executor is not None:
+                outcome = await loop.run_in_executor(executor, _normalize_task, *args)
+            else:
+                outcome = await asyncio.to_thread(_normalize_task, *args)
+            result.duration_seconds = time.time() - file_started
+            if "values" in outcome:
+                self._store(cache, outcome, options.block_size)
+                result.original_loudness = _analysis_from_values(outcome["values"])
+            if outcome.get("error"):
+                result.error = outcome["error"]
+                logger.error(f"Normalization error for {input_path.name}: {result.error}")
+                return result
+            result.gain_applied = outcome["gain_db"]
+            result.normalized_loudness = _analysis_from_values(outcome["values"], outcome["gain_db"])
+            result.success = True
+            return result
         
-        for i, input_path in enumerate(input_paths):
-            if self._cancelled:
-                break
-            
-            def file_progress(progress: float, message: str):
-                overall = (i + progress) / total
+        async def run_worker() -> None:
+            nonlocal next_index, completed, cache_hits
+            while not self._cancelled and next_index < total:
+                index = next_index
+                next_index += 1
+                input_path = input_paths[index]
+                try:
+                    output_path = self._get_output_path(input_path, options)
+                except Exception as e:
+                    # 输出路径无法确定（模板 / 目录错误）时记为该文件失败，不中断整批
+                    logger.error(f"Normalization error for {input_path.name}: {e}")
+                    result = NormalizationResult(input_path=input_path, error=str(e))
+                else:
+                    previous = output_owners.get(output_path)
+                    done = asyncio.Event()
+                    output_owners[output_path] = done
+                    try:
+                        if previous is not None:
+                            await previous.wait()
+                        result = await process(input_path, output_path)
+                    finally:
+                        done.set()
+                results[index] = result
+                completed += 1
                 if progress_callback:
-                    progress_callback(overall, message)
-            
-            result = await self.normalize(input_path, options, file_progress)
-            results.append(result)
+                    progress_callback(
+                        completed / total,
+                        f"{'Normalized' if result.success else 'Failed'} {input_path.name} ({completed}/{total})",
+                    )
         
-        return results
+        try:
+            await asyncio.gather(*(run_worker() for _ in range(workers)))
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        
+        if total > 1:
+            logger.info(
+                "Normalized %d/%d files with %d workers in %.1fs",
+                completed, total, workers, time.time() - started_at,
+            )
+        return [r for r in results if r is not None]
     
     def _get_output_path(self, input_path: Path, options: NormalizationOptions) -> Path:
         """Determine the output path for a file."""
@@ -368,62 +464,6 @@ class LoudnessNormalizer:
         
         return output_dir / output_name
     
-    def _calculate_true_peak(self, data: np.ndarray) -> float:
-        """Calculate true peak in dBTP."""
-        # Simple peak calculation (true peak would require oversampling)
-        peak = np.max(np.abs(data))
-        if peak > 0:
-            return 20 * np.log10(peak)
-        return -np.inf
-    
-    def _calculate_loudness_range(
-        self,
-        data: np.ndarray,
-        sample_rate: int,
-        meter,
-    ) -> float:
-        """Calculate loudness range (simplified)."""
-        # This is a simplified calculation
-        # Full LRA requires short-term loudness measurements
-        block_size = int(3.0 * sample_rate)  # 3 second blocks
-        
-        if len(data.shape) == 1:
-            data = data.reshape(-1, 1)
-        
-        loudness_values = []
-        for i in range(0, len(data) - block_size, block_size // 2):
-            block = data[i:i + block_size]
-            try:
-                loudness = meter.integrated_loudness(block)
-                if not np.isinf(loudness):
-                    loudness_values.append(loudness)
-            except Exception:
-                pass
-        
-        if len(loudness_values) < 2:
-            return 0.0
-        
-        # LRA is approximately the difference between 95th and 10th percentile
-        sorted_values = sorted(loudness_values)
-        low_idx = int(len(sorted_values) * 0.1)
-        high_idx = int(len(sorted_values) * 0.95)
-        
-        return sorted_values[high_idx] - sorted_values[low_idx]
-    
-    def _apply_limiter(self, data: np.ndarray, threshold_db: float) -> np.ndarray:
-        """Apply a simple peak limiter."""
-        threshold_linear = 10 ** (threshold_db / 20.0)
-        
-        # Find peaks above threshold
-        peak = np.max(np.abs(data))
-        
-        if peak > threshold_linear:
-            # Simple limiting by scaling
-            scale = threshold_linear / peak
-            return data * scale
-        
-        return data
-    
     def get_standard_info(self, standard: NormalizationStandard) -> Dict[str, Any]:
         """Get information about a normalization standard."""
         info = {
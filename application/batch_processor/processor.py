@@ -12,7 +12,7 @@ from enum import Enum
 from pathlib import Path
 from typing import Any, Callable, Dict, List, Optional, Union
 
-from .converter import FormatConverter, ConversionOptions, ConversionResult
+from .converter import FormatConverter, ConversionOptions, ConversionResult, default_max_workers
 from .normalizer import LoudnessNormalizer, NormalizationOptions, NormalizationResult
 from .metadata_editor import BatchMetadataEditor, MetadataOperation, MetadataEditResult
 from .worker_pool import WorkerPool, BatchTask, TaskStatus
@@ -43,7 +43,7 @@ class BatchOperation:
     
     # Processing options
     parallel: bool = True
-    max_workers: int = 4
+    max_workers: Optional[int] = None  # None = 使用 BatchProcessor.max_workers
 
 
 @dataclass
@@ -144,18 +144,18 @@ class BatchProcessor:
     - Cancellation support
     """
     
-    def __init__(self, max_workers: int = 4):
+    def __init__(self, max_workers: Optional[int] = None):
         """
         Initialize the batch processor.
         
         Args:
-            max_workers: Maximum number of parallel workers
+            max_workers: Maximum number of parallel workers (None = CPU count)
         """
-        self.max_workers = max_workers
+        self.max_workers = max(1, int(max_workers or default_max_workers()))
         
         # Components
-        self.converter = FormatConverter()
-        self.normalizer = LoudnessNormalizer()
+        self.converter = FormatConverter(max_workers=self.max_workers)
+        self.normalizer = LoudnessNormalizer(max_workers=self.max_workers)
         self.metadata_editor = BatchMetadataEditor()
         self.worker_pool = WorkerPool(max_workers=max_workers)
         
@@ -240,16 +240,22 @@ class BatchProcessor:
             result.errors.append("No conversion options provided")
             return result
         
-        def update_progress(progress: float, message: str):
-            self._progress.current_progress = progress
+        def update_progress(_overall: float, message: str):
+            # 并发转换：完成数与 ETA 取自转换器的聚合吞吐（回调的整体比例即 完成数/总数，不再单独使用）
+            throughput = self.converter.throughput
+            self._progress.processed_files = throughput.completed_files
+            self._progress.failed_files = throughput.failed_files
+            self._progress.current_progress = 0.0
             self._progress.current_file = message
-            self._update_estimated_remaining()
+            self._progress.estimated_remaining = throughput.eta_seconds
             self._notify_progress()
         
+        workers = (operation.max_workers or self.max_workers) if operation.parallel else 1
         results = await self.converter.convert_batch(
             operation.input_files,
             operation.conversion_options,
             update_progress,
+            max_workers=workers,
         )
         
         result.conversion_results = results
@@ -275,10 +281,12 @@ class BatchProcessor:
             self._update_estimated_remaining()
             self._notify_progress()
         
+        workers = (operation.max_workers or self.max_workers) if operation.parallel else 1
         results = await self.normalizer.normalize_batch(
             operation.input_files,
             operation.normalization_options,
             update_progress,
+            max_workers=workers,
         )
         
         result.normalization_results = results
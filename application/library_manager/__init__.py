@@ -13,6 +13,23 @@ from .scanner import (
     calculate_content_hash_async,
 )
 
+from .fingerprint import (
+    calculate_sampled_fingerprint,
+    verify_duplicate_groups,
+)
+
+from .change_pipeline import (
+    ChangeCoalescer,
+    FileChange,
+    LibraryChangeSink,
+)
+
+from .row_index import (
+    LibraryRowIndex,
+    RowDiff,
+    diff_rows,
+)
+
 from .metadata_extractor import (
     MetadataExtractor,
     get_metadata_extractor,
@@ -27,6 +44,17 @@ __all__ = [
     "SUPPORTED_FORMATS",
     "calculate_content_hash",
     "calculate_content_hash_async",
+    # Fingerprint
+    "calculate_sampled_fingerprint",
+    "verify_duplicate_groups",
+    # File watcher pipeline
+    "ChangeCoalescer",
+    "FileChange",
+    "LibraryChangeSink",
+    # Row index
+    "LibraryRowIndex",
+    "RowDiff",
+    "diff_rows",
     # Metadata
     "MetadataExtractor",
     "get_metadata_extractor",
@@ -0,0 +1,435 @@
+"""
+File Watcher Change Pipeline
+
+文件监视事件的合并/去抖层：watchdog 的原始事件不再逐条下发，而是
+
+- 按路径合并：create → modify* → move 链折叠为一条净变化（CREATED / MODIFIED / DELETED / MOVED），
+  create 后又 delete 的文件直接抵消
+- 去抖：路径最后一次事件后静默 ``settle_seconds``，且相隔一个窗口的两次 stat 得到相同的
+  (size, mtime_ns) 才视为稳定（DAW 分段写出的 bounce、解压中的大文件都会被推迟）
+- 批量下发：稳定的变化按 ``max_batch`` 分批交给 sink；``LibraryChangeSink`` 每批一个事务：
+  移动原地更新 ``AudioFile`` 路径（保留标签/翻译/索引状态），新增/变化的文件经
+  ``reconcile_files`` 比对后写入 ``ImportQueue``（由导入 worker 提取元数据），删除的文件移出待导入队列
+
+合并层本身不依赖 watchdog，可直接用 ``record_*`` 驱动（见 scripts/benchmark_file_watcher.py）。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+CHANGE_CREATED = "created"
+CHANGE_MODIFIED = "modified"
+CHANGE_DELETED = "deleted"
+CHANGE_MOVED = "moved"
+
+# 默认静默窗口（秒）与单批最大条数
+DEFAULT_SETTLE_SECONDS = 2.0
+DEFAULT_MAX_BATCH = 2000
+# sink 失败后重试前的等待（秒）
+RETRY_DELAY_SECONDS = 5.0
+
+SQLITE_IN_BATCH = 500
+SQLITE_INSERT_BATCH = 300
+IMPORT_STATUS_PENDING = 0
+
+
+@dataclass
+class FileChange:
+    """一条合并后的净变化。"""
+
+    kind: str
+    path: str
+    # MOVED：变化前的路径
+    origin: Optional[str] = None
+
+
+@dataclass
+class _Pending:
+    kind: str
+    path: str
+    origin: Optional[str]
+    due: float
+    signature: Optional[tuple] = None
+    events: int = 1
+
+
+class ChangeCoalescer:
+    """
+    按路径合并并去抖文件变化事件。
+
+    ``record_*`` 可在任意线程（watchdog 观察线程）调用，只做字典更新；
+    stat 与下发在 ``poll()`` 中完成，后台线程（``start()``）每 ``poll_interval`` 调用一次。
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[List[FileChange]], None],
+        settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        poll_interval: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.sink = sink
+        self.settle_seconds = max(0.0, float(settle_seconds))
+        self.max_batch = max(1, int(max_batch))
+        self.poll_interval = poll_interval if poll_interval is not None else max(0.05, self.settle_seconds / 4)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._pending: Dict[str, _Pending] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.stats = {"events": 0, "flushed": 0, "batches": 0, "stat_calls": 0, "cancelled": 0}
+
+    # ---------- 事件入口 ----------
+
+    def record_created(self, path) -> None:
+        self._record(CHANGE_CREATED, str(path))
+
+    def record_modified(self, path) -> None:
+        self._record(CHANGE_MODIFIED, str(path))
+
+    def record_deleted(self, path) -> None:
+        self._record(CHANGE_DELETED, str(path))
+
+    def record_moved(self, src, dst) -> None:
+        src, dst = str(src), str(dst)
+        with self._lock:
+            self.stats["events"] += 1
+            now = self._clock()
+            moved = self._pending.pop(src, None)
+            if moved is None or moved.kind == CHANGE_DELETED:
+                kind, origin, events = CHANGE_MOVED, src, 1
+            elif moved.kind == CHANGE_CREATED:
+                kind, origin, events = CHANGE_CREATED, None, moved.events + 1
+            elif moved.kind == CHANGE_MOVED:
+                kind, origin, events = CHANGE_MOVED, moved.origin, moved.events + 1
+            else:  # MODIFIED：移动后的快照比对会发现内容变化
+                kind, origin, events = CHANGE_MOVED, src, moved.events + 1
+            if kind == CHANGE_MOVED and origin == dst:
+                # 改回原名：等价于原地修改（内容未变时 reconcile 判为 unchanged）
+                kind, origin = CHANGE_MODIFIED, None
+            self._displace(dst, now)
+            self._pending[dst] = _Pending(kind, dst, origin, now + self.settle_seconds, events=events)
+
+    def _record(self, kind: str, path: str) -> None:
+        with self._lock:
+            self.stats["events"] += 1
+            now = self._clock()
+            current = self._pending.get(path)
+            if kind == CHANGE_DELETED:
+                if current is not None and current.kind == CHANGE_CREATED:
+                    # create → delete：净变化为空
+                    del self._pending[path]
+                    self.stats["cancelled"] += 1
+                    return
+                if current is not None and current.kind == CHANGE_MOVED:
+                    # 移入后又删除：原路径的文件已不存在
+                    del self._pending[path]
+                    self._mark_deleted(current.origin, now)
+                    return
+                self._pending[path] = _Pending(
+                    CHANGE_DELETED, path, None, now + self.settle_seconds,
+                    events=(current.events + 1) if current else 1,
+                )
+                return
+
+            if current is None:
+                self._pending[path] = _Pending(kind, path, None, now + self.settle_seconds)
+                return
+            if current.kind == CHANGE_DELETED:
+                # delete → create：同一路径被替换，按内容变化处理
+                current.kind = CHANGE_MODIFIED
+            current.due = now + self.settle_seconds
+            current.signature = None
+            current.events += 1
+
+    def _displace(self, path: str, now: float) -> None:
+        """目标路径被覆盖：之前移入该路径的文件，其原路径视为删除。"""
+        existing = self._pending.pop(path, None)
+        if existing is not None and existing.kind == CHANGE_MOVED:
+            self._mark_deleted(existing.origin, now)
+
+    def _mark_deleted(self, path: Optional[str], now: float) -> None:
+        if not path:
+            return
+        current = self._pending.get(path)
+        if current is not None and current.kind == CHANGE_CREATED:
+            # 原路径上已有新文件：旧内容删除 + 新文件 = 变化
+            current.kind = CHANGE_MODIFIED
+            return
+        if current is None:
+            self._pending[path] = _Pending(CHANGE_DELETED, path, None, now + self.settle_seconds)
+
+    # ---------- 稳定性检查与下发 ----------
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    def _collect_ready(self, now: float, force: bool) -> List[FileChange]:
+        with self._lock:
+            due = [(p, p.events) for p in self._pending.values() if force or p.due <= now]
+        # stat 在锁外进行；结果只对检查期间没有新事件的条目生效
+        decisions = []
+        for p, events in due:
+            if p.kind == CHANGE_DELETED:
+                decisions.append((p, events, FileChange(p.kind, p.path), None))
+                continue
+            self.stats["stat_calls"] += 1
+            try:
+                st = os.stat(p.path)
+            except OSError:
+                # 静默期间文件又消失了：按删除处理（新建的直接丢弃）
+                if p.kind == CHANGE_CREATED:
+                    change = None
+                elif p.kind == CHANGE_MOVED:
+                    change = FileChange(CHANGE_DELETED, p.origin)
+                else:
+                    change = FileChange(CHANGE_DELETED, p.path)
+                decisions.append((p, events, change, None))
+                continue
+            signature = (st.st_size, st.st_mtime_ns)
+            if force or p.signature == signature:
+                decisions.append((p, events, FileChange(p.kind, p.path, p.origin), None))
+            else:
+                # 第一次观察或仍在写入：再等一个窗口
+                decisions.append((p, events, None, signature))
+
+        ready: List[FileChange] = []
+        with self._lock:
+            for p, events, change, signature in decisions:
+                if self._pending.get(p.path) is not p or p.events != events:
+                    continue
+                if signature is not None:
+                    p.signature = signature
+                    p.due = now + self.settle_seconds
+                    continue
+                del self._pending[p.path]
+                if change is not None:
+                    ready.append(change)
+        return ready
+
+    def poll(self, force: bool = False) -> int:
+        """检查到期条目并下发稳定的变化；返回下发条数。``force`` 忽略静默窗口（停止时使用）。"""
+        now = self._clock()
+        ready = self._collect_ready(now, force)
+        if not ready:
+            return 0
+        # 删除 → 移动 → 新增/修改：同一批里先释放路径再占用
+        order = {CHANGE_DELETED: 0, CHANGE_MOVED: 1, CHANGE_CREATED: 2, CHANGE_MODIFIED: 2}
+        ready.sort(key=lambda c: (order[c.kind], c.path))
+        flushed = 0
+        for i in range(0, len(ready), self.max_batch):
+            batch = ready[i : i + self.max_batch]
+            try:
+                self.sink(batch)
+            except Exception as e:
+                logger.error(f"File change sink failed ({len(batch)} changes), will retry: {e}")
+                self._requeue(ready[i:], now)
+                break
+            flushed += len(batch)
+            self.stats["batches"] += 1
+        self.stats["flushed"] += flushed
+        return flushed
+
+    def _requeue(self, changes: Sequence[FileChange], now: float) -> None:
+        with self._lock:
+            for change in changes:
+                if change.path not in self._pending:
+                    self._pending[change.path] = _Pending(
+                        change.kind, change.path, change.origin, now + RETRY_DELAY_SECONDS
+                    )
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="file-change-coalescer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"File change coalescer poll failed: {e}")
+
+    def stop(self, flush: bool = True) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        if flush:
+            self.poll(force=True)
+
+    def as_handler(self):
+        """作为 FileWatcher 的 FileChangeHandler 使用。"""
+        from .file_watcher import FileChangeHandler
+
+        return FileChangeHandler(
+            on_created=self.record_created,
+            on_deleted=self.record_deleted,
+            on_modified=self.record_modified,
+            on_moved=self.record_moved,
+        )
+
+
+class LibraryChangeSink:
+    """
+    把一批合并后的变化写入数据库（单个事务）。
+
+    Args:
+        roots: 监视的库根目录，用于确定 ImportQueue.root_path（取最长匹配）
+        session_scope_fn: 返回事务上下文的工厂，默认 ``connection.session_scope``
+    """
+
+    def __init__(self, roots: Iterable[str] = (), session_scope_fn=None):
+        self.roots = sorted({os.path.normpath(str(r)) for r in roots}, key=len, reverse=True)
+        self._session_scope = session_scope_fn
+        self.stats = {"transactions": 0, "moved": 0, "enqueued": 0, "dequeued": 0}
+
+    def _root_for(self, path: str) -> Optional[str]:
+        norm = os.path.normcase(os.path.normpath(path))
+        for root in self.roots:
+            prefix = os.path.normcase(root)
+            if norm == prefix or norm.startswith(prefix.rstrip("\\/") + os.sep):
+                return root
+        return None
+
+    def __call__(self, changes: List[FileChange]) -> None:
+        if not changes:
+            return
+        scope = self._session_scope
+        if scope is None:
+            from transcriptionist_v3.infrastructure.database.connection import session_scope as scope
+        with scope() as session:
+            self.apply(session, changes)
+        self.stats["transactions"] += 1
+
+    def apply(self, session, changes: List[FileChange]) -> None:
+        """在给定会话中应用变化（不提交）。"""
+        from sqlalchemy import delete
+        from transcriptionist_v3.infrastructure.database.models import AudioFile, ImportQueue
+
+        from .incremental_scan import reconcile_files
+        from .parallel_walker import FileEntry
+
+        deleted = [c.path for c in changes if c.kind == CHANGE_DELETED]
+        moves = [(c.origin, c.path) for c in changes if c.kind == CHANGE_MOVED and c.origin]
+        touched = [c.path for c in changes if c.kind in (CHANGE_CREATED, CHANGE_MODIFIED)]
+
+        # 删除/移走的路径：尚未导入的队列记录不再需要（库记录保留，与重扫行为一致）
+        gone = deleted + [origin for origin, _ in moves]
+        for i in range(0, len(gone), SQLITE_IN_BATCH):
+            chunk = gone[i : i + SQLITE_IN_BATCH]
+            result = session.execute(
+                delete(ImportQueue)
+                .where(ImportQueue.file_path.in_(chunk))
+                .where(ImportQueue.status == IMPORT_STATUS_PENDING)
+            )
+            self.stats["dequeued"] += max(0, result.rowcount or 0)
+
+        # 移动：原地更新路径；目标路径上的旧记录（被覆盖的文件）先删除
+        if moves:
+            by_origin: Dict[str, AudioFile] = {}
+            origins = [o for o, _ in moves]
+            for i in range(0, len(origins), SQLITE_IN_BATCH):
+                for row in session.query(AudioFile).filter(
+                    AudioFile.file_path.in_(origins[i : i + SQLITE_IN_BATCH])
+                ).all():
+                    by_origin[row.file_path] = row
+            targets = [dst for origin, dst in moves if origin in by_origin]
+            origin_set = set(by_origin)
+            overwritten = [t for t in targets if t not in origin_set]
+            for i in range(0, len(overwritten), SQLITE_IN_BATCH):
+                session.execute(delete(AudioFile).where(AudioFile.file_path.in_(overwritten[i : i + SQLITE_IN_BATCH])))
+            # 先把所有源记录挪到临时路径，避免链式/交换移动触发唯一约束
+            rows = [(by_origin[o], dst) for o, dst in moves if o in by_origin]
+            for row, _ in rows:
+                row.file_path = f"moving:{row.id}:{row.file_path}"
+            session.flush()
+            for row, dst in rows:
+                row.file_path = dst
+                row.filename = Path(dst).name
+            session.flush()
+            self.stats["moved"] += len(rows)
+            # 源路径不在库里的移动按新增处理
+            touched.extend(dst for o, dst in moves if o not in by_origin)
+            # 移动后的文件也参与快照比对：内容在移动前后被改过时会重新入队
+            touched.extend(dst for _, dst in rows)
+
+        if not touched:
+            return
+        entries = []
+        for path in dict.fromkeys(touched):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append(FileEntry(path=path, size=int(st.st_size), mtime_ns=int(st.st_mtime_ns)))
+        result = reconcile_files(session, entries)
+        self._enqueue(session, result.new_paths + result.changed_paths)
+
+    def _enqueue(self, session, paths: List[str]) -> None:
+        """INSERT OR IGNORE + 重置为待处理（已有记录的也重新入队）。"""
+        if not paths:
+            return
+        from sqlalchemy import bindparam, insert, update
+        from transcriptionist_v3.infrastructure.database.models import ImportQueue
+
+        values = [
+            {"file_path": p, "root_path": self._root_for(p), "status": IMPORT_STATUS_PENDING}
+            for p in paths
+        ]
+        for i in range(0, len(values), SQLITE_INSERT_BATCH):
+            session.execute(insert(ImportQueue).prefix_with("OR IGNORE"), values[i : i + SQLITE_INSERT_BATCH])
+        table = ImportQueue.__table__
+        session.execute(
+            update(table)
+            .where(table.c.file_path == bindparam("b_path"))
+            .values(status=IMPORT_STATUS_PENDING, root_path=bindparam("b_root"), error=None),
+            [{"b_path": v["file_path"], "b_root": v["root_path"]} for v in values],
+        )
+        self.stats["enqueued"] += len(values)
+
+
+def create_library_watcher(roots: Sequence[str], on_flush: Optional[Callable[[List[FileChange]], None]] = None):
+    """
+    组装监视管线：FileWatcher → ChangeCoalescer → LibraryChangeSink。
+
+    Args:
+        roots: 要监视的库根目录
+        on_flush: 每批写库成功后的回调（例如通知 UI 启动导入 worker）
+
+    Returns:
+        (watcher, coalescer)；调用方负责 ``watcher.start()`` / ``coalescer.start()`` 与停止
+    """
+    from transcriptionist_v3.core.config import AppConfig
+
+    from .file_watcher import FileWatcher
+
+    sink = LibraryChangeSink(roots)
+
+    def flush(changes: List[FileChange]) -> None:
+        sink(changes)
+        if on_flush is not None:
+            on_flush(changes)
+
+    coalescer = ChangeCoalescer(
+        flush,
+        settle_seconds=float(AppConfig.get("library.watch_settle_seconds", DEFAULT_SETTLE_SECONDS)),
+        max_batch=int(AppConfig.get("library.watch_batch_size", DEFAULT_MAX_BATCH)),
+    )
+    watcher = FileWatcher(coalescer.as_handler())
+    for root in roots:
+        watcher.add_path(Path(root))
+    return watcher, coalescer
@@ -3,6 +3,9 @@ File Watcher Module
 
 Implements file change detection using watchdog.
 
+Raw events are forwarded as-is; use ``change_pipeline.ChangeCoalescer`` as the
+handler to debounce and batch them before they reach the database.
+
 Validates: Requirements 1.4
 """
 
@@ -107,13 +110,23 @@ if WATCHDOG_AVAILABLE:
             src_is_audio = self._is_audio_file(event.src_path)
             dest_is_audio = self._is_audio_file(event.dest_path)
             
-            if src_is_audio or dest_is_audio:
+            if src_is_audio and dest_is_audio:
                 logger.debug(f"File moved: {event.src_path} -> {event.dest_path}")
                 if self.handler.on_moved:
                     self.handler.on_moved(
                         Path(event.src_path),
                         Path(event.dest_path)
                     )
+            elif dest_is_audio:
+                # Temp file renamed into place (DAW bounce, download): a new audio file
+                logger.debug(f"File created by rename: {event.src_path} -> {event.dest_path}")
+                if self.handler.on_created:
+                    self.handler.on_created(Path(event.dest_path))
+            elif src_is_audio:
+                # Audio file renamed to a non-audio name: gone from the library's view
+                logger.debug(f"File renamed away: {event.src_path} -> {event.dest_path}")
+                if self.handler.on_deleted:
+                    self.handler.on_deleted(Path(event.src_path))
 
 
 class FileWatcher:
@@ -0,0 +1,113 @@
+"""
+Sampled content fingerprints.
+
+``calculate_content_hash`` 对整个文件做 SHA-256，百 GB 级音效库导入时不可接受。
+采样指纹只读取文件头、中、尾各一个块（默认 64 KiB），与文件大小一起做 blake2b：
+
+    "s1:" + blake2b(size || head || middle || tail, digest_size=16).hexdigest()
+
+- 每个文件最多读 192 KiB，可以在元数据提取的 worker 进程里顺带算出
+- 小于 3 个块的文件整体参与哈希，等价于完整内容哈希
+- 采样指纹相同只说明“极可能相同”；``verify_duplicate_groups`` 对候选组做一次完整 SHA-256 复核
+- 算法版本前缀（``s1:``）便于以后更换采样策略时区分旧值
+
+选用标准库 blake2b 而不是 xxhash：指纹需要跨安装环境稳定，不能因可选依赖是否存在而改变。
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Union
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from .scanner import calculate_content_hash
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_PREFIX = "s1:"
+# 头/中/尾每个采样块大小
+SAMPLE_BLOCK_SIZE = 64 * 1024
+# 复核时每个组最多读取的文件数（防止超大重复组拖慢复核）
+VERIFY_GROUP_LIMIT = 256
+
+
+def calculate_sampled_fingerprint(
+    file_path: Union[str, Path],
+    block_size: int = SAMPLE_BLOCK_SIZE,
+) -> str:
+    """计算文件的采样指纹（大小 + 头/中/尾块）。"""
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        h.update(size.to_bytes(8, "little"))
+        if size <= block_size * 3:
+            h.update(f.read())
+        else:
+            for offset in (0, (size - block_size) // 2, size - block_size):
+                f.seek(offset)
+                h.update(f.read(block_size))
+    return FINGERPRINT_PREFIX + h.hexdigest()
+
+
+def try_sampled_fingerprint(file_path: Union[str, Path]) -> str:
+    """导入用：失败（文件被占用/已删除等）时返回空串，不影响入库。"""
+    try:
+        return calculate_sampled_fingerprint(file_path)
+    except OSError as e:
+        logger.debug(f"Fingerprint failed for {file_path}: {e}")
+        return ""
+
+
+def is_sampled_fingerprint(value: Optional[str]) -> bool:
+    return bool(value) and value.startswith(FINGERPRINT_PREFIX)
+
+
+def find_fingerprint_groups(session: Session, min_size: int = 2) -> Dict[str, List[int]]:
+    """
+    按 content_hash 分组返回疑似完全重复的文件 {fingerprint: [audio_file_id, ...]}。
+
+    依赖 content_hash 索引：先 GROUP BY 取出重复值，再只查这些值对应的行。
+    """
+    from transcriptionist_v3.infrastructure.database.models import AudioFile
+
+    dup_hashes = [
+        h
+        for (h,) in session.query(AudioFile.content_hash)
+        .filter(AudioFile.content_hash != "")
+        .group_by(AudioFile.content_hash)
+        .having(func.count(AudioFile.id) >= min_size)
+        .all()
+    ]
+    groups: Dict[str, List[int]] = {}
+    for i in range(0, len(dup_hashes), 500):
+        batch = dup_hashes[i : i + 500]
+        for file_id, content_hash in (
+            session.query(AudioFile.id, AudioFile.content_hash)
+            .filter(AudioFile.content_hash.in_(batch))
+            .order_by(AudioFile.id)
+            .all()
+        ):
+            groups.setdefault(content_hash, []).append(file_id)
+    return groups
+
+
+def verify_duplicate_groups(paths: Iterable[Union[str, Path]]) -> List[List[str]]:
+    """
+    完整 SHA-256 复核一个采样指纹相同的候选组，返回真正内容相同的子组（每组 ≥2 个路径）。
+
+    只在需要确定性结论时调用（例如删除重复文件之前）。
+    """
+    by_hash: Dict[str, List[str]] = {}
+    for path in list(paths)[:VERIFY_GROUP_LIMIT]:
+        try:
+            digest = calculate_content_hash(Path(path))
+        except OSError as e:
+            logger.debug(f"Full hash failed for {path}: {e}")
+            continue
+        by_hash.setdefault(digest, []).append(str(path))
+    return [group for group in by_hash.values() if len(group) > 1]
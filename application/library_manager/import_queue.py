@@ -0,0 +1,560 @@
+"""
+Import queue pipeline.
+
+导入分两步，界面（``QueueScanWorker`` / ``ImportQueueWorker``）与无界面命令行共用这里的实现：
+
+- ``QueueScanner``：多线程遍历目录，发现的文件批量写入 ``import_queue``（增量模式下先与库记录比对，
+  移动/改名的文件原地更新路径）；完成后保存目录快照并更新 ``library_paths``
+- ``ImportQueueProcessor``：分批取出待处理的队列记录，提取元数据（大批量时复用进程池）后写入 ``audio_files``
+
+两者都不依赖 Qt：进度经 ``progress_callback(current, total, message)`` 回报，
+取消经 ``is_cancelled()`` 轮询。队列记录持久化在数据库中，中断后再次运行会从剩余的待处理记录继续。
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from transcriptionist_v3.core.config import AppConfig, get_default_scan_workers
+
+logger = logging.getLogger(__name__)
+
+# SQLite 单条 SQL 中变量数上限约 999
+# IN 查询/更新：每批 500 个占位符安全
+SQLITE_IN_BATCH = 500
+# INSERT 多行：每行 3 列 → 每批最多 999/3≈333 行，取 300 保险（4–5 万条也安全）
+SQLITE_INSERT_BATCH = 300
+
+# 导入队列状态
+IMPORT_STATUS_PENDING = 0
+IMPORT_STATUS_PROCESSING = 1
+IMPORT_STATUS_DONE = 2
+IMPORT_STATUS_SKIPPED = 3
+IMPORT_STATUS_FAILED = 4
+
+ProgressCallback = Callable[[int, int, str], None]
+
+
+def _no_progress(current: int, total: int, message: str) -> None:
+    pass
+
+
+def _never_cancelled() -> bool:
+    return False
+
+
+class QueueScanner:
+    """扫描并入队：发现文件立即写入导入队列。"""
+
+    # 扫描进度间隔
+    SCAN_PROGRESS_INTERVAL = 5000
+    # 入队批量大小
+    ENQUEUE_BATCH_SIZE = 2000
+
+    def __init__(
+        self,
+        folder_path: str,
+        progress_callback: Optional[ProgressCallback] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ):
+        self.folder_path = folder_path
+        self._progress = progress_callback or _no_progress
+        self._is_cancelled = is_cancelled or _never_cancelled
+
+    def _enqueue_paths(self, root_folder: Path, paths: List[str]) -> Tuple[int, int]:
+        """将路径批量写入导入队列，返回 (enqueued, skipped)。避免 SQLite too many SQL variables。"""
+        if not paths:
+            return 0, 0
+        from sqlalchemy import insert
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import ImportQueue, AudioFile
+
+        existing_audio: set[str] = set()
+        existing_queue: set[str] = set()
+        with session_scope() as session:
+            for i in range(0, len(paths), SQLITE_IN_BATCH):
+                batch = paths[i : i + SQLITE_IN_BATCH]
+                existing_audio.update(
+                    row.file_path for row in session.query(AudioFile.file_path).filter(AudioFile.file_path.in_(batch)).all()
+                )
+                existing_queue.update(
+                    row.file_path for row in session.query(ImportQueue.file_path).filter(ImportQueue.file_path.in_(batch)).all()
+                )
+            to_insert = [p for p in paths if p not in existing_audio and p not in existing_queue]
+            skipped = len(paths) - len(to_insert)
+
+            if to_insert:
+                for i in range(0, len(to_insert), SQLITE_INSERT_BATCH):
+                    chunk = to_insert[i : i + SQLITE_INSERT_BATCH]
+                    values = [
+                        {
+                            "file_path": p,
+                            "root_path": str(root_folder),
+                            "status": IMPORT_STATUS_PENDING,
+                        }
+                        for p in chunk
+                    ]
+                    stmt = insert(ImportQueue).prefix_with("OR IGNORE")
+                    session.execute(stmt, values)
+            # session_scope 退出时自动 commit
+        return len(to_insert), skipped
+
+    def _requeue_paths(self, root_folder: Path, paths: List[str]) -> int:
+        """已入库但内容变化的文件：导入队列记录重置为待处理（没有记录则新建），由导入流程重新提取元数据。"""
+        if not paths:
+            return 0
+        from sqlalchemy import insert
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import ImportQueue
+
+        with session_scope() as session:
+            for i in range(0, len(paths), SQLITE_INSERT_BATCH):
+                chunk = paths[i : i + SQLITE_INSERT_BATCH]
+                session.execute(
+                    insert(ImportQueue).prefix_with("OR IGNORE"),
+                    [{"file_path": p, "root_path": str(root_folder), "status": IMPORT_STATUS_PENDING} for p in chunk],
+                )
+            for i in range(0, len(paths), SQLITE_IN_BATCH):
+                session.query(ImportQueue).filter(ImportQueue.file_path.in_(paths[i : i + SQLITE_IN_BATCH])).update(
+                    {"status": IMPORT_STATUS_PENDING, "root_path": str(root_folder), "error": None},
+                    synchronize_session=False,
+                )
+        return len(paths)
+
+    def _reconcile_and_enqueue(self, root_folder: Path, entries: list) -> Tuple[int, int, int]:
+        """增量模式：与库记录比对后只入队新文件与变化文件，移动的文件原地更新路径。返回 (enqueued, skipped, moved)。"""
+        from transcriptionist_v3.application.library_manager.incremental_scan import reconcile_files
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+
+        with session_scope() as session:
+            result = reconcile_files(session, entries)
+        added, skipped = self._enqueue_paths(root_folder, result.new_paths)
+        requeued = self._requeue_paths(root_folder, result.changed_paths)
+        return added + requeued, skipped + result.unchanged, result.moved
+
+    def run(self) -> Optional[Dict[str, int]]:
+        """
+        扫描目录：发现文件即入队。
+
+        Returns:
+            {"total", "enqueued", "skipped", "moved"}；被取消时返回 None（已入队的记录保留）
+        """
+        folder = Path(self.folder_path)
+        logger.info(f"QueueScanner.run 开始：文件夹 {self.folder_path}")
+        scanned = 0
+        enqueued = 0
+        skipped = 0
+        moved = 0
+        buffer: list = []
+
+        from transcriptionist_v3.application.library_manager.incremental_scan import DirectorySnapshotStore
+        from transcriptionist_v3.application.library_manager.parallel_walker import ParallelDirectoryWalker
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+
+        # 增量重扫：目录 mtime 未变的跳过 scandir，变化目录内按 (size, mtime) 只处理新增/变化/移动的文件
+        snapshot_store = None
+        if AppConfig.get("library.incremental_scan", True):
+            snapshot_store = DirectorySnapshotStore(str(folder))
+            with session_scope() as session:
+                snapshot_store.load(session)
+
+        def flush():
+            nonlocal enqueued, skipped, moved, buffer
+            if not buffer:
+                return
+            if snapshot_store is not None:
+                added, sk, mv = self._reconcile_and_enqueue(folder, buffer)
+                moved += mv
+            else:
+                # 同一批内去重（保持顺序）；与库/队列已有记录的去重在 _enqueue_paths 中完成
+                added, sk = self._enqueue_paths(folder, list(dict.fromkeys(e.path for e in buffer)))
+            enqueued += added
+            skipped += sk
+            buffer = []
+
+        self._progress(0, 0, "正在扫描目录，请稍候...")
+
+        # 多线程工作窃取遍历：按确定的深度优先顺序逐目录产出，入队顺序与线程数无关
+        max_scan_workers = AppConfig.get("performance.scan_workers") or get_default_scan_workers()
+        walker = ParallelDirectoryWalker(
+            max_scan_workers,
+            is_cancelled=self._is_cancelled,
+            snapshots=snapshot_store.snapshots if snapshot_store is not None else None,
+        )
+        logger.info(
+            f"QueueScanner: scan_workers={walker.workers} (work-stealing, incremental={snapshot_store is not None})"
+        )
+        t_scan = time.perf_counter()
+        next_progress = self.SCAN_PROGRESS_INTERVAL
+        for listing in walker.iter_listings(folder):
+            if self._is_cancelled():
+                return None
+            if snapshot_store is not None:
+                snapshot_store.record(listing)
+            # 未变化目录计入总数但不再逐文件比对
+            scanned += listing.file_count
+            buffer.extend(listing.files)
+            if len(buffer) >= self.ENQUEUE_BATCH_SIZE:
+                flush()
+            if scanned >= next_progress:
+                next_progress = scanned + self.SCAN_PROGRESS_INTERVAL
+                rate = scanned / max(time.perf_counter() - t_scan, 1e-6)
+                self._progress(
+                    scanned, 0,
+                    f"正在扫描目录，已发现 {scanned} 个音频文件（{rate:.0f} 个/秒）..."
+                )
+        if self._is_cancelled():
+            return None
+        walker.log_stats()
+
+        # 最后入队
+        flush()
+        if moved:
+            logger.info(f"QueueScanner: {moved} 个文件被移动/改名，已原地更新路径")
+
+        # 更新库路径信息（目录快照只在完整扫描且全部入队后保存）
+        from transcriptionist_v3.infrastructure.database.models import LibraryPath
+        with session_scope() as session:
+            if snapshot_store is not None:
+                snapshot_store.save(session)
+            lib_path = session.query(LibraryPath).filter_by(path=str(folder)).first()
+            if not lib_path:
+                lib_path = LibraryPath(path=str(folder), enabled=True, recursive=True)
+                session.add(lib_path)
+            lib_path.last_scan_at = datetime.now()
+            lib_path.file_count = scanned
+            session.commit()
+
+        return {"total": scanned, "enqueued": enqueued, "skipped": skipped, "moved": moved}
+
+
+class ImportQueueProcessor:
+    """处理导入队列：提取元数据并写入 audio_files。"""
+
+    PARALLEL_THRESHOLD = 100
+
+    def __init__(
+        self,
+        root_folder: Optional[str] = None,
+        batch_size: int = 3000,
+        progress_callback: Optional[ProgressCallback] = None,
+        is_cancelled: Optional[Callable[[], bool]] = None,
+    ):
+        self.root_folder = str(root_folder) if root_folder else None
+        self.batch_size = max(1, int(batch_size))
+        self._progress = progress_callback or _no_progress
+        self._is_cancelled = is_cancelled or _never_cancelled
+        self._pool = None  # 复用进程池，避免每次 batch 都创建/销毁
+
+    def terminate_pool(self) -> None:
+        """立即终止元数据进程池（取消时调用）。"""
+        if self._pool is not None:
+            try:
+                self._pool.terminate()
+                self._pool.join()
+            except Exception:
+                pass
+            self._pool = None
+
+    def _close_pool(self) -> None:
+        if self._pool is None:
+            return
+        try:
+            logger.info("ImportQueueProcessor: 关闭进程池")
+            self._pool.close()
+            self._pool.join()
+        except Exception as e:
+            logger.warning(f"关闭进程池时出错: {e}")
+            try:
+                self._pool.terminate()
+                self._pool.join()
+            except Exception:
+                pass
+        finally:
+            self._pool = None
+
+    def _extract_metadata_batch(self, file_paths: List[str], progress_cb=None) -> list:
+        from transcriptionist_v3.application.library_manager.metadata_extractor import (
+            MetadataExtractor,
+            extract_for_import,
+            extract_one_for_pool,
+        )
+        total = len(file_paths)
+        if total == 0:
+            return []
+        if total < self.PARALLEL_THRESHOLD:
+            extractor = MetadataExtractor()
+            results = []
+            for idx, path_str in enumerate(file_paths, start=1):
+                if self._is_cancelled():
+                    return []
+                try:
+                    meta = extract_for_import(Path(path_str), extractor)
+                except Exception:
+                    meta = None
+                results.append(meta)
+                if progress_cb and (idx % 50 == 0 or idx == total):
+                    progress_cb(idx, total)
+            return results
+
+        # 多进程提取（复用进程池，避免每次 batch 都创建/销毁）
+        from multiprocessing import Pool
+        max_workers = AppConfig.get("performance.scan_workers") or get_default_scan_workers()
+        max_workers = max(1, min(max_workers, total))
+
+        # 首次调用时创建进程池，后续复用
+        if self._pool is None:
+            logger.info(f"ImportQueueProcessor: 创建进程池 metadata_workers={max_workers}")
+            self._pool = Pool(processes=max_workers)
+        else:
+            logger.info(f"ImportQueueProcessor: 复用进程池 metadata_workers={max_workers}")
+
+        results = [None] * total
+        args_list = [(i, str(fp)) for i, fp in enumerate(file_paths)]
+        # 优化 chunksize：增大批次大小，减少进程间通信开销
+        chunksize = max(1, min(200, total // max_workers))
+        try:
+            it = self._pool.imap_unordered(extract_one_for_pool, args_list, chunksize=chunksize)
+            done = 0
+            for res in it:
+                if self._is_cancelled():
+                    return []
+                idx, _, meta = res
+                results[idx] = meta
+                done += 1
+                # 减少进度更新频率，避免回调过多影响性能
+                if progress_cb and (done % 100 == 0 or done == total):
+                    progress_cb(done, total)
+        except Exception as e:
+            logger.warning(f"Multiprocessing extract failed: {e}")
+            # 失败时关闭进程池并退回单线程
+            self.terminate_pool()
+            extractor = MetadataExtractor()
+            results = []
+            for idx, path_str in enumerate(file_paths, start=1):
+                if self._is_cancelled():
+                    return []
+                try:
+                    meta = extract_for_import(Path(path_str), extractor)
+                except Exception:
+                    meta = None
+                results.append(meta)
+                if progress_cb and (idx % 100 == 0 or idx == total):
+                    progress_cb(idx, total)
+        return results
+
+    def run(self) -> Optional[Tuple[int, int]]:
+        """
+        处理全部待处理的队列记录。
+
+        Returns:
+            (saved_count, skipped_count)；被取消时返回 None（未处理的记录留在队列中）
+        """
+        try:
+            return self._run()
+        except Exception:
+            # 出错时也要关闭进程池
+            self.terminate_pool()
+            raise
+
+    def _run(self) -> Optional[Tuple[int, int]]:
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import ImportQueue, AudioFile
+        from transcriptionist_v3.application.library_manager.incremental_scan import (
+            file_snapshot_values,
+            snapshot_changed,
+        )
+
+        saved_total = 0
+        skipped_total = 0
+        processed_total = 0
+
+        with session_scope() as session:
+            query = session.query(ImportQueue).filter(ImportQueue.status == IMPORT_STATUS_PENDING)
+            if self.root_folder:
+                query = query.filter(ImportQueue.root_path == self.root_folder)
+            overall_total = query.count()
+
+        while True:
+            if self._is_cancelled():
+                return None
+
+            with session_scope() as session:
+                query = session.query(ImportQueue).filter(ImportQueue.status == IMPORT_STATUS_PENDING)
+                if self.root_folder:
+                    query = query.filter(ImportQueue.root_path == self.root_folder)
+                rows = query.order_by(ImportQueue.id).limit(self.batch_size).all()
+                if not rows:
+                    break
+                ids = [r.id for r in rows]
+                paths = [r.file_path for r in rows]
+
+                # 合并查询：已存在的文件（分批，避免 too many SQL variables）
+                existing_rows: dict = {}
+                for i in range(0, len(paths), SQLITE_IN_BATCH):
+                    batch = paths[i : i + SQLITE_IN_BATCH]
+                    for row in session.query(
+                        AudioFile.id, AudioFile.file_path, AudioFile.file_size, AudioFile.file_mtime_ns
+                    ).filter(AudioFile.file_path.in_(batch)).all():
+                        existing_rows[row.file_path] = row
+                # 已入库的文件只有快照（size/mtime）变化时才重新提取，否则跳过
+                existing: set[str] = set()
+                for path_str, row in existing_rows.items():
+                    try:
+                        if not snapshot_changed(row, os.stat(path_str)):
+                            existing.add(path_str)
+                    except OSError:
+                        existing.add(path_str)
+
+                # 更新状态为 PROCESSING（分批）
+                for i in range(0, len(ids), SQLITE_IN_BATCH):
+                    id_batch = ids[i : i + SQLITE_IN_BATCH]
+                    session.query(ImportQueue).filter(ImportQueue.id.in_(id_batch)).update(
+                        {"status": IMPORT_STATUS_PROCESSING}, synchronize_session=False
+                    )
+                session.commit()
+
+            pending_rows = [(r, p) for r, p in zip(rows, paths) if p not in existing]
+            skipped_ids = [r.id for r, p in zip(rows, paths) if p in existing]
+
+            to_process_paths = [p for _, p in pending_rows]
+
+            def _progress_local(done, _batch_total, base=processed_total):
+                # base 以默认参数绑定本批开始时的计数，避免闭包读到循环后续修改的值
+                self._progress(
+                    base + done, overall_total,
+                    f"正在提取元数据... {base + done}/{overall_total}"
+                )
+
+            # 先发一次进度，避免看起来“卡住”
+            self._progress(processed_total, overall_total, f"正在提取元数据... {processed_total}/{overall_total}")
+            metas = self._extract_metadata_batch(to_process_paths, progress_cb=_progress_local)
+            if self._is_cancelled():
+                # 本批未写库：放回待处理，下次运行重新提取
+                with session_scope() as session:
+                    for i in range(0, len(ids), SQLITE_IN_BATCH):
+                        session.query(ImportQueue).filter(ImportQueue.id.in_(ids[i : i + SQLITE_IN_BATCH])).update(
+                            {"status": IMPORT_STATUS_PENDING}, synchronize_session=False
+                        )
+                return None
+
+            new_files = []
+            refreshed = []
+            done_ids = []
+            failed_ids = []
+
+            for idx, (row, path_str) in enumerate(pending_rows):
+                # 即使元数据提取失败(meta 为 None)，也尽量创建记录，保证文件至少能出现在库中
+                meta = metas[idx] if idx < len(metas) else None
+                try:
+                    p = Path(path_str)
+                    if not p.exists():
+                        failed_ids.append(row.id)
+                        continue
+
+                    duration = 0.0
+                    sample_rate = 0
+                    bit_depth = 16
+                    channels = 0
+                    description = None
+                    content_hash = ""
+
+                    if meta is not None:
+                        duration = float(getattr(meta, "duration", 0.0) or 0.0)
+                        sample_rate = int(getattr(meta, "sample_rate", 0) or 0)
+                        bit_depth = int(getattr(meta, "bit_depth", 16) or 16)
+                        channels = int(getattr(meta, "channels", 0) or 0)
+                        description = getattr(meta, "description", None) or getattr(meta, "comment", None)
+                    # 采样内容指纹由元数据 worker 计算；提取失败时留空
+                    content_hash = getattr(meta, "content_hash", "") or ""
+
+                    snapshot = file_snapshot_values(p.stat())
+                    existing_row = existing_rows.get(path_str)
+                    if existing_row is not None:
+                        # 内容已变化：刷新元数据与快照，并让 AI 索引/打标重新处理
+                        refreshed.append({
+                            "id": existing_row.id,
+                            "content_hash": content_hash,
+                            "duration": duration,
+                            "sample_rate": sample_rate,
+                            "bit_depth": bit_depth,
+                            "channels": channels,
+                            "description": description,
+                            "index_status": 0,
+                            "tag_status": 0,
+                            **snapshot,
+                        })
+                        done_ids.append(row.id)
+                        continue
+
+                    audio_file = AudioFile(
+                        file_path=str(p),
+                        filename=p.name,
+                        content_hash=content_hash,
+                        duration=duration,
+                        sample_rate=sample_rate,
+                        bit_depth=bit_depth,
+                        channels=channels,
+                        format=p.suffix.lstrip('.').lower(),
+                        description=description,
+                        original_filename=p.name,
+                        **snapshot,
+                    )
+                    new_files.append(audio_file)
+                    done_ids.append(row.id)
+                except Exception:
+                    failed_ids.append(row.id)
+
+            with session_scope() as session:
+                if new_files:
+                    session.bulk_save_objects(new_files)
+                    saved_total += len(new_files)
+                if refreshed:
+                    session.bulk_update_mappings(AudioFile, refreshed)
+                    saved_total += len(refreshed)
+                for i in range(0, len(skipped_ids), SQLITE_IN_BATCH):
+                    session.query(ImportQueue).filter(ImportQueue.id.in_(skipped_ids[i : i + SQLITE_IN_BATCH])).update(
+                        {"status": IMPORT_STATUS_SKIPPED}, synchronize_session=False
+                    )
+                if skipped_ids:
+                    skipped_total += len(skipped_ids)
+                for i in range(0, len(done_ids), SQLITE_IN_BATCH):
+                    session.query(ImportQueue).filter(ImportQueue.id.in_(done_ids[i : i + SQLITE_IN_BATCH])).update(
+                        {"status": IMPORT_STATUS_DONE}, synchronize_session=False
+                    )
+                for i in range(0, len(failed_ids), SQLITE_IN_BATCH):
+                    session.query(ImportQueue).filter(ImportQueue.id.in_(failed_ids[i : i + SQLITE_IN_BATCH])).update(
+                        {"status": IMPORT_STATUS_FAILED, "error": "metadata extract failed"}, synchronize_session=False
+                    )
+                if failed_ids:
+                    skipped_total += len(failed_ids)
+                session.commit()
+
+            processed_total += len(rows)
+            self._progress(processed_total, overall_total, f"正在入库... {processed_total}/{overall_total}")
+
+        # 关闭进程池（确保资源释放）
+        self._close_pool()
+        return saved_total, skipped_total
+
+
+def reset_stale_processing(root_folder: Optional[str] = None) -> int:
+    """
+    把上次中断时停留在 PROCESSING 的队列记录重置为待处理，返回重置条数。
+
+    ``ImportQueueProcessor`` 先把整批记录标为 PROCESSING 再提取元数据；进程被杀死时这批记录
+    不会再被取出，恢复导入前调用此函数即可从中断处继续。
+    """
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.infrastructure.database.models import ImportQueue
+
+    with session_scope() as session:
+        query = session.query(ImportQueue).filter(ImportQueue.status == IMPORT_STATUS_PROCESSING)
+        if root_folder:
+            query = query.filter(ImportQueue.root_path == str(root_folder))
+        return int(query.update({"status": IMPORT_STATUS_PENDING}, synchronize_session=False) or 0)
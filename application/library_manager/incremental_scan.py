@@ -0,0 +1,202 @@
+"""
+Incremental library rescans.
+
+重扫不再“发现全部文件再用 IN 查询过滤已入库的”，而是基于两类快照：
+
+- 目录快照（``scan_directories``）：目录 mtime 未变 → 直接子项没有增删改名，跳过 scandir，
+  复用记录的子目录列表继续向下（``ParallelDirectoryWalker`` 的 snapshots 参数）
+- 文件快照（``audio_files.file_mtime_ns / file_size / file_inode / file_dev``）：
+  只对变化目录里的文件做比对，(size, mtime) 一致的跳过；不一致的重新提取元数据；
+  库里没有的路径先按 (dev, inode, size) 查找“旧路径已不存在”的记录，命中即视为移动/改名，
+  原地更新路径，保留标签、翻译与索引状态，不再重新导入
+
+注意：目录内文件被原地覆盖（不改变目录项）不会更新目录 mtime，增量模式下不会被发现；
+需要时可关闭 ``library.incremental_scan`` 做一次全量重扫。
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session
+
+from transcriptionist_v3.infrastructure.database.models import AudioFile, ScanDirectory
+
+from .parallel_walker import DirListing, DirSnapshot, FileEntry
+
+logger = logging.getLogger(__name__)
+
+# SQLite 默认 SQLITE_MAX_VARIABLE_NUMBER 较小，IN 列表分批
+SQLITE_IN_BATCH = 500
+# 快照写入批量
+SNAPSHOT_INSERT_BATCH = 2000
+
+
+def _sqlite_int(value: int) -> Optional[int]:
+    """inode/设备号可能是无符号 64 位（NTFS 文件 ID），映射到 SQLite 的有符号 64 位；0 视为未知。"""
+    value = int(value)
+    if value == 0:
+        return None
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def file_snapshot_values(st: os.stat_result) -> dict:
+    """AudioFile 上与增量重扫相关的列值。"""
+    return {
+        "file_size": int(st.st_size),
+        "file_mtime_ns": int(st.st_mtime_ns),
+        "file_inode": _sqlite_int(st.st_ino),
+        "file_dev": _sqlite_int(st.st_dev),
+    }
+
+
+def snapshot_changed(audio_file: AudioFile, st: os.stat_result) -> bool:
+    """文件相对入库时的快照是否变化；旧记录没有 mtime 时只比较大小。"""
+    if int(audio_file.file_size or 0) != int(st.st_size):
+        return True
+    if audio_file.file_mtime_ns is None:
+        return False
+    return int(audio_file.file_mtime_ns) != int(st.st_mtime_ns)
+
+
+class DirectorySnapshotStore:
+    """某个库根目录下所有目录的 mtime 快照。"""
+
+    def __init__(self, root_path: str):
+        self.root_path = str(root_path)
+        self.snapshots: Dict[str, DirSnapshot] = {}
+        self._seen: Dict[str, DirSnapshot] = {}
+
+    def load(self, session: Session) -> Dict[str, DirSnapshot]:
+        rows = (
+            session.query(ScanDirectory.path, ScanDirectory.mtime_ns, ScanDirectory.subdirs, ScanDirectory.file_count)
+            .filter(ScanDirectory.root_path == self.root_path)
+            .all()
+        )
+        snapshots: Dict[str, DirSnapshot] = {}
+        for path, mtime_ns, subdirs, file_count in rows:
+            try:
+                names = json.loads(subdirs or "[]")
+            except ValueError:
+                continue
+            snapshots[path] = DirSnapshot(mtime_ns=int(mtime_ns), subdirs=list(names), file_count=int(file_count or 0))
+        self.snapshots = snapshots
+        logger.info("Loaded %d directory snapshots for %s", len(snapshots), self.root_path)
+        return snapshots
+
+    def record(self, listing: DirListing) -> None:
+        """记录本次扫描到的目录状态（列目录失败的目录 mtime 为 0，不记录，下次重扫）。"""
+        if listing.mtime_ns:
+            self._seen[listing.path] = DirSnapshot(
+                mtime_ns=listing.mtime_ns, subdirs=list(listing.subdirs), file_count=listing.file_count
+            )
+
+    def save(self, session: Session) -> None:
+        """用本次扫描结果整体替换该根目录的快照（已删除的目录随之清除）。不提交。"""
+        session.execute(delete(ScanDirectory).where(ScanDirectory.root_path == self.root_path))
+        # 库中 DateTime 列均为 naive UTC（模型默认值 datetime.utcnow），去掉 tzinfo 保持一致
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = [
+            {
+                "root_path": self.root_path,
+                "path": path,
+                "mtime_ns": snap.mtime_ns,
+                "subdirs": json.dumps(snap.subdirs, ensure_ascii=False),
+                "file_count": snap.file_count,
+                "scanned_at": now,
+            }
+            for path, snap in self._seen.items()
+        ]
+        for i in range(0, len(rows), SNAPSHOT_INSERT_BATCH):
+            session.execute(insert(ScanDirectory), rows[i : i + SNAPSHOT_INSERT_BATCH])
+
+
+@dataclass
+class ReconcileResult:
+    """一批文件与库记录的比对结果。"""
+
+    new_paths: List[str] = field(default_factory=list)
+    changed_paths: List[str] = field(default_factory=list)
+    unchanged: int = 0
+    moved: int = 0
+
+
+def reconcile_files(session: Session, entries: Sequence[FileEntry]) -> ReconcileResult:
+    """
+    比对变化目录中扫描到的文件与 audio_files（不提交）：
+
+    - 路径已入库且 (size, mtime) 一致 → unchanged（旧记录顺带补齐 mtime/inode 快照）
+    - 路径已入库但快照不一致 → changed_paths（需重新提取元数据）
+    - 路径未入库、且存在 (dev, inode, size) 相同而旧路径已不存在的记录 → 视为移动，原地更新路径
+    - 其余 → new_paths
+    """
+    result = ReconcileResult()
+    by_path = {e.path: e for e in entries}
+    paths = list(by_path)
+
+    existing: Dict[str, AudioFile] = {}
+    for i in range(0, len(paths), SQLITE_IN_BATCH):
+        batch = paths[i : i + SQLITE_IN_BATCH]
+        for row in session.query(AudioFile).filter(AudioFile.file_path.in_(batch)).all():
+            existing[row.file_path] = row
+
+    for path, row in existing.items():
+        entry = by_path[path]
+        if int(row.file_size or 0) != entry.size or (
+            row.file_mtime_ns is not None and int(row.file_mtime_ns) != entry.mtime_ns
+        ):
+            result.changed_paths.append(path)
+            continue
+        result.unchanged += 1
+        if row.file_mtime_ns is None or row.file_inode is None:
+            try:
+                for key, value in file_snapshot_values(os.stat(path)).items():
+                    setattr(row, key, value)
+            except OSError:
+                pass
+
+    missing = [p for p in paths if p not in existing]
+    if not missing:
+        return result
+
+    # 移动检测：只对库里没有的路径取 inode（Windows 上 scandir 不带 inode，需要单独 stat）
+    stats: Dict[str, os.stat_result] = {}
+    for path in missing:
+        try:
+            stats[path] = os.stat(path)
+        except OSError:
+            continue
+    inodes = sorted({_sqlite_int(st.st_ino) for st in stats.values() if st.st_ino})
+    candidates: Dict[tuple, List[AudioFile]] = {}
+    for i in range(0, len(inodes), SQLITE_IN_BATCH):
+        batch = inodes[i : i + SQLITE_IN_BATCH]
+        for row in session.query(AudioFile).filter(AudioFile.file_inode.in_(batch)).all():
+            candidates.setdefault((row.file_dev, row.file_inode), []).append(row)
+
+    for path in missing:
+        st = stats.get(path)
+        moved_row = None
+        if st is not None and st.st_ino:
+            for row in candidates.get((_sqlite_int(st.st_dev), _sqlite_int(st.st_ino)), []):
+                if int(row.file_size or 0) == int(st.st_size) and not os.path.lexists(row.file_path):
+                    moved_row = row
+                    break
+        if moved_row is None:
+            result.new_paths.append(path)
+            continue
+        logger.debug(f"Detected move: {moved_row.file_path} -> {path}")
+        moved_row.file_path = path
+        moved_row.filename = Path(path).name
+        for key, value in file_snapshot_values(st).items():
+            setattr(moved_row, key, value)
+        candidates[(moved_row.file_dev, moved_row.file_inode)].remove(moved_row)
+        result.moved += 1
+    return result
+
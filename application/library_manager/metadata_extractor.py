@@ -369,15 +369,27 @@ def extract_metadata(file_path: Path) -> Optional[AudioMetadata]:
     return get_metadata_extractor().extract(file_path)
 
 
+def extract_for_import(file_path: Path, extractor: Optional[MetadataExtractor] = None) -> Optional[AudioMetadata]:
+    """
+    导入用：提取元数据并顺带计算采样内容指纹（meta.content_hash）。
+    在元数据 worker 进程内完成，主进程无需再次读取文件。
+    """
+    from .fingerprint import try_sampled_fingerprint
+
+    meta = (extractor or get_metadata_extractor()).extract(Path(file_path))
+    if meta is not None:
+        meta.content_hash = try_sampled_fingerprint(file_path)
+    return meta
+
+
 def extract_one_for_pool(args: tuple) -> tuple:
     """
     供 multiprocessing.Pool 调用的可 pickle 函数：(idx, path_str) -> (idx, path_str, metadata_or_none)。
-    子进程内创建 MetadataExtractor，避免跨进程传递复杂对象。
+    子进程内复用 MetadataExtractor，避免跨进程传递复杂对象；同时计算采样内容指纹。
     """
     idx, path_str = args
     try:
-        extractor = MetadataExtractor()
-        meta = extractor.extract(Path(path_str))
+        meta = extract_for_import(Path(path_str))
         return (idx, path_str, meta)
     except Exception:
         return (idx, path_str, None)
@@ -0,0 +1,334 @@
+"""
+Library Row Index
+
+音效库行索引。库页与音效列表用“全局索引”（``LibraryPage._all_file_data`` 的下标，下称行号）
+标识一个文件，这里为行号提供不依赖 Qt 的查找与过滤：
+
+- 路径 → 行号、数据库 ID → 行号的哈希 / 数组映射（O(1)），替代逐行线性扫描
+- 文件名过滤：全部文件名小写后以 ``\\n`` 拼成一段 UTF-8 缓冲区，numpy 按字节向量化匹配
+  （从关键词中最罕见的字节起步逐字节收窄候选位置），再用 ``searchsorted`` 把命中位置映射回行号；
+  100 万行一次全量过滤在几十毫秒量级
+- 继续输入（新关键词包含上一次的关键词）且上次结果不多时，只在上一次结果中复核
+- ``diff_rows``：视图当前行与新结果之间的删除 / 插入区段，供视图模型发出增量的
+  beginRemoveRows / beginInsertRows，而不是整表重置
+- 列排序：加载库时在后台线程把各列的值转成按行对齐的数值键（字符串列为排名），
+  表头排序只需对给定行做一次 ``np.argsort``，不再逐行取文件信息后在 UI 线程里 Python 排序
+
+行号数组一律为 numpy int64；同一批行号在各处按同一相对顺序出现时才能做增量 diff。
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 上次结果不超过该行数时，继续输入只在上次结果中逐行复核
+SUBSET_SCAN_LIMIT = 20_000
+# 增量 diff 的区段数上限，超过则让视图整表重置（大量零散信号比一次重置更慢）
+MAX_DIFF_RUNS = 256
+
+# 统计字节频率时的抽样步长
+FREQ_SAMPLE_STRIDE = 61
+
+# 依赖文件名的排序键：路径变化（重命名）后失效，排序退回调用方的逐行排序
+_NAME_SORT_KEYS = ("name", "original")
+
+_NEWLINE = 0x0A
+
+
+def _norm_key(path: str) -> str:
+    return os.path.normcase(os.path.normpath(path))
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """布尔数组中连续 True 的区段 [(first, last), ...]。"""
+    if not mask.size:
+        return []
+    padded = np.concatenate(([False], mask, [False])).astype(np.int8)
+    edges = np.flatnonzero(np.diff(padded))
+    return [(int(a), int(b) - 1) for a, b in zip(edges[0::2], edges[1::2])]
+
+
+@dataclass
+class RowDiff:
+    """
+    ``diff_rows`` 的结果。
+
+    - removed：旧窗口中要删除的区段（旧坐标），按从下往上的顺序排列，可依次直接删除
+    - inserted：删除完成后要插入的区段（新坐标），按从上往下的顺序排列，
+      插入内容为 ``new_rows[first:last + 1]``
+    - window：diff 完成后视图窗口覆盖的新结果前缀长度
+    """
+
+    removed: List[Tuple[int, int]] = field(default_factory=list)
+    inserted: List[Tuple[int, int]] = field(default_factory=list)
+    window: int = 0
+
+
+def diff_rows(
+    old: np.ndarray,
+    new: np.ndarray,
+    max_runs: int = MAX_DIFF_RUNS,
+    max_window: Optional[int] = None,
+) -> Optional[RowDiff]:
+    """
+    计算把视图窗口 ``old``（旧结果中已展示的前缀）变为新结果 ``new`` 前缀的增量操作。
+
+    保留下来的行在新结果中的相对顺序必须与旧窗口一致（同一基准顺序下的过滤结果总满足），
+    否则、或区段数超过 ``max_runs`` 时返回 None，由调用方整表重置。
+    窗口止于最后一个保留行在新结果中的位置：其后的行留给视图按需 fetchMore；
+    窗口超过 ``max_window``（放宽条件后保留行散布在大量新行之间）时同样返回 None。
+    """
+    old = np.asarray(old, dtype=np.int64)
+    new = np.asarray(new, dtype=np.int64)
+    universe = int(max(old.max(initial=-1), new.max(initial=-1))) + 1
+    position = np.full(universe, -1, dtype=np.int64)
+    position[new] = np.arange(new.size, dtype=np.int64)
+
+    placed = position[old] if old.size else np.empty(0, dtype=np.int64)
+    keep = placed >= 0
+    kept = placed[keep]
+    if kept.size > 1 and np.any(np.diff(kept) <= 0):
+        return None
+
+    removed = _runs(~keep)
+    window = int(kept[-1]) + 1 if kept.size else 0
+    if max_window is not None and window > max_window:
+        return None
+    fresh = np.ones(window, dtype=bool)
+    fresh[kept] = False
+    inserted = _runs(fresh)
+    if len(removed) + len(inserted) > max_runs:
+        return None
+    removed.reverse()
+    return RowDiff(removed=removed, inserted=inserted, window=window)
+
+
+class LibraryRowIndex:
+    """
+    行号索引：路径 / ID 映射与文件名过滤。
+
+    路径映射按字符串精确匹配，未命中时再按规范化路径（normcase + normpath）匹配；
+    文件名列表在 ``prepare`` 或第一次过滤时构建；路径变化时只改对应的一项，
+    拼接好的缓冲区标记失效、下次过滤时重新拼接。
+    """
+
+    def __init__(self, paths: Iterable = (), ids: Optional[Sequence[int]] = None):
+        self.rebuild(paths, ids)
+
+    def rebuild(self, paths: Iterable, ids: Optional[Sequence[int]] = None) -> None:
+        """整体重建（库重新加载后调用）。``ids`` 与 ``paths`` 一一对应，未知的 ID 用 -1。"""
+        self._paths: List[str] = [str(p) for p in paths]
+        self._row_of: Dict[str, int] = {}
+        for row, path in enumerate(self._paths):
+            self._row_of.setdefault(path, row)
+        self._norm_row_of: Optional[Dict[str, int]] = None
+
+        if ids is not None and len(ids) == len(self._paths):
+            self._ids = np.asarray(ids, dtype=np.int64)
+        else:
+            self._ids = np.full(len(self._paths), -1, dtype=np.int64)
+        self._row_of_id: Optional[np.ndarray] = None
+        self._names: Optional[List[str]] = None
+        self._sort_keys: Dict[str, np.ndarray] = {}
+        self._invalidate_names()
+
+    def retain(self, rows: Sequence[int]) -> None:
+        """只保留给定行（按给定顺序重新编号），用于从库中移除部分文件夹后。"""
+        rows = np.asarray(rows, dtype=np.int64)
+        sort_keys = {key: values[rows] for key, values in self._sort_keys.items()}
+        self.rebuild([self._paths[r] for r in rows.tolist()], self._ids[rows] if rows.size else [])
+        self._sort_keys = sort_keys
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    # ------------------------------------------------------------------
+    # 映射
+    # ------------------------------------------------------------------
+
+    def row_of(self, path) -> Optional[int]:
+        """路径对应的行号，不在库中返回 None。"""
+        key = str(path).strip()
+        row = self._row_of.get(key)
+        if row is not None:
+            return row
+        if self._norm_row_of is None:
+            self._norm_row_of = {}
+            for r, p in enumerate(self._paths):
+                self._norm_row_of.setdefault(_norm_key(p), r)
+        return self._norm_row_of.get(_norm_key(key)) if key else None
+
+    def rows_of(self, paths: Iterable) -> np.ndarray:
+        """一批路径对应的行号（升序、去重，忽略不在库中的路径）。"""
+        rows = [r for r in (self.row_of(p) for p in paths if p) if r is not None]
+        return np.unique(np.asarray(rows, dtype=np.int64))
+
+    def rows_in_order(self, paths: Iterable) -> np.ndarray:
+        """一批路径对应的行号，保持输入顺序（检索排名），去重并忽略不在库中的路径。"""
+        rows = [r for r in (self.row_of(p) for p in paths if p) if r is not None]
+        return np.asarray(list(dict.fromkeys(rows)), dtype=np.int64)
+
+    def rows_for_ids(self, ids: Iterable[int]) -> np.ndarray:
+        """一批数据库 ID 对应的行号（升序、去重，忽略未知 ID）。"""
+        if self._row_of_id is None:
+            known = self._ids >= 0
+            size = int(self._ids.max(initial=-1)) + 1
+            self._row_of_id = np.full(size, -1, dtype=np.int64)
+            self._row_of_id[self._ids[known]] = np.flatnonzero(known)
+        ids = np.fromiter((int(i) for i in ids), dtype=np.int64)
+        ids = ids[(ids >= 0) & (ids < self._row_of_id.size)]
+        rows = self._row_of_id[ids]
+        return np.unique(rows[rows >= 0])
+
+    def update_path(self, row: int, path) -> None:
+        """某一行的路径变化（重命名 / 移动）。"""
+        if not 0 <= row < len(self._paths):
+            return
+        old = self._paths[row]
+        if self._row_of.get(old) == row:
+            del self._row_of[old]
+        new = str(path)
+        self._paths[row] = new
+        self._row_of.setdefault(new, row)
+        self._norm_row_of = None
+        if self._names is not None:
+            self._names[row] = self._name_of(new)
+        self._invalidate_names()
+        for key in _NAME_SORT_KEYS:
+            self._sort_keys.pop(key, None)
+
+    # ------------------------------------------------------------------
+    # 列排序
+    # ------------------------------------------------------------------
+
+    def set_sort_values(self, key: str, values: Sequence) -> None:
+        """
+        设置一列的排序值（与行号一一对应）。数值列直接保存；字符串列先统一小写，
+        再用 ``np.unique`` 换成排名（一次 O(n log n)，应在后台线程中调用），长度不符时忽略。
+        """
+        if len(values) != len(self._paths):
+            return
+        if len(values) and isinstance(values[0], str):
+            lowered = np.asarray([str(v).lower() for v in values], dtype=object)
+            _, ranks = np.unique(lowered, return_inverse=True)
+            self._sort_keys[key] = ranks.astype(np.int64)
+        else:
+            self._sort_keys[key] = np.asarray(values, dtype=np.float64)
+
+    def has_sort_key(self, key: str) -> bool:
+        return key in self._sort_keys
+
+    def invalidate_sort_key(self, key: str) -> None:
+        """某列的值在加载后被修改（如打标），丢弃该列排序键。"""
+        self._sort_keys.pop(key, None)
+
+    def sort_rows(self, rows: np.ndarray, key: str, descending: bool = False) -> Optional[np.ndarray]:
+        """
+        按列排序给定行号（稳定排序，相同值保持原有相对顺序）；没有该列的排序键时返回 None。
+        """
+        values = self._sort_keys.get(key)
+        if values is None:
+            return None
+        rows = np.asarray(rows, dtype=np.int64)
+        if rows.size and (int(rows.min()) < 0 or int(rows.max()) >= values.size):
+            return None
+        keys = values[rows]
+        order = np.argsort(-keys if descending else keys, kind="stable")
+        return rows[order]
+
+    # ------------------------------------------------------------------
+    # 文件名过滤
+    # ------------------------------------------------------------------
+
+    def prepare(self) -> "LibraryRowIndex":
+        """预先构建文件名缓冲区（100 万行约 1 秒，应在加载库的后台线程中调用）。"""
+        self._ensure_names()
+        return self
+
+    def _invalidate_names(self) -> None:
+        self._blob: Optional[bytes] = None
+        self._blob_arr: Optional[np.ndarray] = None
+        self._starts: Optional[np.ndarray] = None
+        self._byte_freq: Optional[np.ndarray] = None
+        self._last_match: Optional[Tuple[bytes, np.ndarray]] = None
+
+    @staticmethod
+    def _name_of(path: str) -> str:
+        # 同时按 / 与 \ 切分，与 Windows 下 Path.name 一致；换行替换掉，保证分隔符与行一一对应
+        return path[max(path.rfind("/"), path.rfind("\\")) + 1:].replace("\n", " ")
+
+    def _ensure_names(self) -> None:
+        if self._blob is not None:
+            return
+        if self._names is None:
+            name_of = self._name_of
+            self._names = [name_of(p) for p in self._paths]
+        joined = "\n".join(self._names)
+        self._blob = joined.lower().encode("utf-8", "surrogatepass")
+        self._blob_arr = np.frombuffer(self._blob, dtype=np.uint8)
+        # 行起点 = 0 与每个分隔符之后；小写化可能改变字符数，因此按编码后的分隔符位置定位
+        separators = np.flatnonzero(self._blob_arr == _NEWLINE)
+        self._starts = np.concatenate(([0], separators + 1)).astype(np.int64)
+        # 字节频率只用于挑选起步字节，抽样统计即可
+        self._byte_freq = np.bincount(self._blob_arr[::FREQ_SAMPLE_STRIDE], minlength=256)
+
+    def _scan_all(self, needle: bytes) -> np.ndarray:
+        arr = self._blob_arr
+        width = len(needle)
+        anchor = min(range(width), key=lambda k: self._byte_freq[needle[k]])
+        pos = np.flatnonzero(arr == needle[anchor]) - anchor
+        pos = pos[(pos >= 0) & (pos + width <= arr.size)]
+        for k in range(width):
+            if k == anchor or not pos.size:
+                continue
+            pos = pos[arr[pos + k] == needle[k]]
+        rows = np.searchsorted(self._starts, pos, side="right") - 1
+        # pos 升序，rows 也升序：相邻去重即可，不必排序
+        if rows.size > 1:
+            rows = rows[np.concatenate(([True], rows[1:] != rows[:-1]))]
+        return rows
+
+    def _scan_subset(self, needle: bytes, rows: np.ndarray) -> np.ndarray:
+        blob, starts, total = self._blob, self._starts, len(self._blob)
+        last = len(starts) - 1
+        hits = [
+            r for r in rows.tolist()
+            if needle in blob[starts[r]:(starts[r + 1] - 1 if r < last else total)]
+        ]
+        return np.asarray(hits, dtype=np.int64)
+
+    def match(self, text: str) -> np.ndarray:
+        """文件名包含 ``text``（不区分大小写）的全部行号，升序。"""
+        needle = text.strip().lower().replace("\n", " ").encode("utf-8", "surrogatepass")
+        if not needle:
+            return np.arange(len(self._paths), dtype=np.int64)
+        if not self._paths:
+            return np.empty(0, dtype=np.int64)
+        self._ensure_names()
+
+        last = self._last_match
+        if last is not None and last[0] in needle and last[1].size <= SUBSET_SCAN_LIMIT:
+            rows = self._scan_subset(needle, last[1])
+        else:
+            rows = self._scan_all(needle)
+        self._last_match = (needle, rows)
+        return rows
+
+    def filter(self, text: str, within: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        过滤文件名。给出 ``within`` 时只返回其中命中的行，并保持 ``within`` 的原有顺序。
+        """
+        if within is None:
+            return self.match(text)
+        within = np.asarray(within, dtype=np.int64)
+        if not text.strip():
+            return within.copy()
+        rows = self.match(text)
+        mask = np.zeros(len(self._paths), dtype=bool)
+        mask[rows] = True
+        valid = within[(within >= 0) & (within < mask.size)]
+        return valid[mask[valid]]
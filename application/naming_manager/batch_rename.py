@@ -3,12 +3,13 @@ Batch Rename Manager
 
 批量重命名管理器，支持冲突检测和撤销。
 参考Quod Libet的renamefiles模块设计。
+
+实际的磁盘重命名与数据库路径更新由 ``rename_engine`` 事务化执行（预写日志、分层并行、分批提交）。
 """
 
 from __future__ import annotations
 
 import os
-import shutil
 import logging
 from dataclasses import dataclass, field
 from enum import Enum
@@ -18,6 +19,7 @@ from datetime import datetime
 
 from .validator import NamingValidator, ValidationResult
 from .history import RenameHistory, RenameHistoryEntry
+from .rename_engine import RenameEngine, plan_renames
 
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
@@ -44,6 +46,7 @@ class RenameOperation:
     # 状态
     validated: bool = False
     validation_result: Optional[ValidationResult] = None
+    overwrite: bool = False  # 冲突解决为覆盖
     
     # 执行结果
     executed: bool = False
@@ -270,7 +273,7 @@ class BatchRenameManager:
             
         elif resolution == ConflictResolution.OVERWRITE:
             # 保持原目标，执行时会覆盖
-            pass
+            operation.overwrite = True
             
         elif resolution == ConflictResolution.RENAME:
             # 自动重命名
@@ -303,6 +306,9 @@ class BatchRenameManager:
         """
         执行批量重命名
         
+        先整体规划（批次内冲突、链式依赖与环在内存中检测），再由 ``RenameEngine``
+        预写日志、按目录并行重命名并分批提交数据库路径。
+        
         Args:
             operations: 重命名操作列表
             dry_run: 是否为预览模式（不实际执行）
@@ -313,11 +319,22 @@ class BatchRenameManager:
         result = RenameResult(total=len(operations))
         
         # 创建历史记录批次
-        batch_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+        batch_id = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+        
+        if not dry_run:
+            self.recover_interrupted()
+        
+        # 本批次会腾出的源路径：目标等于这些路径时不算冲突（交换、链式改名）
+        freed = {
+            os.path.normcase(os.path.normpath(op.source))
+            for op in operations
+            if not op.is_same
+        }
+        runnable: List[RenameOperation] = []
         
         for i, op in enumerate(operations):
-            # 进度回调
-            if self._progress_callback:
+            # 进度回调（实际执行的进度由重命名引擎回调）
+            if dry_run and self._progress_callback:
                 self._progress_callback(i + 1, len(operations), op.source_name)
             
             # 跳过相同的源和目标
@@ -342,41 +359,45 @@ class BatchRenameManager:
                 continue
             
             # 处理冲突
-            if op.has_conflict:
+            if op.has_conflict and os.path.normcase(os.path.normpath(op.target)) not in freed:
                 op = self.resolve_conflict(op)
                 if op.executed and not op.success:
                     result.skipped += 1
                     continue
             
-            # 执行重命名
             if dry_run:
                 op.executed = True
                 op.success = True
                 result.success += 1
+                result.operations.append(op)
             else:
-                try:
-                    self._do_rename(op)
-                    op.executed = True
-                    op.success = True
+                runnable.append(op)
+        
+        if runnable:
+            if not self._db_session:
+                logger.warning("数据库会话未设置，跳过路径更新")
+            plan = plan_renames([(op.source, op.target, op.overwrite) for op in runnable], batch_id)
+            RenameEngine(self._db_session, progress_callback=self._progress_callback).execute(plan)
+            
+            op_errors = plan.op_errors()
+            now = datetime.now()
+            for i, op in enumerate(runnable):
+                op.executed = True
+                op.error = op_errors.get(i, "")
+                op.success = not op.error
+                if op.success:
                     result.success += 1
-                    
                     # 记录历史
                     self._history.add_entry(RenameHistoryEntry(
                         batch_id=batch_id,
                         source=op.source,
                         target=op.target,
-                        timestamp=datetime.now(),
+                        timestamp=now,
                     ))
-                    
-                except Exception as e:
-                    op.executed = True
-                    op.success = False
-                    op.error = str(e)
+                else:
                     result.failed += 1
-                    result.errors.append(f"{op.source_name}: {e}")
-                    logger.error(f"重命名失败: {op.source} -> {op.target}, 错误: {e}")
-            
-            result.operations.append(op)
+                    result.errors.append(f"{op.source_name}: {op.error}")
+                result.operations.append(op)
         
         # 保存历史
         if not dry_run and result.success > 0:
@@ -384,67 +405,29 @@ class BatchRenameManager:
         
         return result
     
-    def _do_rename(self, operation: RenameOperation) -> None:
-        """执行单个重命名操作"""
-        source = operation.source
-        target = operation.target
-        
-        # 确保目标目录存在
-        target_dir = Path(target).parent
-        target_dir.mkdir(parents=True, exist_ok=True)
-        
-        # 如果目标存在且是覆盖模式，先删除
-        if os.path.exists(target) and source != target:
-            os.remove(target)
-        
-        # 重命名（或移动）
-        shutil.move(source, target)
-        
-        # 同步更新数据库路径
-        self._update_database_path(source, target)
-        
-        logger.info(f"重命名: {source} -> {target}")
-    
-    def _update_database_path(self, old_path: str, new_path: str) -> None:
+    def recover_interrupted(self, revert: bool = False) -> int:
         """
-        更新数据库中的文件路径
+        处理上次被中断的批量重命名（残留的预写日志）。
         
         Args:
-            old_path: 旧文件路径
-            new_path: 新文件路径
+            revert: True 回滚到重命名前的状态；False 按计划续做完成
+            
+        Returns:
+            处理的批次数
         """
         if not self._db_session:
-            logger.warning("数据库会话未设置，跳过路径更新")
-            return
+            return 0
         
+        engine = RenameEngine(self._db_session)
+        recovered = 0
         try:
-            from ...infrastructure.database.models import AudioFile
-            
-            # 规范化路径（处理路径分隔符差异）
-            old_path_normalized = os.path.normpath(old_path)
-            new_path_normalized = os.path.normpath(new_path)
-            
-            # 查找数据库中的记录
-            audio_file = self._db_session.query(AudioFile).filter(
-                AudioFile.file_path == old_path_normalized
-            ).first()
-            
-            if audio_file:
-                # 更新路径和文件名
-                audio_file.file_path = new_path_normalized
-                audio_file.filename = Path(new_path).name
-                audio_file.modified_at = datetime.utcnow()
-                
-                self._db_session.commit()
-                logger.info(f"数据库路径已更新: {old_path} -> {new_path}")
-            else:
-                logger.warning(f"数据库中未找到文件记录: {old_path}")
-                
+            for batch_id in engine.pending_batches():
+                engine.recover(batch_id, revert=revert)
+                recovered += 1
         except Exception as e:
-            logger.error(f"更新数据库路径失败: {e}")
-            if self._db_session:
-                self._db_session.rollback()
-            # 不抛出异常，避免影响重命名操作
+            logger.error(f"恢复中断的重命名失败: {e}")
+            self._db_session.rollback()
+        return recovered
     
     def undo_last_batch(self) -> RenameResult:
         """撤销最后一批重命名操作"""
@@ -0,0 +1,522 @@
+"""
+Transactional Rename Engine
+
+事务化批量重命名引擎。原实现逐个 ``shutil.move``，每个文件一次查询 + 一次 UPDATE + 一次 commit，
+5 万个文件要几十分钟，中途崩溃后磁盘与数据库不一致。这里改为：
+
+1. 规划（``plan_renames``）：先在内存中算出全部步骤
+   - 同批次多个文件指向同一目标 / 同一源文件出现多次 → 后出现的拒绝
+   - 目标是同批次另一个文件的源路径 → 依赖（先腾出再占用），按依赖链分层
+   - 环（a→b, b→a）与仅大小写不同的改名 → 环中一个文件先移到临时名，最后再移到目标
+2. 预写日志：执行前把整个计划写入 ``rename_journal`` 表
+3. 执行：逐层执行，同一层内按目标目录分组，多个目录并行 ``os.rename``（跨卷时回退为复制 + 删除）
+4. 数据库：每层完成后用 ``UPDATE ... FROM (VALUES ...)`` 分批更新路径，
+   日志行的 committed 标记与路径更新在同一事务中提交
+5. 批次结束后删除日志行。进程中断时残留的日志可用 ``recover`` 按磁盘实际状态续做或回滚
+
+覆盖模式下被覆盖的文件无法通过回滚恢复。
+"""
+
+from __future__ import annotations
+
+import errno
+import logging
+import os
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, text, update
+from sqlalchemy.exc import IntegrityError
+
+if TYPE_CHECKING:
+    from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# 并行重命名的目录组数上限（重命名是元数据操作，线程只是为了重叠 NAS 往返延迟）
+RENAME_WORKERS = 8
+# 每条 UPDATE ... FROM (VALUES ...) 的行数（每行 3 个参数）
+PATH_UPDATE_BATCH = 500
+# 日志写入批量
+JOURNAL_INSERT_BATCH = 2000
+
+STATE_PENDING = "pending"
+STATE_COMMITTED = "committed"
+
+
+def _key(path: str) -> str:
+    """路径比较键（Windows 上不区分大小写）。"""
+    return os.path.normcase(os.path.normpath(path))
+
+
+@dataclass
+class RenameStep:
+    """一次磁盘重命名。环中的操作拆成两步（源 → 临时名 → 目标）。"""
+
+    seq: int
+    source: str
+    target: str
+    op_index: int
+    level: int = 0
+    overwrite: bool = False
+    cycle: Optional[int] = None
+    # 必须先完成的步骤（它腾出本步骤的目标路径）
+    depends_on: Optional[int] = None
+    done: bool = False
+    error: str = ""
+
+
+@dataclass
+class RenamePlan:
+    """一个批次的完整重命名计划。"""
+
+    batch_id: str
+    steps: List[RenameStep] = field(default_factory=list)
+    # 规划阶段被拒绝的操作 {op_index: 错误信息}
+    rejected: Dict[int, str] = field(default_factory=dict)
+    cycles: int = 0
+
+    @property
+    def levels(self) -> List[List[RenameStep]]:
+        grouped: Dict[int, List[RenameStep]] = {}
+        for step in self.steps:
+            grouped.setdefault(step.level, []).append(step)
+        return [grouped[level] for level in sorted(grouped)]
+
+    def op_errors(self) -> Dict[int, str]:
+        """各操作的最终错误 {op_index: 错误信息}；不在其中的操作已成功（或源与目标相同）。"""
+        errors = dict(self.rejected)
+        for step in self.steps:
+            if not step.done and step.op_index not in errors:
+                errors[step.op_index] = step.error or "未执行"
+        return errors
+
+
+def plan_renames(
+    operations: Sequence[Tuple[str, str, bool]],
+    batch_id: str,
+) -> RenamePlan:
+    """
+    规划一批重命名。
+
+    Args:
+        operations: (源路径, 目标路径, 是否覆盖已存在目标) 列表
+        batch_id: 批次 ID（也用于环的临时文件名）
+    """
+    plan = RenamePlan(batch_id=batch_id)
+    sources: Dict[str, int] = {}
+    targets: Dict[str, int] = {}
+    accepted: List[int] = []
+
+    for i, (source, target, _overwrite) in enumerate(operations):
+        if os.path.normpath(source) == os.path.normpath(target):
+            continue
+        s_key, t_key = _key(source), _key(target)
+        if s_key in sources:
+            plan.rejected[i] = "同一文件在批次中出现多次"
+            continue
+        if t_key in targets:
+            plan.rejected[i] = "目标与同批次其他文件冲突"
+            continue
+        sources[s_key] = i
+        targets[t_key] = i
+        accepted.append(i)
+
+    # 目标已存在、且不会被本批次腾出（不是其他操作的源）时只允许覆盖模式
+    for i in accepted:
+        source, target, overwrite = operations[i]
+        t_key = _key(target)
+        if t_key == _key(source) or t_key in sources:
+            continue
+        if os.path.lexists(target) and not overwrite:
+            plan.rejected[i] = "目标文件已存在"
+    if plan.rejected:
+        accepted = [i for i in accepted if i not in plan.rejected]
+        sources = {_key(operations[i][0]): i for i in accepted}
+
+    # 依赖：next_op[i] = 源路径等于 i 的目标路径的操作（必须先执行）
+    next_op: Dict[int, Optional[int]] = {}
+    for i in accepted:
+        source, target, _ = operations[i]
+        j = sources.get(_key(target))
+        next_op[i] = j if j is not None and j != i else None
+
+    # 找环：每个节点最多一个后继、一个前驱（源与目标各自唯一），图由链和简单环组成
+    split: Dict[int, int] = {}  # 拆成两步的操作 op_index -> cycle id
+    in_cycle: Dict[int, int] = {}  # 环中所有操作 op_index -> cycle id
+    state: Dict[int, int] = {}  # 0 访问中, 1 已完成
+    for start in accepted:
+        path: List[int] = []
+        node: Optional[int] = start
+        while node is not None and node not in state:
+            state[node] = 0
+            path.append(node)
+            node = next_op[node]
+        if node is not None and state[node] == 0:
+            for member in path[path.index(node):]:
+                in_cycle[member] = plan.cycles
+            split[node] = plan.cycles
+            plan.cycles += 1
+        for n in path:
+            state[n] = 1
+    # 仅大小写不同的改名（不区分大小写的文件系统上等价于自环）
+    for i in accepted:
+        source, target, _ = operations[i]
+        if i not in split and _key(source) == _key(target):
+            split[i] = in_cycle[i] = plan.cycles
+            plan.cycles += 1
+
+    steps: List[RenameStep] = []
+    temps = set()
+    for i in accepted:
+        source, target, overwrite = operations[i]
+        if i in split:
+            temp = os.path.join(os.path.dirname(source), f".{Path(source).name}.{batch_id}.renaming")
+            temps.add(_key(temp))
+            steps.append(RenameStep(seq=0, source=source, target=temp, op_index=i, cycle=split[i]))
+            steps.append(RenameStep(seq=0, source=temp, target=target, op_index=i, cycle=split[i]))
+        else:
+            steps.append(
+                RenameStep(seq=0, source=source, target=target, op_index=i, overwrite=overwrite, cycle=in_cycle.get(i))
+            )
+
+    # 分层：level = 依赖步骤的 level + 1
+    by_source = {_key(s.source): idx for idx, s in enumerate(steps)}
+    deps: List[Optional[int]] = []
+    for idx, step in enumerate(steps):
+        # 移到临时名的一步没有依赖（临时名随后才被下一步取走）
+        j = None if _key(step.target) in temps else by_source.get(_key(step.target))
+        deps.append(j if j is not None and j != idx else None)
+    levels: Dict[int, int] = {}
+    for idx in range(len(steps)):
+        chain: List[int] = []
+        node: Optional[int] = idx
+        while node is not None and node not in levels:
+            chain.append(node)
+            node = deps[node]
+        base = levels[node] if node is not None else -1
+        for n in reversed(chain):
+            base += 1
+            levels[n] = base
+
+    order = sorted(range(len(steps)), key=lambda idx: (levels[idx], steps[idx].op_index, idx))
+    seq_of = {idx: seq for seq, idx in enumerate(order)}
+    for idx, step in enumerate(steps):
+        step.level = levels[idx]
+        step.seq = seq_of[idx]
+        step.depends_on = seq_of[deps[idx]] if deps[idx] is not None else None
+    plan.steps = [steps[idx] for idx in order]
+    return plan
+
+
+def _move(source: str, target: str, overwrite: bool) -> None:
+    """同卷 ``os.rename``；跨卷回退为 ``shutil.move``。"""
+    Path(target).parent.mkdir(parents=True, exist_ok=True)
+    if not overwrite and os.path.lexists(target) and _key(source) != _key(target):
+        raise FileExistsError(f"目标文件已存在: {target}")
+    try:
+        if overwrite:
+            os.replace(source, target)
+        else:
+            os.rename(source, target)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        if overwrite and os.path.lexists(target):
+            os.remove(target)
+        shutil.move(source, target)
+
+
+def _moved_on_disk(source: str, target: str) -> bool:
+    return not os.path.lexists(source) and os.path.lexists(target)
+
+
+class RenameEngine:
+    """
+    执行 ``RenamePlan``：预写日志 → 分层并行重命名 → 分批事务更新数据库路径。
+
+    session 为 None 时只做磁盘重命名（不写日志、不更新数据库）。
+    """
+
+    def __init__(
+        self,
+        session: Optional["Session"] = None,
+        workers: int = RENAME_WORKERS,
+        progress_callback: Optional[Callable[[int, int, str], None]] = None,
+    ):
+        self.session = session
+        self.workers = max(1, int(workers))
+        self.progress_callback = progress_callback
+
+    # ------------------------------------------------------------------
+    # execute
+    # ------------------------------------------------------------------
+
+    def execute(self, plan: RenamePlan) -> RenamePlan:
+        """执行计划，结果写回各步骤的 done / error。"""
+        if not plan.steps:
+            return plan
+        journaled = self._write_journal(plan)
+        by_seq = {s.seq: s for s in plan.steps}
+        total = len(plan.steps)
+        finished = 0
+        db_ok = True
+
+        for level_steps in plan.levels:
+            runnable: Dict[str, List[RenameStep]] = {}
+            for step in level_steps:
+                dep = by_seq.get(step.depends_on) if step.depends_on is not None else None
+                if dep is not None and not dep.done:
+                    step.error = f"依赖的重命名未完成: {Path(dep.source).name}"
+                    finished += 1
+                    continue
+                runnable.setdefault(os.path.dirname(step.target), []).append(step)
+
+            # 按目录分组并行；回调在调用线程中触发
+            with ThreadPoolExecutor(max_workers=min(self.workers, len(runnable) or 1)) as pool:
+                futures = {pool.submit(self._run_group, group): group for group in runnable.values()}
+                for future in as_completed(futures):
+                    group = futures[future]
+                    finished += len(group)
+                    if self.progress_callback:
+                        self.progress_callback(finished, total, Path(group[-1].target).name)
+
+            if self.session is not None:
+                db_ok &= self._commit_paths(
+                    [s for s in level_steps if s.done], plan.batch_id if journaled else None
+                )
+
+        self._revert_broken_cycles(plan)
+
+        if journaled and db_ok:
+            self._clear_journal(plan.batch_id)
+        elif journaled:
+            logger.warning(f"重命名批次 {plan.batch_id} 的数据库更新未全部提交，保留日志以便恢复")
+        logger.info(
+            "批量重命名 %s: %d 步完成, %d 步失败, %d 个环",
+            plan.batch_id, sum(1 for s in plan.steps if s.done),
+            sum(1 for s in plan.steps if not s.done), plan.cycles,
+        )
+        return plan
+
+    def _run_group(self, steps: List[RenameStep]) -> None:
+        for step in steps:
+            try:
+                _move(step.source, step.target, step.overwrite)
+                step.done = True
+            except Exception as e:
+                step.error = str(e)
+                logger.error(f"重命名失败: {step.source} -> {step.target}, 错误: {e}")
+
+    def _revert_broken_cycles(self, plan: RenamePlan) -> None:
+        """环中任一步失败时按逆序撤销该环已完成的步骤，不把文件留在临时名下。"""
+        broken = {s.cycle for s in plan.steps if s.cycle is not None and not s.done}
+        if not broken:
+            return
+        for cycle in broken:
+            # 环与其他步骤互不依赖（源、目标各自唯一），只需撤销环内步骤
+            cycle_steps = [s for s in plan.steps if s.done and s.cycle == cycle]
+            reverted: List[RenameStep] = []
+            for step in sorted(cycle_steps, key=lambda s: s.seq, reverse=True):
+                try:
+                    _move(step.target, step.source, False)
+                except Exception as e:
+                    logger.error(f"撤销重命名失败: {step.target} -> {step.source}, 错误: {e}")
+                    continue
+                step.done = False
+                step.error = step.error or "同一环中的其他重命名失败，已撤销"
+                reverted.append(RenameStep(seq=step.seq, source=step.target, target=step.source,
+                                           op_index=step.op_index, done=True))
+            if self.session is not None:
+                # 逐条提交：同一条 UPDATE 内交换路径会触发 file_path 唯一约束
+                for step in reverted:
+                    self._commit_paths([step], None)
+
+    # ------------------------------------------------------------------
+    # database
+    # ------------------------------------------------------------------
+
+    def _write_journal(self, plan: RenamePlan) -> bool:
+        if self.session is None:
+            return False
+        from transcriptionist_v3.infrastructure.database.models import RenameJournalEntry
+
+        # 库中 DateTime 列均为 naive UTC（模型默认值 datetime.utcnow），去掉 tzinfo 保持一致
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        rows = [
+            {
+                "batch_id": plan.batch_id,
+                "seq": s.seq,
+                "level": s.level,
+                "source_path": s.source,
+                "target_path": s.target,
+                "overwrite": s.overwrite,
+                "state": STATE_PENDING,
+                "created_at": now,
+            }
+            for s in plan.steps
+        ]
+        try:
+            for i in range(0, len(rows), JOURNAL_INSERT_BATCH):
+                self.session.execute(insert(RenameJournalEntry), rows[i : i + JOURNAL_INSERT_BATCH])
+            self.session.commit()
+            return True
+        except Exception as e:
+            self.session.rollback()
+            logger.error(f"写入重命名日志失败，将不带日志执行: {e}")
+            return False
+
+    def _commit_paths(self, steps: List[RenameStep], batch_id: Optional[str]) -> bool:
+        """分批更新 audio_files 路径（每批一个事务；给出 batch_id 时同时标记日志行 committed）。"""
+        if not steps:
+            return True
+        ok = True
+        # 库中 DateTime 列均为 naive UTC（模型默认值 datetime.utcnow），去掉 tzinfo 保持一致
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        for i in range(0, len(steps), PATH_UPDATE_BATCH):
+            batch = steps[i : i + PATH_UPDATE_BATCH]
+            try:
+                self._commit_batch(batch, batch_id, now)
+            except IntegrityError:
+                # 目标路径上残留了已不存在文件的旧记录：逐条重试，只跳过冲突的行
+                self.session.rollback()
+                for step in batch:
+                    try:
+                        self._commit_batch([step], batch_id, now)
+                    except Exception as e:
+                        self.session.rollback()
+                        ok = False
+                        logger.error(f"更新数据库路径失败: {step.source} -> {step.target}, 错误: {e}")
+            except Exception as e:
+                self.session.rollback()
+                ok = False
+                logger.error(f"批量更新数据库路径失败: {e}")
+        return ok
+
+    def _commit_batch(self, batch: List[RenameStep], batch_id: Optional[str], now: datetime) -> None:
+        from transcriptionist_v3.infrastructure.database.models import AudioFile, RenameJournalEntry
+
+        overwritten = [os.path.normpath(s.target) for s in batch if s.overwrite]
+        if overwritten:
+            # 被覆盖文件的旧记录（否则 file_path 唯一约束冲突）
+            self.session.execute(delete(AudioFile).where(AudioFile.file_path.in_(overwritten)))
+        self._update_paths(
+            [(os.path.normpath(s.source), os.path.normpath(s.target), Path(s.target).name) for s in batch], now
+        )
+        if batch_id is not None:
+            self.session.execute(
+                update(RenameJournalEntry)
+                .where(RenameJournalEntry.batch_id == batch_id)
+                .where(RenameJournalEntry.seq.in_([s.seq for s in batch]))
+                .values(state=STATE_COMMITTED)
+            )
+        self.session.commit()
+
+    def _update_paths(self, rows: List[Tuple[str, str, str]], now: datetime) -> None:
+        """UPDATE audio_files ... FROM (VALUES (old, new, name), ...)。"""
+        params: Dict[str, object] = {"now": now}
+        values = []
+        for n, (old, new, name) in enumerate(rows):
+            params[f"o{n}"], params[f"n{n}"], params[f"f{n}"] = old, new, name
+            values.append(f"(:o{n}, :n{n}, :f{n})")
+        # SQLite 的 VALUES 列名固定为 column1..N；其他方言显式给出同名列别名
+        alias = "v" if self.session.bind.dialect.name == "sqlite" else "v(column1, column2, column3)"
+        self.session.execute(
+            text(
+                "UPDATE audio_files SET file_path = v.column2, filename = v.column3, modified_at = :now "
+                f"FROM (VALUES {', '.join(values)}) AS {alias} "
+                "WHERE audio_files.file_path = v.column1"
+            ),
+            params,
+        )
+
+    def _clear_journal(self, batch_id: str) -> None:
+        from transcriptionist_v3.infrastructure.database.models import RenameJournalEntry
+
+        try:
+            self.session.execute(delete(RenameJournalEntry).where(RenameJournalEntry.batch_id == batch_id))
+            self.session.commit()
+        except Exception as e:
+            self.session.rollback()
+            logger.error(f"清理重命名日志失败: {e}")
+
+    # ------------------------------------------------------------------
+    # recovery
+    # ------------------------------------------------------------------
+
+    def pending_batches(self) -> List[str]:
+        """残留日志（被中断）的批次 ID。"""
+        if self.session is None:
+            return []
+        from transcriptionist_v3.infrastructure.database.models import RenameJournalEntry
+
+        return [
+            batch_id
+            for (batch_id,) in self.session.query(RenameJournalEntry.batch_id)
+            .distinct()
+            .order_by(RenameJournalEntry.batch_id)
+            .all()
+        ]
+
+    def recover(self, batch_id: str, revert: bool = False) -> RenamePlan:
+        """
+        恢复被中断的批次。
+
+        - 续做（默认）：磁盘上已完成的步骤补提交数据库，未执行的步骤继续执行
+        - 回滚（revert=True）：按逆序把已移动的文件移回原路径，已提交的数据库路径一并还原
+        """
+        from transcriptionist_v3.infrastructure.database.models import RenameJournalEntry
+
+        rows = (
+            self.session.query(RenameJournalEntry)
+            .filter(RenameJournalEntry.batch_id == batch_id)
+            .order_by(RenameJournalEntry.seq)
+            .all()
+        )
+        steps = [
+            RenameStep(
+                seq=r.seq, source=r.source_path, target=r.target_path, op_index=r.seq,
+                level=r.level, overwrite=bool(r.overwrite),
+                done=r.state == STATE_COMMITTED,
+            )
+            for r in rows
+        ]
+        committed = {s.seq for s in steps if s.done}
+        plan = RenamePlan(batch_id=batch_id, steps=steps)
+
+        if revert:
+            for step in sorted(steps, key=lambda s: s.seq, reverse=True):
+                if not _moved_on_disk(step.source, step.target):
+                    step.done = False
+                    continue
+                try:
+                    _move(step.target, step.source, False)
+                except Exception as e:
+                    step.error = str(e)
+                    logger.error(f"回滚重命名失败: {step.target} -> {step.source}, 错误: {e}")
+                    continue
+                step.done = False
+                if step.seq in committed:
+                    self._commit_paths(
+                        [RenameStep(seq=step.seq, source=step.target, target=step.source, op_index=step.seq)], None
+                    )
+            logger.info(f"已回滚被中断的重命名批次 {batch_id}")
+        else:
+            for level_steps in plan.levels:
+                pending = [s for s in level_steps if s.seq not in committed]
+                for step in pending:
+                    if _moved_on_disk(step.source, step.target):
+                        step.done = True
+                    elif os.path.lexists(step.source):
+                        self._run_group([step])
+                    else:
+                        step.error = f"源文件不存在: {step.source}"
+                self._commit_paths([s for s in pending if s.done], batch_id)
+            logger.info(f"已续做被中断的重命名批次 {batch_id}")
+
+        self._clear_journal(batch_id)
+        return plan
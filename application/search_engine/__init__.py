@@ -22,6 +22,11 @@ from transcriptionist_v3.application.search_engine.query_orchestrator import (
     QueryOrchestratorResult,
     OrchestratedItem,
 )
+from transcriptionist_v3.application.search_engine.hybrid_search import (
+    HybridSearchPage,
+    HybridSearchService,
+    get_hybrid_search_service,
+)
 from transcriptionist_v3.application.search_engine.benchmark_gate_status import (
     BenchmarkGateSnapshot,
     BenchmarkGateStatusService,
@@ -40,6 +45,9 @@ __all__ = [
     'QueryObservation',
     'QueryOrchestratorResult',
     'OrchestratedItem',
+    'HybridSearchPage',
+    'HybridSearchService',
+    'get_hybrid_search_service',
     'BenchmarkGateSnapshot',
     'BenchmarkGateStatusService',
 ]
@@ -0,0 +1,400 @@
+"""
+Hybrid Search Service
+
+库页与 AI 检索页共用的应用层检索服务：文本一路走 ``SearchEngine``（SQLite FTS5 / LIKE），
+语义一路走常驻的 ``SemanticSearchEngine``（预归一化 embedding 矩阵，可选 IVF 近似索引），
+两路由 ``QueryOrchestrator`` 并发执行并做 RRF 融合。
+
+服务持有：
+- 词法索引：``SearchEngine``（自带查询缓存），命中的数据库 ID 统一换成文件路径作为融合键
+- 常驻 embedding 矩阵：由 AI 检索页在索引加载完成后挂载（列式存储或内存字典两种来源）
+- 查询文本 embedding 缓存：内存 LRU，重复查询 / 翻页不再走文本编码器
+- 融合结果缓存：同一查询翻页直接切片，不重复检索
+
+返回分页后的 ``HybridSearchPage``，附带各阶段耗时（编码 / 文本 / 语义 / 融合 / 总计）。
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from transcriptionist_v3.application.search_engine.query_orchestrator import (
+    OrchestratedItem,
+    QueryObservation,
+    QueryOrchestrator,
+    QueryPlan,
+)
+
+logger = logging.getLogger(__name__)
+
+SQLITE_IN_BATCH = 500
+# 融合结果缓存条数（按 查询 + 模式 + top_k 区分）
+RESULT_CACHE_SIZE = 32
+# 查询文本 embedding 的内存缓存条数
+QUERY_EMBEDDING_CACHE_SIZE = 512
+
+TextEncoder = Callable[[str], Optional[np.ndarray]]
+
+
+@dataclass
+class HybridSearchPage:
+    """一页融合结果。"""
+
+    query_text: str
+    mode: str
+    items: List[OrchestratedItem] = field(default_factory=list)
+    total: int = 0
+    page: int = 0
+    page_size: int = 0
+    observation: QueryObservation = field(default_factory=QueryObservation)
+    encode_ms: float = 0.0
+    # 翻页命中融合结果缓存时为 True（observation 为首次检索时的统计）
+    cached: bool = False
+
+    @property
+    def has_more(self) -> bool:
+        return (self.page + 1) * self.page_size < self.total
+
+    @property
+    def keys(self) -> List[str]:
+        return [item.key for item in self.items]
+
+    def timings(self) -> Dict[str, float]:
+        obs = self.observation
+        return {
+            "encode_ms": self.encode_ms,
+            "lexical_ms": obs.lexical_ms,
+            "semantic_ms": obs.semantic_ms,
+            "fuse_ms": obs.fuse_ms,
+            "total_ms": obs.total_ms,
+        }
+
+    def describe_timings(self) -> str:
+        """状态栏用的简短耗时说明。"""
+        obs = self.observation
+        parts = []
+        if self.mode in ("lexical", "hybrid"):
+            parts.append("文本超时" if obs.lexical_timed_out else f"文本 {obs.lexical_ms:.0f}ms")
+        if self.mode in ("semantic", "hybrid"):
+            parts.append("语义超时" if obs.semantic_timed_out else f"语义 {obs.semantic_ms:.0f}ms")
+        if self.mode == "hybrid":
+            parts.append(f"融合 {obs.fuse_ms:.0f}ms")
+        parts.append(f"共 {obs.total_ms:.0f}ms")
+        return " / ".join(parts)
+
+
+@dataclass
+class _CachedResult:
+    items: List[OrchestratedItem]
+    observation: QueryObservation
+    encode_ms: float
+
+
+class HybridSearchService:
+    """
+    混合检索服务（线程安全，可在 worker 线程中调用）。
+
+    Args:
+        session_factory: 返回数据库会话上下文的工厂，默认 ``connection.session_scope``
+        orchestrator: 查询编排器，默认新建
+    """
+
+    def __init__(self, session_factory=None, orchestrator: Optional[QueryOrchestrator] = None):
+        self._session_factory = session_factory
+        self._orchestrator = orchestrator or QueryOrchestrator()
+        self._search_engine = None
+        self._lock = threading.RLock()
+        self._semantic = None
+        self._ann = None
+        self._semantic_source: Tuple = ()
+        self._text_encoder: Optional[TextEncoder] = None
+        self._model_version = ""
+        self._query_embeddings = None
+        self._results: "OrderedDict[tuple, _CachedResult]" = OrderedDict()
+        self._generation = 0
+
+    # ------------------------------------------------------------------
+    # 词法索引
+    # ------------------------------------------------------------------
+
+    def _scope(self):
+        if self._session_factory is not None:
+            return self._session_factory()
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+
+        return session_scope()
+
+    @property
+    def search_engine(self):
+        """词法检索引擎（``SearchEngine``），首次访问时创建。"""
+        with self._lock:
+            if self._search_engine is None:
+                from transcriptionist_v3.application.search_engine.search_engine import SearchEngine
+
+                self._search_engine = SearchEngine(self._scope)
+            return self._search_engine
+
+    def _lexical_search(self, query_text: str, top_k: int) -> List[Tuple[str, float]]:
+        engine = self.search_engine
+        query = engine.parse_query(query_text)
+        query.limit = max(1, int(top_k))
+        result = engine.execute_sync(query)
+        ids = list(dict.fromkeys(int(i) for i in result.file_ids))
+        if not ids:
+            return []
+        from transcriptionist_v3.infrastructure.database.models import AudioFile
+
+        path_of: Dict[int, str] = {}
+        with self._scope() as session:
+            for i in range(0, len(ids), SQLITE_IN_BATCH):
+                batch = ids[i : i + SQLITE_IN_BATCH]
+                for file_id, file_path in session.query(AudioFile.id, AudioFile.file_path).filter(
+                    AudioFile.id.in_(batch)
+                ):
+                    path_of[int(file_id)] = file_path
+        scores = result.scores or {}
+        return [(path_of[i], float(scores.get(i, 0.0))) for i in ids if i in path_of]
+
+    # ------------------------------------------------------------------
+    # 常驻 embedding 矩阵与文本编码
+    # ------------------------------------------------------------------
+
+    def attach_store(self, index_dir, base_name: str = "clap_embeddings") -> int:
+        """
+        挂载列式 embedding 存储（``EmbeddingStore``）：矩阵由 ``get_store_engine`` 常驻复用，
+        行数达到阈值且已训练时一并挂载 IVF 近似索引。返回可检索的行数。
+        """
+        from transcriptionist_v3.application.ai.semantic_search import get_store_engine
+        from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore
+        from transcriptionist_v3.core.config import AppConfig
+
+        store = EmbeddingStore(index_dir, base_name=base_name)
+        engine = get_store_engine(store)
+        ann = None
+        if AppConfig.get("ai.ann_enabled", True) and engine.size >= int(AppConfig.get("ai.ann_min_rows", 200000)):
+            try:
+                from transcriptionist_v3.application.ai.ann_index import get_store_ann
+
+                ann = get_store_ann(store, engine, nprobe=int(AppConfig.get("ai.ann_nprobe", 32)))
+            except Exception as e:
+                logger.warning(f"ANN index unavailable, falling back to exact search: {e}")
+        self._set_semantic(engine, ann, ("store", str(index_dir), base_name))
+        return engine.size
+
+    def set_embeddings(self, keys: Sequence[str], matrix: np.ndarray) -> int:
+        """挂载内存中的 embedding 矩阵（行与 keys 一一对应）。"""
+        from transcriptionist_v3.application.ai.semantic_search import SemanticSearchEngine
+
+        engine = SemanticSearchEngine()
+        engine.set_embeddings(keys, matrix)
+        self._set_semantic(engine, None, ("matrix", id(matrix)))
+        return engine.size
+
+    def set_embedding_dict(self, embeddings: Dict[str, np.ndarray]) -> int:
+        """挂载旧格式的 {path: vector} 索引；同一个字典且条数未变时复用已构建的矩阵。"""
+        source = ("dict", id(embeddings), len(embeddings))
+        with self._lock:
+            if self._semantic is not None and self._semantic_source == source:
+                return self._semantic.size
+        from transcriptionist_v3.application.ai.semantic_search import SemanticSearchEngine
+
+        engine = SemanticSearchEngine.from_dict({str(k): v for k, v in embeddings.items()})
+        self._set_semantic(engine, None, source)
+        return engine.size
+
+    def clear_embeddings(self) -> None:
+        self._set_semantic(None, None, ())
+
+    def _set_semantic(self, engine, ann, source: Tuple) -> None:
+        with self._lock:
+            # 重复挂载同一份常驻矩阵（每次检索前都会调用）时保留融合结果缓存
+            if engine is self._semantic and ann is self._ann and source == self._semantic_source:
+                return
+            self._semantic = engine
+            self._ann = ann
+            self._semantic_source = source
+            self._bump()
+
+    def set_text_encoder(self, encoder: Optional[TextEncoder], model_version: str = "") -> None:
+        """设置查询文本编码器（返回 L2 归一化向量或 None）；模型版本变化时清空查询 embedding 缓存。"""
+        with self._lock:
+            if encoder is self._text_encoder and model_version == self._model_version:
+                return
+            self._text_encoder = encoder
+            if model_version != self._model_version or self._query_embeddings is None:
+                from transcriptionist_v3.application.ai.text_embedding_cache import TextEmbeddingCache
+
+                self._query_embeddings = TextEmbeddingCache(
+                    None, model_version, memory_limit=QUERY_EMBEDDING_CACHE_SIZE
+                )
+                self._model_version = model_version
+            self._bump()
+
+    @property
+    def semantic_ready(self) -> bool:
+        with self._lock:
+            return self._semantic is not None and self._semantic.size > 0 and self._text_encoder is not None
+
+    @property
+    def semantic_size(self) -> int:
+        with self._lock:
+            return self._semantic.size if self._semantic is not None else 0
+
+    def _encode(self, text: str):
+        with self._lock:
+            encoder = self._text_encoder
+            cache = self._query_embeddings
+        if encoder is None:
+            return None
+        vector = cache.get(text) if cache is not None else None
+        if vector is not None:
+            return vector
+        vector = encoder(text)
+        if vector is None:
+            return None
+        vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+        if cache is not None:
+            cache.put_many([text], vector.reshape(1, -1))
+        return vector
+
+    # ------------------------------------------------------------------
+    # 检索
+    # ------------------------------------------------------------------
+
+    def invalidate(self) -> None:
+        """库内容变化（导入 / 重命名 / 删除 / 打标）后调用：清空词法查询缓存与融合结果缓存。"""
+        with self._lock:
+            if self._search_engine is not None:
+                self._search_engine.invalidate_cache()
+            self._bump()
+
+    def _bump(self) -> None:
+        self._generation += 1
+        self._results.clear()
+
+    @staticmethod
+    def build_plan(mode: str, top_k: int) -> QueryPlan:
+        """按配置构建查询计划（RRF 参数与两路截止时间）。"""
+        from transcriptionist_v3.core.config import AppConfig
+
+        return QueryPlan(
+            mode=mode,
+            top_k=max(1, int(top_k)),
+            rrf_k=int(AppConfig.get("ai.search_rrf_k", 60)),
+            lexical_weight=float(AppConfig.get("ai.search_rrf_lexical_weight", 1.0)),
+            semantic_weight=float(AppConfig.get("ai.search_rrf_semantic_weight", 1.0)),
+            lexical_deadline_ms=float(AppConfig.get("ai.search_lexical_deadline_ms", 0) or 0),
+            semantic_deadline_ms=float(AppConfig.get("ai.search_semantic_deadline_ms", 0) or 0),
+        )
+
+    def search(
+        self,
+        query_text: str,
+        mode: str = "hybrid",
+        top_k: int = 500,
+        page: int = 0,
+        page_size: int = 50,
+        semantic_text: Optional[str] = None,
+        plan: Optional[QueryPlan] = None,
+    ) -> HybridSearchPage:
+        """
+        执行检索并返回第 ``page`` 页。
+
+        Args:
+            query_text: 文本一路的查询（支持 SearchEngine 查询语法）
+            mode: "lexical" | "semantic" | "hybrid"；语义一路未就绪时 hybrid 退化为 lexical
+            top_k: 每一路召回条数，也是融合结果的上限
+            semantic_text: 语义一路使用的文本（如中文查询的英文译文），默认同 query_text
+            plan: 显式查询计划（默认按配置构建）；给出时忽略 mode / top_k
+        """
+        query_text = (query_text or "").strip()
+        semantic_text = (semantic_text or query_text).strip()
+        plan = plan or self.build_plan(mode, top_k)
+        mode = self._effective_mode((plan.mode or "hybrid").strip().lower())
+        page = max(0, int(page))
+        page_size = max(1, int(page_size))
+
+        key = (query_text, semantic_text, mode, plan.top_k)
+        with self._lock:
+            cached = self._results.get(key) if query_text else None
+            if cached is not None:
+                self._results.move_to_end(key)
+            generation = self._generation
+        hit = cached is not None
+        if cached is None:
+            cached = self._execute(query_text, semantic_text, mode, plan)
+            with self._lock:
+                # 检索期间索引 / 编码器发生变化时不缓存旧结果；某一路超时的截断结果也不缓存
+                if generation == self._generation and query_text and not cached.observation.partial:
+                    self._results[key] = cached
+                    while len(self._results) > RESULT_CACHE_SIZE:
+                        self._results.popitem(last=False)
+
+        start = page * page_size
+        return HybridSearchPage(
+            query_text=query_text,
+            mode=mode,
+            items=cached.items[start : start + page_size],
+            total=len(cached.items),
+            page=page,
+            page_size=page_size,
+            observation=cached.observation,
+            encode_ms=cached.encode_ms,
+            cached=hit,
+        )
+
+    def _effective_mode(self, mode: str) -> str:
+        if mode not in ("lexical", "semantic", "hybrid"):
+            mode = "hybrid"
+        if mode == "hybrid" and not self.semantic_ready:
+            return "lexical"
+        return mode
+
+    def _execute(self, query_text: str, semantic_text: str, mode: str, plan: QueryPlan) -> _CachedResult:
+        if not query_text:
+            return _CachedResult([], QueryObservation(), 0.0)
+        with self._lock:
+            engine = self._ann or self._semantic
+        timing = {"encode_ms": 0.0}
+
+        def _semantic_retriever(_text: str, k: int) -> List[Tuple[str, float]]:
+            t0 = time.perf_counter()
+            vector = self._encode(semantic_text)
+            timing["encode_ms"] = (time.perf_counter() - t0) * 1000.0
+            if vector is None or engine is None:
+                return []
+            return engine.search(vector, top_k=k)
+
+        result = self._orchestrator.execute(
+            query_text,
+            replace(plan, mode=mode),
+            lexical_retriever=self._lexical_search if mode in ("lexical", "hybrid") else None,
+            semantic_retriever=_semantic_retriever if mode in ("semantic", "hybrid") else None,
+        )
+        obs = result.observation
+        logger.info(
+            f"Search '{query_text}' ({mode}): lexical={obs.lexical_count} in {obs.lexical_ms:.1f} ms, "
+            f"semantic={obs.semantic_count} in {obs.semantic_ms:.1f} ms, fused={obs.fused_count}, "
+            f"total {obs.total_ms:.1f} ms{' (partial)' if obs.partial else ''}"
+        )
+        return _CachedResult(result.items, obs, timing["encode_ms"])
+
+
+_service: Optional[HybridSearchService] = None
+_service_lock = threading.Lock()
+
+
+def get_hybrid_search_service() -> HybridSearchService:
+    """应用内共享的混合检索服务（库页与 AI 检索页共用同一份常驻矩阵与缓存）。"""
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = HybridSearchService()
+        return _service
@@ -2,17 +2,60 @@
 Query Orchestrator
 
 Unifies lexical/semantic retrieval and optional RRF fusion.
+
+hybrid 模式下两路检索在共享线程池中并发执行，总耗时约为 max(lexical, semantic) + fuse；
+每一路可设独立的截止时间（从 ``execute`` 开始计时），超时的一路结果被丢弃并在
+``QueryObservation`` 中标记，另一路照常返回（单源退化，结果仍然有效）。
+超时的一路无法中断、仍占用线程；这类“放弃”的检索达到上限时，新查询改为在调用线程中
+顺序执行（不设截止时间），而不是排队等待被占满的线程池。
 """
 
 from __future__ import annotations
 
+import logging
+import threading
 import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass, field
-from typing import Callable, Dict, List, Sequence, Tuple
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
 
+logger = logging.getLogger(__name__)
 
 Retriever = Callable[[str, int], Sequence[Tuple[str, float]]]
 
+# 检索线程池：超时的一路无法中断，只能放任其跑完，因此留出富余线程给后续查询
+_LEG_POOL_WORKERS = 8
+_leg_pool: Optional[ThreadPoolExecutor] = None
+_leg_pool_lock = threading.Lock()
+# 已超时但仍在运行的检索；达到上限后不再向线程池提交（留出线程，避免后续查询排队）
+_MAX_ABANDONED_LEGS = _LEG_POOL_WORKERS - 2
+_abandoned_legs: set = set()
+
+
+def _get_leg_pool() -> ThreadPoolExecutor:
+    global _leg_pool
+    with _leg_pool_lock:
+        if _leg_pool is None:
+            _leg_pool = ThreadPoolExecutor(max_workers=_LEG_POOL_WORKERS, thread_name_prefix="query-leg")
+        return _leg_pool
+
+
+def _abandon_leg(future: Future) -> None:
+    """登记一路超时仍在运行的检索，跑完后自动移除。"""
+    with _leg_pool_lock:
+        _abandoned_legs.add(future)
+    future.add_done_callback(_release_leg)
+
+
+def _release_leg(future: Future) -> None:
+    with _leg_pool_lock:
+        _abandoned_legs.discard(future)
+
+
+def _leg_pool_saturated() -> bool:
+    with _leg_pool_lock:
+        return len(_abandoned_legs) >= _MAX_ABANDONED_LEGS
+
 
 @dataclass
 class QueryPlan:
@@ -21,6 +64,9 @@ class QueryPlan:
     rrf_k: int = 60
     lexical_weight: float = 1.0
     semantic_weight: float = 1.0
+    # 各路截止时间（毫秒，从 execute 开始计时）；<= 0 表示不限时
+    lexical_deadline_ms: float = 0.0
+    semantic_deadline_ms: float = 0.0
 
 
 @dataclass
@@ -40,6 +86,13 @@ class QueryObservation:
     semantic_ms: float = 0.0
     fuse_ms: float = 0.0
     total_ms: float = 0.0
+    # 超时 / 出错的一路：结果被丢弃，*_ms 为等待该路的时长
+    lexical_timed_out: bool = False
+    semantic_timed_out: bool = False
+    lexical_error: str = ""
+    semantic_error: str = ""
+    # 启用的某一路没有贡献结果（超时或出错），items 仅来自另一路
+    partial: bool = False
 
 
 @dataclass
@@ -65,19 +118,46 @@ class QueryOrchestrator:
         semantic_hits: List[Tuple[str, float]] = []
 
         normalized_mode = (plan.mode or "hybrid").strip().lower()
-        enable_lexical = normalized_mode in {"lexical", "hybrid"}
-        enable_semantic = normalized_mode in {"semantic", "hybrid"}
+        run_lexical = normalized_mode in {"lexical", "hybrid"} and lexical_retriever is not None
+        run_semantic = normalized_mode in {"semantic", "hybrid"} and semantic_retriever is not None
 
-        if enable_lexical and lexical_retriever:
-            t0 = time.perf_counter()
-            lexical_hits = self._normalize_hits(lexical_retriever(query_text, plan.top_k))
-            observation.lexical_ms = (time.perf_counter() - t0) * 1000.0
+        if run_lexical and run_semantic and _leg_pool_saturated():
+            # 线程池被超时的检索占满：在调用线程中顺序执行两路（无法限时，但不会排队卡住）
+            logger.warning("Query leg pool saturated by timed-out retrievals, running legs sequentially")
+            lexical_hits, observation.lexical_ms = self._run_leg(lexical_retriever, query_text, plan.top_k)
+            semantic_hits, observation.semantic_ms = self._run_leg(semantic_retriever, query_text, plan.top_k)
             observation.lexical_count = len(lexical_hits)
-
-        if enable_semantic and semantic_retriever:
-            t0 = time.perf_counter()
-            semantic_hits = self._normalize_hits(semantic_retriever(query_text, plan.top_k))
-            observation.semantic_ms = (time.perf_counter() - t0) * 1000.0
+            observation.semantic_count = len(semantic_hits)
+        elif run_lexical and run_semantic:
+            # 两路并发：各自提交到线程池，按各自的截止时间等待
+            pool = _get_leg_pool()
+            lexical_future = pool.submit(self._run_leg, lexical_retriever, query_text, plan.top_k)
+            semantic_future = pool.submit(self._run_leg, semantic_retriever, query_text, plan.top_k)
+            (
+                lexical_hits,
+                observation.lexical_ms,
+                observation.lexical_timed_out,
+                observation.lexical_error,
+            ) = self._await_leg("lexical", lexical_future, plan.lexical_deadline_ms, started)
+            (
+                semantic_hits,
+                observation.semantic_ms,
+                observation.semantic_timed_out,
+                observation.semantic_error,
+            ) = self._await_leg("semantic", semantic_future, plan.semantic_deadline_ms, started)
+            observation.lexical_count = len(lexical_hits)
+            observation.semantic_count = len(semantic_hits)
+            observation.partial = bool(
+                observation.lexical_timed_out
+                or observation.lexical_error
+                or observation.semantic_timed_out
+                or observation.semantic_error
+            )
+        elif run_lexical:
+            lexical_hits, observation.lexical_ms = self._run_leg(lexical_retriever, query_text, plan.top_k)
+            observation.lexical_count = len(lexical_hits)
+        elif run_semantic:
+            semantic_hits, observation.semantic_ms = self._run_leg(semantic_retriever, query_text, plan.top_k)
             observation.semantic_count = len(semantic_hits)
 
         t0 = time.perf_counter()
@@ -87,6 +167,42 @@ class QueryOrchestrator:
         observation.total_ms = (time.perf_counter() - started) * 1000.0
         return QueryOrchestratorResult(items=items, observation=observation)
 
+    def _run_leg(
+        self, retriever: Retriever, query_text: str, top_k: int
+    ) -> Tuple[List[Tuple[str, float]], float]:
+        t0 = time.perf_counter()
+        hits = self._normalize_hits(retriever(query_text, top_k))
+        return hits, (time.perf_counter() - t0) * 1000.0
+
+    def _await_leg(
+        self,
+        source: str,
+        future: Future,
+        deadline_ms: float,
+        started: float,
+    ) -> Tuple[List[Tuple[str, float]], float, bool, str]:
+        """
+        等待一路检索。
+
+        Returns:
+            (hits, 耗时毫秒, 是否超时, 错误信息)；超时或出错时 hits 为空，耗时为等待该路的时长
+        """
+        timeout = None
+        if deadline_ms and deadline_ms > 0:
+            timeout = max(0.0, deadline_ms / 1000.0 - (time.perf_counter() - started))
+        try:
+            hits, elapsed_ms = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            # 尚未开始的直接取消；已在运行的无法中断，登记为放弃，跑完后结果丢弃
+            if not future.cancel():
+                _abandon_leg(future)
+            logger.warning(f"{source} retrieval missed its {deadline_ms:.0f} ms deadline, returning partial results")
+            return [], (time.perf_counter() - started) * 1000.0, True, ""
+        except Exception as e:
+            logger.error(f"{source} retrieval failed: {e}")
+            return [], (time.perf_counter() - started) * 1000.0, False, str(e) or type(e).__name__
+        return hits, elapsed_ms, False, ""
+
     def merge_ranked_lists(
         self,
         lexical_hits: Sequence[Tuple[str, float]],
@@ -6,6 +6,7 @@ Implements the core search functionality including:
 - Field-specific searches
 - Wildcard pattern matching
 - Relevance scoring with TF-IDF
+- SQLite FTS5 full-text matching with bm25 ranking (falls back to LIKE)
 - Query caching
 """
 
@@ -23,7 +24,7 @@ from datetime import datetime
 from functools import lru_cache
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
 
-from sqlalchemy import and_, or_, not_, func, text
+from sqlalchemy import and_, or_, not_, func, text, column, literal_column, table
 from sqlalchemy.orm import Session
 
 from transcriptionist_v3.domain.models.search import (
@@ -31,6 +32,13 @@ from transcriptionist_v3.domain.models.search import (
     SearchQuery, SearchResult, SavedSearch, SearchFilters
 )
 from transcriptionist_v3.application.search_engine.query_parser import QueryParser
+from transcriptionist_v3.infrastructure.database.fts import (
+    FTS_BM25_WEIGHTS,
+    FTS_MIN_TERM_LENGTH,
+    FTS_TABLE,
+    fts_exists,
+    quote_fts_phrase,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -191,6 +199,8 @@ class SearchEngine:
         'description': 'description',
         'size': 'file_size',
         'tags': '_tags',  # Special handling
+        'dup': '_duplicate',  # Special handling: 近似重复检测结果
+        'duplicate': '_duplicate',
     }
     
     def __init__(self, session_factory: Callable[[], Session]):
@@ -204,6 +214,8 @@ class SearchEngine:
         self._parser = QueryParser()
         self._cache = QueryCache()
         self._scorer = TFIDFScorer()
+        # FTS5 表是否可用（首次查询时探测）
+        self._fts_available: Optional[bool] = None
     
     def parse_query(self, query_string: str) -> SearchQuery:
         """Parse a query string into a SearchQuery object."""
@@ -291,6 +303,12 @@ class SearchEngine:
         """Execute query against database."""
         from transcriptionist_v3.infrastructure.database.models import AudioFile as AudioFileModel
         
+        # 全文检索优先走 FTS5：bm25 排序在 LIMIT/OFFSET 之前完成
+        if query.parsed is not None and self._fts_ready(session):
+            fts_result = self._execute_fts_query(session, query, AudioFileModel)
+            if fts_result is not None:
+                return fts_result
+        
         # Start with base query
         base_query = session.query(AudioFileModel.id, AudioFileModel.filename)
         
@@ -321,6 +339,100 @@ class SearchEngine:
         
         return file_ids, scores
     
+    def _fts_ready(self, session: Session) -> bool:
+        """FTS5 表是否存在（结果缓存；探测失败视为不可用）。"""
+        if self._fts_available is None:
+            try:
+                self._fts_available = fts_exists(session)
+            except Exception as e:
+                logger.debug(f"FTS availability check failed: {e}")
+                self._fts_available = False
+        return self._fts_available
+    
+    def _execute_fts_query(
+        self,
+        session: Session,
+        query: SearchQuery,
+        model: Any
+    ) -> Optional[Tuple[List[int], Dict[int, float]]]:
+        """
+        顶层 AND 的各个子条件中，能表达为 FTS5 MATCH 的合并成一个 MATCH 表达式，
+        其余（字段比较、短词、通配符、取反）仍按 SQL 条件过滤。没有可用的 MATCH 部分时返回 None。
+        """
+        match_parts = []
+        sql_nodes = []
+        for node in self._split_conjuncts(query.parsed):
+            expr = self._build_fts_match(node)
+            if expr is None:
+                sql_nodes.append(node)
+            else:
+                match_parts.append(expr)
+        if not match_parts:
+            return None
+        
+        match_expr = " AND ".join(f"({part})" for part in match_parts)
+        fts_table = table(FTS_TABLE, column("rowid"))
+        fts_ref = literal_column(FTS_TABLE)
+        rank = func.bm25(fts_ref, *FTS_BM25_WEIGHTS).label("rank")
+        
+        base_query = (
+            session.query(model.id, rank)
+            .join(fts_table, fts_table.c.rowid == model.id)
+            .filter(fts_ref.op("MATCH")(match_expr))
+        )
+        for node in sql_nodes:
+            condition = self._build_condition(node, model)
+            if condition is not None:
+                base_query = base_query.filter(condition)
+        base_query = self._apply_filters(base_query, query.filters, model)
+        
+        try:
+            results = (
+                base_query.order_by(rank, model.id)
+                .limit(query.limit)
+                .offset(query.offset)
+                .all()
+            )
+        except Exception as e:
+            logger.warning(f"FTS query failed, falling back to LIKE: {e}")
+            return None
+        
+        # bm25 越小越相关，取负作为分数（越大越相关）
+        file_ids = [file_id for file_id, _ in results]
+        scores = {file_id: -float(score) for file_id, score in results}
+        return file_ids, scores
+    
+    def _split_conjuncts(
+        self,
+        node: Union[SearchTerm, SearchExpression]
+    ) -> List[Union[SearchTerm, SearchExpression]]:
+        """展开顶层 AND 链。"""
+        if isinstance(node, SearchExpression) and node.operator == SearchOperator.AND:
+            return self._split_conjuncts(node.left) + self._split_conjuncts(node.right)
+        return [node]
+    
+    def _build_fts_match(self, node: Union[SearchTerm, SearchExpression]) -> Optional[str]:
+        """把查询节点转成 FTS5 MATCH 表达式；无法等价表达时返回 None。"""
+        if isinstance(node, SearchTerm):
+            if node.negated or node.operator != FieldOperator.CONTAINS:
+                return None
+            value = node.value.strip()
+            # trigram 子串匹配：短于 3 个字符的词无法命中；通配符交给 LIKE
+            if len(value) < FTS_MIN_TERM_LENGTH or '*' in value or '?' in value:
+                return None
+            if not node.field:
+                return quote_fts_phrase(value)
+            if self.FIELD_MAPPINGS.get(node.field.lower()) == '_tags':
+                return f"tags : {quote_fts_phrase(value)}"
+            return None
+        if isinstance(node, SearchExpression):
+            left = self._build_fts_match(node.left)
+            right = self._build_fts_match(node.right)
+            if left is None or right is None:
+                return None
+            return f"({left}) {node.operator.value} ({right})"
+        return None
+    
     def _build_condition(
         self, 
         node: Union[SearchTerm, SearchExpression],
@@ -360,6 +472,8 @@ class SearchEngine:
         # Special handling for tags
         if column_name == '_tags':
             return self._build_tag_condition(term, model)
+        if column_name == '_duplicate':
+            return self._build_duplicate_condition(term, model)
         
         column = getattr(model, column_name, None)
         if column is None:
@@ -413,6 +527,31 @@ class SearchEngine:
         # 返回条件：文件 ID 在子查询结果中
         return model.id.in_(subquery)
     
+    def _build_duplicate_condition(self, term: SearchTerm, model: Any) -> Any:
+        """
+        Build condition for near-duplicate results.
+
+        dup:yes 为可隐藏的重复文件（组内非 keeper），dup:no 为其余文件（唯一文件与 keeper），
+        dup:keeper 为各组保留文件，dup:any 为所有组成员。
+        """
+        from transcriptionist_v3.infrastructure.database.models import DuplicateMember
+        
+        value = term.value.strip().lower()
+        members = DuplicateMember.__table__.select().with_only_columns(DuplicateMember.audio_file_id)
+        
+        if value in ('keeper', 'keep'):
+            return model.id.in_(members.where(DuplicateMember.is_keeper.is_(True)))
+        if value in ('any', 'all', 'group'):
+            return model.id.in_(members)
+        
+        duplicates = model.id.in_(members.where(DuplicateMember.is_keeper.is_(False)))
+        if value in ('no', 'false', '0'):
+            return not_(duplicates)
+        if value in ('yes', 'true', '1'):
+            return duplicates
+        logger.warning(f"Unknown duplicate filter: {value}")
+        return None
+    
     def _build_fulltext_condition(self, term: SearchTerm, model: Any) -> Any:
         """Build full-text search condition."""
         value = term.value
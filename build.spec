@@ -58,7 +58,7 @@ hiddenimports = [
     "transcriptionist_v3.application.ai_engine.providers.kling_audio",
     "transcriptionist_v3.application.ai_engine.providers.hy_mt15_onnx",
     "transcriptionist_v3.ui.utils.ucs_labels_data",
-    "transcriptionist_v3.ui.utils.audioset_labels",
+    "transcriptionist_v3.application.ai.audioset_labels",
     "multiprocessing",
     "multiprocessing.spawn",
     "multiprocessing.pool",
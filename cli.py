@@ -0,0 +1,825 @@
+"""
+Headless command line interface.
+
+无界面命令行：扫描 / 导入 / 建立索引 / 打标 / 检索 / 导出项目，直接调用界面后台线程所用的同一套
+应用层任务（``QueueScanner`` / ``ImportQueueProcessor`` / ``IndexJob`` / ``TaggingJob`` /
+``HybridSearchService`` / ``ProjectExporter``），不导入 PySide6，可在服务器与定时任务中运行。
+
+约定：
+- ``--json`` 时 stdout 只输出 JSON Lines 事件（start / progress / log / result / error），日志只写文件
+- 长任务都登记在 ``jobs`` 表中；Ctrl+C / SIGTERM 会让任务在当前批次结束后暂停并保存检查点，
+  之后用 ``--job-id`` 从断点继续（``jobs`` 子命令可列出可恢复的任务）
+- 配置、数据库与日志写在数据根目录下：``--data-dir`` > 环境变量 ``TRANSCRIPTIONIST_HOME`` >
+  用户数据目录（``$XDG_DATA_HOME/transcriptionist``，Windows 为 ``%APPDATA%/Transcriptionist``）；
+  与界面共用音效库时把 ``--data-dir`` 指向界面使用的目录
+- 退出码：0 成功；1 失败；2 参数错误；75 已暂停可恢复（EX_TEMPFAIL）；130 被强制中断
+
+Usage:
+    python -m transcriptionist_v3 scan /data/sfx --json
+    python -m transcriptionist_v3 index --folder /data/sfx
+    python -m transcriptionist_v3 tag --job-id 12
+    python -m transcriptionist_v3 search "rain -thunder" --mode hybrid --json
+    python -m transcriptionist_v3 export --project "Trailer" --output /tmp/out
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+EXIT_PAUSED = 75
+EXIT_INTERRUPTED = 130
+
+# 非 JSON 模式下进度输出的最小间隔（秒）；JSON 模式同样节流，避免大库刷屏
+PROGRESS_INTERVAL_S = 0.5
+
+COMMANDS = ("scan", "import", "index", "tag", "search", "export", "jobs")
+
+
+class CliError(Exception):
+    """命令执行失败（附带退出码）。"""
+
+    def __init__(self, message: str, exit_code: int = EXIT_FAILED):
+        super().__init__(message)
+        self.exit_code = exit_code
+
+
+class CancelToken:
+    """SIGINT / SIGTERM → 取消标志：第一次请求任务暂停，第二次强制中断。"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._hooks: List[Callable[[], None]] = []
+
+    def __call__(self) -> bool:
+        return self._event.is_set()
+
+    def on_cancel(self, hook: Callable[[], None]) -> None:
+        self._hooks.append(hook)
+
+    def cancel(self) -> None:
+        if self._event.is_set():
+            raise KeyboardInterrupt
+        self._event.set()
+        for hook in self._hooks:
+            try:
+                hook()
+            except Exception:
+                pass
+
+    def install(self) -> None:
+        def _handler(_signum, _frame):
+            self.cancel()
+
+        signal.signal(signal.SIGINT, _handler)
+        if hasattr(signal, "SIGTERM"):
+            signal.signal(signal.SIGTERM, _handler)
+
+
+class Reporter:
+    """事件输出：JSON Lines（机器可读）或简短文本（进度写 stderr，结果写 stdout）。"""
+
+    def __init__(self, command: str, json_mode: bool, stream=None):
+        self.command = command
+        self.json_mode = json_mode
+        self.stream = stream or sys.stdout
+        self.job_id: Optional[int] = None
+        self._last_progress = 0.0
+
+    def _emit(self, event: str, **fields) -> None:
+        payload = {"event": event, "command": self.command, "ts": round(time.time(), 3)}
+        if self.job_id is not None:
+            payload["job_id"] = self.job_id
+        payload.update(fields)
+        self.stream.write(json.dumps(payload, ensure_ascii=False, default=str) + "\n")
+        self.stream.flush()
+
+    def start(self, **fields) -> None:
+        if self.json_mode:
+            self._emit("start", **fields)
+
+    def progress(self, current: int, total: int, message: str = "") -> None:
+        now = time.monotonic()
+        if total and current < total and now - self._last_progress < PROGRESS_INTERVAL_S:
+            return
+        self._last_progress = now
+        if self.json_mode:
+            self._emit("progress", current=int(current), total=int(total), message=str(message or ""))
+        else:
+            sys.stderr.write(f"[{self.command}] {current}/{total} {message}\n")
+            sys.stderr.flush()
+
+    def log(self, message: str) -> None:
+        if self.json_mode:
+            self._emit("log", message=str(message))
+        else:
+            sys.stderr.write(f"[{self.command}] {message}\n")
+            sys.stderr.flush()
+
+    def result(self, status: str, **data) -> None:
+        if self.json_mode:
+            self._emit("result", status=status, **data)
+            return
+        self.stream.write(f"status: {status}\n")
+        if self.job_id is not None:
+            self.stream.write(f"job_id: {self.job_id}\n")
+        for key, value in data.items():
+            if isinstance(value, (list, dict)):
+                value = json.dumps(value, ensure_ascii=False, default=str)
+            self.stream.write(f"{key}: {value}\n")
+        self.stream.flush()
+
+    def error(self, message: str, exit_code: int) -> None:
+        if self.json_mode:
+            self._emit("error", message=str(message), exit_code=int(exit_code))
+        else:
+            sys.stderr.write(f"[{self.command}] 错误: {message}\n")
+            sys.stderr.flush()
+
+
+# ----------------------------------------------------------------------
+# 通用辅助
+# ----------------------------------------------------------------------
+
+def _status_exit_code(status: str) -> int:
+    from transcriptionist_v3.application.ai_jobs.job_constants import JOB_STATUS_DONE, JOB_STATUS_PAUSED
+
+    if status == JOB_STATUS_DONE:
+        return EXIT_OK
+    if status == JOB_STATUS_PAUSED:
+        return EXIT_PAUSED
+    return EXIT_FAILED
+
+
+def _load_job(job_id: int, job_types: Sequence[str]) -> dict:
+    """读取要恢复的任务；类型不符或已完成时报参数错误。"""
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.infrastructure.database.models import Job
+    from transcriptionist_v3.application.ai_jobs.job_constants import JOB_STATUS_DONE
+
+    with session_scope() as session:
+        job = session.get(Job, int(job_id))
+        if job is None:
+            raise CliError(f"任务不存在: {job_id}", EXIT_USAGE)
+        if job.job_type not in job_types:
+            raise CliError(f"任务 {job_id} 的类型为 {job.job_type}，不能用此命令恢复", EXIT_USAGE)
+        if job.status == JOB_STATUS_DONE:
+            raise CliError(f"任务 {job_id} 已完成", EXIT_USAGE)
+        selection = dict(job.selection or {})
+        # 与界面恢复任务一致：selection 缺失时用任务总数补全
+        if selection.get("count") in (None, 0) and job.total:
+            selection["count"] = int(job.total)
+        selection.setdefault("mode", "none")
+        return {
+            "id": job.id,
+            "type": job.job_type,
+            "status": job.status,
+            "selection": selection,
+            "params": dict(job.params or {}),
+            "checkpoint": dict(job.checkpoint or {}),
+        }
+
+
+def _build_selection(folders: Sequence[str] | None, files: Sequence[str] | None) -> dict:
+    """命令行选择 → selection dict（并统计命中的库内文件数）。"""
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.infrastructure.database.models import AudioFile
+    from transcriptionist_v3.application.ai_jobs.selection import apply_selection_filters
+
+    if files:
+        selection = {"mode": "files", "files": [str(Path(f).resolve()) for f in files]}
+    elif folders:
+        selection = {"mode": "folders", "folders": [str(Path(f).resolve()) for f in folders]}
+    else:
+        selection = {"mode": "all"}
+    with session_scope() as session:
+        selection["count"] = int(apply_selection_filters(session.query(AudioFile), selection).count() or 0)
+    return selection
+
+
+def _create_clap_engine():
+    """按界面相同的位置创建 CLAP 引擎，返回 (engine, model_version, index_dir)。"""
+    from transcriptionist_v3.runtime.runtime_config import get_data_dir
+    from transcriptionist_v3.application.ai.clap_service import CLAPInferenceService
+
+    data_dir = get_data_dir()
+    model_dir = data_dir / "models" / "larger-clap-general"
+    if not model_dir.exists():
+        raise CliError(f"CLAP 模型未下载: {model_dir}")
+    index_dir = data_dir / "index"
+    index_dir.mkdir(parents=True, exist_ok=True)
+    return CLAPInferenceService(model_dir), model_dir.name, index_dir
+
+
+def _job_record(session, job_type: str, selection: dict, params: dict, job_id: Optional[int]):
+    from transcriptionist_v3.infrastructure.database.models import Job
+    from transcriptionist_v3.application.ai_jobs.job_store import create_job
+
+    job = session.get(Job, job_id) if job_id else None
+    if job is None:
+        job = create_job(session, job_type, selection, params=params)
+    return job
+
+
+def _update_job(job_id: int, status: Optional[str] = None, processed: Optional[int] = None,
+                failed: Optional[int] = None, total: Optional[int] = None,
+                checkpoint: Optional[dict] = None, error: str = "") -> None:
+    """保存进度 / 检查点；给出 status 时同时结束（done / failed）或暂停任务。"""
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.infrastructure.database.models import Job
+    from transcriptionist_v3.application.ai_jobs.job_constants import JOB_STATUS_DONE, JOB_STATUS_PAUSED
+    from transcriptionist_v3.application.ai_jobs.job_store import (
+        update_job_progress,
+        mark_job_done,
+        mark_job_failed,
+        mark_job_paused,
+    )
+
+    with session_scope() as session:
+        job = session.get(Job, job_id)
+        if job is None:
+            return
+        update_job_progress(session, job, processed=processed, failed=failed, total=total, checkpoint=checkpoint)
+        if status == JOB_STATUS_DONE:
+            mark_job_done(session, job)
+        elif status == JOB_STATUS_PAUSED:
+            mark_job_paused(session, job)
+        elif status:
+            mark_job_failed(session, job, error)
+
+
+# ----------------------------------------------------------------------
+# scan / import
+# ----------------------------------------------------------------------
+
+def _run_import_queue(root: Optional[str], batch_size: int, reporter: Reporter, cancel: CancelToken):
+    """处理导入队列；先把上次中断遗留的 PROCESSING 记录放回待处理。返回 (saved, skipped) 或 None（已取消）。"""
+    from transcriptionist_v3.application.library_manager.import_queue import (
+        ImportQueueProcessor,
+        reset_stale_processing,
+    )
+
+    reset = reset_stale_processing(root)
+    if reset:
+        reporter.log(f"已恢复 {reset} 条中断的导入记录")
+    processor = ImportQueueProcessor(
+        root_folder=root,
+        batch_size=batch_size,
+        progress_callback=reporter.progress,
+        is_cancelled=cancel,
+    )
+    cancel.on_cancel(processor.terminate_pool)
+    return processor.run()
+
+
+def _import_batch_size(value: int) -> int:
+    from transcriptionist_v3.core.config import AppConfig
+
+    if value and value > 0:
+        return int(value)
+    try:
+        return int(AppConfig.get("performance.import_batch_size", 5000))
+    except (TypeError, ValueError):
+        return 5000
+
+
+def cmd_scan(args, reporter: Reporter, cancel: CancelToken) -> int:
+    """扫描目录入队（默认随后处理导入队列）。检查点记录所处阶段，恢复时跳过已完成的扫描。"""
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.application.library_manager.import_queue import QueueScanner
+    from transcriptionist_v3.application.ai_jobs.job_constants import (
+        JOB_TYPE_SCAN,
+        JOB_STATUS_DONE,
+        JOB_STATUS_PAUSED,
+    )
+    from transcriptionist_v3.application.ai_jobs.job_store import start_job
+
+    checkpoint: dict = {}
+    if args.job_id:
+        job_info = _load_job(args.job_id, (JOB_TYPE_SCAN,))
+        folders = job_info["selection"].get("folders") or []
+        if not folders:
+            raise CliError(f"任务 {args.job_id} 缺少扫描目录", EXIT_USAGE)
+        folder = folders[0]
+        do_import = bool(job_info["params"].get("import", True))
+        checkpoint = job_info["checkpoint"]
+    else:
+        if not args.path:
+            raise CliError("请指定要扫描的目录，或用 --job-id 恢复任务", EXIT_USAGE)
+        folder = str(Path(args.path).resolve())
+        if not Path(folder).is_dir():
+            raise CliError(f"目录不存在: {folder}", EXIT_USAGE)
+        do_import = not args.no_import
+
+    selection = {"mode": "folders", "folders": [folder]}
+    with session_scope() as session:
+        job = _job_record(session, JOB_TYPE_SCAN, selection, {"import": do_import}, args.job_id)
+        start_job(session, job)
+        reporter.job_id = job.id
+    reporter.start(path=folder, resume=bool(args.job_id))
+
+    stats = dict(checkpoint.get("scan") or {})
+    if checkpoint.get("phase") != "import":
+        scanned = QueueScanner(folder, progress_callback=reporter.progress, is_cancelled=cancel).run()
+        if scanned is None:
+            _update_job(reporter.job_id, JOB_STATUS_PAUSED, checkpoint={"phase": "scan"})
+            reporter.result(JOB_STATUS_PAUSED, phase="scan")
+            return EXIT_PAUSED
+        stats = scanned
+        _update_job(reporter.job_id, None if do_import else JOB_STATUS_DONE,
+                    processed=int(stats.get("enqueued", 0)), total=int(stats.get("total", 0)),
+                    checkpoint={"phase": "import", "scan": stats})
+        reporter.log(f"扫描完成：发现 {stats.get('total', 0)} 个文件，入队 {stats.get('enqueued', 0)} 个")
+        if not do_import:
+            reporter.result(JOB_STATUS_DONE, scan=stats)
+            return EXIT_OK
+
+    imported = _run_import_queue(folder, _import_batch_size(args.batch_size), reporter, cancel)
+    if imported is None:
+        _update_job(reporter.job_id, JOB_STATUS_PAUSED, checkpoint={"phase": "import", "scan": stats})
+        reporter.result(JOB_STATUS_PAUSED, phase="import", scan=stats)
+        return EXIT_PAUSED
+    saved, skipped = imported
+    _update_job(reporter.job_id, JOB_STATUS_DONE, processed=saved, failed=0,
+                checkpoint={"phase": "done", "scan": stats})
+    reporter.result(JOB_STATUS_DONE, scan=stats, saved=saved, skipped=skipped)
+    return EXIT_OK
+
+
+def cmd_import(args, reporter: Reporter, cancel: CancelToken) -> int:
+    """处理导入队列中剩余的待处理记录（可限定根目录）。"""
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.application.ai_jobs.job_constants import (
+        JOB_TYPE_IMPORT,
+        JOB_STATUS_DONE,
+        JOB_STATUS_PAUSED,
+    )
+    from transcriptionist_v3.application.ai_jobs.job_store import start_job
+
+    root = str(Path(args.root).resolve()) if args.root else None
+    if args.job_id:
+        job_info = _load_job(args.job_id, (JOB_TYPE_IMPORT,))
+        root = job_info["params"].get("root") or root
+
+    selection = {"mode": "folders", "folders": [root]} if root else {"mode": "all"}
+    with session_scope() as session:
+        job = _job_record(session, JOB_TYPE_IMPORT, selection, {"root": root}, args.job_id)
+        start_job(session, job)
+        reporter.job_id = job.id
+    reporter.start(root=root, resume=bool(args.job_id))
+
+    imported = _run_import_queue(root, _import_batch_size(args.batch_size), reporter, cancel)
+    if imported is None:
+        _update_job(reporter.job_id, JOB_STATUS_PAUSED)
+        reporter.result(JOB_STATUS_PAUSED)
+        return EXIT_PAUSED
+    saved, skipped = imported
+    _update_job(reporter.job_id, JOB_STATUS_DONE, processed=saved)
+    reporter.result(JOB_STATUS_DONE, saved=saved, skipped=skipped)
+    return EXIT_OK
+
+
+# ----------------------------------------------------------------------
+# index / tag
+# ----------------------------------------------------------------------
+
+def cmd_index(args, reporter: Reporter, cancel: CancelToken) -> int:
+    """为选中文件建立 CLAP 索引（只处理未索引或模型版本不同的文件）。"""
+    from transcriptionist_v3.core.config import AppConfig
+    from transcriptionist_v3.application.ai_jobs.index_job import IndexJob
+    from transcriptionist_v3.application.ai_jobs.job_constants import JOB_TYPE_INDEX
+
+    engine, model_version, index_dir = _create_clap_engine()
+    if args.job_id:
+        job_info = _load_job(args.job_id, (JOB_TYPE_INDEX,))
+        selection = job_info["selection"]
+        model_version = job_info["params"].get("model_version") or model_version
+    else:
+        selection = _build_selection(args.folder, args.file)
+
+    batch_size = int(args.batch_size or AppConfig.get("performance.index_batch_size", 2000))
+    job = IndexJob(
+        engine,
+        selection,
+        index_dir,
+        model_version,
+        batch_size=batch_size,
+        chunk_size=batch_size,
+        job_id=args.job_id,
+        progress_callback=reporter.progress,
+        is_cancelled=cancel,
+    )
+    reporter.job_id = args.job_id
+    reporter.start(selection=selection.get("mode"), count=selection.get("count", 0), model_version=model_version)
+    try:
+        result = job.run()
+    finally:
+        reporter.job_id = job.job_id
+    reporter.result(result["status"], processed=result["processed"], failed=result["failed"])
+    return _status_exit_code(result["status"])
+
+
+def _label_set(name: str) -> list:
+    from transcriptionist_v3.application.ai.audioset_labels import SFX_FOCUSED_LABELS, AUDIOSET_LABELS
+
+    if name == "audioset":
+        return list(AUDIOSET_LABELS)
+    return list(SFX_FOCUSED_LABELS)
+
+
+def cmd_tag(args, reporter: Reporter, cancel: CancelToken) -> int:
+    """用标签集对已建索引的文件打标（已按同一标签集打过标的文件跳过）。"""
+    import hashlib
+    import numpy as np
+    from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore
+    from transcriptionist_v3.application.ai_jobs.tagging_job import TaggingJob, translate_tags_batch
+    from transcriptionist_v3.application.ai_jobs.job_constants import JOB_TYPE_TAG
+    from transcriptionist_v3.application.ai_jobs.index_job import INDEX_BASE_NAME
+
+    if args.labels_file:
+        raw = Path(args.labels_file).read_text(encoding="utf-8")
+        labels = [line.strip() for line in raw.splitlines() if line.strip()]
+    else:
+        labels = _label_set(args.label_set)
+    if not labels:
+        raise CliError("标签集为空", EXIT_USAGE)
+
+    engine, _model_version, index_dir = _create_clap_engine()
+    store = EmbeddingStore(index_dir, base_name=INDEX_BASE_NAME)
+    if not store.exists or store.count == 0:
+        raise CliError("尚未建立 AI 索引，请先运行 index 命令")
+
+    if args.job_id:
+        selection = _load_job(args.job_id, (JOB_TYPE_TAG,))["selection"]
+    else:
+        selection = _build_selection(args.folder, args.file)
+
+    reporter.job_id = args.job_id
+    reporter.start(selection=selection.get("mode"), count=selection.get("count", 0), labels=len(labels))
+    if not engine.initialize():
+        raise CliError("CLAP 模型初始化失败")
+
+    # 分段批量编码标签（命中磁盘缓存的直接读取）
+    tag_embeddings = {}
+    step = 512
+    for start in range(0, len(labels), step):
+        chunk = labels[start:start + step]
+        for tag, embed in zip(chunk, engine.get_text_embeddings(chunk)):
+            if embed is not None:
+                tag_embeddings[tag] = embed
+        reporter.log(f"标签特征 [{min(start + step, len(labels))}/{len(labels)}]")
+    tag_list = list(tag_embeddings.keys())
+    tag_matrix = np.array([tag_embeddings[t] for t in tag_list])
+    tag_version = hashlib.sha1("\n".join(tag_list).encode("utf-8")).hexdigest()[:12]
+
+    job = TaggingJob(
+        engine,
+        selection,
+        {
+            "_chunked": True,
+            "_store": True,
+            "chunk_files": [],
+            "index_dir": str(store.index_dir),
+            "base_name": store.base_name,
+        },
+        None,
+        tag_list,
+        tag_matrix,
+        {},
+        min_confidence=float(args.min_confidence),
+        tag_version=tag_version,
+        job_id=args.job_id,
+        translate_tags=translate_tags_batch if args.translate else None,
+        progress_callback=reporter.progress,
+        log_callback=reporter.log,
+        is_cancelled=cancel,
+    )
+    try:
+        result = job.run()
+    finally:
+        reporter.job_id = job.job_id
+    reporter.result(result["status"], processed=result["processed"], failed=result["failed"], tag_version=tag_version)
+    return _status_exit_code(result["status"])
+
+
+# ----------------------------------------------------------------------
+# search / export / jobs
+# ----------------------------------------------------------------------
+
+def cmd_search(args, reporter: Reporter) -> int:
+    """检索音效库：文本（FTS5 / LIKE）、语义（CLAP 索引）或两者 RRF 融合。"""
+    from transcriptionist_v3.application.search_engine.hybrid_search import get_hybrid_search_service
+    from transcriptionist_v3.application.ai_jobs.index_job import INDEX_BASE_NAME
+
+    service = get_hybrid_search_service()
+    mode = args.mode
+    if mode in ("semantic", "hybrid"):
+        try:
+            engine, model_version, index_dir = _create_clap_engine()
+            if service.attach_store(index_dir, base_name=INDEX_BASE_NAME) > 0 and engine.initialize():
+                service.set_text_encoder(engine.get_text_embedding, model_version)
+        except CliError as e:
+            if mode == "semantic":
+                raise
+            reporter.log(f"语义检索不可用，仅使用文本检索: {e}")
+        if mode == "semantic" and not service.semantic_ready:
+            raise CliError("语义检索不可用：请先建立 AI 索引")
+
+    top_k = max(1, int(args.top_k))
+    page = service.search(
+        args.query,
+        mode=mode,
+        top_k=top_k,
+        page=max(0, int(args.page)),
+        page_size=max(1, int(args.page_size)),
+        semantic_text=args.semantic_text or None,
+    )
+    items = [
+        {
+            "path": item.key,
+            "score": item.score,
+            "lexical_score": item.lexical_score,
+            "semantic_score": item.semantic_score,
+        }
+        for item in page.items
+    ]
+    if reporter.json_mode:
+        reporter.result(
+            "done",
+            query=page.query_text,
+            mode=page.mode,
+            total=page.total,
+            page=page.page,
+            page_size=page.page_size,
+            has_more=page.has_more,
+            timings=page.timings(),
+            items=items,
+        )
+    else:
+        for item in items:
+            print(f"{item['score']:.4f}\t{item['path']}")
+        sys.stderr.write(f"[search] {page.total} 条（{page.mode}，{page.describe_timings()}）\n")
+    return EXIT_OK
+
+
+def _domain_audio_files(file_ids: Sequence[int]) -> list:
+    """按 ID 读取库记录并转换为导出用的领域模型（保持项目内顺序）。"""
+    from sqlalchemy.orm import selectinload
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.infrastructure.database.models import AudioFile as AudioFileRow
+    from transcriptionist_v3.domain.models.audio_file import AudioFile
+
+    ids = [int(i) for i in file_ids]
+    rows = {}
+    with session_scope() as session:
+        for i in range(0, len(ids), 500):
+            batch = ids[i:i + 500]
+            query = (
+                session.query(AudioFileRow)
+                .options(selectinload(AudioFileRow.tags))
+                .filter(AudioFileRow.id.in_(batch))
+            )
+            for row in query:
+                rows[row.id] = AudioFile(
+                    id=row.id,
+                    file_path=Path(row.file_path),
+                    filename=row.filename,
+                    file_size=row.file_size or 0,
+                    content_hash=row.content_hash or "",
+                    duration=row.duration or 0.0,
+                    sample_rate=row.sample_rate or 0,
+                    bit_depth=row.bit_depth or 0,
+                    channels=row.channels or 0,
+                    format=row.format or "",
+                    tags=[t.tag for t in row.tags],
+                    description=row.description or "",
+                    created_at=row.created_at,
+                    modified_at=row.modified_at,
+                    last_played_at=row.last_played_at,
+                )
+    return [rows[i] for i in ids if i in rows]
+
+
+def cmd_export(args, reporter: Reporter, cancel: CancelToken) -> int:
+    """导出项目：复制文件并生成元数据侧车文件与项目信息。"""
+    import asyncio
+    from transcriptionist_v3.core.config import get_config
+    from transcriptionist_v3.application.project_manager import ProjectManager, ProjectExporter
+    from transcriptionist_v3.application.project_manager.exporter import (
+        ExportFormat,
+        ExportOptions,
+        NamingScheme,
+    )
+
+    manager = ProjectManager(Path(get_config("projects_dir", "./data/projects")))
+    project = manager.get_project(int(args.project)) if str(args.project).isdigit() else None
+    if project is None:
+        project = manager.get_project_by_name(str(args.project))
+    if project is None:
+        raise CliError(f"项目不存在: {args.project}", EXIT_USAGE)
+
+    files = _domain_audio_files(manager.get_files_in_project(project.id))
+    reporter.start(project=project.name, files=len(files))
+
+    total = len(files)
+    exporter = ProjectExporter()
+    cancel.on_cancel(exporter.cancel)
+    options = ExportOptions(
+        output_dir=Path(args.output),
+        format=ExportFormat[args.layout.upper()],
+        naming_scheme=NamingScheme[args.naming.upper()],
+        copy_files=not args.symlink,
+        create_symlinks=args.symlink,
+        overwrite_existing=args.overwrite,
+        include_metadata=not args.no_metadata,
+        progress_callback=lambda ratio, message: reporter.progress(int(round(ratio * total)), total, message),
+    )
+    result = asyncio.run(exporter.export_project(project, files, options))
+
+    payload = result.to_dict()
+    if cancel():
+        reporter.result("cancelled", **payload)
+        return EXIT_PAUSED
+    status = "done" if result.success else "failed"
+    reporter.result(status, **payload)
+    return EXIT_OK if result.success else EXIT_FAILED
+
+
+def cmd_jobs(args, reporter: Reporter) -> int:
+    """列出最近的任务（默认只列出可恢复的：running / paused / failed / pending）。"""
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.infrastructure.database.models import Job
+    from transcriptionist_v3.application.ai_jobs.job_constants import JOB_STATUS_DONE
+
+    with session_scope() as session:
+        query = session.query(Job)
+        if args.status:
+            query = query.filter(Job.status == args.status)
+        elif not args.all:
+            query = query.filter(Job.status != JOB_STATUS_DONE)
+        if args.type:
+            query = query.filter(Job.job_type == args.type)
+        jobs = [
+            {
+                "id": job.id,
+                "type": job.job_type,
+                "status": job.status,
+                "total": job.total,
+                "processed": job.processed,
+                "failed": job.failed,
+                "error": job.error,
+                "created_at": job.created_at.isoformat() if job.created_at else None,
+                "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+            }
+            for job in query.order_by(Job.id.desc()).limit(max(1, int(args.limit)))
+        ]
+
+    if reporter.json_mode:
+        reporter.result("done", jobs=jobs)
+    else:
+        for job in jobs:
+            print(f"{job['id']}\t{job['type']}\t{job['status']}\t{job['processed']}/{job['total']}")
+    return EXIT_OK
+
+
+HANDLERS = {
+    "scan": cmd_scan,
+    "import": cmd_import,
+    "index": cmd_index,
+    "tag": cmd_tag,
+    "search": cmd_search,
+    "export": cmd_export,
+    "jobs": cmd_jobs,
+}
+# 长任务：处理函数额外接收 CancelToken（Ctrl+C / SIGTERM 时在批次边界暂停）
+CANCELLABLE = ("scan", "import", "index", "tag", "export")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="以 JSON Lines 输出事件（机器可读）")
+    common.add_argument("--database-url", metavar="URL", help="数据库地址（sqlite:///...），覆盖默认位置")
+    common.add_argument(
+        "--data-dir",
+        metavar="DIR",
+        help="数据根目录（config/、data/ 放在其下）；默认取 TRANSCRIPTIONIST_HOME，否则为用户数据目录",
+    )
+
+    parser = argparse.ArgumentParser(
+        prog="transcriptionist",
+        description="Transcriptionist headless commands",
+    )
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("scan", parents=[common], help="扫描目录并导入音效库")
+    p.add_argument("path", nargs="?", help="要扫描的目录")
+    p.add_argument("--no-import", action="store_true", help="只扫描入队，不处理导入队列")
+    p.add_argument("--batch-size", type=int, default=0, help="导入批量（默认取设置）")
+    p.add_argument("--job-id", type=int, help="恢复暂停 / 中断的扫描任务")
+
+    p = sub.add_parser("import", parents=[common], help="处理导入队列中待处理的记录")
+    p.add_argument("--root", help="只处理该根目录下的队列记录")
+    p.add_argument("--batch-size", type=int, default=0, help="导入批量（默认取设置）")
+    p.add_argument("--job-id", type=int, help="恢复暂停 / 中断的导入任务")
+
+    for name, text in (("index", "为音效建立 AI 检索索引"), ("tag", "AI 批量打标")):
+        p = sub.add_parser(name, parents=[common], help=text)
+        p.add_argument("--folder", action="append", help="只处理该目录下的文件（可重复）")
+        p.add_argument("--file", action="append", help="只处理指定文件（可重复）")
+        p.add_argument("--job-id", type=int, help="恢复暂停 / 中断的任务")
+        if name == "index":
+            p.add_argument("--batch-size", type=int, default=0, help="每批文件数（默认取设置）")
+        else:
+            p.add_argument("--label-set", choices=("sfx", "audioset"), default="sfx", help="预设标签集")
+            p.add_argument("--labels-file", help="自定义标签文件（每行一个英文标签）")
+            p.add_argument("--min-confidence", type=float, default=0.35, help="最低置信度")
+            p.add_argument("--translate", action="store_true", help="用已配置的 AI 服务把标签译为中文")
+
+    p = sub.add_parser("search", parents=[common], help="检索音效库")
+    p.add_argument("query", help="查询（支持文本检索语法）")
+    p.add_argument("--mode", choices=("lexical", "semantic", "hybrid"), default="lexical")
+    p.add_argument("--semantic-text", help="语义检索使用的文本（如查询的英文译文）")
+    p.add_argument("--top-k", type=int, default=500, help="每一路召回条数")
+    p.add_argument("--page", type=int, default=0)
+    p.add_argument("--page-size", type=int, default=50)
+
+    p = sub.add_parser("export", parents=[common], help="导出项目")
+    p.add_argument("--project", required=True, help="项目 ID 或名称")
+    p.add_argument("--output", required=True, help="导出目录")
+    p.add_argument("--layout", choices=("flat", "by_category", "by_date"), default="flat")
+    p.add_argument("--naming", choices=("original", "ucs", "sequential"), default="original")
+    p.add_argument("--symlink", action="store_true", help="创建符号链接而不是复制")
+    p.add_argument("--overwrite", action="store_true", help="覆盖已存在的文件")
+    p.add_argument("--no-metadata", action="store_true", help="不生成元数据侧车文件")
+
+    p = sub.add_parser("jobs", parents=[common], help="列出任务")
+    p.add_argument("--status", choices=("pending", "running", "paused", "failed", "done"))
+    p.add_argument("--type", help="任务类型（scan / import / index / tag / ...）")
+    p.add_argument("--all", action="store_true", help="包含已完成的任务")
+    p.add_argument("--limit", type=int, default=20)
+
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """
+    命令行入口。
+
+    Returns:
+        int: 退出码（见模块说明）。
+    """
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+    except SystemExit as e:
+        # --help 返回 0，参数错误统一为 EXIT_USAGE
+        return EXIT_OK if not e.code else EXIT_USAGE
+
+    if args.database_url:
+        os.environ["TRANSCRIPTIONIST_DATABASE_URL"] = args.database_url
+    # 配置、数据库与日志默认写到用户数据目录，而不是（可能只读的）安装目录
+    from transcriptionist_v3.runtime.runtime_config import DATA_HOME_ENV, user_data_home
+
+    if args.data_dir:
+        os.environ[DATA_HOME_ENV] = str(Path(args.data_dir).expanduser().resolve())
+    elif not os.environ.get(DATA_HOME_ENV):
+        os.environ[DATA_HOME_ENV] = str(user_data_home())
+
+    reporter = Reporter(args.command, args.json)
+    try:
+        from transcriptionist_v3.runtime.bootstrap import bootstrap
+
+        bootstrap()
+    except Exception as e:
+        reporter.error(f"运行环境初始化失败: {e}", EXIT_FAILED)
+        return EXIT_FAILED
+
+    handler = HANDLERS[args.command]
+    try:
+        if args.command in CANCELLABLE:
+            cancel = CancelToken()
+            cancel.install()
+            return handler(args, reporter, cancel)
+        return handler(args, reporter)
+    except CliError as e:
+        reporter.error(str(e), e.exit_code)
+        return e.exit_code
+    except KeyboardInterrupt:
+        reporter.error("已强制中断（任务可用 --job-id 恢复）", EXIT_INTERRUPTED)
+        return EXIT_INTERRUPTED
+    except Exception as e:
+        import logging
+
+        logging.getLogger(__name__).error(f"CLI command {args.command} failed: {e}", exc_info=True)
+        reporter.error(str(e), EXIT_FAILED)
+        return EXIT_FAILED
@@ -180,6 +180,9 @@ DEFAULT_CONFIG = {
         "scan_on_startup": True,
         "watch_for_changes": True,
         "supported_formats": ["wav", "flac", "mp3", "ogg", "aiff", "m4a"],
+        "incremental_scan": True,  # 重扫时按目录/文件快照跳过未变化部分；False = 全量重扫
+        "watch_settle_seconds": 2.0,  # 文件监视：路径静默且 size/mtime 稳定这么久后才入库
+        "watch_batch_size": 2000,  # 文件监视：每个写库事务最多处理的变化条数
     },
     
     # UI settings
@@ -240,8 +243,19 @@ DEFAULT_CONFIG = {
         "search_rrf_k": 60,
         "search_rrf_lexical_weight": 1.0,
         "search_rrf_semantic_weight": 1.0,
+        # 两路检索的截止时间（毫秒，0=不限）：超时的一路丢弃，另一路结果照常返回
+        "search_lexical_deadline_ms": 800,
+        "search_semantic_deadline_ms": 1500,
+        "search_page_size": 20,
         "search_consistency_check_enabled": True,
         "search_consistency_top_n": 20,
+        # 近似最近邻（IVF-Flat）：行数达到 ann_min_rows 后自动训练，ann_nprobe 越大召回越高、耗时越长
+        "ann_enabled": True,
+        "ann_min_rows": 200000,
+        "ann_nprobe": 32,
+        # 声学近似重复检测：余弦相似度阈值与每个倒排表探查的相邻表数
+        "near_duplicate_threshold": 0.97,
+        "near_duplicate_probe_lists": 4,
         # AI 音效生成（可灵）
         "audio_provider": "kling",
         "audio_access_key": "",
@@ -48,6 +48,9 @@ class AudioMetadata:
     # Additional tags
     tags: List[str] = field(default_factory=list)
     
+    # 采样内容指纹（导入时由元数据 worker 计算，见 library_manager.fingerprint）
+    content_hash: str = ""
+    
     # Raw metadata (all extracted fields)
     raw: Dict[str, Any] = field(default_factory=dict)
     
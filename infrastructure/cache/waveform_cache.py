@@ -1,8 +1,22 @@
 """
 Waveform Cache
 
-Caches waveform data for audio files to avoid repeated computation.
-Inspired by Quod Libet's thumbnail caching with file-based persistence.
+Packed, persistent store of waveform peak pyramids.
+
+Layout (under ``cache_dir``):
+- ``peaks.dat``: append-only data file; each entry is one serialized
+  ``WaveformPeaks`` (header + quantized min/max/RMS levels)
+- ``peaks.idx.sqlite3``: index keyed by normalized path with the file's
+  ``mtime_ns``/``size`` (validation), the entry's offset/length and a CRC32
+
+Each entry stores a multi-resolution pyramid (``LEVEL_BINS``) so the list
+thumbnails and the detail preview read a ready-made level instead of decoding
+audio. Pyramids are built by a streaming decoder (soundfile, with an ffmpeg
+pipe for containers libsndfile cannot read); memory use does not grow with the
+length of the file.
+
+Replaced/removed entries leave dead bytes in ``peaks.dat``; ``compact()``
+rewrites the live entries once the dead share grows past ``COMPACT_DEAD_RATIO``.
 
 Validates: Requirements 10.3
 """
@@ -11,12 +25,18 @@ from __future__ import annotations
 
 import logging
 import os
-import hashlib
+import shutil
+import sqlite3
 import struct
+import subprocess
+import sys
+import threading
+import time
 import zlib
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional
-from dataclasses import dataclass
+from typing import Iterator, Optional
+
 import numpy as np
 
 from .lru_cache import LRUCache
@@ -24,369 +44,696 @@ from .utils import CacheStats
 
 logger = logging.getLogger(__name__)
 
+# Entry format version; bump when the serialized layout or the reduction changes
+FORMAT_VERSION = 1
+MAGIC = b"WPK1"
+# Bins per pyramid level, finest first. Shorter files get fewer bins
+# (at least MIN_FRAMES_PER_BIN frames per bin).
+LEVEL_BINS = (2048, 512, 128)
+MIN_FRAMES_PER_BIN = 16
+DECODE_BLOCK_FRAMES = 65536
+# Initial hop (frames) when the total length is unknown up front; the hop doubles
+# whenever more than MAX_STREAM_HOPS statistics have accumulated
+STREAM_HOP_FRAMES = 16
+MAX_STREAM_HOPS = LEVEL_BINS[0] * 8
+# Sample rate requested from ffmpeg for formats soundfile cannot decode
+FFMPEG_SAMPLE_RATE = 22050
+COMPACT_DEAD_RATIO = 0.5
+SQLITE_IN_BATCH = 500
+
+# magic, version, channels, n_levels, sample_rate, frames, peak
+_HEADER = struct.Struct("<4sBBBIQf")
+# bins
+_LEVEL_HEADER = struct.Struct("<I")
+
+
+@dataclass
+class PeakLevel:
+    """One pyramid level; all arrays are float32 in absolute amplitude units."""
+    minimum: np.ndarray
+    maximum: np.ndarray
+    rms: np.ndarray
+    # RMS of the first difference: a cheap brightness proxy (high for noisy/bright bins)
+    diff_rms: np.ndarray
+
+    @property
+    def bins(self) -> int:
+        return int(len(self.minimum))
+
 
 @dataclass
-class WaveformData:
-    """Waveform data for an audio file."""
-    file_path: str
-    mtime: float
-    samples: np.ndarray  # Downsampled waveform data
-    sample_count: int
-    duration: float
+class WaveformPeaks:
+    """Peak pyramid for an audio file."""
+    sample_rate: int
     channels: int
-    
-    def to_bytes(self) -> bytes:
-        """Serialize waveform data to bytes."""
-        # Header: mtime (double), sample_count (int), duration (double), channels (int)
-        header = struct.pack(
-            '<didi',
-            self.mtime,
-            self.sample_count,
-            self.duration,
-            self.channels
+    frames: int
+    peak: float
+    levels: list[PeakLevel] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return self.frames / self.sample_rate if self.sample_rate > 0 else 0.0
+
+    def level_for(self, points: int) -> Optional[PeakLevel]:
+        """Coarsest level with at least ``points`` bins (the finest level if none has)."""
+        if not self.levels:
+            return None
+        for level in reversed(self.levels):
+            if level.bins >= points:
+                return level
+        return self.levels[0]
+
+    def envelope(self, points: int) -> Optional[PeakLevel]:
+        """Reduce the best-fitting level to exactly ``min(points, bins)`` bins."""
+        level = self.level_for(max(1, int(points)))
+        if level is None or level.bins == 0:
+            return None
+        if level.bins <= points:
+            return level
+        starts = np.linspace(0, level.bins, int(points) + 1).astype(np.int64)[:-1]
+        counts = np.diff(np.append(starts, level.bins)).astype(np.float32)
+        return PeakLevel(
+            minimum=np.minimum.reduceat(level.minimum, starts),
+            maximum=np.maximum.reduceat(level.maximum, starts),
+            rms=np.sqrt(np.add.reduceat(level.rms * level.rms, starts) / counts),
+            diff_rms=np.sqrt(np.add.reduceat(level.diff_rms * level.diff_rms, starts) / counts),
         )
-        
-        # Compress sample data
-        sample_bytes = self.samples.astype(np.float32).tobytes()
-        compressed = zlib.compress(sample_bytes, level=6)
-        
-        # Length prefix for compressed data
-        length = struct.pack('<I', len(compressed))
-        
-        return header + length + compressed
-    
+
+    def to_bytes(self) -> bytes:
+        """
+        Serialize with 8-bit quantization relative to the file peak:
+        min/max as int8, RMS values as uint8 (sqrt-companded to keep quiet detail).
+        """
+        scale = self.peak if self.peak > 0 else 1.0
+        parts = [
+            _HEADER.pack(
+                MAGIC, FORMAT_VERSION, min(255, self.channels), len(self.levels),
+                self.sample_rate, self.frames, float(self.peak),
+            )
+        ]
+        for level in self.levels:
+            parts.append(_LEVEL_HEADER.pack(level.bins))
+            for values in (level.minimum, level.maximum):
+                q = np.clip(np.rint(values / scale * 127.0), -127, 127).astype(np.int8)
+                parts.append(q.tobytes())
+            for values in (level.rms, level.diff_rms):
+                norm = np.clip(values / scale, 0.0, 1.0)
+                parts.append(np.rint(np.sqrt(norm) * 255.0).astype(np.uint8).tobytes())
+        return b"".join(parts)
+
     @classmethod
-    def from_bytes(cls, data: bytes, file_path: str) -> 'WaveformData':
-        """Deserialize waveform data from bytes."""
-        # Parse header
-        header_size = struct.calcsize('<didi')
-        mtime, sample_count, duration, channels = struct.unpack(
-            '<didi', data[:header_size]
-        )
-        
-        # Parse compressed data length
-        length_size = struct.calcsize('<I')
-        compressed_length = struct.unpack(
-            '<I', data[header_size:header_size + length_size]
-        )[0]
-        
-        # Decompress sample data
-        compressed = data[header_size + length_size:]
-        sample_bytes = zlib.decompress(compressed)
-        samples = np.frombuffer(sample_bytes, dtype=np.float32)
-        
+    def from_bytes(cls, data: bytes) -> "WaveformPeaks":
+        """Deserialize; raises ValueError on a foreign or truncated entry."""
+        if len(data) < _HEADER.size:
+            raise ValueError("truncated waveform entry")
+        magic, version, channels, n_levels, sample_rate, frames, peak = _HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("unknown waveform entry format")
+        scale = peak if peak > 0 else 1.0
+        buf = memoryview(data)
+        pos = _HEADER.size
+        levels: list[PeakLevel] = []
+        for _ in range(n_levels):
+            (bins,) = _LEVEL_HEADER.unpack_from(data, pos)
+            pos += _LEVEL_HEADER.size
+            if pos + bins * 4 > len(data):
+                raise ValueError("truncated waveform entry")
+            arrays = []
+            for dtype in (np.int8, np.int8, np.uint8, np.uint8):
+                arrays.append(np.frombuffer(buf[pos:pos + bins], dtype=dtype).astype(np.float32))
+                pos += bins
+            q_min, q_max, q_rms, q_drms = arrays
+            levels.append(PeakLevel(
+                minimum=q_min * (scale / 127.0),
+                maximum=q_max * (scale / 127.0),
+                rms=np.square(q_rms / 255.0) * scale,
+                diff_rms=np.square(q_drms / 255.0) * scale,
+            ))
         return cls(
-            file_path=file_path,
-            mtime=mtime,
-            samples=samples,
-            sample_count=sample_count,
-            duration=duration,
-            channels=channels
+            sample_rate=int(sample_rate), channels=int(channels), frames=int(frames),
+            peak=float(peak), levels=levels,
+        )
+
+
+class PeakPyramidBuilder:
+    """
+    Streaming reducer: feed decoded blocks, then ``finish()`` builds the pyramid.
+
+    Blocks are mixed to mono and reduced per hop (min/max/sum of squares/sum of
+    squared first differences) with reshape-based numpy reductions; the levels are
+    then cut from the hop statistics with ``reduceat``. Only the per-hop statistics
+    are kept; for streams of unknown length adjacent hops are merged pairwise
+    whenever they exceed ``MAX_STREAM_HOPS``, so memory stays bounded.
+    """
+
+    def __init__(self, sample_rate: int, channels: int, frames_hint: int = 0):
+        self.sample_rate = int(sample_rate)
+        self.channels = max(1, int(channels))
+        if frames_hint > 0:
+            # ~4 hops per finest bin keeps the level edges accurate
+            self.hop = max(1, int(frames_hint) // (LEVEL_BINS[0] * 4))
+        else:
+            self.hop = STREAM_HOP_FRAMES
+        self.frames = 0
+        self._last = 0.0
+        self._pending = np.zeros(0, dtype=np.float32)
+        self._pending_diff = np.zeros(0, dtype=np.float32)
+        self._stats: list[tuple[np.ndarray, ...]] = []
+        self._n_hops = 0
+
+    def feed(self, block: np.ndarray) -> None:
+        block = np.asarray(block, dtype=np.float32)
+        if block.size == 0:
+            return
+        mono = block.mean(axis=1, dtype=np.float32) if block.ndim == 2 else block.reshape(-1)
+        diff = np.diff(mono, prepend=np.float32(self._last))
+        self._last = float(mono[-1])
+        self.frames += len(mono)
+        if len(self._pending):
+            mono = np.concatenate([self._pending, mono])
+            diff = np.concatenate([self._pending_diff, diff])
+        n_full = len(mono) // self.hop
+        if n_full:
+            cut = n_full * self.hop
+            self._reduce(mono[:cut].reshape(n_full, self.hop), diff[:cut].reshape(n_full, self.hop))
+        self._pending = mono[n_full * self.hop:]
+        self._pending_diff = diff[n_full * self.hop:]
+
+    def _reduce(self, chunks: np.ndarray, diff_chunks: np.ndarray) -> None:
+        self._stats.append((
+            chunks.min(axis=1),
+            chunks.max(axis=1),
+            np.einsum("ij,ij->i", chunks, chunks, dtype=np.float64),
+            np.einsum("ij,ij->i", diff_chunks, diff_chunks, dtype=np.float64),
+            np.full(len(chunks), chunks.shape[1], dtype=np.float64),
+        ))
+        self._n_hops += len(chunks)
+        if self._n_hops > MAX_STREAM_HOPS:
+            self._coarsen()
+
+    def _coarsen(self) -> None:
+        mins, maxs, sq, dsq, counts = (np.concatenate(parts) for parts in zip(*self._stats))
+        starts = np.arange(0, len(mins), 2)
+        self._stats = [(
+            np.minimum.reduceat(mins, starts),
+            np.maximum.reduceat(maxs, starts),
+            np.add.reduceat(sq, starts),
+            np.add.reduceat(dsq, starts),
+            np.add.reduceat(counts, starts),
+        )]
+        self._n_hops = len(starts)
+        self.hop *= 2
+
+    def finish(self) -> Optional[WaveformPeaks]:
+        if len(self._pending):
+            self._reduce(self._pending.reshape(1, -1), self._pending_diff.reshape(1, -1))
+            self._pending = self._pending[:0]
+            self._pending_diff = self._pending_diff[:0]
+        if not self._stats or self.frames <= 0:
+            return None
+        mins, maxs, sq, dsq, counts = (np.concatenate(parts) for parts in zip(*self._stats))
+        self._stats = []
+        n_hops = len(mins)
+        peak = float(max(abs(float(mins.min())), abs(float(maxs.max()))))
+
+        levels: list[PeakLevel] = []
+        max_bins = max(1, self.frames // MIN_FRAMES_PER_BIN)
+        for target in LEVEL_BINS:
+            bins = int(min(target, max_bins, n_hops))
+            if levels and bins >= levels[-1].bins:
+                continue
+            starts = np.linspace(0, n_hops, bins + 1).astype(np.int64)[:-1]
+            n = np.add.reduceat(counts, starts)
+            levels.append(PeakLevel(
+                minimum=np.minimum.reduceat(mins, starts).astype(np.float32),
+                maximum=np.maximum.reduceat(maxs, starts).astype(np.float32),
+                rms=np.sqrt(np.add.reduceat(sq, starts) / n).astype(np.float32),
+                diff_rms=np.sqrt(np.add.reduceat(dsq, starts) / n).astype(np.float32),
+            ))
+        return WaveformPeaks(
+            sample_rate=self.sample_rate, channels=self.channels, frames=self.frames,
+            peak=peak, levels=levels,
         )
 
 
+def _find_ffmpeg() -> Optional[str]:
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg:
+        return ffmpeg
+    for candidate in (r"C:\ffmpeg\bin\ffmpeg.exe", r"C:\Program Files\ffmpeg\bin\ffmpeg.exe"):
+        if Path(candidate).exists():
+            return candidate
+    return None
+
+
+def _ffmpeg_blocks(file_path: str, block_frames: int) -> Iterator[np.ndarray]:
+    """Decode through an ffmpeg pipe as mono float32 at ``FFMPEG_SAMPLE_RATE``."""
+    ffmpeg = _find_ffmpeg()
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg not found")
+    creationflags = subprocess.CREATE_NO_WINDOW if sys.platform == "win32" else 0
+    proc = subprocess.Popen(
+        [
+            ffmpeg, "-v", "error", "-nostdin", "-i", file_path, "-vn",
+            "-ac", "1", "-ar", str(FFMPEG_SAMPLE_RATE), "-f", "f32le", "-acodec", "pcm_f32le", "-",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        creationflags=creationflags,
+    )
+    try:
+        chunk_bytes = block_frames * 4
+        leftover = b""
+        while True:
+            raw = proc.stdout.read(chunk_bytes)
+            if not raw:
+                break
+            raw = leftover + raw
+            usable = len(raw) - len(raw) % 4
+            leftover = raw[usable:]
+            if usable:
+                yield np.frombuffer(raw[:usable], dtype="<f4")
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg exited with code {proc.returncode}")
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        proc.stdout.close()
+
+
+def compute_peaks(file_path: str | Path, block_frames: int = DECODE_BLOCK_FRAMES) -> Optional[WaveformPeaks]:
+    """
+    Stream-decode an audio file into a peak pyramid.
+
+    soundfile (libsndfile) handles WAV/FLAC/OGG/AIFF/MP3; anything it rejects
+    (M4A/MP4 and other containers) goes through ffmpeg when it is installed.
+    """
+    path = str(file_path)
+    try:
+        import soundfile as sf
+
+        with sf.SoundFile(path) as f:
+            builder = PeakPyramidBuilder(f.samplerate, f.channels, frames_hint=int(f.frames or 0))
+            for block in f.blocks(blocksize=block_frames, dtype="float32", always_2d=True):
+                builder.feed(block)
+            return builder.finish()
+    except Exception as e:
+        logger.debug(f"soundfile cannot decode {path}, trying ffmpeg: {e}")
+
+    try:
+        builder = PeakPyramidBuilder(FFMPEG_SAMPLE_RATE, 1)
+        for block in _ffmpeg_blocks(path, block_frames):
+            builder.feed(block)
+        return builder.finish()
+    except Exception as e:
+        logger.debug(f"Failed to decode waveform for {path}: {e}")
+        return None
+
+
+def _normalize_path(file_path: str | Path) -> str:
+    return os.path.normcase(os.path.abspath(str(file_path)))
+
+
 class WaveformCacheManager:
     """
-    Manager for waveform data caching.
-    
-    Features:
-    - In-memory LRU cache for fast access
-    - File-based persistence for large waveforms
-    - Mtime-based validation
-    - Compressed storage
-    
+    Packed waveform peak store with an in-memory LRU in front.
+
+    Thread-safe: appends/reads of ``peaks.dat`` share one handle under a lock,
+    the index uses per-thread SQLite connections (WAL).
+
     Usage:
-        cache = WaveformCacheManager(cache_dir=Path("~/.cache/transcriptionist/waveforms"))
-        
-        waveform = cache.get_or_compute(
-            file_path,
-            compute_fn=lambda: extract_waveform(file_path)
-        )
+        cache = get_waveform_cache()
+        peaks = cache.get_or_compute(file_path)        # decodes only on a miss
+        envelope = peaks.envelope(192) if peaks else None
     """
-    
+
+    DATA_NAME = "peaks.dat"
+    INDEX_NAME = "peaks.idx.sqlite3"
+
     def __init__(
         self,
         cache_dir: Optional[Path] = None,
-        memory_cache_size: int = 100,
-        memory_ttl: float = 300.0
+        memory_cache_size: int = 256,
+        memory_ttl: Optional[float] = None,
     ):
         """
         Initialize the waveform cache manager.
-        
+
         Args:
-            cache_dir: Directory for file-based cache
-            memory_cache_size: Max entries in memory cache
-            memory_ttl: Memory cache TTL in seconds
+            cache_dir: Directory holding the data file and index (None = memory only)
+            memory_cache_size: Max decoded entries kept in memory
+            memory_ttl: Memory cache TTL in seconds (None = no expiry)
         """
-        self._cache_dir = cache_dir
-        self._memory_cache = LRUCache[str, WaveformData](
-            max_size=memory_cache_size,
-            ttl=memory_ttl
-        )
+        self._cache_dir = Path(cache_dir) if cache_dir else None
+        self._memory_cache = LRUCache[str, tuple](max_size=memory_cache_size, ttl=memory_ttl)
         self._stats = CacheStats()
-        
-        # Create cache directory
-        if cache_dir:
-            cache_dir.mkdir(parents=True, exist_ok=True)
-    
+        self._lock = threading.RLock()
+        self._local = threading.local()
+        self._data_fh = None
+
+        if self._cache_dir:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            self._remove_legacy_files()
+
+    def _remove_legacy_files(self) -> None:
+        # One-file-per-waveform ``<md5>.waveform`` entries from the previous layout
+        for legacy in self._cache_dir.glob("*.waveform"):
+            try:
+                legacy.unlink()
+            except OSError:
+                pass
+
     @property
     def stats(self) -> CacheStats:
         return self._stats
-    
-    def _get_cache_key(self, file_path: str | Path) -> str:
-        """Generate cache key from file path."""
-        path_str = str(Path(file_path).resolve())
-        return hashlib.md5(path_str.encode()).hexdigest()
-    
-    def _get_cache_path(self, cache_key: str) -> Optional[Path]:
-        """Get file path for cached waveform."""
+
+    @property
+    def data_path(self) -> Optional[Path]:
+        return self._cache_dir / self.DATA_NAME if self._cache_dir else None
+
+    # ---------- storage ----------
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
         if not self._cache_dir:
             return None
-        return self._cache_dir / f"{cache_key}.waveform"
-    
-    def get(self, file_path: str | Path) -> Optional[WaveformData]:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(str(self._cache_dir / self.INDEX_NAME), timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS peaks (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    offset INTEGER NOT NULL,
+                    length INTEGER NOT NULL,
+                    crc INTEGER NOT NULL,
+                    version INTEGER NOT NULL,
+                    created_at REAL
+                )
+                """
+            )
+            self._local.conn = conn
+        return conn
+
+    def _data_handle(self):
+        if self._data_fh is None:
+            self._data_fh = open(self.data_path, "a+b")
+        return self._data_fh
+
+    def _read_entry(self, offset: int, length: int) -> bytes:
+        with self._lock:
+            fh = self._data_handle()
+            fh.seek(offset)
+            return fh.read(length)
+
+    def _append_entry(self, payload: bytes) -> int:
+        with self._lock:
+            fh = self._data_handle()
+            fh.seek(0, os.SEEK_END)
+            offset = fh.tell()
+            fh.write(payload)
+            fh.flush()
+            return offset
+
+    @staticmethod
+    def _file_signature(file_path: str | Path) -> Optional[tuple[int, int]]:
+        try:
+            st = os.stat(file_path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    # ---------- public API ----------
+
+    def get(self, file_path: str | Path) -> Optional[WaveformPeaks]:
         """
-        Get cached waveform data.
-        
-        Args:
-            file_path: Path to the audio file
-            
-        Returns:
-            Cached waveform data or None
+        Return the cached pyramid if it is still valid for the file on disk.
+
+        Costs one ``stat`` plus (on a memory miss) one index lookup and one read;
+        never decodes audio.
         """
-        cache_key = self._get_cache_key(file_path)
-        
-        # Try memory cache first
-        cached = self._memory_cache.get(cache_key)
+        key = _normalize_path(file_path)
+        signature = self._file_signature(file_path)
+        if signature is None:
+            self._stats.record_miss()
+            return None
+
+        cached = self._memory_cache.get(key)
         if cached is not None:
-            # Validate mtime
-            if self._validate_mtime(file_path, cached.mtime):
+            if cached[0] == signature:
                 self._stats.record_hit()
-                return cached
-            else:
-                self._memory_cache.delete(cache_key)
-        
-        # Try file cache
-        cache_path = self._get_cache_path(cache_key)
-        if cache_path and cache_path.exists():
-            try:
-                with open(cache_path, 'rb') as f:
-                    data = f.read()
-                
-                cached = WaveformData.from_bytes(data, str(file_path))
-                
-                # Validate mtime
-                if self._validate_mtime(file_path, cached.mtime):
-                    # Promote to memory cache
-                    self._memory_cache.set(cache_key, cached)
-                    self._stats.record_hit()
-                    return cached
-                else:
-                    # Invalid, remove file
-                    cache_path.unlink(missing_ok=True)
-                    
-            except Exception as e:
-                logger.warning(f"Failed to load waveform cache for {file_path}: {e}")
-                cache_path.unlink(missing_ok=True)
-        
+                return cached[1]
+            self._memory_cache.delete(key)
+
+        conn = self._connect()
+        if conn is not None:
+            peaks, stale = self._load_entry(conn, key, signature, file_path)
+            if peaks is not None:
+                self._memory_cache.set(key, (signature, peaks))
+                self._stats.record_hit()
+                return peaks
+            if stale:
+                self._delete_keys([key])
+
         self._stats.record_miss()
         return None
-    
-    def _validate_mtime(self, file_path: str | Path, cached_mtime: float) -> bool:
-        """Validate that file hasn't changed."""
-        try:
-            current_mtime = os.stat(file_path).st_mtime
-            return abs(current_mtime - cached_mtime) < 0.001
-        except OSError:
-            return False
-    
-    def set(self, file_path: str | Path, waveform: WaveformData) -> None:
+
+    def _load_entry(
+        self, conn: sqlite3.Connection, key: str, signature: tuple[int, int], file_path: str | Path
+    ) -> tuple[Optional[WaveformPeaks], bool]:
         """
-        Cache waveform data.
-        
-        Args:
-            file_path: Path to the audio file
-            waveform: Waveform data to cache
+        Look up and read one entry; returns ``(peaks, stale)``.
+
+        The index row and the payload are read under the same lock ``compact`` holds,
+        so an entry is never read at an offset that compaction has just moved.
         """
-        cache_key = self._get_cache_key(file_path)
-        
-        # Store in memory cache
-        self._memory_cache.set(cache_key, waveform)
-        
-        # Store in file cache
-        cache_path = self._get_cache_path(cache_key)
-        if cache_path:
+        with self._lock:
             try:
-                with open(cache_path, 'wb') as f:
-                    f.write(waveform.to_bytes())
-                logger.debug(f"Waveform cached to disk: {file_path}")
+                row = conn.execute(
+                    "SELECT mtime_ns, size, offset, length, crc, version FROM peaks WHERE path = ?",
+                    (key,),
+                ).fetchone()
+            except sqlite3.Error as e:
+                logger.warning(f"Waveform index read failed: {e}")
+                return None, False
+            if row is None:
+                return None, False
+            mtime_ns, size, offset, length, crc, version = row
+            if (mtime_ns, size) != signature or version != FORMAT_VERSION:
+                return None, True
+            try:
+                payload = self._read_entry(offset, length)
+                if len(payload) != length or zlib.crc32(payload) != crc:
+                    raise ValueError("corrupt waveform entry")
+                return WaveformPeaks.from_bytes(payload), False
             except Exception as e:
-                logger.warning(f"Failed to save waveform cache for {file_path}: {e}")
-    
-    def get_or_compute(
-        self,
-        file_path: str | Path,
-        compute_fn,
-        target_samples: int = 1000
-    ) -> Optional[WaveformData]:
+                logger.warning(f"Failed to load waveform cache for {file_path}: {e}")
+                return None, True
+
+    def set(self, file_path: str | Path, peaks: WaveformPeaks) -> None:
+        """Append a pyramid for ``file_path`` (replacing any previous entry)."""
+        key = _normalize_path(file_path)
+        signature = self._file_signature(file_path)
+        if signature is None:
+            return
+        # Keep what is actually stored (quantized) so memory and disk hits agree
+        payload = peaks.to_bytes()
+        stored = WaveformPeaks.from_bytes(payload)
+        self._memory_cache.set(key, (signature, stored))
+
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            offset = self._append_entry(payload)
+            conn.execute(
+                "INSERT OR REPLACE INTO peaks "
+                "(path, mtime_ns, size, offset, length, crc, version, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, signature[0], signature[1], offset, len(payload), zlib.crc32(payload),
+                 FORMAT_VERSION, time.time()),
+            )
+            conn.commit()
+        except Exception as e:
+            logger.warning(f"Failed to save waveform cache for {file_path}: {e}")
+
+    def get_or_compute(self, file_path: str | Path, compute_fn=None) -> Optional[WaveformPeaks]:
         """
-        Get cached waveform or compute and cache it.
-        
+        Get the cached pyramid or build and store it.
+
         Args:
             file_path: Path to the audio file
-            compute_fn: Function to compute waveform if not cached
-            target_samples: Target number of samples for downsampling
-            
-        Returns:
-            Waveform data (cached or computed)
+            compute_fn: Optional ``() -> WaveformPeaks``; defaults to ``compute_peaks``
         """
-        # Try cache first
         cached = self.get(file_path)
         if cached is not None:
             return cached
-        
-        # Compute waveform
         try:
-            raw_waveform = compute_fn()
-            if raw_waveform is None:
-                return None
-            
-            # Get file stats
-            stat = os.stat(file_path)
-            
-            # Downsample if needed
-            if len(raw_waveform) > target_samples:
-                samples = self._downsample(raw_waveform, target_samples)
-            else:
-                samples = raw_waveform
-            
-            # Create waveform data
-            waveform = WaveformData(
-                file_path=str(file_path),
-                mtime=stat.st_mtime,
-                samples=samples,
-                sample_count=len(samples),
-                duration=getattr(raw_waveform, 'duration', 0.0),
-                channels=1  # Typically mono for display
-            )
-            
-            self.set(file_path, waveform)
-            return waveform
-            
+            peaks = compute_fn() if compute_fn is not None else compute_peaks(file_path)
         except Exception as e:
             logger.warning(f"Failed to compute waveform for {file_path}: {e}")
             return None
-    
-    def _downsample(self, samples: np.ndarray, target_count: int) -> np.ndarray:
-        """Downsample waveform data for display."""
-        if len(samples) <= target_count:
-            return samples
-        
-        # Use peak detection for better visual representation
-        chunk_size = len(samples) // target_count
-        result = np.zeros(target_count * 2)  # Store min and max for each chunk
-        
-        for i in range(target_count):
-            start = i * chunk_size
-            end = min(start + chunk_size, len(samples))
-            chunk = samples[start:end]
-            
-            if len(chunk) > 0:
-                result[i * 2] = np.min(chunk)
-                result[i * 2 + 1] = np.max(chunk)
-        
-        return result
-    
+        if peaks is None:
+            return None
+        self.set(file_path, peaks)
+        return peaks
+
+    def _delete_keys(self, keys: list[str]) -> int:
+        for key in keys:
+            self._memory_cache.delete(key)
+        conn = self._connect()
+        if conn is None or not keys:
+            return 0
+        removed = 0
+        try:
+            for i in range(0, len(keys), SQLITE_IN_BATCH):
+                chunk = keys[i:i + SQLITE_IN_BATCH]
+                cur = conn.execute(
+                    f"DELETE FROM peaks WHERE path IN ({', '.join('?' for _ in chunk)})", chunk
+                )
+                removed += max(0, cur.rowcount)
+            conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Waveform index delete failed: {e}")
+        return removed
+
     def invalidate(self, file_path: str | Path) -> bool:
         """
         Invalidate cached waveform for a file.
-        
-        Args:
-            file_path: Path to the audio file
-            
+
         Returns:
-            True if entry was removed
+            True if an entry was removed
         """
-        cache_key = self._get_cache_key(file_path)
-        
-        # Remove from memory cache
-        memory_removed = self._memory_cache.delete(cache_key)
-        
-        # Remove from file cache
-        cache_path = self._get_cache_path(cache_key)
-        file_removed = False
-        if cache_path and cache_path.exists():
-            try:
-                cache_path.unlink()
-                file_removed = True
-            except OSError:
-                pass
-        
-        if memory_removed or file_removed:
+        key = _normalize_path(file_path)
+        in_memory = self._memory_cache.delete(key)
+        removed = self._delete_keys([key]) > 0
+        if in_memory or removed:
             self._stats.record_eviction()
             return True
         return False
-    
+
     def clear(self) -> None:
         """Clear all cached waveforms."""
         self._memory_cache.clear()
-        
-        if self._cache_dir and self._cache_dir.exists():
-            for cache_file in self._cache_dir.glob("*.waveform"):
+        conn = self._connect()
+        if conn is not None:
+            with self._lock:
                 try:
-                    cache_file.unlink()
-                except OSError:
-                    pass
-        
+                    conn.execute("DELETE FROM peaks")
+                    conn.commit()
+                    self._data_handle().truncate(0)
+                except Exception as e:
+                    logger.warning(f"Failed to clear waveform cache: {e}")
         self._stats.reset()
-    
-    def cleanup_orphaned(self, valid_paths: set[str]) -> int:
+
+    def cleanup_orphaned(self, valid_paths: Optional[set[str]] = None) -> int:
         """
-        Remove cache entries for files that no longer exist.
-        
-        Args:
-            valid_paths: Set of valid file paths
-            
+        Remove entries whose audio file has been deleted.
+
+        An entry is removed only when its file no longer exists on disk; paths in
+        ``valid_paths`` (e.g. the library's current file list) are kept without a
+        ``stat``. Compacts the data file afterwards if enough space became dead.
+
         Returns:
             Number of entries removed
         """
-        removed = 0
-        
-        if self._cache_dir and self._cache_dir.exists():
-            for cache_file in self._cache_dir.glob("*.waveform"):
+        conn = self._connect()
+        if conn is None:
+            return 0
+        keep = {_normalize_path(p) for p in valid_paths} if valid_paths else set()
+        try:
+            paths = [row[0] for row in conn.execute("SELECT path FROM peaks")]
+        except sqlite3.Error as e:
+            logger.warning(f"Waveform index read failed: {e}")
+            return 0
+        orphaned = [p for p in paths if p not in keep and not os.path.exists(p)]
+        removed = self._delete_keys(orphaned)
+        if removed:
+            for _ in range(removed):
+                self._stats.record_eviction()
+            logger.info(f"Removed {removed} orphaned waveform entries")
+        if self.dead_ratio() >= COMPACT_DEAD_RATIO:
+            self.compact()
+        return removed
+
+    def dead_ratio(self) -> float:
+        """Share of ``peaks.dat`` no longer referenced by the index."""
+        conn = self._connect()
+        if conn is None:
+            return 0.0
+        try:
+            total = os.path.getsize(self.data_path)
+            live = conn.execute("SELECT COALESCE(SUM(length), 0) FROM peaks").fetchone()[0]
+        except (OSError, sqlite3.Error):
+            return 0.0
+        return 1.0 - live / total if total > 0 else 0.0
+
+    def compact(self) -> None:
+        """Rewrite ``peaks.dat`` with only the live entries (blocks readers/writers meanwhile)."""
+        conn = self._connect()
+        if conn is None:
+            return
+        tmp_path = self.data_path.with_name(self.DATA_NAME + ".compact")
+        with self._lock:
+            try:
+                rows = conn.execute("SELECT path, offset, length FROM peaks ORDER BY offset").fetchall()
+                fh = self._data_handle()
+                moved = []
+                with open(tmp_path, "wb") as out:
+                    for path, offset, length in rows:
+                        fh.seek(offset)
+                        moved.append((out.tell(), path))
+                        out.write(fh.read(length))
+                    out.flush()
+                    os.fsync(out.fileno())
+                self._data_fh.close()
+                self._data_fh = None
+                os.replace(tmp_path, self.data_path)
+                # Offsets that fail the CRC after a crash here just read as misses
+                conn.executemany("UPDATE peaks SET offset = ? WHERE path = ?", moved)
+                conn.commit()
+                logger.info(f"Compacted waveform store: {len(rows)} entries")
+            except Exception as e:
+                logger.warning(f"Waveform store compaction failed: {e}")
                 try:
-                    with open(cache_file, 'rb') as f:
-                        # Read just enough to get the file path
-                        # This is a simplified check
-                        pass
-                    
-                    # For now, just check if file exists
-                    # A full implementation would decode the path
-                    cache_file.unlink()
-                    removed += 1
-                except Exception:
+                    tmp_path.unlink(missing_ok=True)
+                except OSError:
                     pass
-        
-        return removed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._data_fh is not None:
+                self._data_fh.close()
+                self._data_fh = None
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
 
 
 # Global waveform cache instance
 _waveform_cache: Optional[WaveformCacheManager] = None
+_waveform_cache_lock = threading.Lock()
 
 
 def get_waveform_cache() -> WaveformCacheManager:
     """Get the global waveform cache instance."""
     global _waveform_cache
     if _waveform_cache is None:
-        # Use default cache directory
-        from transcriptionist_v3.runtime.runtime_config import get_runtime_config
-        try:
-            config = get_runtime_config()
-            cache_dir = config.paths.cache_dir / "waveforms"
-        except Exception:
-            cache_dir = Path.home() / ".cache" / "transcriptionist" / "waveforms"
-        
-        _waveform_cache = WaveformCacheManager(cache_dir=cache_dir)
+        with _waveform_cache_lock:
+            if _waveform_cache is None:
+                from transcriptionist_v3.runtime.runtime_config import get_runtime_config
+                try:
+                    config = get_runtime_config()
+                    cache_dir = config.paths.cache_dir / "waveforms"
+                except Exception:
+                    cache_dir = Path.home() / ".cache" / "transcriptionist" / "waveforms"
+
+                _waveform_cache = WaveformCacheManager(cache_dir=cache_dir)
     return _waveform_cache
 
 
@@ -19,6 +19,7 @@ from sqlalchemy.engine import Engine
 from sqlalchemy.engine.url import make_url
 from sqlalchemy.orm import Session, sessionmaker
 
+from .fts import ensure_fts
 from .models import Base
 
 logger = logging.getLogger(__name__)
@@ -222,6 +223,9 @@ class DatabaseManager:
                     ("tag_status", "tag_status INTEGER DEFAULT 0"),
                     ("tag_version", "tag_version VARCHAR(64) NOT NULL DEFAULT ''"),
                     ("translation_status", "translation_status INTEGER DEFAULT 0"),
+                    ("file_mtime_ns", "file_mtime_ns INTEGER"),
+                    ("file_inode", "file_inode INTEGER"),
+                    ("file_dev", "file_dev INTEGER"),
                 ]
 
                 for name, ddl in new_columns:
@@ -238,15 +242,32 @@ class DatabaseManager:
                         )
                     )
 
+                result = conn.execute(text("PRAGMA table_info(index_shards)"))
+                shard_columns = [row[1] for row in result.fetchall()]
+                for name, ddl in (
+                    ("row_start", "row_start INTEGER"),
+                    ("row_end", "row_end INTEGER"),
+                ):
+                    if shard_columns and name not in shard_columns:
+                        conn.execute(text(f"ALTER TABLE index_shards ADD COLUMN {ddl}"))
+
                 index_sql = [
                     "CREATE INDEX IF NOT EXISTS idx_audio_files_index_status ON audio_files (index_status)",
                     "CREATE INDEX IF NOT EXISTS idx_audio_files_tag_status ON audio_files (tag_status)",
                     "CREATE INDEX IF NOT EXISTS idx_audio_files_translation_status ON audio_files (translation_status)",
+                    "CREATE INDEX IF NOT EXISTS idx_audio_files_inode ON audio_files (file_inode)",
                 ]
                 for sql in index_sql:
                     conn.execute(text(sql))
         except Exception as e:
             logger.error("Database migration failed: %s", e)
+
+        # FTS5 全文索引单独事务：SQLite 不支持 FTS5/trigram 时不影响其他迁移
+        try:
+            with self.engine.begin() as conn:
+                ensure_fts(conn)
+        except Exception as e:
+            logger.error("Full-text index migration failed: %s", e)
 def _resolve_runtime_database_config() -> tuple[str, str, Optional[Path]]:
     from transcriptionist_v3.core.config import AppConfig
     from transcriptionist_v3.runtime.runtime_config import get_runtime_config
@@ -0,0 +1,141 @@
+"""
+SQLite FTS5 full-text index for the audio library.
+
+``audio_files_fts`` 以 ``audio_files.id`` 作为 rowid，索引文件名、描述、译名与标签（空格拼接）。
+由触发器与 ``audio_files`` / ``audio_file_tags`` 保持同步，Alembic 迁移与
+``DatabaseManager._apply_migrations`` 共用这里的 DDL（均为幂等语句）。
+
+使用 trigram 分词器：与原 ``ILIKE '%term%'`` 一样按子串匹配（中文文件名无需分词），
+大小写不敏感，并可用 bm25 排序；查询词少于 3 个字符时无法命中，调用方需回退 LIKE。
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import Any, Iterable, List
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "audio_files_fts"
+# 列顺序即 bm25() 权重顺序
+FTS_COLUMNS = ("filename", "description", "translated_name", "tags")
+# bm25 列权重：文件名 > 译名 > 标签 > 描述
+FTS_BM25_WEIGHTS = (10.0, 2.0, 6.0, 4.0)
+# trigram 分词器的最短可检索词长
+FTS_MIN_TERM_LENGTH = 3
+
+_TAGS_SQL = "COALESCE((SELECT group_concat(tag, ' ') FROM audio_file_tags WHERE audio_file_id = {ref}), '')"
+
+_ROW_VALUES_SQL = (
+    "{ref}, {row}.filename, COALESCE({row}.description, ''), COALESCE({row}.translated_name, ''), "
+    + _TAGS_SQL
+)
+
+CREATE_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    + ", ".join(FTS_COLUMNS)
+    + ", tokenize = 'trigram')"
+)
+
+TRIGGER_SQL = {
+    "audio_files_fts_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS audio_files_fts_ai AFTER INSERT ON audio_files BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {", ".join(FTS_COLUMNS)})
+            VALUES ({_ROW_VALUES_SQL.format(ref="new.id", row="new")});
+        END
+    """,
+    "audio_files_fts_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS audio_files_fts_ad AFTER DELETE ON audio_files BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        END
+    """,
+    "audio_files_fts_au": f"""
+        CREATE TRIGGER IF NOT EXISTS audio_files_fts_au
+        AFTER UPDATE OF id, filename, description, translated_name ON audio_files BEGIN
+            DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+            INSERT INTO {FTS_TABLE}(rowid, {", ".join(FTS_COLUMNS)})
+            VALUES ({_ROW_VALUES_SQL.format(ref="new.id", row="new")});
+        END
+    """,
+    "audio_file_tags_fts_ai": f"""
+        CREATE TRIGGER IF NOT EXISTS audio_file_tags_fts_ai AFTER INSERT ON audio_file_tags BEGIN
+            UPDATE {FTS_TABLE} SET tags = {_TAGS_SQL.format(ref="new.audio_file_id")}
+            WHERE rowid = new.audio_file_id;
+        END
+    """,
+    "audio_file_tags_fts_ad": f"""
+        CREATE TRIGGER IF NOT EXISTS audio_file_tags_fts_ad AFTER DELETE ON audio_file_tags BEGIN
+            UPDATE {FTS_TABLE} SET tags = {_TAGS_SQL.format(ref="old.audio_file_id")}
+            WHERE rowid = old.audio_file_id;
+        END
+    """,
+    "audio_file_tags_fts_au": f"""
+        CREATE TRIGGER IF NOT EXISTS audio_file_tags_fts_au
+        AFTER UPDATE OF tag, audio_file_id ON audio_file_tags BEGIN
+            UPDATE {FTS_TABLE} SET tags = {_TAGS_SQL.format(ref="old.audio_file_id")}
+            WHERE rowid = old.audio_file_id;
+            UPDATE {FTS_TABLE} SET tags = {_TAGS_SQL.format(ref="new.audio_file_id")}
+            WHERE rowid = new.audio_file_id;
+        END
+    """,
+}
+
+REBUILD_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"""
+        INSERT INTO {FTS_TABLE}(rowid, {", ".join(FTS_COLUMNS)})
+        SELECT {_ROW_VALUES_SQL.format(ref="a.id", row="a")} FROM audio_files AS a
+    """,
+]
+
+
+def upgrade_statements() -> List[str]:
+    """建表 + 触发器（幂等）。"""
+    return [CREATE_TABLE_SQL, *TRIGGER_SQL.values()]
+
+
+def downgrade_statements() -> List[str]:
+    return [f"DROP TRIGGER IF EXISTS {name}" for name in TRIGGER_SQL] + [f"DROP TABLE IF EXISTS {FTS_TABLE}"]
+
+
+def fts_exists(conn: Any) -> bool:
+    row = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+        {"name": FTS_TABLE},
+    ).first()
+    return row is not None
+
+
+def ensure_fts(conn: Any) -> bool:
+    """
+    在给定连接上创建 FTS 表与触发器；表为新建时从 audio_files 全量回填。
+
+    SQLite 未编译 FTS5 / trigram（< 3.34）时返回 False，搜索回退到 LIKE。
+    """
+    existed = fts_exists(conn)
+    try:
+        _execute_all(conn, upgrade_statements())
+        if not existed:
+            _execute_all(conn, REBUILD_SQL)
+            logger.info("Full-text index %s created and populated", FTS_TABLE)
+        return True
+    except Exception as e:
+        logger.warning(f"SQLite FTS5 (trigram) unavailable, text search falls back to LIKE: {e}")
+        return False
+
+
+def rebuild_fts(conn: Any) -> None:
+    """按 audio_files / audio_file_tags 重新生成全部 FTS 行（修复或批量导入后使用）。"""
+    _execute_all(conn, REBUILD_SQL)
+
+
+def quote_fts_phrase(value: str) -> str:
+    """把用户输入转成 FTS5 字符串字面量（双引号转义），避免被解析为 FTS 语法。"""
+    return '"' + value.replace('"', '""') + '"'
+
+
+def _execute_all(conn: Any, statements: Iterable[str]) -> None:
+    for sql in statements:
+        conn.execute(text(sql))
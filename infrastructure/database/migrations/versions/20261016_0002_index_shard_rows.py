@@ -0,0 +1,40 @@
+"""index shard row range for columnar embedding store
+
+Revision ID: 20261016_0002
+Revises: 20260207_0001
+Create Date: 2026-10-16 10:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0002"
+down_revision = "20260207_0001"
+branch_labels = None
+depends_on = None
+
+
+def _columns(table: str) -> set[str]:
+    return {col["name"] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def upgrade() -> None:
+    existing = _columns("index_shards")
+    with op.batch_alter_table("index_shards") as batch:
+        if "row_start" not in existing:
+            batch.add_column(sa.Column("row_start", sa.Integer(), nullable=True))
+        if "row_end" not in existing:
+            batch.add_column(sa.Column("row_end", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    existing = _columns("index_shards")
+    with op.batch_alter_table("index_shards") as batch:
+        if "row_end" in existing:
+            batch.drop_column("row_end")
+        if "row_start" in existing:
+            batch.drop_column("row_start")
@@ -0,0 +1,38 @@
+"""fts5 full-text index for audio files
+
+Revision ID: 20261016_0003
+Revises: 20261016_0002
+Create Date: 2026-10-16 12:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+try:
+    from transcriptionist_v3.infrastructure.database import fts
+except ModuleNotFoundError:
+    from infrastructure.database import fts
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0003"
+down_revision = "20261016_0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existed = fts.fts_exists(bind)
+    for sql in fts.upgrade_statements():
+        op.execute(sa.text(sql))
+    if not existed:
+        for sql in fts.REBUILD_SQL:
+            op.execute(sa.text(sql))
+
+
+def downgrade() -> None:
+    for sql in fts.downgrade_statements():
+        op.execute(sa.text(sql))
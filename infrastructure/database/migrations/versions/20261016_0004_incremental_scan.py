@@ -0,0 +1,60 @@
+"""file snapshots and directory snapshots for incremental rescans
+
+Revision ID: 20261016_0004
+Revises: 20261016_0003
+Create Date: 2026-10-16 14:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0004"
+down_revision = "20261016_0003"
+branch_labels = None
+depends_on = None
+
+
+def _columns(table: str) -> set[str]:
+    return {col["name"] for col in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _tables() -> set[str]:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    existing = _columns("audio_files")
+    with op.batch_alter_table("audio_files") as batch:
+        for name in ("file_mtime_ns", "file_inode", "file_dev"):
+            if name not in existing:
+                batch.add_column(sa.Column(name, sa.Integer(), nullable=True))
+    op.execute("CREATE INDEX IF NOT EXISTS idx_audio_files_inode ON audio_files (file_inode)")
+
+    if "scan_directories" not in _tables():
+        op.create_table(
+            "scan_directories",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("root_path", sa.String(length=1024), nullable=False),
+            sa.Column("path", sa.String(length=1024), nullable=False, unique=True),
+            sa.Column("mtime_ns", sa.Integer(), nullable=False),
+            sa.Column("subdirs", sa.Text(), nullable=False, server_default="[]"),
+            sa.Column("file_count", sa.Integer(), nullable=True),
+            sa.Column("scanned_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_scan_directories_root_path", "scan_directories", ["root_path"])
+
+
+def downgrade() -> None:
+    if "scan_directories" in _tables():
+        op.drop_index("ix_scan_directories_root_path", table_name="scan_directories")
+        op.drop_table("scan_directories")
+    op.execute("DROP INDEX IF EXISTS idx_audio_files_inode")
+    existing = _columns("audio_files")
+    with op.batch_alter_table("audio_files") as batch:
+        for name in ("file_dev", "file_inode", "file_mtime_ns"):
+            if name in existing:
+                batch.drop_column(name)
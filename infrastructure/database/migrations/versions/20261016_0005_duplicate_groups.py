@@ -0,0 +1,72 @@
+"""near-duplicate groups found from CLAP embeddings
+
+Revision ID: 20261016_0005
+Revises: 20261016_0004
+Create Date: 2026-10-16 16:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0005"
+down_revision = "20261016_0004"
+branch_labels = None
+depends_on = None
+
+
+def _tables() -> set[str]:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    existing = _tables()
+    if "duplicate_groups" not in existing:
+        op.create_table(
+            "duplicate_groups",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("job_id", sa.Integer(), sa.ForeignKey("jobs.id", ondelete="SET NULL"), nullable=True),
+            sa.Column(
+                "keeper_id", sa.Integer(), sa.ForeignKey("audio_files.id", ondelete="SET NULL"), nullable=True
+            ),
+            sa.Column("size", sa.Integer(), nullable=True),
+            sa.Column("threshold", sa.Float(), nullable=True),
+            sa.Column("min_similarity", sa.Float(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_duplicate_groups_job_id", "duplicate_groups", ["job_id"])
+        op.create_index("ix_duplicate_groups_keeper_id", "duplicate_groups", ["keeper_id"])
+    if "duplicate_members" not in existing:
+        op.create_table(
+            "duplicate_members",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column(
+                "group_id", sa.Integer(), sa.ForeignKey("duplicate_groups.id", ondelete="CASCADE"), nullable=False
+            ),
+            sa.Column(
+                "audio_file_id",
+                sa.Integer(),
+                sa.ForeignKey("audio_files.id", ondelete="CASCADE"),
+                nullable=False,
+                unique=True,
+            ),
+            sa.Column("similarity", sa.Float(), nullable=True),
+            sa.Column("is_keeper", sa.Boolean(), nullable=True),
+        )
+        op.create_index("ix_duplicate_members_group_id", "duplicate_members", ["group_id"])
+        op.create_index("ix_duplicate_members_is_keeper", "duplicate_members", ["is_keeper"])
+
+
+def downgrade() -> None:
+    existing = _tables()
+    if "duplicate_members" in existing:
+        op.drop_index("ix_duplicate_members_is_keeper", table_name="duplicate_members")
+        op.drop_index("ix_duplicate_members_group_id", table_name="duplicate_members")
+        op.drop_table("duplicate_members")
+    if "duplicate_groups" in existing:
+        op.drop_index("ix_duplicate_groups_keeper_id", table_name="duplicate_groups")
+        op.drop_index("ix_duplicate_groups_job_id", table_name="duplicate_groups")
+        op.drop_table("duplicate_groups")
@@ -0,0 +1,45 @@
+"""write-ahead journal for transactional bulk renames
+
+Revision ID: 20261016_0006
+Revises: 20261016_0005
+Create Date: 2026-10-16 18:00:00
+"""
+
+from __future__ import annotations
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "20261016_0006"
+down_revision = "20261016_0005"
+branch_labels = None
+depends_on = None
+
+
+def _tables() -> set[str]:
+    return set(sa.inspect(op.get_bind()).get_table_names())
+
+
+def upgrade() -> None:
+    if "rename_journal" not in _tables():
+        op.create_table(
+            "rename_journal",
+            sa.Column("id", sa.Integer(), primary_key=True, autoincrement=True),
+            sa.Column("batch_id", sa.String(length=64), nullable=False),
+            sa.Column("seq", sa.Integer(), nullable=False),
+            sa.Column("level", sa.Integer(), nullable=False),
+            sa.Column("source_path", sa.String(length=1024), nullable=False),
+            sa.Column("target_path", sa.String(length=1024), nullable=False),
+            sa.Column("overwrite", sa.Boolean(), nullable=True),
+            sa.Column("state", sa.String(length=16), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+        )
+        op.create_index("ix_rename_journal_batch_id", "rename_journal", ["batch_id"])
+
+
+def downgrade() -> None:
+    if "rename_journal" in _tables():
+        op.drop_index("ix_rename_journal_batch_id", table_name="rename_journal")
+        op.drop_table("rename_journal")
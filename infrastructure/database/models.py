@@ -52,6 +52,10 @@ class AudioFile(Base):
     original_filename: Mapped[str] = mapped_column(String(512), nullable=False, index=True, default="")
     file_size: Mapped[int] = mapped_column(Integer, nullable=False)
     content_hash: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    # 增量重扫快照：入库/更新时的 mtime(ns) 与 inode/设备号（移动检测用）
+    file_mtime_ns: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    file_inode: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    file_dev: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     
     # Audio properties
     duration: Mapped[float] = mapped_column(Float, nullable=False, index=True)
@@ -97,6 +101,7 @@ class AudioFile(Base):
         Index('idx_audio_files_format_duration', 'format', 'duration'),
         Index('idx_audio_files_sample_bit_depth', 'sample_rate', 'bit_depth'),
         Index('idx_audio_files_search', 'filename', 'duration', 'format'),
+        Index('idx_audio_files_inode', 'file_inode'),
     )
     
     def __repr__(self) -> str:
@@ -240,6 +245,29 @@ class LibraryPath(Base):
         return f"<LibraryPath(id={self.id}, path='{self.path}')>"
 
 
+class ScanDirectory(Base):
+    """
+    Per-directory snapshot for incremental rescans.
+
+    目录 mtime 未变说明其直接子项（文件/子目录）没有增删改名，重扫时跳过 scandir，
+    直接复用记录的子目录列表继续向下检查。
+    """
+    __tablename__ = 'scan_directories'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    root_path: Mapped[str] = mapped_column(String(1024), nullable=False, index=True)
+    path: Mapped[str] = mapped_column(String(1024), unique=True, nullable=False)
+    mtime_ns: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 直接子目录名（JSON 列表）
+    subdirs: Mapped[str] = mapped_column(Text, nullable=False, default="[]")
+    # 直接包含的音频文件数
+    file_count: Mapped[int] = mapped_column(Integer, default=0)
+    scanned_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<ScanDirectory(id={self.id}, path='{self.path}')>"
+
+
 class WaveformCache(Base):
     """
     Cached waveform data for audio files.
@@ -347,6 +375,9 @@ class IndexShard(Base):
     )
     shard_path: Mapped[str] = mapped_column(String(1024), nullable=False)
     count: Mapped[int] = mapped_column(Integer, default=0)
+    # 列式 EmbeddingStore 中的行区间 [row_start, row_end)
+    row_start: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    row_end: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     start_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     end_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     model_version: Mapped[Optional[str]] = mapped_column(String(64), nullable=True)
@@ -357,3 +388,81 @@ class IndexShard(Base):
 
     def __repr__(self) -> str:
         return f"<IndexShard(id={self.id}, shard='{self.shard_path}')>"
+
+
+class RenameJournalEntry(Base):
+    """
+    Write-ahead journal for a transactional bulk rename.
+
+    批量重命名开始前把完整计划（每一步的源/目标路径与执行层级）写入本表；
+    每批数据库路径更新与对应日志行的 committed 标记在同一事务中提交。
+    批次正常结束后删除其日志行，残留的行即为被中断的批次，可按磁盘状态续做或回滚。
+    """
+    __tablename__ = 'rename_journal'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    batch_id: Mapped[str] = mapped_column(String(64), nullable=False, index=True)
+    seq: Mapped[int] = mapped_column(Integer, nullable=False)
+    # 执行层级：同一层的步骤互不依赖，可并行；第 n 层依赖第 n-1 层腾出目标路径
+    level: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    source_path: Mapped[str] = mapped_column(String(1024), nullable=False)
+    target_path: Mapped[str] = mapped_column(String(1024), nullable=False)
+    overwrite: Mapped[bool] = mapped_column(Boolean, default=False)
+    # pending / committed
+    state: Mapped[str] = mapped_column(String(16), nullable=False, default="pending")
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    def __repr__(self) -> str:
+        return f"<RenameJournalEntry(batch_id='{self.batch_id}', seq={self.seq}, state='{self.state}')>"
+
+
+class DuplicateGroup(Base):
+    """
+    Acoustic near-duplicate cluster found by a near_duplicates job.
+
+    同一声音的不同格式/采样率/文件名版本（CLAP embedding 余弦相似度高于阈值）归为一组，
+    每组选出一个保留文件（keeper），其余成员可在音效库中按 ``dup:`` 条件隐藏。
+    全库任务完成后整体替换上一次的结果；按选择范围运行时只替换含有范围内文件的组。
+    """
+    __tablename__ = 'duplicate_groups'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    job_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey('jobs.id', ondelete='SET NULL'), nullable=True, index=True
+    )
+    keeper_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey('audio_files.id', ondelete='SET NULL'), nullable=True, index=True
+    )
+    size: Mapped[int] = mapped_column(Integer, default=0)
+    threshold: Mapped[float] = mapped_column(Float, default=0.0)
+    # 组内非 keeper 成员与 keeper 的最小相似度
+    min_similarity: Mapped[float] = mapped_column(Float, default=0.0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
+
+    members: Mapped[List["DuplicateMember"]] = relationship(
+        "DuplicateMember", back_populates="group", cascade="all, delete-orphan"
+    )
+
+    def __repr__(self) -> str:
+        return f"<DuplicateGroup(id={self.id}, keeper_id={self.keeper_id}, size={self.size})>"
+
+
+class DuplicateMember(Base):
+    """Membership of an audio file in a near-duplicate group (one group per file)."""
+    __tablename__ = 'duplicate_members'
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    group_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('duplicate_groups.id', ondelete='CASCADE'), nullable=False, index=True
+    )
+    audio_file_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey('audio_files.id', ondelete='CASCADE'), nullable=False, unique=True
+    )
+    # 与 keeper 的余弦相似度（keeper 自身为 1.0）
+    similarity: Mapped[float] = mapped_column(Float, default=0.0)
+    is_keeper: Mapped[bool] = mapped_column(Boolean, default=False, index=True)
+
+    group: Mapped["DuplicateGroup"] = relationship("DuplicateGroup", back_populates="members")
+
+    def __repr__(self) -> str:
+        return f"<DuplicateMember(group_id={self.group_id}, audio_file_id={self.audio_file_id})>"
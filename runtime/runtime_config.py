@@ -217,6 +217,11 @@ class RuntimeConfig:
                 user_data = appdata / "Transcriptionist"
                 data_dir = user_data / "data"
                 config_dir = user_data / "config"
+        # 显式指定的数据根目录（无界面命令行的 --data-dir / 默认用户目录）优先
+        home_override = os.environ.get(DATA_HOME_ENV)
+        if home_override:
+            data_dir = Path(home_override) / "data"
+            config_dir = Path(home_override) / "config"
         
         # Resource paths - handle PyInstaller _internal directory
         if internal_dir and internal_dir.exists():
@@ -338,6 +343,22 @@ class RuntimeConfig:
 # Global runtime configuration instance
 _runtime_config: Optional[RuntimeConfig] = None
 
+# 数据根目录覆盖：设置后 data/ 与 config/ 都放在该目录下，而不是安装目录
+DATA_HOME_ENV = "TRANSCRIPTIONIST_HOME"
+
+
+def user_data_home() -> Path:
+    """
+    当前用户的数据根目录（不随安装位置变化）。
+
+    Windows 为 ``%APPDATA%/Transcriptionist``（与安装到 Program Files 时一致）；
+    其他平台遵循 XDG：``$XDG_DATA_HOME/transcriptionist``，默认 ``~/.local/share/transcriptionist``。
+    """
+    if sys.platform == "win32":
+        return Path(os.environ.get("APPDATA", Path.home() / "AppData" / "Roaming")) / "Transcriptionist"
+    xdg = os.environ.get("XDG_DATA_HOME") or str(Path.home() / ".local" / "share")
+    return Path(xdg) / "transcriptionist"
+
 
 def get_runtime_config() -> RuntimeConfig:
     """
@@ -1,21 +1,33 @@
 #!/usr/bin/env python3
-"""AudioFilesPanel 1万条列表微压测脚本。"""
+"""AudioFilesPanel 列表微压测脚本。
+
+- 渲染：1 万条列表的 set_folder_indices 与首次渲染耗时
+- 过滤：100 万行下逐字输入 / 回删时的过滤延迟
+  * 行索引（LibraryRowIndex）过滤 + 增量 diff，不依赖 Qt
+  * 面板端到端（搜索框 textChanged → 模型增量更新 → 渲染），需要 PySide6
+"""
 
 from __future__ import annotations
 
+import argparse
+import json
 import random
 import string
 import sys
 import time
 from pathlib import Path
 
-from PySide6.QtWidgets import QApplication
+import numpy as np
 
 PROJECT_ROOT = Path(__file__).resolve().parent.parent
 if str(PROJECT_ROOT.parent) not in sys.path:
     sys.path.insert(0, str(PROJECT_ROOT.parent))
 
-from transcriptionist_v3.ui.panels.audio_files_panel import AudioFilesPanel
+from transcriptionist_v3.application.library_manager.row_index import LibraryRowIndex, diff_rows
+
+# 模拟输入：逐字输入再回删，覆盖“继续输入只复核上次结果”与“回删重新全量过滤”两种路径
+TYPING_SEQUENCE = ["s", "sf", "sfx", "sfx_", "sfx_0", "sfx_00", "sfx_001", "sfx_0012", "sfx_001", "sfx_00", "", "rain", "ra", ""]
+FORMATS = ["wav", "mp3", "flac", "ogg"]
 
 
 def _random_word(length: int = 8) -> str:
@@ -23,11 +35,38 @@ def _random_word(length: int = 8) -> str:
     return "".join(random.choice(letters) for _ in range(length))
 
 
+def _fake_filename(index: int) -> str:
+    rng = random.Random(index)
+    word = "".join(rng.choice(string.ascii_lowercase) for _ in range(6))
+    return f"sfx_{index:07d}_{word}.{FORMATS[index % len(FORMATS)]}"
+
+
+def _fake_path(index: int) -> str:
+    return f"D:/benchmark/audio/pack_{index % 997:03d}/{_fake_filename(index)}"
+
+
+def _fake_info(index: int) -> dict:
+    """按索引确定性生成文件信息（100 万行时不预先构造字典）。"""
+    filename = _fake_filename(index)
+    return {
+        "file_path": _fake_path(index),
+        "filename": filename,
+        "translated_name": f"音效_{index:07d}" if index % 3 == 0 else "",
+        "original_filename": filename,
+        "tags": [f"tag{index % 11}", f"scene{index % 7}"] if index % 4 != 0 else [],
+        "duration": round((index % 1200) / 100.0 + 0.1, 2),
+        "file_size": 30_000 + (index * 7919) % 40_000_000,
+        "format": filename.split(".")[-1],
+        "index_status": index % 3,
+        "tag_status": (index + 1) % 3,
+        "translation_status": (index + 2) % 3,
+    }
+
+
 def _build_fake_dataset(count: int) -> list[dict]:
     dataset: list[dict] = []
-    formats = ["wav", "mp3", "flac", "ogg"]
     for index in range(count):
-        filename = f"sfx_{index:05d}_{_random_word(6)}.{random.choice(formats)}"
+        filename = f"sfx_{index:05d}_{_random_word(6)}.{random.choice(FORMATS)}"
         translated = f"音效_{index:05d}" if index % 3 == 0 else ""
         tags = [f"tag{index % 11}", f"scene{index % 7}"] if index % 4 != 0 else []
         dataset.append(
@@ -48,7 +87,14 @@ def _build_fake_dataset(count: int) -> list[dict]:
     return dataset
 
 
+def _percentile(values: list[float], q: float) -> float:
+    return float(np.percentile(np.asarray(values), q)) if values else 0.0
+
+
 def run_benchmark(record_count: int = 10_000):
+    from PySide6.QtWidgets import QApplication
+    from transcriptionist_v3.ui.panels.audio_files_panel import AudioFilesPanel
+
     random.seed(42)
     app = QApplication.instance() or QApplication(sys.argv)
 
@@ -68,7 +114,7 @@ def run_benchmark(record_count: int = 10_000):
     t2 = time.perf_counter()
 
     print("=" * 60)
-    print("AudioFilesPanel 微压测（10k）")
+    print(f"AudioFilesPanel 微压测（{record_count}）")
     print("=" * 60)
     print(f"数据构造条数: {record_count}")
     print(f"set_folder_indices 耗时: {(t1 - t0) * 1000:.2f} ms")
@@ -81,5 +127,161 @@ def run_benchmark(record_count: int = 10_000):
     app.processEvents()
 
 
+def run_filter_benchmark(row_count: int = 1_000_000, fetch_batch: int = 2000) -> dict:
+    """行索引过滤延迟（不依赖 Qt）：逐字输入序列上每次过滤 + 与当前视图窗口 diff 的耗时。"""
+    paths = [_fake_path(i) for i in range(row_count)]
+    ids = np.arange(1, row_count + 1, dtype=np.int64)
+
+    t0 = time.perf_counter()
+    row_index = LibraryRowIndex(paths, ids)
+    t1 = time.perf_counter()
+    row_index.prepare()
+    t2 = time.perf_counter()
+
+    # 面板基准顺序：文件夹勾选结果（按全局索引升序）
+    all_rows = np.arange(row_count, dtype=np.int64)
+    window = all_rows[:fetch_batch]
+    samples = []
+    for text in TYPING_SEQUENCE:
+        s0 = time.perf_counter()
+        rows = row_index.filter(text, within=all_rows)
+        s1 = time.perf_counter()
+        diff = diff_rows(window, rows, max_window=max(len(window), fetch_batch) * 4)
+        s2 = time.perf_counter()
+        if diff is None:
+            window = rows[:fetch_batch]
+        else:
+            window = rows[: max(diff.window, min(fetch_batch, len(rows)))]
+        samples.append({
+            "text": text,
+            "matches": int(len(rows)),
+            "filter_ms": (s1 - s0) * 1000.0,
+            "diff_ms": (s2 - s1) * 1000.0,
+            "incremental": diff is not None,
+        })
+
+    lookup_paths = [paths[i] for i in range(0, row_count, max(1, row_count // 10_000))]
+    l0 = time.perf_counter()
+    found = row_index.rows_of(lookup_paths)
+    l1 = time.perf_counter()
+    id_rows = row_index.rows_for_ids(ids[::7])
+    l2 = time.perf_counter()
+
+    totals = [s["filter_ms"] + s["diff_ms"] for s in samples]
+    return {
+        "rows": row_count,
+        "build_ms": (t1 - t0) * 1000.0,
+        "prepare_ms": (t2 - t1) * 1000.0,
+        "samples": samples,
+        "p50_ms": _percentile(totals, 50),
+        "p95_ms": _percentile(totals, 95),
+        "max_ms": max(totals) if totals else 0.0,
+        "path_lookup": {"paths": len(lookup_paths), "found": int(len(found)), "ms": (l1 - l0) * 1000.0},
+        "id_lookup": {"ids": int(len(ids[::7])), "found": int(len(id_rows)), "ms": (l2 - l1) * 1000.0},
+    }
+
+
+def run_panel_filter_benchmark(row_count: int = 1_000_000) -> dict:
+    """面板端到端：100 万行列表上逐字输入，测每次 textChanged → 处理完事件的耗时。"""
+    from PySide6.QtWidgets import QApplication
+    from transcriptionist_v3.ui.panels.audio_files_panel import AudioFilesPanel
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    row_index = LibraryRowIndex(_fake_path(i) for i in range(row_count)).prepare()
+
+    panel = AudioFilesPanel()
+    panel.set_data_provider(_fake_info)
+    panel.set_row_index_provider(lambda: row_index)
+    panel.resize(1280, 720)
+    panel.show()
+
+    t0 = time.perf_counter()
+    panel.set_folder_indices("D:/benchmark/audio", np.arange(row_count, dtype=np.int64))
+    app.processEvents()
+    t1 = time.perf_counter()
+
+    samples = []
+    for text in TYPING_SEQUENCE:
+        s0 = time.perf_counter()
+        panel.search_box.setText(text)
+        app.processEvents()
+        samples.append({
+            "text": text,
+            "visible_rows": panel._model.rowCount(),
+            "matches": int(len(panel._model.rows)),
+            "ms": (time.perf_counter() - s0) * 1000.0,
+        })
+
+    panel.close()
+    app.processEvents()
+    latencies = [s["ms"] for s in samples]
+    return {
+        "rows": row_count,
+        "set_folder_indices_ms": (t1 - t0) * 1000.0,
+        "samples": samples,
+        "p50_ms": _percentile(latencies, 50),
+        "p95_ms": _percentile(latencies, 95),
+        "max_ms": max(latencies) if latencies else 0.0,
+    }
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="AudioFilesPanel 列表微压测")
+    parser.add_argument("--records", type=int, default=10_000, help="渲染压测条数，默认 10000")
+    parser.add_argument("--filter-rows", type=int, default=1_000_000, help="过滤压测行数，默认 1000000")
+    parser.add_argument("--filter-p95-ms", type=float, default=200.0, help="行索引过滤 p95 门槛（毫秒），默认 200")
+    parser.add_argument("--skip-render", action="store_true", help="跳过渲染压测")
+    parser.add_argument("--skip-panel", action="store_true", help="跳过面板端到端过滤压测")
+    parser.add_argument("--json-out", type=str, default="", help="可选：输出 JSON 文件路径")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    try:
+        import PySide6  # noqa: F401
+        has_qt = True
+    except ImportError:
+        has_qt = False
+        print("未安装 PySide6：跳过渲染与面板端到端压测，仅测行索引过滤。")
+
+    if has_qt and not args.skip_render:
+        run_benchmark(max(1, args.records))
+
+    report = {"filter": run_filter_benchmark(max(1, args.filter_rows))}
+    flt = report["filter"]
+    print("=" * 72)
+    print(f"行索引过滤压测（{flt['rows']} 行）")
+    print("=" * 72)
+    print(f"构建: {flt['build_ms']:.0f} ms，文件名缓冲区: {flt['prepare_ms']:.0f} ms（加载线程中完成）")
+    for s in flt["samples"]:
+        mode = "增量" if s["incremental"] else "重置"
+        print(
+            f"  {s['text']!r:<12} 命中 {s['matches']:>8}  过滤 {s['filter_ms']:7.1f} ms  "
+            f"diff {s['diff_ms']:6.2f} ms  {mode}"
+        )
+    print(f"p50={flt['p50_ms']:.1f} ms, p95={flt['p95_ms']:.1f} ms, max={flt['max_ms']:.1f} ms")
+    lk, ik = flt["path_lookup"], flt["id_lookup"]
+    print(f"路径 → 行号: {lk['paths']} 条 {lk['ms']:.1f} ms；ID → 行号: {ik['ids']} 条 {ik['ms']:.1f} ms")
+
+    if has_qt and not args.skip_panel:
+        report["panel"] = run_panel_filter_benchmark(max(1, args.filter_rows))
+        pnl = report["panel"]
+        print("-" * 72)
+        print(f"面板端到端过滤（{pnl['rows']} 行），set_folder_indices: {pnl['set_folder_indices_ms']:.0f} ms")
+        for s in pnl["samples"]:
+            print(f"  {s['text']!r:<12} 命中 {s['matches']:>8}  视图行 {s['visible_rows']:>5}  {s['ms']:7.1f} ms")
+        print(f"p50={pnl['p50_ms']:.1f} ms, p95={pnl['p95_ms']:.1f} ms, max={pnl['max_ms']:.1f} ms")
+
+    passed = flt["p95_ms"] <= args.filter_p95_ms and lk["found"] == lk["paths"]
+    report["passed"] = passed
+    print(f"整体结论: {'PASS' if passed else 'FAIL'}（p95 门槛 {args.filter_p95_ms:.0f} ms）")
+    print("说明: 仅用于开发期趋势观察，不代表最终发布性能。")
+    print("=" * 72)
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0 if passed else 1
+
+
 if __name__ == "__main__":
-    run_benchmark(10_000)
+    raise SystemExit(main())
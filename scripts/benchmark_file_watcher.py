@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""文件监视事件风暴压测：合并/去抖层在大量原始事件下的 CPU 与写库次数。
+
+模拟场景（不依赖 watchdog，直接驱动 ChangeCoalescer）：
+- 解压：N 个新文件，每个 create + 若干次 modify（分块写入）
+- 临时文件改名落盘：部分文件先写 .part 再改名为音频（handler 上报为 create）
+- 已入库文件被整理：M 个已入库文件移动到子目录，其中一部分再改名一次
+- DAW bounce：一个文件持续写入数百次 modify，写完后才应入队
+- 解压出的部分文件随即被删除（create → delete 抵消）
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+PACKAGE_ROOT = PROJECT_ROOT.parent
+if str(PACKAGE_ROOT) not in sys.path:
+    sys.path.insert(0, str(PACKAGE_ROOT))
+
+from sqlalchemy import event  # noqa: E402
+
+from transcriptionist_v3.application.library_manager.change_pipeline import ChangeCoalescer, LibraryChangeSink  # noqa: E402
+from transcriptionist_v3.infrastructure.database.connection import DatabaseManager  # noqa: E402
+from transcriptionist_v3.infrastructure.database.models import AudioFile, ImportQueue  # noqa: E402
+
+
+@dataclass
+class StormResult:
+    new_files: int
+    moved_files: int
+    raw_events: int
+    flushed_changes: int
+    transactions: int
+    sql_statements: int
+    cpu_ms: float
+    cpu_us_per_event: float
+    drain_ms: float
+    queued: int
+    moved_in_db: int
+    bounce_queued_early: bool
+    passed: bool
+
+
+def _seed_library(db: DatabaseManager, root: Path, count: int) -> list[str]:
+    paths = []
+    rows = []
+    for i in range(count):
+        p = root / "library" / f"old_{i:06d}.wav"
+        p.write_bytes(b"RIFF" + bytes(64))
+        st = p.stat()
+        paths.append(str(p))
+        rows.append({
+            "file_path": str(p), "filename": p.name, "content_hash": "", "duration": 1.0,
+            "sample_rate": 48000, "bit_depth": 16, "channels": 2, "format": "wav",
+            "file_size": st.st_size, "file_mtime_ns": st.st_mtime_ns,
+        })
+    with db.session_scope() as session:
+        session.bulk_insert_mappings(AudioFile, rows)
+    return paths
+
+
+def run_storm(new_files: int, moved_files: int, modifies: int, settle: float, batch: int) -> StormResult:
+    workdir = Path(tempfile.mkdtemp(prefix="watcher_storm_"))
+    try:
+        root = workdir / "root"
+        (root / "library").mkdir(parents=True)
+        (root / "incoming").mkdir()
+        (root / "sorted").mkdir()
+        db = DatabaseManager(workdir / "bench.db")
+        db.init_db()
+        old_paths = _seed_library(db, root, moved_files)
+
+        statements = 0
+
+        @event.listens_for(db.engine, "before_cursor_execute")
+        def _count(*_args, **_kwargs):
+            nonlocal statements
+            statements += 1
+
+        sink = LibraryChangeSink([str(root)], session_scope_fn=db.session_scope)
+        coalescer = ChangeCoalescer(sink, settle_seconds=settle, max_batch=batch)
+        coalescer.start()
+        cpu0 = time.process_time()
+        t0 = time.perf_counter()
+
+        # DAW bounce：另一线程持续写入，期间不应入队
+        bounce = root / "incoming" / "bounce_master.wav"
+        bounce_done = threading.Event()
+
+        def _bounce_writer():
+            with open(bounce, "wb") as fh:
+                coalescer.record_created(bounce)
+                for _ in range(400):
+                    fh.write(bytes(4096))
+                    fh.flush()
+                    coalescer.record_modified(bounce)
+                    time.sleep(settle / 40)
+            bounce_done.set()
+
+        writer = threading.Thread(target=_bounce_writer)
+        writer.start()
+
+        # 解压风暴
+        for i in range(new_files):
+            if i % 10 == 0:
+                part = root / "incoming" / f"n_{i:06d}.wav.part"
+                final = part.with_suffix("")
+                part.write_bytes(bytes(256))
+                os.replace(part, final)
+                coalescer.record_created(final)  # handler 把 .part → .wav 上报为 create
+                continue
+            p = root / "incoming" / f"n_{i:06d}.wav"
+            with open(p, "wb") as fh:
+                coalescer.record_created(p)
+                for _ in range(modifies):
+                    fh.write(bytes(128))
+                    coalescer.record_modified(p)
+            if i % 50 == 1:
+                p.unlink()
+                coalescer.record_deleted(p)
+
+        # 整理已入库文件：移动，部分再改名
+        for i, old in enumerate(old_paths):
+            dst = root / "sorted" / Path(old).name
+            os.replace(old, dst)
+            coalescer.record_moved(old, dst)
+            if i % 3 == 0:
+                dst2 = dst.with_name("renamed_" + dst.name)
+                os.replace(dst, dst2)
+                coalescer.record_moved(dst, dst2)
+
+        # 等 bounce 写完前检查一次：bounce 不应已入队
+        bounce_queued_early = False
+        while not bounce_done.is_set():
+            with db.session_scope() as session:
+                if session.query(ImportQueue).filter(ImportQueue.file_path == str(bounce)).count():
+                    bounce_queued_early = True
+            time.sleep(settle / 2)
+        writer.join()
+
+        deadline = time.perf_counter() + 60 + settle * 20
+        while coalescer.pending_count and time.perf_counter() < deadline:
+            time.sleep(settle / 4)
+        drain_ms = (time.perf_counter() - t0) * 1000.0
+        coalescer.stop()
+        cpu_ms = (time.process_time() - cpu0) * 1000.0
+
+        with db.session_scope() as session:
+            queued = session.query(ImportQueue).count()
+            moved_in_db = session.query(AudioFile).filter(AudioFile.file_path.like(str(root / "sorted") + "%")).count()
+
+        deleted_new = len([i for i in range(new_files) if i % 10 != 0 and i % 50 == 1])
+        expected_queue = new_files - deleted_new + 1  # + bounce
+        changes = coalescer.stats["flushed"]
+        tx_bound = math.ceil(changes / batch) + 8 + int(drain_ms / 1000.0 / settle) * 2
+        passed = (
+            coalescer.pending_count == 0
+            and queued == expected_queue
+            and moved_in_db == moved_files
+            and not bounce_queued_early
+            and sink.stats["transactions"] <= tx_bound
+        )
+        events = coalescer.stats["events"]
+        return StormResult(
+            new_files=new_files,
+            moved_files=moved_files,
+            raw_events=events,
+            flushed_changes=changes,
+            transactions=sink.stats["transactions"],
+            sql_statements=statements,
+            cpu_ms=cpu_ms,
+            cpu_us_per_event=cpu_ms * 1000.0 / max(1, events),
+            drain_ms=drain_ms,
+            queued=queued,
+            moved_in_db=moved_in_db,
+            bounce_queued_early=bounce_queued_early,
+            passed=passed,
+        )
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="文件监视事件风暴压测")
+    parser.add_argument("--files", type=int, default=30_000, help="解压出的新文件数，默认 30000")
+    parser.add_argument("--moved", type=int, default=3_000, help="被移动的已入库文件数，默认 3000")
+    parser.add_argument("--modifies", type=int, default=6, help="每个新文件的 modify 事件数，默认 6")
+    parser.add_argument("--settle", type=float, default=0.5, help="静默窗口（秒），默认 0.5")
+    parser.add_argument("--batch", type=int, default=2000, help="单个事务最多变化条数，默认 2000")
+    parser.add_argument("--json-out", type=str, default="", help="可选：输出 JSON 文件路径")
+    return parser.parse_args()
+
+
+def main() -> int:
+    args = parse_args()
+    result = run_storm(
+        new_files=max(1, args.files),
+        moved_files=max(0, args.moved),
+        modifies=max(0, args.modifies),
+        settle=max(0.05, args.settle),
+        batch=max(1, args.batch),
+    )
+    print("=" * 72)
+    print("文件监视事件风暴压测")
+    print("=" * 72)
+    print(f"new_files={result.new_files}, moved_files={result.moved_files}, raw_events={result.raw_events}")
+    print(f"flushed_changes={result.flushed_changes}, transactions={result.transactions}, sql={result.sql_statements}")
+    print(f"cpu={result.cpu_ms:.0f}ms ({result.cpu_us_per_event:.1f}us/event), drain={result.drain_ms:.0f}ms")
+    print(f"import_queue={result.queued}, moved_in_db={result.moved_in_db}, bounce_queued_early={result.bounce_queued_early}")
+    print(f"整体结论: {'PASS' if result.passed else 'FAIL'}")
+    print("=" * 72)
+    if args.json_out:
+        Path(args.json_out).write_text(json.dumps(asdict(result), ensure_ascii=False, indent=2), encoding="utf-8")
+    return 0 if result.passed else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,14 @@
 #!/usr/bin/env python3
-"""M5 阶段检索压测脚本：10万条规模、耗时指标、自动阈值判定。"""
+"""M5 阶段检索压测脚本：10万条规模、耗时指标、自动阈值判定。
+
+两路检索的实际计算（倒排计数排序 / 矩阵内积 top-k）都在 retriever 调用内完成，
+编排器并发执行两路时 total 应接近 max(lexical, semantic) + fuse 而非三者之和；
+另跑一组截止时间场景：语义一路故意超时，检查单源退化结果与 observation 标记。
+
+服务场景（--service-records > 0）走应用内真实检索路径：临时 SQLite 库（FTS5）+ ``HybridSearchService``
+（常驻 embedding 矩阵、查询 embedding 缓存、RRF 融合、分页），统计各阶段耗时；
+包级依赖（SQLAlchemy 等）不可用时跳过并给出提示。
+"""
 
 from __future__ import annotations
 
@@ -9,6 +18,7 @@ import json
 import random
 import statistics
 import sys
+import tempfile
 import time
 from dataclasses import asdict, dataclass
 from pathlib import Path
@@ -42,9 +52,16 @@ def _load_orchestrator_symbols():
 
 @dataclass
 class BenchmarkThreshold:
-    p95_total_ms_max: float = 220.0
+    p95_total_ms_max: float = 160.0
     p95_fuse_ms_max: float = 60.0
     overlap_rate_min: float = 0.45
+    # total_p95 <= max(lexical_p95, semantic_p95) + fuse_p95 + 该余量（线程调度与结果收集开销）
+    p95_parallel_slack_ms: float = 15.0
+    # 截止时间场景：语义一路的截止时间，以及超时后 total 允许超出截止时间的余量
+    deadline_ms: float = 50.0
+    deadline_slack_ms: float = 25.0
+    # 服务场景（SQLite 文本检索 + 常驻矩阵 + 融合 + 分页）的 P95 总耗时上限
+    p95_service_total_ms_max: float = 250.0
 
 
 @dataclass
@@ -63,6 +80,26 @@ class BenchmarkResult:
     pass_fuse_ms: bool
     pass_overlap: bool
     passed: bool
+    parallel_bound_ms: float = 0.0
+    pass_parallel: bool = True
+    deadline_queries: int = 0
+    deadline_total_p95_ms: float = 0.0
+    pass_deadline: bool = True
+    ann_nprobe: int = 0
+    ann_build_ms: float = 0.0
+    ann_p95_ms: float = 0.0
+    ann_recall_avg: float | None = None
+    ann_recall_p50: float | None = None
+    service_records: int = 0
+    service_queries: int = 0
+    service_encode_p95_ms: float = 0.0
+    service_lexical_p95_ms: float = 0.0
+    service_semantic_p95_ms: float = 0.0
+    service_fuse_p95_ms: float = 0.0
+    service_total_p95_ms: float = 0.0
+    service_fused_avg: float = 0.0
+    service_cached_page_p95_ms: float = 0.0
+    pass_service: bool = True
 
 
 class SearchBenchmarkDataset:
@@ -128,14 +165,12 @@ def _build_query_embedding(dataset: SearchBenchmarkDataset, terms: Sequence[str]
 
 
 def _make_lexical_retriever(dataset: SearchBenchmarkDataset, terms: Sequence[str]) -> Callable[[str, int], list[tuple[str, float]]]:
-    counter: dict[int, float] = {}
-    for term in terms:
-        for record_id in dataset.token_inverted.get(term, []):
-            counter[record_id] = counter.get(record_id, 0.0) + 1.0
-
-    ranked = sorted(counter.items(), key=lambda item: item[1], reverse=True)
-
     def _retriever(_query_text: str, top_k: int):
+        counter: dict[int, float] = {}
+        for term in terms:
+            for record_id in dataset.token_inverted.get(term, []):
+                counter[record_id] = counter.get(record_id, 0.0) + 1.0
+        ranked = sorted(counter.items(), key=lambda item: item[1], reverse=True)
         limit = max(1, int(top_k))
         return [(str(record_id), score) for record_id, score in ranked[:limit]]
 
@@ -143,9 +178,8 @@ def _make_lexical_retriever(dataset: SearchBenchmarkDataset, terms: Sequence[str
 
 
 def _make_semantic_retriever(dataset: SearchBenchmarkDataset, query_embedding: np.ndarray) -> Callable[[str, int], list[tuple[str, float]]]:
-    sims = dataset.embedding_matrix @ query_embedding
-
     def _retriever(_query_text: str, top_k: int):
+        sims = dataset.embedding_matrix @ query_embedding
         limit = max(1, int(top_k))
         if limit >= len(sims):
             indices = np.argsort(-sims)
@@ -157,6 +191,174 @@ def _make_semantic_retriever(dataset: SearchBenchmarkDataset, query_embedding: n
     return _retriever
 
 
+def _make_stalled_retriever(
+    retriever: Callable[[str, int], list[tuple[str, float]]], stall_ms: float
+) -> Callable[[str, int], list[tuple[str, float]]]:
+    """模拟卡住的一路（模型冷启动、磁盘抖动等）：先停顿 stall_ms 再检索。"""
+
+    def _retriever(query_text: str, top_k: int):
+        time.sleep(stall_ms / 1000.0)
+        return retriever(query_text, top_k)
+
+    return _retriever
+
+
+def _run_deadline_checks(
+    orchestrator,
+    QueryPlan,
+    dataset: SearchBenchmarkDataset,
+    query_terms_list: list[list[str]],
+    top_k: int,
+    threshold: BenchmarkThreshold,
+) -> tuple[int, float, bool]:
+    """语义一路超过截止时间：应只返回文本一路结果、标记 semantic_timed_out/partial，且按时返回。"""
+    totals: list[float] = []
+    passed = True
+    for terms in query_terms_list:
+        query_text = " ".join(terms)
+        lexical_retriever = _make_lexical_retriever(dataset, terms)
+        stalled = _make_stalled_retriever(
+            _make_semantic_retriever(dataset, _build_query_embedding(dataset, terms)),
+            stall_ms=threshold.deadline_ms * 3,
+        )
+        result = orchestrator.execute(
+            query_text=query_text,
+            plan=QueryPlan(mode="hybrid", top_k=top_k, semantic_deadline_ms=threshold.deadline_ms),
+            lexical_retriever=lexical_retriever,
+            semantic_retriever=stalled,
+        )
+        obs = result.observation
+        totals.append(float(obs.total_ms))
+        expected = [key for key, _score in lexical_retriever(query_text, top_k)]
+        passed = passed and (
+            obs.semantic_timed_out
+            and obs.partial
+            and not obs.lexical_timed_out
+            and obs.semantic_count == 0
+            and [item.key for item in result.items] == expected
+            and all(item.semantic_score is None for item in result.items)
+        )
+    total_p95 = _percentile(totals, 0.95)
+    passed = passed and total_p95 <= threshold.deadline_ms + threshold.deadline_slack_ms
+    return len(totals), total_p95, passed
+
+
+def _load_service_symbols():
+    """服务场景依赖包级导入（SQLAlchemy、数据库模型）；失败时返回 None 跳过。"""
+    try:
+        from sqlalchemy import insert
+
+        from transcriptionist_v3.application.search_engine.hybrid_search import HybridSearchService
+        from transcriptionist_v3.application.search_engine.query_orchestrator import QueryPlan
+        from transcriptionist_v3.infrastructure.database.connection import DatabaseManager
+        from transcriptionist_v3.infrastructure.database.models import AudioFile
+
+        return HybridSearchService, QueryPlan, DatabaseManager, AudioFile, insert
+    except Exception as e:
+        print(f"[WARN] 检索服务依赖不可用，跳过服务场景: {e}")
+        return None
+
+
+def _run_service_checks(
+    dataset: SearchBenchmarkDataset,
+    records: int,
+    query_count: int,
+    top_k: int,
+    threshold: BenchmarkThreshold,
+) -> dict | None:
+    """
+    应用检索服务端到端：前 records 条样本写入临时库，文件名为样本词；
+    查询取某条样本中的两个词（保证文本一路有命中），语义一路用同一词向量均值编码。
+    """
+    symbols = _load_service_symbols()
+    if symbols is None:
+        return None
+    HybridSearchService, QueryPlan, DatabaseManager, AudioFile, insert = symbols
+
+    records = max(1, min(int(records), dataset.records))
+    with tempfile.TemporaryDirectory(prefix="search_service_bench_") as tmp_dir:
+        db = DatabaseManager(Path(tmp_dir) / "library.db")
+        try:
+            db.init_db()
+            paths = [f"/bench/{idx:07d}/{' '.join(dataset.record_tokens[idx])}.wav" for idx in range(records)]
+            rows = [
+                {
+                    "file_path": path,
+                    "filename": Path(path).name,
+                    "original_filename": Path(path).name,
+                    "file_size": 1024,
+                    "content_hash": f"{idx:064x}",
+                    "duration": 1.0,
+                    "sample_rate": 48000,
+                    "bit_depth": 24,
+                    "channels": 2,
+                    "format": "wav",
+                }
+                for idx, path in enumerate(paths)
+            ]
+            with db.session_scope() as session:
+                for start in range(0, len(rows), 5000):
+                    session.execute(insert(AudioFile), rows[start : start + 5000])
+
+            service = HybridSearchService(session_factory=db.session_scope)
+            service.set_embeddings(paths, dataset.embedding_matrix[:records])
+            service.set_text_encoder(
+                lambda text: _build_query_embedding(dataset, text.split()), model_version="bench"
+            )
+            plan = QueryPlan(mode="hybrid", top_k=top_k)
+
+            encode_ms: list[float] = []
+            lexical_ms: list[float] = []
+            semantic_ms: list[float] = []
+            fuse_ms: list[float] = []
+            total_ms: list[float] = []
+            cached_ms: list[float] = []
+            fused: list[int] = []
+            page_size = 20
+            for _ in range(query_count):
+                query_text = " ".join(random.sample(dataset.record_tokens[random.randrange(records)], 2))
+                page = service.search(query_text, plan=plan, page_size=page_size)
+                obs = page.observation
+                encode_ms.append(float(page.encode_ms))
+                lexical_ms.append(float(obs.lexical_ms))
+                semantic_ms.append(float(obs.semantic_ms))
+                fuse_ms.append(float(obs.fuse_ms))
+                total_ms.append(float(obs.total_ms))
+                fused.append(page.total)
+                # 翻页命中融合结果缓存，只做切片
+                t0 = time.perf_counter()
+                service.search(query_text, plan=plan, page=1, page_size=page_size)
+                cached_ms.append((time.perf_counter() - t0) * 1000.0)
+        finally:
+            db.close()
+
+    total_p95 = _percentile(total_ms, 0.95)
+    return {
+        "service_records": records,
+        "service_queries": len(total_ms),
+        "service_encode_p95_ms": _percentile(encode_ms, 0.95),
+        "service_lexical_p95_ms": _percentile(lexical_ms, 0.95),
+        "service_semantic_p95_ms": _percentile(semantic_ms, 0.95),
+        "service_fuse_p95_ms": _percentile(fuse_ms, 0.95),
+        "service_total_p95_ms": total_p95,
+        "service_fused_avg": float(statistics.mean(fused)) if fused else 0.0,
+        "service_cached_page_p95_ms": _percentile(cached_ms, 0.95),
+        "pass_service": total_p95 <= threshold.p95_service_total_ms_max and min(fused, default=0) > 0,
+    }
+
+
+def _load_ann_symbols():
+    """IVF 压测依赖包级导入；失败时返回 None 跳过 recall 统计。"""
+    try:
+        from transcriptionist_v3.application.ai.ann_index import IVFFlatIndex, recall_at_k
+        from transcriptionist_v3.application.ai.semantic_search import SemanticSearchEngine
+
+        return IVFFlatIndex, SemanticSearchEngine, recall_at_k
+    except Exception as e:
+        print(f"[WARN] ANN 模块不可用，跳过 recall@k 统计: {e}")
+        return None
+
+
 def _percentile(values: list[float], ratio: float) -> float:
     if not values:
         return 0.0
@@ -166,13 +368,36 @@ def _percentile(values: list[float], ratio: float) -> float:
     return float(ordered[pos])
 
 
-def run_benchmark(records: int, query_count: int, top_k: int, threshold: BenchmarkThreshold) -> BenchmarkResult:
+def run_benchmark(
+    records: int,
+    query_count: int,
+    top_k: int,
+    threshold: BenchmarkThreshold,
+    ann_nprobe: int = 0,
+    deadline_queries: int = 5,
+    service_records: int = 0,
+) -> BenchmarkResult:
     QueryOrchestrator, QueryPlan = _load_orchestrator_symbols()
     orchestrator = QueryOrchestrator()
 
     dataset = SearchBenchmarkDataset(records=records, vocab_size=2400, dim=128)
     query_terms_list = _build_query_terms(dataset, query_count)
 
+    ann = None
+    ann_build_ms = 0.0
+    recall_fn = None
+    if ann_nprobe > 0:
+        symbols = _load_ann_symbols()
+        if symbols is not None:
+            IVFFlatIndex, SemanticSearchEngine, recall_fn = symbols
+            engine = SemanticSearchEngine()
+            engine.set_embeddings([str(idx) for idx in range(records)], dataset.embedding_matrix)
+            t0 = time.perf_counter()
+            ann = IVFFlatIndex.from_engine(engine, nprobe=ann_nprobe)
+            ann_build_ms = (time.perf_counter() - t0) * 1000.0
+    ann_ms: list[float] = []
+    recalls: list[float] = []
+
     lexical_ms: list[float] = []
     semantic_ms: list[float] = []
     fuse_ms: list[float] = []
@@ -211,6 +436,12 @@ def run_benchmark(records: int, query_count: int, top_k: int, threshold: Benchma
         overlap = len(semantic_set & hybrid_set) / max(1, min(len(semantic_set), len(hybrid_set)))
         overlaps.append(float(overlap))
 
+        if ann is not None:
+            t0 = time.perf_counter()
+            approx = ann.search(query_embedding, top_k=top_k)
+            ann_ms.append((time.perf_counter() - t0) * 1000.0)
+            recalls.append(float(recall_fn(approx, semantic_only, top_k)))
+
     lexical_p95 = _percentile(lexical_ms, 0.95)
     semantic_p95 = _percentile(semantic_ms, 0.95)
     fuse_p95 = _percentile(fuse_ms, 0.95)
@@ -219,9 +450,23 @@ def run_benchmark(records: int, query_count: int, top_k: int, threshold: Benchma
     overlap_p50 = _percentile(overlaps, 0.50)
     overlap_p95 = _percentile(overlaps, 0.95)
 
+    parallel_bound = max(lexical_p95, semantic_p95) + fuse_p95 + threshold.p95_parallel_slack_ms
+
     pass_total = total_p95 <= threshold.p95_total_ms_max
     pass_fuse = fuse_p95 <= threshold.p95_fuse_ms_max
     pass_overlap = overlap_avg >= threshold.overlap_rate_min
+    pass_parallel = total_p95 <= parallel_bound
+
+    deadline_count, deadline_total_p95, pass_deadline = 0, 0.0, True
+    if deadline_queries > 0:
+        deadline_count, deadline_total_p95, pass_deadline = _run_deadline_checks(
+            orchestrator, QueryPlan, dataset, query_terms_list[:deadline_queries], top_k, threshold
+        )
+
+    service = None
+    if service_records > 0:
+        service = _run_service_checks(dataset, service_records, query_count, top_k, threshold)
+    pass_service = service["pass_service"] if service is not None else True
 
     return BenchmarkResult(
         records=records,
@@ -237,7 +482,18 @@ def run_benchmark(records: int, query_count: int, top_k: int, threshold: Benchma
         pass_total_ms=pass_total,
         pass_fuse_ms=pass_fuse,
         pass_overlap=pass_overlap,
-        passed=pass_total and pass_fuse and pass_overlap,
+        passed=pass_total and pass_fuse and pass_overlap and pass_parallel and pass_deadline and pass_service,
+        parallel_bound_ms=parallel_bound,
+        pass_parallel=pass_parallel,
+        deadline_queries=deadline_count,
+        deadline_total_p95_ms=deadline_total_p95,
+        pass_deadline=pass_deadline,
+        ann_nprobe=ann_nprobe if ann is not None else 0,
+        ann_build_ms=ann_build_ms,
+        ann_p95_ms=_percentile(ann_ms, 0.95),
+        ann_recall_avg=float(statistics.mean(recalls)) if recalls else None,
+        ann_recall_p50=_percentile(recalls, 0.50) if recalls else None,
+        **(service or {}),
     )
 
 
@@ -246,9 +502,30 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--records", type=int, default=100_000, help="样本条数，默认 100000")
     parser.add_argument("--queries", type=int, default=50, help="查询次数，默认 50")
     parser.add_argument("--top-k", type=int, default=200, help="每次查询取 TopK，默认 200")
-    parser.add_argument("--threshold-total-ms", type=float, default=220.0, help="P95 总耗时阈值(ms)")
+    parser.add_argument("--threshold-total-ms", type=float, default=160.0, help="P95 总耗时阈值(ms)")
     parser.add_argument("--threshold-fuse-ms", type=float, default=60.0, help="P95 融合耗时阈值(ms)")
     parser.add_argument("--threshold-overlap", type=float, default=0.45, help="平均重叠率阈值(0-1)")
+    parser.add_argument(
+        "--threshold-parallel-slack-ms",
+        type=float,
+        default=15.0,
+        help="P95 总耗时相对 max(lexical, semantic) + fuse 允许的余量(ms)",
+    )
+    parser.add_argument("--deadline-ms", type=float, default=50.0, help="截止时间场景中语义一路的截止时间(ms)")
+    parser.add_argument("--deadline-queries", type=int, default=5, help="截止时间场景的查询次数，0 表示跳过")
+    parser.add_argument(
+        "--ann-nprobe",
+        type=int,
+        default=0,
+        help="可选：>0 时构建 IVF-Flat 近似索引，按该 nprobe 统计相对精确检索的 recall@k",
+    )
+    parser.add_argument(
+        "--service-records",
+        type=int,
+        default=20_000,
+        help="应用检索服务场景的入库条数（不超过 records），0 表示跳过",
+    )
+    parser.add_argument("--threshold-service-total-ms", type=float, default=250.0, help="服务场景 P95 总耗时阈值(ms)")
     parser.add_argument("--json-out", type=str, default="", help="可选：输出 JSON 文件路径")
     return parser.parse_args()
 
@@ -259,6 +536,9 @@ def main() -> int:
         p95_total_ms_max=float(args.threshold_total_ms),
         p95_fuse_ms_max=float(args.threshold_fuse_ms),
         overlap_rate_min=float(args.threshold_overlap),
+        p95_parallel_slack_ms=float(args.threshold_parallel_slack_ms),
+        deadline_ms=float(args.deadline_ms),
+        p95_service_total_ms_max=float(args.threshold_service_total_ms),
     )
 
     started = time.perf_counter()
@@ -267,6 +547,9 @@ def main() -> int:
         query_count=max(1, int(args.queries)),
         top_k=max(1, int(args.top_k)),
         threshold=threshold,
+        ann_nprobe=max(0, int(args.ann_nprobe)),
+        deadline_queries=max(0, int(args.deadline_queries)),
+        service_records=max(0, int(args.service_records)),
     )
     elapsed = (time.perf_counter() - started) * 1000.0
 
@@ -279,10 +562,38 @@ def main() -> int:
     print(f"fuse_p95={result.fuse_p95_ms:.2f}ms")
     print(f"total_p95={result.total_p95_ms:.2f}ms")
     print(f"overlap_avg={result.overlap_avg:.2%}, overlap_p50={result.overlap_p50:.2%}, overlap_p95={result.overlap_p95:.2%}")
+    if result.ann_recall_avg is not None:
+        print(
+            f"ann(ivf, nprobe={result.ann_nprobe}): build={result.ann_build_ms:.0f}ms, "
+            f"p95={result.ann_p95_ms:.2f}ms, recall@{result.top_k} avg={result.ann_recall_avg:.2%}, "
+            f"p50={result.ann_recall_p50:.2%}"
+        )
+    if result.service_queries:
+        print(
+            f"service(records={result.service_records}): encode_p95={result.service_encode_p95_ms:.2f}ms, "
+            f"lexical_p95={result.service_lexical_p95_ms:.2f}ms, semantic_p95={result.service_semantic_p95_ms:.2f}ms, "
+            f"fuse_p95={result.service_fuse_p95_ms:.2f}ms, total_p95={result.service_total_p95_ms:.2f}ms, "
+            f"cached_page_p95={result.service_cached_page_p95_ms:.2f}ms, fused_avg={result.service_fused_avg:.1f}"
+        )
     print("-" * 72)
     print(f"阈值判定: total_p95<={threshold.p95_total_ms_max:.2f}ms -> {'PASS' if result.pass_total_ms else 'FAIL'}")
     print(f"阈值判定: fuse_p95<={threshold.p95_fuse_ms_max:.2f}ms -> {'PASS' if result.pass_fuse_ms else 'FAIL'}")
     print(f"阈值判定: overlap_avg>={threshold.overlap_rate_min:.2%} -> {'PASS' if result.pass_overlap else 'FAIL'}")
+    print(
+        f"阈值判定: total_p95<=max(lexical,semantic)+fuse+{threshold.p95_parallel_slack_ms:.0f}ms"
+        f"={result.parallel_bound_ms:.2f}ms -> {'PASS' if result.pass_parallel else 'FAIL'}"
+    )
+    if result.deadline_queries:
+        print(
+            f"阈值判定: 语义超时({threshold.deadline_ms:.0f}ms) x{result.deadline_queries} "
+            f"total_p95={result.deadline_total_p95_ms:.2f}ms, 单源退化与标记 -> "
+            f"{'PASS' if result.pass_deadline else 'FAIL'}"
+        )
+    if result.service_queries:
+        print(
+            f"阈值判定: service_total_p95<={threshold.p95_service_total_ms_max:.2f}ms 且每次均有结果 -> "
+            f"{'PASS' if result.pass_service else 'FAIL'}"
+        )
     print(f"整体结论: {'PASS' if result.passed else 'FAIL'}")
     print(f"总执行时间: {elapsed:.2f}ms")
     print("=" * 72)
@@ -19,9 +19,11 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--records-list", default="100000,500000,1000000", help="Comma separated records list")
     parser.add_argument("--queries", type=int, default=50, help="Query count per records size")
     parser.add_argument("--top-k", type=int, default=200, help="Top K per query")
-    parser.add_argument("--threshold-total-ms", type=float, default=220.0, help="P95 total threshold")
+    parser.add_argument("--threshold-total-ms", type=float, default=160.0, help="P95 total threshold")
     parser.add_argument("--threshold-fuse-ms", type=float, default=60.0, help="P95 fuse threshold")
     parser.add_argument("--threshold-overlap", type=float, default=0.45, help="Overlap average threshold")
+    parser.add_argument("--service-records", type=int, default=20000, help="Search service scenario rows, 0 to skip")
+    parser.add_argument("--threshold-service-total-ms", type=float, default=250.0, help="Search service P95 total threshold")
     parser.add_argument("--stop-on-fail", action="store_true", help="Stop matrix when one scale fails")
     parser.add_argument("--baseline-json", default="", help="Optional baseline matrix json for regression gate")
     parser.add_argument("--allow-total-p95-delta-ms", type=float, default=15.0, help="Allowed total_p95 increase")
@@ -70,6 +72,10 @@ def main() -> int:
         str(float(args.threshold_fuse_ms)),
         "--threshold-overlap",
         str(float(args.threshold_overlap)),
+        "--service-records",
+        str(max(0, int(args.service_records))),
+        "--threshold-service-total-ms",
+        str(float(args.threshold_service_total_ms)),
         "--json-out",
         str(matrix_json),
         "--csv-out",
@@ -27,6 +27,8 @@ class ProfilePreset:
     allow_total_p95_delta_ms: float
     allow_fuse_p95_delta_ms: float
     allow_overlap_drop: float
+    service_records: int
+    threshold_service_total_ms: float
 
 
 PROFILE_PRESETS: dict[str, ProfilePreset] = {
@@ -34,23 +36,27 @@ PROFILE_PRESETS: dict[str, ProfilePreset] = {
         records_list="10000,20000",
         queries=10,
         top_k=100,
-        threshold_total_ms=220.0,
+        threshold_total_ms=160.0,
         threshold_fuse_ms=60.0,
         threshold_overlap=0.45,
         allow_total_p95_delta_ms=15.0,
         allow_fuse_p95_delta_ms=10.0,
         allow_overlap_drop=0.05,
+        service_records=5000,
+        threshold_service_total_ms=250.0,
     ),
     "standard": ProfilePreset(
         records_list="100000,500000,1000000",
         queries=50,
         top_k=200,
-        threshold_total_ms=220.0,
+        threshold_total_ms=160.0,
         threshold_fuse_ms=60.0,
         threshold_overlap=0.45,
         allow_total_p95_delta_ms=15.0,
         allow_fuse_p95_delta_ms=10.0,
         allow_overlap_drop=0.05,
+        service_records=20000,
+        threshold_service_total_ms=250.0,
     ),
 }
 
@@ -68,6 +74,8 @@ def parse_args() -> argparse.Namespace:
     parser.add_argument("--allow-total-p95-delta-ms", type=float, default=-1.0)
     parser.add_argument("--allow-fuse-p95-delta-ms", type=float, default=-1.0)
     parser.add_argument("--allow-overlap-drop", type=float, default=-1.0)
+    parser.add_argument("--service-records", type=int, default=-1, help="Optional override service scenario rows (0 skips)")
+    parser.add_argument("--threshold-service-total-ms", type=float, default=-1.0)
     parser.add_argument("--reports-dir", default="docs/reports")
     parser.add_argument("--baseline-json", default="", help="Optional baseline json path")
     parser.add_argument("--tag", default="")
@@ -165,6 +173,8 @@ def main() -> int:
     allow_total = _pick_float(args.allow_total_p95_delta_ms, preset.allow_total_p95_delta_ms)
     allow_fuse = _pick_float(args.allow_fuse_p95_delta_ms, preset.allow_fuse_p95_delta_ms)
     allow_overlap_drop = _pick_float(args.allow_overlap_drop, preset.allow_overlap_drop)
+    service_records = int(args.service_records) if int(args.service_records) >= 0 else preset.service_records
+    threshold_service_total_ms = _pick_float(args.threshold_service_total_ms, preset.threshold_service_total_ms)
 
     command = [
         sys.executable,
@@ -187,6 +197,10 @@ def main() -> int:
         str(allow_fuse),
         "--allow-overlap-drop",
         str(allow_overlap_drop),
+        "--service-records",
+        str(service_records),
+        "--threshold-service-total-ms",
+        str(threshold_service_total_ms),
         "--reports-dir",
         str(reports_dir),
         "--tag",
@@ -440,6 +440,7 @@ QMessageBox#appThemedMessageBox QPlainTextEdit {{
         self.batch_center.add_batch_tab(self.audioFilesPanel, "音效列表")
         # 将库页面作为音效列表的数据提供者（懒加载使用全局索引 -> 文件信息）
         self.audioFilesPanel.set_data_provider(self.libraryInterface.get_file_info_by_index)
+        self.audioFilesPanel.set_row_index_provider(lambda: self.libraryInterface.row_index)
         
         # TODO: Audio Editor - 需要 encodec_encode 模型支持音频续写
         # self.audioEditorInterface = AudioEditorPage(self)
@@ -25,7 +25,9 @@ from transcriptionist_v3.ui.utils.workers import (
     IndexingJobWorker,
     TaggingJobWorker,
     ClearTagsJobWorker,
+    NearDuplicateJobWorker,
     ChunkedSearchWorker,
+    HybridSearchWorker,
     IndexLoadWorker,
     IndexSaveWorker,
     SearchWorker,
@@ -33,6 +35,7 @@ from transcriptionist_v3.ui.utils.workers import (
     cleanup_thread,
 )
 from transcriptionist_v3.core.config import AppConfig
+from transcriptionist_v3.application.search_engine.hybrid_search import get_hybrid_search_service
 
 # AI Imports for translation
 from transcriptionist_v3.application.ai_engine.providers.openai_compatible import OpenAICompatibleService
@@ -57,14 +60,14 @@ class AISearchPage(QWidget):
         
         # PRESET TAGS for classification
         # 使用为影视音效库精简过的标签子集，减少不相关/抽象标签
-        from transcriptionist_v3.ui.utils.audioset_labels import SFX_FOCUSED_LABELS
+        from transcriptionist_v3.application.ai.audioset_labels import SFX_FOCUSED_LABELS
         self.AUDIO_CATEGORIES = SFX_FOCUSED_LABELS
 
         
         # Engine & Data
         self.engine = None
         self.audio_embeddings = {}  # {str(file_path): np.array} 或分片时为空
-        self._chunked_index = None  # 分片索引时: {"_chunked": True, "chunk_files": [...], "index_dir": str, "total_count": N}
+        self._chunked_index = None  # 按需索引时: {"_chunked": True, "_store": True, "index_dir": str, "base_name": str, "total_count": N}
         self.tag_embeddings = {}   # {tag_name: np.array} - Precomputed
         self.tag_translations = {} # {english_tag: chinese_tag} - Cached
         self.selected_files = []   # From Library
@@ -80,6 +83,8 @@ class AISearchPage(QWidget):
         self._tagging_worker = None
         self._clear_tags_thread = None
         self._clear_tags_worker = None
+        self._dedupe_thread = None
+        self._dedupe_worker = None
         self._load_index_thread = None
         self._load_index_worker = None
         self._save_index_thread = None
@@ -165,6 +170,7 @@ class AISearchPage(QWidget):
             # 分片索引也支持打标，需要时按需加载分片
             self.start_tag_btn.setEnabled(True)
             self.start_tag_btn.setToolTip("开始 AI 智能打标（分片索引将按需加载）")
+            self.dedupe_btn.setEnabled(bool(embeddings.get("_store")))
             self.results_list.clear()
             self.list_header.setText("索引已就绪")
             item = QListWidgetItem(f"✅ 已加载分片索引，共 {total} 条，检索时按需加载")
@@ -597,6 +603,13 @@ class AISearchPage(QWidget):
         self.clear_tags_btn.clicked.connect(self._on_clear_tags)
         exec_layout.addWidget(self.clear_tags_btn)
         
+        self.dedupe_btn = TransparentPushButton(FluentIcon.FINGERPRINT, "查找重复")
+        self.dedupe_btn.setFixedWidth(110)
+        self.dedupe_btn.setToolTip("按 CLAP 声学特征查找近似重复的音效（不同格式/采样率/文件名），结果可在音效库用 dup:no 隐藏")
+        self.dedupe_btn.setEnabled(False)
+        self.dedupe_btn.clicked.connect(self._on_find_duplicates)
+        exec_layout.addWidget(self.dedupe_btn)
+        
         self.start_tag_btn = PrimaryPushButton(FluentIcon.TAG, "开始 AI 智能打标")
         self.start_tag_btn.setFixedWidth(180)
         self.start_tag_btn.setEnabled(False)
@@ -705,12 +718,13 @@ class AISearchPage(QWidget):
             JOB_TYPE_INDEX,
             JOB_TYPE_TAG,
             JOB_TYPE_CLEAR_TAGS,
+            JOB_TYPE_NEAR_DUPLICATES,
         )
 
         with session_scope() as session:
             return (
                 session.query(Job)
-                .filter(Job.job_type.in_([JOB_TYPE_INDEX, JOB_TYPE_TAG, JOB_TYPE_CLEAR_TAGS]))
+                .filter(Job.job_type.in_([JOB_TYPE_INDEX, JOB_TYPE_TAG, JOB_TYPE_CLEAR_TAGS, JOB_TYPE_NEAR_DUPLICATES]))
                 .order_by(Job.updated_at.desc())
                 .limit(20)
                 .all()
@@ -721,6 +735,7 @@ class AISearchPage(QWidget):
             "index": "索引",
             "tag": "打标",
             "clear_tags": "清除标签",
+            "near_duplicates": "查找重复",
         }
         status_map = {
             "pending": "待处理",
@@ -812,6 +827,12 @@ class AISearchPage(QWidget):
             self._resume_tagging_job(selection, job_id=job_id, job_params=job.params or {})
             return
 
+        if job.job_type == "near_duplicates":
+            # 重复检测不保存中间结果，恢复即按原参数重新计算
+            params = job.params if isinstance(job.params, dict) else {}
+            self._start_dedupe_job(selection, job_id=job_id, threshold=params.get("threshold"))
+            return
+
         InfoBar.warning(title="不支持的任务", content="当前任务类型暂不支持恢复", parent=self)
 
     def _on_stop_job_clicked(self):
@@ -834,6 +855,10 @@ class AISearchPage(QWidget):
             self._clear_tags_worker.cancel()
             InfoBar.info(title="已请求停止", content="清除标签任务将尽快暂停", parent=self)
             return
+        if self._dedupe_worker and self._dedupe_thread and self._dedupe_thread.isRunning():
+            self._dedupe_worker.cancel()
+            InfoBar.info(title="已请求停止", content="重复检测任务将尽快暂停", parent=self)
+            return
 
         InfoBar.warning(title="无法停止", content="当前页面没有正在运行的任务", parent=self)
 
@@ -846,6 +871,7 @@ class AISearchPage(QWidget):
             JOB_TYPE_INDEX,
             JOB_TYPE_TAG,
             JOB_TYPE_CLEAR_TAGS,
+            JOB_TYPE_NEAR_DUPLICATES,
         )
 
         # 运行中的任务不允许直接清空，避免任务线程和 DB 记录状态不同步
@@ -853,6 +879,7 @@ class AISearchPage(QWidget):
             (self._indexing_thread and self._indexing_thread.isRunning())
             or (self._tagging_thread and self._tagging_thread.isRunning())
             or (self._clear_tags_thread and self._clear_tags_thread.isRunning())
+            or (self._dedupe_thread and self._dedupe_thread.isRunning())
         )
         if has_running_task:
             InfoBar.warning(
@@ -874,7 +901,7 @@ class AISearchPage(QWidget):
         try:
             with session_scope() as session:
                 session.query(Job).filter(
-                    Job.job_type.in_([JOB_TYPE_INDEX, JOB_TYPE_TAG, JOB_TYPE_CLEAR_TAGS])
+                    Job.job_type.in_([JOB_TYPE_INDEX, JOB_TYPE_TAG, JOB_TYPE_CLEAR_TAGS, JOB_TYPE_NEAR_DUPLICATES])
                 ).delete(synchronize_session=False)
                 session.commit()
         except Exception as e:
@@ -921,7 +948,7 @@ class AISearchPage(QWidget):
 
     def _get_tag_list_from_ui(self):
         """根据当前 UI（标签集 + 自定义）解析出待用标签列表。影视音效(753)已注释。"""
-        from transcriptionist_v3.ui.utils.audioset_labels import SFX_FOCUSED_LABELS, AUDIOSET_LABELS
+        from transcriptionist_v3.application.ai.audioset_labels import SFX_FOCUSED_LABELS, AUDIOSET_LABELS
         idx = self.tag_label_set_combo.currentIndex()
         if idx == 0:
             return list(SFX_FOCUSED_LABELS)
@@ -1011,6 +1038,76 @@ class AISearchPage(QWidget):
         self.clear_tags_btn.setEnabled(True)
         self._refresh_job_list()
 
+    def _on_find_duplicates(self):
+        """在已选范围内查找声学近似重复（后台线程）。"""
+        selection = self._get_active_selection()
+        if selection.get("mode") == "none" or int(selection.get("count", 0) or 0) == 0:
+            InfoBar.warning(
+                title="未选择文件",
+                content="请先在音效库中选择需要查重的文件或文件夹",
+                parent=self
+            )
+            return
+        self._start_dedupe_job(selection, job_id=None)
+
+    def _start_dedupe_job(self, selection: dict, job_id: int | None, threshold: float | None = None):
+        """启动近似重复检测任务（可用于恢复）。"""
+        if not (self._chunked_index and self._chunked_index.get("_store")):
+            InfoBar.warning(title="索引未就绪", content="请先建立 AI 检索索引", parent=self)
+            return
+        try:
+            cleanup_thread(self._dedupe_thread, self._dedupe_worker)
+        except Exception:
+            pass
+
+        if threshold is None:
+            threshold = AppConfig.get("ai.near_duplicate_threshold", 0.97)
+        self.dedupe_btn.setEnabled(False)
+        self.tag_log.append("▶ 开始查找近似重复音效...")
+
+        self._dedupe_thread = QThread()
+        self._dedupe_worker = NearDuplicateJobWorker(
+            selection=selection,
+            chunked_index=self._chunked_index,
+            threshold=float(threshold),
+            probe_lists=int(AppConfig.get("ai.near_duplicate_probe_lists", 4) or 4),
+            job_id=job_id,
+        )
+        self._dedupe_worker.moveToThread(self._dedupe_thread)
+
+        self._dedupe_thread.started.connect(self._dedupe_worker.run)
+        self._dedupe_worker.log_message.connect(self._on_tagging_log)
+        self._dedupe_worker.finished.connect(self._on_dedupe_finished)
+        self._dedupe_worker.error.connect(self._on_dedupe_error)
+
+        self._dedupe_thread.start()
+        logger.info("Near-duplicate worker started in background thread")
+
+    def _on_dedupe_finished(self, result: dict):
+        """近似重复检测完成"""
+        cleanup_thread(self._dedupe_thread, self._dedupe_worker)
+        self._dedupe_thread = None
+        self._dedupe_worker = None
+
+        InfoBar.success(
+            title="查重完成",
+            content=f"发现 {int(result.get('groups', 0) or 0)} 组、{int(result.get('duplicates', 0) or 0)} 个重复音效",
+            parent=self
+        )
+        self.dedupe_btn.setEnabled(True)
+        self._refresh_job_list()
+
+    def _on_dedupe_error(self, error_msg: str):
+        """近似重复检测出错"""
+        cleanup_thread(self._dedupe_thread, self._dedupe_worker)
+        self._dedupe_thread = None
+        self._dedupe_worker = None
+
+        self.tag_log.append(f"\n❌ 查重出错: {error_msg}")
+        InfoBar.error(title="查重失败", content=error_msg, parent=self)
+        self.dedupe_btn.setEnabled(True)
+        self._refresh_job_list()
+
     def _on_start_tagging(self):
         """执行批量打标 (后台线程 + 实时更新)"""
         selection = self._get_active_selection()
@@ -1070,21 +1167,21 @@ class AISearchPage(QWidget):
 
         # 预计算标签 embedding
         if not self.tag_embeddings:
-            self.tag_log.append(f"正在初始化标签库特征（共 {len(tag_list_from_ui)} 个标签，首次需 10-60 秒）...")
+            self.tag_log.append(f"正在初始化标签库特征（共 {len(tag_list_from_ui)} 个标签，已缓存的标签直接读取）...")
             QApplication.processEvents()
 
             try:
-                for idx, tag in enumerate(tag_list_from_ui):
-                    if idx % 20 == 0 or idx == len(tag_list_from_ui) - 1:
-                        self.tag_log.append(f"构建索引 [{idx + 1}/{len(tag_list_from_ui)}]...")
-                        QApplication.processEvents()
-
-                    embed = self.engine.get_text_embedding(tag)
-                    if embed is not None:
-                        norm = np.linalg.norm(embed)
-                        if norm > 0:
-                            embed = embed / norm
-                        self.tag_embeddings[tag] = embed
+                # 分段批量编码：每段内命中磁盘缓存的直接读取，未命中的按真实 batch 跑文本编码器
+                step = 512
+                for start in range(0, len(tag_list_from_ui), step):
+                    tags = list(tag_list_from_ui[start:start + step])
+                    for tag, embed in zip(tags, self.engine.get_text_embeddings(tags)):
+                        if embed is not None:
+                            self.tag_embeddings[tag] = embed
+                    self.tag_log.append(
+                        f"构建索引 [{min(start + step, len(tag_list_from_ui))}/{len(tag_list_from_ui)}]..."
+                    )
+                    QApplication.processEvents()
 
                 self.tag_log.append("✅ 标签库初始化完成")
             except Exception as e:
@@ -1197,6 +1294,8 @@ class AISearchPage(QWidget):
         processed = result.get('processed', 0)
         total = result.get('total', 0)
         
+        # 标签已写入数据库：文本一路的查询缓存与融合结果失效
+        get_hybrid_search_service().invalidate()
         InfoBar.success(
             title="打标完成",
             content=f"已更新 {processed} 个文件的标签信息",
@@ -1224,6 +1323,7 @@ class AISearchPage(QWidget):
         """Handle library clear event"""
         self.selected_files = []
         self.audio_embeddings.clear()
+        get_hybrid_search_service().clear_embeddings()
         self.results_list.clear()
         self.list_header.setText("搜索结果")
         
@@ -1289,7 +1389,25 @@ class AISearchPage(QWidget):
         self.results_list.clear()
         self.list_header.setText(f"正在检索（共 {total_count} 条）...")
         self._search_thread = QThread()
-        if self._chunked_index:
+        store = None
+        if self._chunked_index and self._chunked_index.get("_store"):
+            store = (self._chunked_index["index_dir"], self._chunked_index["base_name"])
+        if store is not None or not self._chunked_index:
+            # 列式存储 / 内存索引：走应用层混合检索（文件名文本 + 语义并发、RRF 融合）
+            get_hybrid_search_service().set_text_encoder(
+                self.engine.get_text_embedding, getattr(self, "_model_version", "")
+            )
+            self._search_worker = HybridSearchWorker(
+                text,
+                semantic_text=search_query,
+                mode=str(AppConfig.get("ai.search_orchestrator_mode", "hybrid")),
+                top_k=int(AppConfig.get("ai.search_orchestrator_top_k", 500) or 500),
+                page_size=int(AppConfig.get("ai.search_page_size", 20) or 20),
+                store=store,
+                embeddings=None if store is not None else self.audio_embeddings,
+            )
+            self._search_worker.finished.connect(self._on_hybrid_search_finished)
+        elif self._chunked_index:
             top_per_chunk = AppConfig.get("ai.search_top_per_chunk", 300)
             max_results = AppConfig.get("ai.search_max_results", 500)
             try:
@@ -1309,6 +1427,7 @@ class AISearchPage(QWidget):
                 selection=selection,
                 top_per_chunk=top_per_chunk,
                 max_results=max_results,
+                base_name=self._chunked_index.get("base_name"),
             )
         else:
             self._search_worker = SearchWorker(
@@ -1318,9 +1437,10 @@ class AISearchPage(QWidget):
                 selected_set,
                 selection=selection,
             )
+        if not isinstance(self._search_worker, HybridSearchWorker):
+            self._search_worker.finished.connect(self._on_search_finished)
         self._search_worker.moveToThread(self._search_thread)
         self._search_thread.started.connect(self._search_worker.run)
-        self._search_worker.finished.connect(self._on_search_finished)
         self._search_worker.error.connect(self._on_search_error)
         self._search_thread.start()
         logger.info("Search worker started in background")
@@ -1376,6 +1496,44 @@ class AISearchPage(QWidget):
             self.results_list.addItem(item)
         logger.info(f"AI Search: displayed top {len(display)} results for query '{text}' (threshold={MIN_SCORE_THRESHOLD:.0%})")
 
+    def _on_hybrid_search_finished(self, page):
+        """混合检索完成：展示融合后的第一页，语义分低于阈值且无文本命中的条目被过滤。"""
+        cleanup_thread(self._search_thread, self._search_worker)
+        self._search_thread = None
+        self._search_worker = None
+        self.search_input.setEnabled(True)
+        text = getattr(self, "_last_search_text", "")
+        self.results_list.clear()
+        MIN_SCORE_THRESHOLD = 0.22
+        timings = page.describe_timings()
+        if page.observation.partial:
+            logger.warning(f"AI Search '{text}' returned partial results: {timings}")
+        items = [
+            item
+            for item in page.items
+            if item.lexical_score is not None
+            or (item.semantic_score is not None and item.semantic_score >= MIN_SCORE_THRESHOLD)
+        ]
+        if not items:
+            self.list_header.setText(f"搜索结果: '{text}' (共 0 条，{timings})")
+            self.results_list.addItem("未找到匹配结果，建议尝试更具体的关键词或描述")
+            return
+        self.list_header.setText(f"搜索结果: '{text}' (共 {page.total} 条，{timings})")
+        for item in items:
+            name = Path(item.key).name
+            if item.semantic_score is not None:
+                label = f"{name}  (匹配度: {item.semantic_score:.2%})"
+            else:
+                label = f"{name}  (文件名匹配)"
+            list_item = QListWidgetItem(label)
+            list_item.setToolTip(item.key)
+            list_item.setIcon(FluentIcon.MUSIC.icon())
+            list_item.setSizeHint(QSize(0, 40))
+            if (item.semantic_score or 0.0) > 0.35:
+                list_item.setForeground(Qt.GlobalColor.green)
+            self.results_list.addItem(list_item)
+        logger.info(f"AI Search ({page.mode}): displayed {len(items)} of {page.total} fused results for '{text}' ({timings})")
+
     def _on_search_error(self, msg: str):
         cleanup_thread(self._search_thread, self._search_worker)
         self._search_thread = None
@@ -1600,6 +1758,7 @@ class AISearchPage(QWidget):
         if w.exec():
             self.audio_embeddings.clear()
             self._chunked_index = None
+            get_hybrid_search_service().clear_embeddings()
             try:
                 if self._index_path.exists():
                     self._index_path.unlink()
@@ -1647,71 +1806,55 @@ class AISearchPage(QWidget):
             InfoBar.success(title="清除成功", content="AI 索引已重置", parent=self)
 
     def _save_index(self):
-        """Persist embeddings to disk"""
+        """Persist embeddings to disk（同步写入列式存储）"""
         try:
             if not self.audio_embeddings:
                 return
-            
+            from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore
+            from transcriptionist_v3.application.ai.ann_index import IVFFlatIndex
+
             # 确保所有键都是字符串格式
             embeddings_to_save = {}
             for key, value in self.audio_embeddings.items():
                 embeddings_to_save[str(key)] = value
-            
-            logger.info(f"Saving {len(embeddings_to_save)} embeddings to {self._index_path}")
-            np.save(self._index_path, embeddings_to_save)
+
+            logger.info(f"Saving {len(embeddings_to_save)} embeddings to {self._index_dir}")
+            store = EmbeddingStore(self._index_dir, base_name=self._index_path.stem)
+            store.clear()
+            IVFFlatIndex(self._index_dir, base_name=self._index_path.stem).clear()
+            store.append(embeddings_to_save)
             logger.info("Index saved successfully")
-            
+
         except Exception as e:
             logger.error(f"Failed to save index: {e}")
 
     def _load_index(self):
-        """从磁盘加载索引；若存在分片 manifest 则只加载 manifest（按需检索）。"""
+        """从磁盘加载索引：只读取列式存储 manifest（检索时内存映射按需读取）。"""
         try:
-            index_dir = self._index_path.parent
-            base_name = self._index_path.stem
-            meta_path = index_dir / f"{base_name}_meta.npy"
-            if meta_path.exists():
-                data = np.load(str(meta_path), allow_pickle=True)
-                meta = data.item() if data.ndim == 0 else {}
-                if isinstance(meta, dict) and "chunk_files" in meta:
-                    self._chunked_index = {
-                        "_chunked": True,
-                        "chunk_files": meta["chunk_files"],
-                        "index_dir": str(index_dir),
-                        "total_count": int(meta.get("total_count", 0)),
-                    }
-                    self.audio_embeddings = {}
-                    total = self._chunked_index["total_count"]
-                    self.build_index_btn.setText("索引已就绪")
-                    self.build_index_btn.setEnabled(True)
-                    self.start_tag_btn.setEnabled(True)
-                    self.results_list.clear()
-                    self.list_header.setText("索引已就绪")
-                    item = QListWidgetItem(f"✅ 已加载分片索引，共 {total} 条，检索时按需加载")
-                    self.results_list.addItem(item)
-                    logger.info(f"Loaded chunked index manifest: {total} items")
-                    return
-            if self._index_path.exists():
-                logger.info(f"Loading index from {self._index_path}")
-                data = np.load(self._index_path, allow_pickle=True)
-                if data.ndim == 0:
-                    self.audio_embeddings = data.item()
-                    self._chunked_index = None
-                else:
-                    logger.warning("Invalid index format")
-                    self.audio_embeddings = {}
-                logger.info(f"Loaded {len(self.audio_embeddings)} items from index")
-                if self.audio_embeddings:
-                    self.build_index_btn.setText("索引已就绪")
-                    self.build_index_btn.setEnabled(True)
-                    self.start_tag_btn.setEnabled(True)
-                    self.results_list.clear()
-                    self.list_header.setText("索引已就绪")
-                    item = QListWidgetItem(f"✅ 已加载 {len(self.audio_embeddings)} 个文件的索引，可以开始搜索")
-                    self.results_list.addItem(item)
-                    logger.info("Index loaded successfully, UI updated")
-            else:
+            from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore
+
+            store = EmbeddingStore(self._index_path.parent, base_name=self._index_path.stem)
+            if not store.exists or store.count == 0:
                 logger.info("No existing index found")
+                return
+            self._chunked_index = {
+                "_chunked": True,
+                "_store": True,
+                "chunk_files": [],
+                "index_dir": str(store.index_dir),
+                "base_name": store.base_name,
+                "total_count": len(store.live_rows()),
+            }
+            self.audio_embeddings = {}
+            total = self._chunked_index["total_count"]
+            self.build_index_btn.setText("索引已就绪")
+            self.build_index_btn.setEnabled(True)
+            self.start_tag_btn.setEnabled(True)
+            self.results_list.clear()
+            self.list_header.setText("索引已就绪")
+            item = QListWidgetItem(f"✅ 已加载索引，共 {total} 条，检索时按需加载")
+            self.results_list.addItem(item)
+            logger.info(f"Loaded embedding store manifest: {total} items")
         except Exception as e:
             logger.error(f"Failed to load index: {e}")
             self.audio_embeddings = {}
@@ -38,7 +38,9 @@ from transcriptionist_v3.core.config import AppConfig, get_default_scan_workers
 from transcriptionist_v3.core.utils import format_file_size, format_duration, format_sample_rate
 from transcriptionist_v3.ui.utils.notifications import NotificationHelper
 from transcriptionist_v3.ui.utils.workers import DatabaseLoadWorker, cleanup_thread
-from transcriptionist_v3.application.search_engine.search_engine import SearchEngine
+from transcriptionist_v3.application.search_engine.hybrid_search import get_hybrid_search_service
+from transcriptionist_v3.application.library_manager.row_index import LibraryRowIndex
+from transcriptionist_v3.application.library_manager.import_queue import ImportQueueProcessor, QueueScanner
 from transcriptionist_v3.infrastructure.database.connection import session_scope
 from transcriptionist_v3.ui.themes.theme_tokens import get_theme_tokens
 
@@ -46,19 +48,6 @@ logger = logging.getLogger(__name__)
 
 SUPPORTED_FORMATS = {".wav", ".flac", ".mp3", ".ogg", ".aiff", ".aif", ".m4a", ".mp4"}
 
-# SQLite 单条 SQL 中变量数上限约 999
-# IN 查询/更新：每批 500 个占位符安全
-SQLITE_IN_BATCH = 500
-# INSERT 多行：每行 3 列 → 每批最多 999/3≈333 行，取 300 保险（4–5 万条也安全）
-SQLITE_INSERT_BATCH = 300
-
-# 导入队列状态
-IMPORT_STATUS_PENDING = 0
-IMPORT_STATUS_PROCESSING = 1
-IMPORT_STATUS_DONE = 2
-IMPORT_STATUS_SKIPPED = 3
-IMPORT_STATUS_FAILED = 4
-
 
 class SaveWorker(QObject):
     """后台保存工作线程"""
@@ -130,7 +119,7 @@ class SaveWorker(QObject):
                             file_path=str(file_path),
                             filename=file_path.name,
                             file_size=file_path.stat().st_size,
-                            content_hash="",
+                            content_hash=getattr(metadata, "content_hash", "") or "",
                             duration=metadata.duration,
                             sample_rate=metadata.sample_rate,
                             bit_depth=metadata.bit_depth or 16,
@@ -159,16 +148,11 @@ class SaveWorker(QObject):
 
 
 class QueueScanWorker(QObject):
-    """扫描并入队：发现文件立即写入导入队列。"""
+    """扫描并入队：发现文件立即写入导入队列（逻辑见 ``QueueScanner``）。"""
     progress = Signal(int, int, str)  # scanned, total, current_file
-    finished = Signal(dict)  # {"total": int, "enqueued": int, "skipped": int}
+    finished = Signal(dict)  # {"total": int, "enqueued": int, "skipped": int, "moved": int}
     error = Signal(str)
 
-    # 扫描进度间隔
-    SCAN_PROGRESS_INTERVAL = 5000
-    # 入队批量大小
-    ENQUEUE_BATCH_SIZE = 2000
-
     def __init__(self, folder_path: str, parent=None):
         super().__init__(parent)
         self.folder_path = folder_path
@@ -177,154 +161,18 @@ class QueueScanWorker(QObject):
     def cancel(self):
         self._cancelled = True
 
-    def _scan_dir_stream(self, dir_path: Path):
-        """递归流式扫描目录，逐个产出匹配文件路径，避免大列表占用内存峰值。"""
-        if self._cancelled:
-            return
-        try:
-            with os.scandir(dir_path) as entries:
-                for entry in entries:
-                    if self._cancelled:
-                        return
-                    if entry.is_file(follow_symlinks=False):
-                        file_path = Path(entry.path)
-                        if file_path.suffix.lower() in SUPPORTED_FORMATS:
-                            yield file_path
-                    elif entry.is_dir(follow_symlinks=False):
-                        yield from self._scan_dir_stream(Path(entry.path))
-        except PermissionError:
-            logger.warning(f"Permission denied: {dir_path}")
-        except Exception as e:
-            logger.warning(f"Error scanning {dir_path}: {e}")
-
-    def _enqueue_paths(self, root_folder: Path, paths: list[str]) -> tuple[int, int]:
-        """将路径批量写入导入队列，返回 (enqueued, skipped)。避免 SQLite too many SQL variables。"""
-        if not paths:
-            return 0, 0
-        from sqlalchemy import insert
-        from transcriptionist_v3.infrastructure.database.connection import session_scope
-        from transcriptionist_v3.infrastructure.database.models import ImportQueue, AudioFile
-
-        existing_audio: set[str] = set()
-        existing_queue: set[str] = set()
-        with session_scope() as session:
-            for i in range(0, len(paths), SQLITE_IN_BATCH):
-                batch = paths[i : i + SQLITE_IN_BATCH]
-                existing_audio.update(
-                    row.file_path for row in session.query(AudioFile.file_path).filter(AudioFile.file_path.in_(batch)).all()
-                )
-                existing_queue.update(
-                    row.file_path for row in session.query(ImportQueue.file_path).filter(ImportQueue.file_path.in_(batch)).all()
-                )
-            to_insert = [p for p in paths if p not in existing_audio and p not in existing_queue]
-            skipped = len(paths) - len(to_insert)
-
-            if to_insert:
-                for i in range(0, len(to_insert), SQLITE_INSERT_BATCH):
-                    chunk = to_insert[i : i + SQLITE_INSERT_BATCH]
-                    values = [
-                        {
-                            "file_path": p,
-                            "root_path": str(root_folder),
-                            "status": IMPORT_STATUS_PENDING,
-                        }
-                        for p in chunk
-                    ]
-                    stmt = insert(ImportQueue).prefix_with("OR IGNORE")
-                    session.execute(stmt, values)
-            # session_scope 退出时自动 commit
-        return len(to_insert), skipped
-
     def run(self):
         """扫描目录：发现文件即入队。"""
         try:
-            folder = Path(self.folder_path)
-            logger.info(f"QueueScanWorker.run 开始：文件夹 {self.folder_path}")
-            scanned = 0
-            enqueued = 0
-            skipped = 0
-            buffer: list[str] = []
-
-            def flush():
-                nonlocal enqueued, skipped, buffer
-                if not buffer:
-                    return
-                added, sk = self._enqueue_paths(folder, buffer)
-                enqueued += added
-                skipped += sk
-                buffer = []
-
-            self.progress.emit(0, 0, "正在扫描目录，请稍候...")
-
-            # 根目录文件
-            try:
-                with os.scandir(folder) as entries:
-                    for entry in entries:
-                        if self._cancelled:
-                            return
-                        if entry.is_file(follow_symlinks=False):
-                            file_path = Path(entry.path)
-                            if file_path.suffix.lower() in SUPPORTED_FORMATS:
-                                buffer.append(str(file_path))
-                                scanned += 1
-                                if len(buffer) >= self.ENQUEUE_BATCH_SIZE:
-                                    flush()
-                                if scanned % self.SCAN_PROGRESS_INTERVAL == 0:
-                                    self.progress.emit(
-                                        scanned,
-                                        0,
-                                        f"正在扫描目录，已发现 {scanned} 个音频文件..."
-                                    )
-            except PermissionError:
-                logger.warning(f"Permission denied: {folder}")
-            except Exception as e:
-                logger.warning(f"Error scanning root: {e}")
-
-            # 一级子目录流式扫描（避免 future 一次性返回大列表导致内存峰值）
-            subdirs = [Path(entry.path) for entry in os.scandir(folder) if entry.is_dir(follow_symlinks=False)]
-            if subdirs:
-                max_scan_workers = AppConfig.get("performance.scan_workers") or get_default_scan_workers()
-                max_scan_workers = min(max(1, max_scan_workers), 32)
-                logger.info(f"QueueScanWorker: scan_workers={max_scan_workers} (stream mode)")
-                self.progress.emit(
-                    scanned, 0,
-                    f"正在扫描 {len(subdirs)} 个子目录（已发现 {scanned} 个）..."
-                )
-                for subdir in subdirs:
-                    if self._cancelled:
-                        return
-                    try:
-                        for file_path in self._scan_dir_stream(subdir):
-                            if self._cancelled:
-                                return
-                            buffer.append(str(file_path))
-                            scanned += 1
-                            if len(buffer) >= self.ENQUEUE_BATCH_SIZE:
-                                flush()
-                            if scanned % self.SCAN_PROGRESS_INTERVAL == 0:
-                                self.progress.emit(
-                                    scanned, 0,
-                                    f"正在扫描目录，已发现 {scanned} 个音频文件..."
-                                )
-                    except Exception as e:
-                        logger.warning(f"Subdir scan failed: {e}")
-
-            # 最后入队
-            flush()
-
-            # 更新库路径信息
-            from transcriptionist_v3.infrastructure.database.connection import session_scope
-            from transcriptionist_v3.infrastructure.database.models import LibraryPath
-            with session_scope() as session:
-                lib_path = session.query(LibraryPath).filter_by(path=str(folder)).first()
-                if not lib_path:
-                    lib_path = LibraryPath(path=str(folder), enabled=True, recursive=True)
-                    session.add(lib_path)
-                lib_path.last_scan_at = datetime.now()
-                lib_path.file_count = scanned
-                session.commit()
-
-            self.finished.emit({"total": scanned, "enqueued": enqueued, "skipped": skipped})
+            scanner = QueueScanner(
+                self.folder_path,
+                progress_callback=self.progress.emit,
+                is_cancelled=lambda: self._cancelled,
+            )
+            stats = scanner.run()
+            if stats is None:
+                return
+            self.finished.emit(stats)
 
         except Exception as e:
             logger.error(f"Queue scan error: {e}")
@@ -332,256 +180,37 @@ class QueueScanWorker(QObject):
 
 
 class ImportQueueWorker(QObject):
-    """后台处理导入队列：提取元数据并写入 audio_files。"""
+    """后台处理导入队列：提取元数据并写入 audio_files（逻辑见 ``ImportQueueProcessor``）。"""
     progress = Signal(int, int, str)  # current, total, message
     finished = Signal(int, int)  # saved_count, skipped_count
     error = Signal(str)
 
-    PARALLEL_THRESHOLD = 100
-
     def __init__(self, root_folder: Optional[str] = None, batch_size: int = 3000, parent=None):
         super().__init__(parent)
-        self.root_folder = str(root_folder) if root_folder else None
-        self.batch_size = max(1, int(batch_size))
         self._cancelled = False
-        self._pool = None  # 复用进程池，避免每次 batch 都创建/销毁
+        self._processor = ImportQueueProcessor(
+            root_folder=root_folder,
+            batch_size=batch_size,
+            progress_callback=self.progress.emit,
+            is_cancelled=lambda: self._cancelled,
+        )
 
     def cancel(self):
         self._cancelled = True
-        if self._pool is not None:
-            try:
-                self._pool.terminate()
-                self._pool.join()
-            except Exception:
-                pass
-            self._pool = None
-
-    def _extract_metadata_batch(self, file_paths: list[str], progress_cb=None) -> list:
-        from transcriptionist_v3.application.library_manager.metadata_extractor import MetadataExtractor, extract_one_for_pool
-        total = len(file_paths)
-        if total == 0:
-            return []
-        if total < self.PARALLEL_THRESHOLD:
-            extractor = MetadataExtractor()
-            results = []
-            for idx, path_str in enumerate(file_paths, start=1):
-                if self._cancelled:
-                    return []
-                try:
-                    meta = extractor.extract(Path(path_str))
-                except Exception:
-                    meta = None
-                results.append(meta)
-                if progress_cb and (idx % 50 == 0 or idx == total):
-                    progress_cb(idx, total)
-            return results
-
-        # 多进程提取（复用进程池，避免每次 batch 都创建/销毁）
-        from multiprocessing import Pool
-        max_workers = AppConfig.get("performance.scan_workers") or get_default_scan_workers()
-        max_workers = max(1, min(max_workers, total))
-        
-        # 首次调用时创建进程池，后续复用
-        if self._pool is None:
-            logger.info(f"ImportQueueWorker: 创建进程池 metadata_workers={max_workers}")
-            self._pool = Pool(processes=max_workers)
-        else:
-            logger.info(f"ImportQueueWorker: 复用进程池 metadata_workers={max_workers}")
-        
-        results = [None] * total
-        args_list = [(i, str(fp)) for i, fp in enumerate(file_paths)]
-        # 优化 chunksize：增大批次大小，减少进程间通信开销
-        chunksize = max(1, min(200, total // max_workers))
-        try:
-            it = self._pool.imap_unordered(extract_one_for_pool, args_list, chunksize=chunksize)
-            done = 0
-            for res in it:
-                if self._cancelled:
-                    return []
-                idx, _, meta = res
-                results[idx] = meta
-                done += 1
-                # 减少进度更新频率，避免信号过多影响性能
-                if progress_cb and (done % 100 == 0 or done == total):
-                    progress_cb(done, total)
-        except Exception as e:
-            logger.warning(f"Multiprocessing extract failed: {e}")
-            # 失败时关闭进程池并退回单线程
-            if self._pool is not None:
-                try:
-                    self._pool.terminate()
-                    self._pool.join()
-                except Exception:
-                    pass
-                self._pool = None
-            extractor = MetadataExtractor()
-            results = []
-            for idx, path_str in enumerate(file_paths, start=1):
-                if self._cancelled:
-                    return []
-                try:
-                    meta = extractor.extract(Path(path_str))
-                except Exception:
-                    meta = None
-                results.append(meta)
-                if progress_cb and (idx % 100 == 0 or idx == total):
-                    progress_cb(idx, total)
-        return results
+        self._processor.terminate_pool()
 
     def run(self):
         try:
-            from transcriptionist_v3.infrastructure.database.connection import session_scope
-            from transcriptionist_v3.infrastructure.database.models import ImportQueue, AudioFile
-
-            saved_total = 0
-            skipped_total = 0
-            processed_total = 0
-
-            with session_scope() as session:
-                query = session.query(ImportQueue).filter(ImportQueue.status == IMPORT_STATUS_PENDING)
-                if self.root_folder:
-                    query = query.filter(ImportQueue.root_path == self.root_folder)
-                overall_total = query.count()
-
-            while True:
-                if self._cancelled:
-                    return
-
-                with session_scope() as session:
-                    query = session.query(ImportQueue).filter(ImportQueue.status == IMPORT_STATUS_PENDING)
-                    if self.root_folder:
-                        query = query.filter(ImportQueue.root_path == self.root_folder)
-                    rows = query.order_by(ImportQueue.id).limit(self.batch_size).all()
-                    if not rows:
-                        break
-                    ids = [r.id for r in rows]
-                    paths = [r.file_path for r in rows]
-                    
-                    # 合并查询：已存在的文件路径（分批，避免 too many SQL variables）
-                    existing: set[str] = set()
-                    for i in range(0, len(paths), SQLITE_IN_BATCH):
-                        batch = paths[i : i + SQLITE_IN_BATCH]
-                        existing.update(
-                            row.file_path for row in session.query(AudioFile.file_path).filter(AudioFile.file_path.in_(batch)).all()
-                        )
-                    
-                    # 更新状态为 PROCESSING（分批）
-                    for i in range(0, len(ids), SQLITE_IN_BATCH):
-                        id_batch = ids[i : i + SQLITE_IN_BATCH]
-                        session.query(ImportQueue).filter(ImportQueue.id.in_(id_batch)).update(
-                            {"status": IMPORT_STATUS_PROCESSING}, synchronize_session=False
-                        )
-                    session.commit()
-
-                pending_rows = [(r, p) for r, p in zip(rows, paths) if p not in existing]
-                skipped_ids = [r.id for r, p in zip(rows, paths) if p in existing]
-
-                to_process_paths = [p for _, p in pending_rows]
-                def _progress_local(done, _batch_total):
-                    self.progress.emit(processed_total + done, overall_total, f"正在提取元数据... {processed_total + done}/{overall_total}")
-
-                # 先发一次进度，避免 UI 看起来“卡住”
-                self.progress.emit(processed_total, overall_total, f"正在提取元数据... {processed_total}/{overall_total}")
-                metas = self._extract_metadata_batch(to_process_paths, progress_cb=_progress_local)
-
-                new_files = []
-                done_ids = []
-                failed_ids = []
-
-                for idx, (row, path_str) in enumerate(pending_rows):
-                    # 即使元数据提取失败(meta 为 None)，也尽量创建记录，保证文件至少能出现在库中
-                    meta = metas[idx] if idx < len(metas) else None
-                    try:
-                        p = Path(path_str)
-                        if not p.exists():
-                            failed_ids.append(row.id)
-                            continue
-
-                        duration = 0.0
-                        sample_rate = 0
-                        bit_depth = 16
-                        channels = 0
-                        description = None
-
-                        if meta is not None:
-                            duration = float(getattr(meta, "duration", 0.0) or 0.0)
-                            sample_rate = int(getattr(meta, "sample_rate", 0) or 0)
-                            bit_depth = int(getattr(meta, "bit_depth", 16) or 16)
-                            channels = int(getattr(meta, "channels", 0) or 0)
-                            description = getattr(meta, "description", None) or getattr(meta, "comment", None)
-
-                        audio_file = AudioFile(
-                            file_path=str(p),
-                            filename=p.name,
-                            file_size=p.stat().st_size,
-                            content_hash="",
-                            duration=duration,
-                            sample_rate=sample_rate,
-                            bit_depth=bit_depth,
-                            channels=channels,
-                            format=p.suffix.lstrip('.').lower(),
-                            description=description,
-                            original_filename=p.name,
-                        )
-                        new_files.append(audio_file)
-                        done_ids.append(row.id)
-                    except Exception:
-                        failed_ids.append(row.id)
-
-                with session_scope() as session:
-                    if new_files:
-                        session.bulk_save_objects(new_files)
-                        saved_total += len(new_files)
-                    for i in range(0, len(skipped_ids), SQLITE_IN_BATCH):
-                        session.query(ImportQueue).filter(ImportQueue.id.in_(skipped_ids[i : i + SQLITE_IN_BATCH])).update(
-                            {"status": IMPORT_STATUS_SKIPPED}, synchronize_session=False
-                        )
-                    if skipped_ids:
-                        skipped_total += len(skipped_ids)
-                    for i in range(0, len(done_ids), SQLITE_IN_BATCH):
-                        session.query(ImportQueue).filter(ImportQueue.id.in_(done_ids[i : i + SQLITE_IN_BATCH])).update(
-                            {"status": IMPORT_STATUS_DONE}, synchronize_session=False
-                        )
-                    for i in range(0, len(failed_ids), SQLITE_IN_BATCH):
-                        session.query(ImportQueue).filter(ImportQueue.id.in_(failed_ids[i : i + SQLITE_IN_BATCH])).update(
-                            {"status": IMPORT_STATUS_FAILED, "error": "metadata extract failed"}, synchronize_session=False
-                        )
-                    if failed_ids:
-                        skipped_total += len(failed_ids)
-                    session.commit()
-
-                processed_total += len(rows)
-                self.progress.emit(processed_total, overall_total, f"正在入库... {processed_total}/{overall_total}")
-
-            # 关闭进程池（线程守卫：确保资源释放）
-            if self._pool is not None:
-                try:
-                    logger.info("ImportQueueWorker: 关闭进程池")
-                    self._pool.close()
-                    self._pool.join()
-                except Exception as e:
-                    logger.warning(f"关闭进程池时出错: {e}")
-                    try:
-                        self._pool.terminate()
-                        self._pool.join()
-                    except Exception:
-                        pass
-                finally:
-                    self._pool = None
-
-            self.finished.emit(saved_total, skipped_total)
+            result = self._processor.run()
+            if result is None:
+                return
+            self.finished.emit(*result)
 
         except Exception as e:
             logger.error(f"Import queue error: {e}")
-            # 出错时也要关闭进程池
-            if self._pool is not None:
-                try:
-                    self._pool.terminate()
-                    self._pool.join()
-                except Exception:
-                    pass
-                self._pool = None
             self.error.emit(str(e))
+
+
 _metadata_extractor_local = None
 
 
@@ -741,7 +370,7 @@ class ScanWorker(QObject):
     
     def _extract_single_thread(self, audio_files: list) -> list:
         """单线程提取元数据"""
-        from transcriptionist_v3.application.library_manager.metadata_extractor import MetadataExtractor
+        from transcriptionist_v3.application.library_manager.metadata_extractor import MetadataExtractor, extract_for_import
         
         extractor = MetadataExtractor()
         total = len(audio_files)
@@ -754,7 +383,7 @@ class ScanWorker(QObject):
             self.progress.emit(i + 1, total, str(file_path))
             
             try:
-                metadata = extractor.extract(file_path)
+                metadata = extract_for_import(file_path, extractor)
                 results.append((file_path, metadata))
             except Exception as e:
                 logger.warning(f"Failed to extract metadata from {file_path}: {e}")
@@ -1394,6 +1023,7 @@ class LibraryPage(QWidget):
     folder_clicked = Signal(str, list)  # folder_path, file_indices (List[int])
     library_cleared = Signal()
     realtime_index_status_changed = Signal(str, str)
+    library_changes_detected = Signal(int)  # 监视线程写库后的变化条数（跨线程转回 UI 线程）
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -1415,15 +1045,16 @@ class LibraryPage(QWidget):
         self._selected_folders = set()  # 新增：跟踪选中的文件夹
         self._file_items: Dict[str, QTreeWidgetItem] = {}
         
-        # 文件路径到数据库 ID 的映射（用于搜索）
-        self._file_path_to_id: Dict[str, int] = {}
+        # 行索引：路径 / 数据库 ID → 全局索引（O(1)），以及音效列表的文件名过滤
+        self._row_index = LibraryRowIndex()
+        self._search_active = False  # 音效列表当前是否显示搜索结果
         
         # 懒加载相关
         self._all_file_data = []  # 所有文件数据 [(path, metadata), ...]
         self._loaded_count = 0    # 已加载数量
         self._batch_size = 100    # 每批加载数量
         self._is_loading = False  # 是否正在加载
-        self._lazy_load_enabled = True  # 懒加载开关（搜索时禁用）
+        self._lazy_load_enabled = True  # 懒加载开关
         self._folder_items = {}   # 文件夹节点缓存 {folder_path_str: QTreeWidgetItem}
         self._is_all_selected = False  # 全选状态标记
         
@@ -1434,8 +1065,8 @@ class LibraryPage(QWidget):
         self._db_load_thread: Optional[QThread] = None
         self._db_load_worker: Optional[DatabaseLoadWorker] = None
         
-        # Initialize backend search engine
-        self._search_engine = SearchEngine(lambda: session_scope())
+        # 应用层混合检索服务（与 AI 检索页共用：词法索引 + 常驻 embedding 矩阵 + RRF 融合）
+        self._search_service = get_hybrid_search_service()
         
         # 搜索防抖计时器，避免频繁触发全库搜索导致卡顿
         self._search_timer = QTimer(self)
@@ -1443,6 +1074,18 @@ class LibraryPage(QWidget):
         self._search_timer.setSingleShot(True)
         self._search_timer.timeout.connect(self._execute_search)
         
+        # 库目录监视（library.watch_for_changes）：库加载完成后按库根目录启动，退出时停止
+        self._library_watcher = None
+        self._library_coalescer = None
+        self._watched_roots: List[str] = []
+        self._watch_import_thread: Optional[QThread] = None
+        self._watch_import_worker: Optional[ImportQueueWorker] = None
+        self._watch_import_pending = False
+        self.library_changes_detected.connect(self._on_library_changes_detected)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self._stop_library_watcher)
+        
         self._init_ui()
         self._load_from_database_async()  # 异步从数据库加载已有数据
 
@@ -1460,6 +1103,7 @@ class LibraryPage(QWidget):
         
         if not results and not root_paths:
             logger.info("No audio files loaded from database")
+            self._restart_library_watcher([])
             self.stack.setCurrentWidget(self.empty_state)
             return
         
@@ -1476,20 +1120,17 @@ class LibraryPage(QWidget):
         # 清理缓存
         self._file_info_cache.clear()
         
-        # 构建文件路径到数据库 ID 的映射（用于搜索）
-        self._file_path_to_id = {}
-        if not paths_only:
-            try:
-                from transcriptionist_v3.infrastructure.database.models import AudioFile
-                with session_scope() as session:
-                    for path, _ in results:
-                        audio_file = session.query(AudioFile).filter_by(file_path=str(path)).first()
-                        if audio_file:
-                            self._file_path_to_id[str(path)] = audio_file.id
-            except Exception as e:
-                logger.error(f"Failed to build file path to ID mapping: {e}")
+        # 行索引（由加载线程建好；兼容旧数据格式时在此构建，此时按 ID 映射不可用）
+        row_index = data.get("row_index") if isinstance(data, dict) else None
+        if row_index is None:
+            row_index = LibraryRowIndex(path for path, _ in self._all_file_data)
+        self._row_index = row_index
+        self._search_active = False
+        # 库内容已变化：丢弃检索服务中的查询 / 融合结果缓存
+        self._search_service.invalidate()
         
         self._library_roots = root_paths
+        self._restart_library_watcher(root_paths)
         
         logger.info(f"Loaded {len(results)} audio files from database, roots: {len(root_paths)}, paths_only={paths_only}")
         
@@ -1698,7 +1339,7 @@ class LibraryPage(QWidget):
         
         # 2. 搜索框 (Expanding) - 作用于左侧整个音效库
         self.search_edit = SearchLineEdit()
-        self.search_edit.setPlaceholderText("搜索音效库... (支持: exp* / tags:脚步声 / duration:>10)")
+        self.search_edit.setPlaceholderText("搜索音效库... (支持: exp* / tags:脚步声 / duration:>10 / dup:no)")
         self.search_edit.setMinimumWidth(180)
         self.search_edit.setFixedHeight(34)
         self.search_edit.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Fixed)
@@ -1715,7 +1356,7 @@ class LibraryPage(QWidget):
         main_layout.addWidget(self.toolbar_row_main)
         
         # 第二行：搜索提示（可折叠）
-        self.search_hint = CaptionLabel("💡 高级搜索: exp* | tags:脚步声 | duration:>10")
+        self.search_hint = CaptionLabel("💡 高级搜索: exp* | tags:脚步声 | duration:>10 | dup:no 隐藏重复音效")
         self.search_hint.setTextColor(QColor(150, 150, 150), QColor(150, 150, 150))
         self.search_hint.setVisible(False)  # 默认隐藏
         main_layout.addWidget(self.search_hint)
@@ -2455,7 +2096,7 @@ QFileDialog#folderImportDialog QSplitter::handle {{
                             file_path=str(file_path),
                             filename=file_path.name,
                             file_size=file_path.stat().st_size,
-                            content_hash="",
+                            content_hash=getattr(metadata, "content_hash", "") or "",
                             duration=metadata.duration,
                             sample_rate=metadata.sample_rate,
                             bit_depth=metadata.bit_depth or 16,
@@ -2539,6 +2180,95 @@ QFileDialog#folderImportDialog QSplitter::handle {{
         self._db_load_thread = None
         self._db_load_worker = None
     
+    # ========= 库目录监视 =========
+    def _restart_library_watcher(self, roots) -> None:
+        """按库根目录（重新）启动文件监视；设置关闭、无根目录或 watchdog 不可用时只停止。"""
+        roots = sorted({str(r) for r in roots or []})
+        if not AppConfig.get("library.watch_for_changes", True) or not roots:
+            self._stop_library_watcher()
+            return
+        if roots == self._watched_roots and self._library_watcher is not None:
+            return
+        self._stop_library_watcher()
+
+        from transcriptionist_v3.application.library_manager.change_pipeline import create_library_watcher
+
+        try:
+            watcher, coalescer = create_library_watcher(
+                roots, on_flush=lambda changes: self.library_changes_detected.emit(len(changes))
+            )
+            if not watcher.is_available:
+                logger.info("watchdog not installed, library folder watching disabled")
+                return
+            coalescer.start()
+            if not watcher.start():
+                coalescer.stop(flush=False)
+                return
+        except Exception as e:
+            logger.warning(f"Failed to start library watcher: {e}")
+            return
+        self._library_watcher = watcher
+        self._library_coalescer = coalescer
+        self._watched_roots = roots
+        logger.info(f"Watching {len(roots)} library roots for changes")
+
+    def _stop_library_watcher(self) -> None:
+        """停止监视；合并层中已稳定的变化在停止前写入数据库。"""
+        watcher, coalescer = self._library_watcher, self._library_coalescer
+        self._library_watcher = None
+        self._library_coalescer = None
+        self._watched_roots = []
+        try:
+            if watcher is not None:
+                watcher.stop()
+            if coalescer is not None:
+                coalescer.stop()
+        except Exception as e:
+            logger.warning(f"Failed to stop library watcher: {e}")
+
+    def _on_library_changes_detected(self, count: int) -> None:
+        """监视层已把变化写入库 / 导入队列：后台处理导入队列后刷新库视图。"""
+        logger.info(f"Library watcher flushed {count} changes")
+        busy = (
+            self._watch_import_thread is not None
+            or getattr(self, "_save_thread", None) is not None
+            or self._scan_thread is not None
+        )
+        if busy:
+            # 正在导入：结束后再处理一次
+            self._watch_import_pending = True
+            return
+        self._watch_import_pending = False
+
+        batch_size = AppConfig.get("performance.import_batch_size", 5000)
+        try:
+            batch_size = int(batch_size)
+        except (TypeError, ValueError):
+            batch_size = 5000
+        self._watch_import_worker = ImportQueueWorker(root_folder=None, batch_size=batch_size)
+        self._watch_import_thread = QThread()
+        self._watch_import_worker.moveToThread(self._watch_import_thread)
+        self._watch_import_thread.started.connect(self._watch_import_worker.run)
+        self._watch_import_worker.finished.connect(self._on_watch_import_finished)
+        self._watch_import_worker.error.connect(self._on_watch_import_error)
+        self._watch_import_thread.start()
+
+    def _on_watch_import_finished(self, saved_count: int, skipped_count: int) -> None:
+        self._cleanup_watch_import_thread()
+        logger.info(f"Watched changes imported: saved={saved_count}, skipped={skipped_count}")
+        self._load_from_database_async()
+        if self._watch_import_pending:
+            self._on_library_changes_detected(0)
+
+    def _on_watch_import_error(self, error_msg: str) -> None:
+        self._cleanup_watch_import_thread()
+        logger.error(f"Failed to import watched changes: {error_msg}")
+
+    def _cleanup_watch_import_thread(self) -> None:
+        cleanup_thread(self._watch_import_thread, self._watch_import_worker)
+        self._watch_import_thread = None
+        self._watch_import_worker = None
+
     def _load_from_database_async(self):
         """异步从数据库加载已有的音频文件 (不阻塞UI)"""
         # 创建工作线程
@@ -2722,6 +2452,9 @@ QFileDialog#folderImportDialog QSplitter::handle {{
                         new_file_path_str = path_str.replace(old_path_str, new_path_str, 1)
                         new_path_obj = Path(new_file_path_str)
                         self._all_file_data[i] = (new_path_obj, metadata)
+                        self._row_index.update_path(i, new_path_obj)
+                
+                self._search_service.invalidate()
                 
                 # 4. 重建文件夹索引（因为文件夹路径变了）
                 # 优化：批量操作时延迟重建索引
@@ -2809,8 +2542,10 @@ QFileDialog#folderImportDialog QSplitter::handle {{
                         new_metadata.translated_name = new_path_obj.name
                         logger.debug(f"Set translated_name to {new_path_obj.name} in existing metadata")
                 
-                # 2.5. 更新 _all_file_data（关键：这是文件索引的基础数据）
-                for i, (file_path, metadata) in enumerate(self._all_file_data):
+                # 2.5. 更新 _all_file_data（关键：这是文件索引的基础数据；行号经行索引 O(1) 定位）
+                row = self._row_index.row_of(old_path_str)
+                for i in ([row] if row is not None else []):
+                    file_path, metadata = self._all_file_data[i]
                     if str(file_path) == old_path_str:
                         # 使用新提取的 metadata，如果没有则用旧的
                         updated_metadata = new_metadata if new_metadata else metadata
@@ -2834,6 +2569,8 @@ QFileDialog#folderImportDialog QSplitter::handle {{
                             logger.debug(f"Created new metadata with original_filename={old_filename}, translated_name={new_path_obj.name}")
                         
                         self._all_file_data[i] = (new_path_obj, updated_metadata)
+                        self._row_index.update_path(i, new_path_obj)
+                        self._search_service.invalidate()
                         break
                 
                 # 2.6. 重建文件夹索引（因为文件路径变了，文件夹索引需要更新）
@@ -3520,96 +3257,48 @@ QFileDialog#folderImportDialog QSplitter::handle {{
             self._search_timer.start()
     
     def _execute_search(self):
-        """真正执行搜索逻辑 - 使用后端 SearchEngine"""
+        """
+        真正执行搜索逻辑 - 使用应用层混合检索服务。
+
+        模式由 ``search.library_orchestrator_mode`` 决定：lexical 只走 SearchEngine；
+        hybrid 在 AI 检索页已挂载索引与文本编码器时并发加入语义一路并做 RRF 融合，否则自动退化为 lexical。
+        结果按融合排名映射为全局索引交给音效列表（不重建左侧文件夹树），
+        由列表模型按需取数、按 diff 增量更新。
+        """
         text = self.search_edit.text().strip()
         
-        # 1. 如果搜索框为空，恢复默认视图（懒加载模式）
+        # 1. 如果搜索框为空，恢复勾选文件夹对应的列表
         if not text:
-            if not self._lazy_load_enabled:
-                self._lazy_load_enabled = True
-                self._update_tree_lazy() # 重新构建并将懒加载模式打开
+            if self._search_active:
+                self._search_active = False
+                self._last_folder_display_key = None
+                self._update_audio_files_panel_display()
+                self._update_stats()
             return
-            
-        # 2. 如果有搜索内容，切换到"全量搜索结果视图"（禁用懒加载）
-        self._lazy_load_enabled = False
         
         try:
-            # 构建查询字符串
-            query_str = text
-            
-            # 执行搜索
-            query = self._search_engine.parse_query(query_str)
-            # 搜索全部数据库
-            result = self._search_engine.execute_sync(query)
-            matched_ids = set(result.file_ids)
-            
-            logger.info(f"Search '{query_str}' found {len(matched_ids)} matches")
-            
-            # 3. 重建树，只包含匹配项
-            self.tree.clear()
-            self._file_items.clear()
-            
-            # 重建文件夹结构
-            self._build_folder_tree_structure()
-            
-            # 填充匹配的文件
-            # 痛点：我们需要知道 ID -> FilePath 的反向映射，或者遍历 _all_file_data
-            # 为提高效率，我们可以遍历 _all_file_data，因为我们有 _file_path_to_id 映射
-            
-            count = 0
-            # 优化：仅当有匹配时才遍历
-            if matched_ids:
-                # 预先获取 ID 映射
-                path_id_map = self._file_path_to_id
-                matched_path_set = None
-                if not path_id_map:
-                    # paths_only 模式下没有缓存映射：按需查一次 DB 获取匹配路径集合
-                    try:
-                        from transcriptionist_v3.infrastructure.database.models import AudioFile
-                        with session_scope() as session:
-                            rows = (
-                                session.query(AudioFile.id, AudioFile.file_path)
-                                .filter(AudioFile.id.in_(list(matched_ids)))
-                                .all()
-                            )
-                        matched_path_set = {row.file_path for row in rows}
-                    except Exception as e:
-                        logger.error(f"Failed to resolve matched paths: {e}")
-                        matched_path_set = set()
-                
-                # 冻结刷新
-                self.tree.setUpdatesEnabled(False)
-                
-                for file_path, metadata in self._all_file_data:
-                    path_str = str(file_path)
-                    fid = path_id_map.get(path_str) if path_id_map else None
-                    
-                    if (fid in matched_ids) or (matched_path_set is not None and path_str in matched_path_set):
-                        # 是匹配项，添加到树中
-                        # 确保 file_path 是 Path 对象
-                        if not isinstance(file_path, Path):
-                            file_path = Path(file_path)
-                            
-                        # 添加到对应文件夹
-                        parent_path = file_path.parent
-                        parent_item = self._folder_items.get(str(parent_path))
-                        
-                        if parent_item:
-                            self._create_file_item(parent_item, file_path)
-                            # 展开该文件的父文件夹路径
-                            temp = parent_item
-                            while temp:
-                                temp.setExpanded(True)
-                                temp = temp.parent()
-                            count += 1
-                
-                self.tree.setUpdatesEnabled(True)
+            # 执行搜索（搜索全部数据库），融合结果一次取完，由列表按需展示
+            top_k = int(AppConfig.get("search.library_orchestrator_top_k", 5000))
+            page = self._search_service.search(
+                text,
+                mode=str(AppConfig.get("search.library_orchestrator_mode", "lexical")),
+                top_k=top_k,
+                page_size=top_k,
+            )
+            rows = self._row_index.rows_in_order(page.keys)
             
-            # 更新统计
-            self.stats_label.setText(f"搜索结果: {count} 个")
+            logger.info(
+                f"Search '{text}' ({page.mode}) found {page.total} matches, {len(rows)} in library view: "
+                f"{page.describe_timings()}"
+            )
             
-            # 隐藏没有子项的文件夹
-            self._hide_empty_folders()
+            self._search_active = True
+            self._last_folder_display_key = None
+            self.folder_clicked.emit(f"搜索: {text}", rows.tolist())
+            summary = f"搜索结果: {len(rows)} 个"
+            if AppConfig.get("search.library_show_observation", True):
+                summary += f"（{page.describe_timings()}）"
+            self.stats_label.setText(summary)
 
         except Exception as e:
             logger.error(f"Search failed: {e}", exc_info=True)
@@ -3767,7 +3456,8 @@ QFileDialog#folderImportDialog QSplitter::handle {{
                 self._folder_items = {}
                 self._folder_file_index = {}
                 self._folder_index_built = False
-                self._file_path_to_id = {}
+                self._row_index = LibraryRowIndex()
+                self._search_service.invalidate()
                 try:
                     self._file_info_cache.clear()
                 except Exception:
@@ -3849,10 +3539,14 @@ QFileDialog#folderImportDialog QSplitter::handle {{
                 return False
 
             new_all = []
-            for file_path, metadata in (getattr(self, "_all_file_data", []) or []):
+            kept_rows = []
+            for row, (file_path, metadata) in enumerate(getattr(self, "_all_file_data", []) or []):
                 if not _is_under_any_selected(str(file_path)):
                     new_all.append((file_path, metadata))
+                    kept_rows.append(row)
             self._all_file_data = new_all
+            self._row_index.retain(kept_rows)
+            self._search_service.invalidate()
 
             # roots 更新（被移除的根从列表中删除）
             if getattr(self, "_library_roots", None):
@@ -3867,7 +3561,6 @@ QFileDialog#folderImportDialog QSplitter::handle {{
             self._folder_items = {}
             self._folder_file_index = {}
             self._folder_index_built = False
-            self._file_path_to_id = {}
             try:
                 self._file_info_cache.clear()
             except Exception:
@@ -4146,12 +3839,12 @@ QFileDialog#folderImportDialog QSplitter::handle {{
         """
         if not paths:
             return []
-        path_set = {str(p).strip() for p in paths if p}
-        indices: List[int] = []
-        for idx, (file_path, _) in enumerate(self._all_file_data):
-            if str(file_path).strip() in path_set:
-                indices.append(idx)
-        return sorted(set(indices))
+        return self._row_index.rows_of(paths).tolist()
+
+    @property
+    def row_index(self) -> LibraryRowIndex:
+        """全局索引对应的行索引（供音效列表做文件名过滤）。"""
+        return self._row_index
 
     def resolve_selection_to_paths(self, selection: dict) -> List[str]:
         """
@@ -4250,6 +3943,9 @@ QFileDialog#folderImportDialog QSplitter::handle {{
             batch_updates: [{'file_path': str, 'tags': list}, ...]
         """
         import os
+        if batch_updates:
+            # 标签变化后加载时生成的标签列排序键已过期
+            self._row_index.invalidate_sort_key("tags")
         for update in batch_updates:
             file_path = update['file_path']
             tags = update['tags']
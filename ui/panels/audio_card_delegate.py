@@ -566,96 +566,41 @@ class AudioCardDelegate(QStyledItemDelegate):
 
     @staticmethod
     def _extract_waveform_peaks(file_path: str, points: int) -> list[tuple[float, float]] | None:
-        """Extract waveform peaks in background thread."""
+        """Extract waveform peaks in background thread.
+
+        读取打包波形存储中的峰值金字塔；仅在存储未命中（新文件/文件已修改）时才解码音频。
+        """
         try:
             path_obj = Path(file_path)
             if not path_obj.exists() or not path_obj.is_file():
                 return None
 
-            peaks: list[tuple[float, float]] = []
+            import numpy as np  # type: ignore
+            from transcriptionist_v3.infrastructure.cache.waveform_cache import (
+                compute_peaks,
+                get_waveform_cache,
+            )
 
-            try:
-                import soundfile as sf  # type: ignore
-                import numpy as np  # type: ignore
-
-                with sf.SoundFile(str(path_obj)) as sound_file:
-                    total_frames = int(len(sound_file))
-                    if total_frames <= 0:
-                        return None
-                    block_size = max(1024, total_frames // max(points, 1))
-                    for block in sound_file.blocks(blocksize=block_size, dtype="float32", always_2d=True):
-                        if block is None or len(block) == 0:
-                            continue
-                        mono = block.mean(axis=1)
-                        abs_mono = np.abs(mono)
-                        peak = float(np.max(abs_mono))
-                        rms = float(np.sqrt(np.mean(np.square(mono)))) if len(mono) else 0.0
-
-                        spectrum = np.fft.rfft(mono)
-                        mag = np.abs(spectrum)
-                        if mag.size > 0:
-                            split1 = max(1, int(mag.size * 0.18))
-                            split2 = max(split1 + 1, int(mag.size * 0.62))
-                            low_energy = float(np.mean(mag[:split1])) if split1 > 0 else 0.0
-                            mid_energy = float(np.mean(mag[split1:split2])) if split2 > split1 else 0.0
-                            high_energy = float(np.mean(mag[split2:])) if mag.size > split2 else 0.0
-                            freq_total = low_energy + mid_energy + high_energy + 1e-9
-                            low_ratio = low_energy / freq_total
-                            high_ratio = high_energy / freq_total
-                            band_bias = 0.5 + (low_ratio - high_ratio) * 0.5
-                            band_bias = max(0.0, min(1.0, band_bias))
-                        else:
-                            band_bias = 0.5
-
-                        mixed = (peak * 0.56) + (rms * 0.34) + (abs(peak - rms) * 0.10)
-                        peaks.append((mixed, band_bias))
-                if peaks:
-                    return AudioCardDelegate._normalize_peaks(peaks, points)
-            except Exception:
-                pass
-
-            # 兜底：仅 WAV（标准库）
-            if path_obj.suffix.lower() != ".wav":
+            if AppConfig.get("performance.waveform_cache_enabled", True):
+                pyramid = get_waveform_cache().get_or_compute(path_obj)
+            else:
+                pyramid = compute_peaks(path_obj)
+            if pyramid is None:
                 return None
-            try:
-                import wave
-                import struct
-
-                with wave.open(str(path_obj), "rb") as wav:
-                    channels = wav.getnchannels()
-                    sample_width = wav.getsampwidth()
-                    total_frames = wav.getnframes()
-                    if total_frames <= 0 or channels <= 0:
-                        return None
-
-                    frames_per_chunk = max(1024, total_frames // max(points, 1))
-                    while True:
-                        raw = wav.readframes(frames_per_chunk)
-                        if not raw:
-                            break
-                        if sample_width == 1:
-                            fmt = f"{len(raw)}B"
-                            values = struct.unpack(fmt, raw)
-                            # uint8 -> centered int
-                            mono = [abs(v - 128) for v in values[::channels]]
-                        elif sample_width == 2:
-                            fmt = f"{len(raw) // 2}h"
-                            values = struct.unpack(fmt, raw)
-                            mono = [abs(v) for v in values[::channels]]
-                        else:
-                            return None
-                        if mono:
-                            peak = float(max(mono))
-                            avg = float(sum(mono) / len(mono)) if mono else 0.0
-                            mixed = (peak * 0.72) + (avg * 0.28)
-                            peaks.append((mixed, 0.5))
-                if peaks:
-                    return AudioCardDelegate._normalize_peaks(peaks, points)
-            except Exception:
+            envelope = pyramid.envelope(points)
+            if envelope is None or envelope.bins == 0:
                 return None
+
+            peak = np.maximum(np.abs(envelope.minimum), np.abs(envelope.maximum))
+            rms = envelope.rms
+            mixed = (peak * 0.56) + (rms * 0.34) + (np.abs(peak - rms) * 0.10)
+            # 一阶差分 RMS / 信号 RMS 近似亮度：低频为主 -> 接近 0，噪声/高频为主 -> 接近 1
+            brightness = np.clip(envelope.diff_rms / (2.0 * np.maximum(rms, 1e-9)), 0.0, 1.0)
+            band_bias = np.where(rms > 0, 1.0 - brightness, 0.5)
+            peaks = list(zip(mixed.astype(float).tolist(), band_bias.astype(float).tolist()))
+            return AudioCardDelegate._normalize_peaks(peaks, points) if peaks else None
         except Exception:
             return None
-        return None
 
     @staticmethod
     def _normalize_peaks(peaks: list[tuple[float, float]], points: int) -> list[tuple[float, float]]:
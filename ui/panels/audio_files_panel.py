@@ -9,6 +9,7 @@ import subprocess
 from pathlib import Path
 from typing import List
 
+import numpy as np
 from PySide6.QtCore import QEvent, Qt, Signal, QAbstractTableModel, QModelIndex, QSize, QPoint, QTimer
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QTreeView,
@@ -21,6 +22,7 @@ from qfluentwidgets import (
     FluentIcon, SearchLineEdit, RoundMenu, Action, PushButton, isDarkTheme, ComboBox
 )
 
+from transcriptionist_v3.application.library_manager.row_index import diff_rows
 from transcriptionist_v3.core.utils import format_duration, format_file_size
 from transcriptionist_v3.core.config import AppConfig
 from transcriptionist_v3.ui.utils.notifications import NotificationHelper
@@ -29,14 +31,33 @@ from transcriptionist_v3.ui.themes.theme_tokens import get_theme_tokens
 
 logger = logging.getLogger(__name__)
 
+# 平表模型的根索引（参数默认值共用，不在默认参数里构造）
+_ROOT_INDEX = QModelIndex()
+
+
+def _as_rows(indices) -> np.ndarray:
+    """全局索引序列 → numpy int64 数组。"""
+    if indices is None:
+        return np.empty(0, dtype=np.int64)
+    return np.asarray(indices, dtype=np.int64).reshape(-1)
+
 
 class _AudioFilesTableModel(QAbstractTableModel):
     """
     只保存数据，不创建 QTreeWidgetItem，依赖视图的虚拟化能力。
     对外保持与旧版 AudioFilesPanel 相同的字段含义。
+
+    行由全局索引数组（numpy int64）表示；视图按需取数（canFetchMore / fetchMore），
+    每次只向视图暴露 FETCH_BATCH 行，滚动到底部时再追加。过滤条件变化时
+    ``update_rows`` 按 diff 发出增删行信号，变化零散或顺序不一致时才整表重置。
     """
 
     HEADERS = ["音效名", "原音效名", "标签", "时长", "大小", "格式"]
+    # 每次向视图追加的行数
+    FETCH_BATCH = 2000
+
+    # 表头点击排序：排序基准由面板持有（过滤结果须保持同一顺序），模型只转发请求
+    sort_requested = Signal(int, object)
 
     def __init__(self, provider=None, indices: List[int] | None = None, parent=None):
         """
@@ -46,20 +67,36 @@ class _AudioFilesTableModel(QAbstractTableModel):
         """
         super().__init__(parent)
         self._provider = provider
-        self._indices: List[int] = indices or []
+        self._rows: np.ndarray = _as_rows(indices)
+        self._fetched: int = min(len(self._rows), self.FETCH_BATCH)
         self._skeleton_rows: int = 0
 
     # ---- 基础行列 ----
-    def rowCount(self, parent=QModelIndex()) -> int:  # type: ignore[override]
+    def rowCount(self, parent=_ROOT_INDEX) -> int:  # type: ignore[override]
         if parent.isValid():
             return 0
         if self._skeleton_rows > 0:
             return self._skeleton_rows
-        return len(self._indices)
+        return self._fetched
 
-    def columnCount(self, parent=QModelIndex()) -> int:  # type: ignore[override]
+    def columnCount(self, parent=_ROOT_INDEX) -> int:  # type: ignore[override]
         return len(self.HEADERS)
 
+    def canFetchMore(self, parent=_ROOT_INDEX) -> bool:  # type: ignore[override]
+        if parent.isValid() or self._skeleton_rows > 0:
+            return False
+        return self._fetched < len(self._rows)
+
+    def fetchMore(self, parent=_ROOT_INDEX) -> None:  # type: ignore[override]
+        if parent.isValid():
+            return
+        count = min(self.FETCH_BATCH, len(self._rows) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
     # ---- 数据 ----
     def data(self, index: QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):  # type: ignore[override]
         if not index.isValid():
@@ -67,7 +104,7 @@ class _AudioFilesTableModel(QAbstractTableModel):
 
         row = index.row()
         col = index.column()
-        if row < 0 or row >= len(self._indices):
+        if self._skeleton_rows <= 0 and (row < 0 or row >= self._fetched):
             return None
 
         # 懒加载：按需从 provider 获取当前行的文件信息
@@ -80,7 +117,7 @@ class _AudioFilesTableModel(QAbstractTableModel):
 
         if not self._provider:
             return None
-        global_index = self._indices[row]
+        global_index = int(self._rows[row])
         file_info = self._provider(global_index)
         if not isinstance(file_info, dict):
             return None
@@ -148,43 +185,89 @@ class _AudioFilesTableModel(QAbstractTableModel):
         """设置数据提供者"""
         self._provider = provider
 
-    def set_indices(self, indices: List[int]):
-        """替换全部索引列表（懒加载数据）"""
+    @property
+    def rows(self) -> np.ndarray:
+        """当前全部结果行（含尚未取到视图中的部分）。"""
+        return self._rows
+
+    def set_indices(self, indices):
+        """替换全部索引列表（整表重置，只暴露第一批）。"""
         self.beginResetModel()
         self._skeleton_rows = 0
-        self._indices = indices or []
+        self._rows = _as_rows(indices)
+        self._fetched = min(len(self._rows), self.FETCH_BATCH)
         self.endResetModel()
 
-    def append_indices(self, indices: List[int]):
-        """增量追加索引，用于「加载更多」避免全表重置。"""
-        if not indices:
-            return
-        if self._skeleton_rows > 0:
-            self.beginResetModel()
-            self._skeleton_rows = 0
-            self._indices = indices
-            self.endResetModel()
-            return
+    def update_rows(self, indices) -> bool:
+        """
+        替换结果行，尽量增量更新：对已取到视图中的行做 diff，只删除消失的行、插入新出现的行，
+        未变化的行保持原位（选中、滚动位置、波形缓存都不受影响）。
+        返回 False 表示无法增量（已整表重置）。
+        """
+        rows = _as_rows(indices)
+        if self._skeleton_rows > 0 or self._fetched == 0:
+            self.set_indices(rows)
+            return False
+        diff = diff_rows(
+            self._rows[: self._fetched], rows, max_window=max(self._fetched, self.FETCH_BATCH) * 4
+        )
+        if diff is None:
+            self.set_indices(rows)
+            return False
 
-        start = len(self._indices)
-        end = start + len(indices) - 1
-        self.beginInsertRows(QModelIndex(), start, end)
-        self._indices.extend(indices)
-        self.endInsertRows()
+        window = self._rows[: self._fetched]
+        for first, last in diff.removed:
+            self.beginRemoveRows(QModelIndex(), first, last)
+            window = np.concatenate((window[:first], window[last + 1:]))
+            self._rows = window
+            self._fetched = len(window)
+            self.endRemoveRows()
+        for first, last in diff.inserted:
+            self.beginInsertRows(QModelIndex(), first, last)
+            window = np.concatenate((window[:first], rows[first : last + 1], window[first:]))
+            self._rows = window
+            self._fetched = len(window)
+            self.endInsertRows()
+
+        # 窗口之后的行不在视图中，直接换成新结果；窗口过短时补足一批
+        self._rows = rows
+        self._fetched = diff.window
+        if self._fetched < self.FETCH_BATCH and self.canFetchMore():
+            self.fetchMore()
+        return True
 
     def show_skeleton_rows(self, count: int = 8):
         row_count = max(1, int(count))
         self.beginResetModel()
-        self._indices = []
+        self._rows = _as_rows(None)
+        self._fetched = 0
         self._skeleton_rows = row_count
         self.endResetModel()
 
     def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder):  # type: ignore[override]
-        """按列排序当前索引列表。"""
-        if not self._provider or not self._indices:
-            return
+        """表头排序：交给面板对完整结果排序后再回填。"""
+        self.sort_requested.emit(column, order)
+
+    # 表头列 → LibraryRowIndex 中的排序键
+    SORT_KEYS = ("name", "original", "tags", "duration", "size", "format")
+
+    def sorted_rows(
+        self, rows: np.ndarray, column: int, order: Qt.SortOrder, row_index=None
+    ) -> np.ndarray:
+        """
+        按列排序给定的全局索引数组。行索引有该列的排序键时一次 argsort 完成；
+        否则退回逐行调用 provider 的 Python 排序。
+        """
+        if not len(rows):
+            return rows
 
         reverse = order == Qt.SortOrder.DescendingOrder
+        if row_index is not None and 0 <= column < len(self.SORT_KEYS):
+            ranked = row_index.sort_rows(rows, self.SORT_KEYS[column], descending=reverse)
+            if ranked is not None:
+                return ranked
+        if not self._provider:
+            return rows
 
         def _safe_info(global_index: int) -> dict:
             info = self._provider(global_index)
@@ -211,16 +294,14 @@ class _AudioFilesTableModel(QAbstractTableModel):
                 return str(info.get("format") or "").lower()
             return filename.lower()
 
-        self.layoutAboutToBeChanged.emit()
-        self._indices.sort(key=_sort_key, reverse=reverse)
-        self.layoutChanged.emit()
+        return _as_rows(sorted(rows.tolist(), key=_sort_key, reverse=reverse))
 
     def files(self) -> List[dict]:
-        """兼容旧接口：返回当前所有行对应的文件信息列表（会调用 provider）"""
+        """兼容旧接口：返回视图中已取到的行对应的文件信息列表（会调用 provider）"""
         if not self._provider:
             return []
         result: List[dict] = []
-        for idx in self._indices:
+        for idx in self._rows[: self._fetched].tolist():
             info = self._provider(idx)
             if isinstance(info, dict):
                 result.append(info)
@@ -229,8 +310,8 @@ class _AudioFilesTableModel(QAbstractTableModel):
     def file_at(self, row: int) -> dict | None:
         if not self._provider:
             return None
-        if 0 <= row < len(self._indices):
-            info = self._provider(self._indices[row])
+        if 0 <= row < self._fetched:
+            info = self._provider(int(self._rows[row]))
             if isinstance(info, dict):
                 return info
         return None
@@ -256,8 +337,6 @@ class _TableDensityDelegate(QStyledItemDelegate):
 class AudioFilesPanel(QWidget):
     """音效文件显示面板（虚拟列表实现，接口保持兼容）"""
 
-    # 单次最多显示行数，超过则「加载更多」分批显示，避免几十万行一次性 set_indices 卡死
-    DISPLAY_CAP = 10000
     TABLE_HEADER_HEIGHT = 36
     TABLE_ROW_HEIGHT = 34
     TABLE_CELL_PADDING_X = 12
@@ -283,16 +362,16 @@ class AudioFilesPanel(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
         self._current_folder: str | None = None
-        # 使用全局索引进行懒加载
-        self._all_indices: List[int] = []
-        self._filtered_indices: List[int] = []
+        # 使用全局索引进行懒加载：_all_rows 为当前列表全部行（排序后的顺序即过滤基准顺序），
+        # _filtered_rows 为过滤后的结果，模型按需把其中一批批行交给视图
+        self._all_rows: np.ndarray = _as_rows(None)
+        self._filtered_rows: np.ndarray = _as_rows(None)
         self._selected_files: List[dict] = []
         self._data_provider = None  # type: ignore
-        # 显示上限：当前已传给模型的索引、下一批起始位置、是否还有更多
-        self._displayed_offset: int = 0
-        self._has_more: bool = False
+        self._row_index_provider = None  # type: ignore
 
         self._model = _AudioFilesTableModel(provider=None, indices=[])
+        self._model.sort_requested.connect(self._on_sort_requested)
         self._theme_tokens = get_theme_tokens(isDarkTheme())
         self._card_delegate = AudioCardDelegate(self._theme_tokens, self)
         self._table_delegate = _TableDensityDelegate(
@@ -355,13 +434,6 @@ class AudioFilesPanel(QWidget):
 
         toolbar.addStretch()
 
-        # 加载更多（仅当当前显示数 < 总数时显示，避免几十万行一次性卡死）
-        self.load_more_btn = PushButton(FluentIcon.ADD, "加载更多")
-        self.load_more_btn.setToolTip("加载下一批文件到列表")
-        self.load_more_btn.clicked.connect(self._on_load_more)
-        self.load_more_btn.setVisible(False)
-        toolbar.addWidget(self.load_more_btn)
-
         # 刷新按钮
         self.refresh_btn = TransparentToolButton(FluentIcon.SYNC)
         self.refresh_btn.setToolTip("刷新")
@@ -470,7 +542,7 @@ class AudioFilesPanel(QWidget):
         # 信号连接
         self.file_view.selectionModel().selectionChanged.connect(self._on_selection_changed)
         self.file_view.doubleClicked.connect(self._on_item_double_clicked)
-        self.file_view.verticalScrollBar().valueChanged.connect(self._on_scroll_load_more)
+        self.file_view.verticalScrollBar().valueChanged.connect(self._on_scrolled)
         self.file_view.header().sortIndicatorChanged.connect(self._on_sort_indicator_changed)
         self._card_delegate.quick_action_requested.connect(self._on_card_quick_action)
         self.file_view.viewport().installEventFilter(self)
@@ -486,16 +558,9 @@ class AudioFilesPanel(QWidget):
 
         layout.addLayout(status_bar)
 
-    def _on_scroll_load_more(self, value: int):
-        """滚动到底部附近时自动加载更多，模拟分页滚动体验。"""
+    def _on_scrolled(self, _value: int):
+        """滚动时预取可见区域波形；行的按需追加由视图通过 canFetchMore / fetchMore 完成。"""
         self._schedule_waveform_prefetch()
-        if not self._has_more:
-            return
-        bar = self.file_view.verticalScrollBar()
-        if bar.maximum() <= 0:
-            return
-        if value >= int(bar.maximum() * 0.85):
-            self._on_load_more()
 
     def _schedule_waveform_prefetch(self, immediate: bool = False):
         if self._view_mode != self.VIEW_MODE_CARD:
@@ -558,6 +623,14 @@ class AudioFilesPanel(QWidget):
         self._data_provider = provider
         self._model.set_provider(provider)
 
+    def set_row_index_provider(self, provider):
+        """
+        设置行索引提供者。
+        provider 无参数，返回与全局索引对应的 LibraryRowIndex（或 None），用于文件名过滤；
+        未设置时退回逐行调用数据提供者过滤。
+        """
+        self._row_index_provider = provider
+
     def apply_theme_tokens(self, is_dark: bool = True):
         self._theme_tokens = get_theme_tokens(is_dark)
         self._card_delegate.update_tokens(self._theme_tokens)
@@ -744,94 +817,52 @@ class AudioFilesPanel(QWidget):
             self.bulk_label.style().unpolish(self.bulk_label)
             self.bulk_label.style().polish(self.bulk_label)
 
-    def _apply_display_cap(self):
-        """根据 _filtered_indices 应用显示上限：只传前 DISPLAY_CAP 条给模型，避免几十万行卡死。"""
-        total = len(self._filtered_indices)
-        if total <= self.DISPLAY_CAP:
-            displayed = list(self._filtered_indices)
-            self._displayed_offset = total
-            self._has_more = False
-        else:
-            displayed = list(self._filtered_indices[: self.DISPLAY_CAP])
-            self._displayed_offset = len(displayed)
-            self._has_more = True
-        self._model.set_indices(displayed)
-        self._update_count_and_load_more_btn()
-        self._schedule_waveform_prefetch(immediate=True)
-
-    def _update_count_and_load_more_btn(self):
-        """更新「共 N 个文件」/「已显示 X / N」文案及「加载更多」按钮可见性。"""
-        total = len(self._filtered_indices)
-        if self._has_more:
-            self.count_label.setText(
-                f"已显示 {self._displayed_offset} / {total}，点击「加载更多」或使用搜索"
-            )
-            self.load_more_btn.setVisible(True)
+    def _update_count_label(self):
+        """更新「共 N 个文件」文案。"""
+        total = len(self._filtered_rows)
+        if len(self._filtered_rows) != len(self._all_rows):
+            self.count_label.setText(f"共 {total} / {len(self._all_rows)} 个文件")
         else:
             self.count_label.setText(f"共 {total} 个文件")
-            self.load_more_btn.setVisible(False)
-
-    def _on_load_more(self):
-        """加载下一批到列表（增量 append，避免全表重置）。"""
-        total = len(self._filtered_indices)
-        if self._displayed_offset >= total:
-            self._has_more = False
-            self._update_count_and_load_more_btn()
-            return
-        batch = self._filtered_indices[
-            self._displayed_offset : self._displayed_offset + self.DISPLAY_CAP
-        ]
-        self._model.append_indices(batch)
-        self._displayed_offset += len(batch)
-        self._has_more = self._displayed_offset < total
-        self._update_count_and_load_more_btn()
-        self._schedule_waveform_prefetch()
 
-    def set_folder_indices(self, folder_path: str, indices: List[int]):
+    def set_folder_indices(self, folder_path: str, indices):
         """
         设置当前文件夹及其文件索引列表（懒加载版本）。
-        若数量超过 DISPLAY_CAP，只先显示前 DISPLAY_CAP 条，其余通过「加载更多」追加。
+        视图只按需取数；列表已有内容时按 diff 增量更新（例如库搜索关键词变化、增减勾选的文件夹）。
         """
         self._current_folder = folder_path
-        self._model.show_skeleton_rows(8)
-        QApplication.processEvents()
-        self._all_indices = indices or []
-        self._filtered_indices = list(self._all_indices)
+        if not self._model.rowCount():
+            self._model.show_skeleton_rows(8)
+            QApplication.processEvents()
+        self._all_rows = _as_rows(indices)
         self._selected_files = []
 
         folder_name = Path(folder_path).name if folder_path else "未选择文件夹"
         self.title_label.setText(f"音效列表 - {folder_name}")
 
-        self._apply_display_cap()
-
-        self.file_view.selectionModel().clearSelection()
-        self.selection_label.setText("未选择文件")
-        self.bulk_label.setText("批量操作：未选择文件")
-        self._set_bulk_bar_enabled(False)
-        self.search_box.setEnabled(bool(self._all_indices))
-        self._schedule_waveform_prefetch(immediate=True)
+        self._apply_filter(self.search_box.text())
+        self.search_box.setEnabled(bool(len(self._all_rows)))
 
         logger.info(
-            f"AudioFilesPanel: Loaded {len(self._filtered_indices)} files from {folder_path}"
+            f"AudioFilesPanel: Loaded {len(self._filtered_rows)} files from {folder_path}"
         )
 
     def clear(self):
         """清空文件列表"""
         self._current_folder = None
-        self._all_indices = []
-        self._filtered_indices = []
+        self._all_rows = _as_rows(None)
+        self._filtered_rows = _as_rows(None)
         self._selected_files = []
-        self._displayed_offset = 0
-        self._has_more = False
 
-        self._model.set_indices([])
+        self._model.set_indices(None)
         self.title_label.setText("音效列表")
         self.count_label.setText("共 0 个文件")
         self.selection_label.setText("未选择文件")
         self.bulk_label.setText("批量操作：未选择文件")
         self._set_bulk_bar_enabled(False)
-        self.load_more_btn.setVisible(False)
+        self.search_box.blockSignals(True)
         self.search_box.clear()
+        self.search_box.blockSignals(False)
         self.search_box.setEnabled(False)
         self._waveform_prefetch_timer.stop()
 
@@ -840,33 +871,56 @@ class AudioFilesPanel(QWidget):
         return list(self._selected_files)
 
     # ========= 内部逻辑 =========
-    def _on_search_changed(self, text: str):
-        """搜索框文本变化；结果仍受显示上限限制，超出部分可「加载更多」。"""
-        text = text.strip().lower()
-
-        if not text:
-            self._filtered_indices = list(self._all_indices)
+    def _filter_rows(self, text: str) -> np.ndarray:
+        """按文件名过滤 _all_rows，结果保持 _all_rows 的顺序。"""
+        text = text.strip()
+        if not text or not len(self._all_rows):
+            return self._all_rows
+        row_index = self._row_index_provider() if self._row_index_provider else None
+        if row_index is not None and len(row_index):
+            return row_index.filter(text, within=self._all_rows)
+
+        needle = text.lower()
+        filtered: List[int] = []
+        if self._data_provider:
+            for idx in self._all_rows.tolist():
+                info = self._data_provider(idx)
+                if not isinstance(info, dict):
+                    continue
+                name = Path(info.get("file_path", "")).name.lower()
+                if needle in name:
+                    filtered.append(idx)
+        return _as_rows(filtered)
+
+    def _apply_filter(self, text: str, reset: bool = False):
+        """重新过滤并把结果交给模型（默认增量 diff，排序后整表重置）。"""
+        self._filtered_rows = self._filter_rows(text)
+        if reset:
+            self._model.set_indices(self._filtered_rows)
         else:
-            filtered: List[int] = []
-            if self._data_provider:
-                for idx in self._all_indices:
-                    info = self._data_provider(idx)
-                    if not isinstance(info, dict):
-                        continue
-                    name = Path(info.get("file_path", "")).name.lower()
-                    if text in name:
-                        filtered.append(idx)
-            self._filtered_indices = filtered
-
-        self._apply_display_cap()
+            self._model.update_rows(self._filtered_rows)
+        self._update_count_label()
+
         self.file_view.selectionModel().clearSelection()
         self._selected_files = []
         self.selection_label.setText("未选择文件")
         self.bulk_label.setText("批量操作：未选择文件")
         self._set_bulk_bar_enabled(False)
-        self.files_selected.emit([])
         self._schedule_waveform_prefetch(immediate=True)
 
+    def _on_search_changed(self, text: str):
+        """搜索框文本变化：在当前列表中按文件名过滤，视图按 diff 增量更新。"""
+        self._apply_filter(text)
+        self.files_selected.emit([])
+
+    def _on_sort_requested(self, column: int, order):
+        """表头排序：对当前列表全部行排序（作为之后过滤的基准顺序），再重新过滤。"""
+        if not len(self._all_rows):
+            return
+        row_index = self._row_index_provider() if self._row_index_provider else None
+        self._all_rows = self._model.sorted_rows(self._all_rows, column, order, row_index=row_index)
+        self._apply_filter(self.search_box.text(), reset=True)
+
     def _on_refresh(self):
         """刷新列表：重新应用当前搜索条件"""
         self._on_search_changed(self.search_box.text())
@@ -107,10 +107,23 @@ class DatabaseLoadWorker(BaseWorker):
             from transcriptionist_v3.infrastructure.database.connection import session_scope
             from transcriptionist_v3.infrastructure.database.models import AudioFile, LibraryPath
             from transcriptionist_v3.domain.models.metadata import AudioMetadata
+            from transcriptionist_v3.application.library_manager.row_index import LibraryRowIndex
             from pathlib import Path
             from sqlalchemy.orm import joinedload
             
             results = []
+            ids = []
+            # 表头排序用的各列值（与 results 逐行对应），在后台线程换成排序键
+            sort_values = {key: [] for key in ("name", "original", "tags", "duration", "size", "format")}
+
+            def _add_sort_values(file_path, translated_name, original_filename, tags, duration, file_size, file_format):
+                filename = file_path.name
+                sort_values["name"].append(translated_name or filename)
+                sort_values["original"].append((original_filename or filename) if translated_name else "")
+                sort_values["tags"].append(",".join(str(t) for t in tags[:6]))
+                sort_values["duration"].append(float(duration or 0))
+                sort_values["size"].append(int(file_size or 0))
+                sort_values["format"].append(str(file_format or ""))
             
             with session_scope() as session:
                 total = session.query(AudioFile.id).count()
@@ -121,11 +134,26 @@ class DatabaseLoadWorker(BaseWorker):
 
                 if paths_only:
                     # 只加载路径，用于构建文件夹树与懒加载
-                    query = session.query(AudioFile.file_path).yield_per(2000)
+                    query = session.query(
+                        AudioFile.id,
+                        AudioFile.file_path,
+                        AudioFile.translated_name,
+                        AudioFile.original_filename,
+                        AudioFile.duration,
+                        AudioFile.file_size,
+                        AudioFile.format,
+                    ).yield_per(2000)
                     for i, row in enumerate(query, start=1):
                         if self.is_cancelled:
                             return
-                        results.append(Path(row.file_path))
+                        file_path = Path(row.file_path)
+                        results.append(file_path)
+                        ids.append(row.id)
+                        # 只加载路径时不取标签，标签列排序退回逐行排序
+                        _add_sort_values(
+                            file_path, row.translated_name, row.original_filename, [],
+                            row.duration, row.file_size, row.format,
+                        )
                         if i % 2000 == 0 or i == total:
                             self.progress.emit(i, total, f"加载路径中 ({i}/{total})")
                 else:
@@ -171,6 +199,11 @@ class DatabaseLoadWorker(BaseWorker):
                         metadata.tags = [t.tag for t in db_file.tags]
                         
                         results.append((file_path, metadata))
+                        ids.append(db_file.id)
+                        _add_sort_values(
+                            file_path, metadata.translated_name, metadata.original_filename, metadata.tags,
+                            db_file.duration, db_file.file_size, db_file.format,
+                        )
                         
                         if (i + 1) % 100 == 0 or i == total - 1:
                             self.progress.emit(i + 1, total, f"加载中 ({i+1}/{total})")
@@ -179,12 +212,21 @@ class DatabaseLoadWorker(BaseWorker):
                 lib_paths = session.query(LibraryPath).filter_by(enabled=True).all()
                 root_paths = [Path(lp.path) for lp in lib_paths]
             
+            # 行索引（路径 / ID → 行号、文件名过滤缓冲区）在后台线程建好，避免大库加载完成时卡 UI
+            row_paths = results if paths_only else [path for path, _ in results]
+            row_index = LibraryRowIndex(row_paths, ids).prepare()
+            for key, values in sort_values.items():
+                if key == "tags" and paths_only:
+                    continue
+                row_index.set_sort_values(key, values)
+            
             # 在 with 块外发射 finished，确保 Session 已正确关闭
             self.finished.emit({
                 "paths_only": paths_only,
                 "results": results,
                 "root_paths": root_paths,
                 "total": total,
+                "row_index": row_index,
             })
                 
         except Exception as e:
@@ -577,56 +619,85 @@ class ModelDownloadWorker(BaseWorker):
             self.error.emit(str(e))
 
 
+def _lookup_audio_file_ids(paths: list) -> dict:
+    """路径 -> audio_file_id（分批 IN 查询，兼容 / 与 \\ 两种分隔符）。"""
+    from transcriptionist_v3.infrastructure.database.connection import session_scope
+    from transcriptionist_v3.infrastructure.database.models import AudioFile
+
+    variants = {}
+    for p in paths:
+        variants[p] = p
+        variants.setdefault(p.replace("\\", "/"), p)
+        variants.setdefault(p.replace("/", "\\"), p)
+    keys = list(variants.keys())
+    out = {}
+    with session_scope() as session:
+        for i in range(0, len(keys), SQLITE_IN_BATCH):
+            batch = keys[i : i + SQLITE_IN_BATCH]
+            rows = (
+                session.query(AudioFile.id, AudioFile.file_path)
+                .filter(AudioFile.file_path.in_(batch))
+                .all()
+            )
+            for row in rows:
+                out[variants[row.file_path]] = int(row.id)
+    return out
+
+
+def _store_index_info(store) -> dict:
+    """列式存储的按需检索描述（沿用 _chunked 语义：不把 embedding 读进内存）。"""
+    return {
+        "_chunked": True,
+        "_store": True,
+        "chunk_files": [],
+        "index_dir": str(store.index_dir),
+        "base_name": store.base_name,
+        "total_count": len(store.live_rows()),
+    }
+
+
 class IndexLoadWorker(BaseWorker):
-    """后台加载 AI 索引。若存在分片 manifest 则只加载 manifest（按需检索时再读分片）；否则加载单文件。"""
+    """后台加载 AI 索引。列式存储只读取 manifest（检索时内存映射）；旧版 pickled 索引会先迁移到列式存储。"""
     def __init__(self, index_path: Path, parent: Optional[QObject] = None):
         super().__init__(parent)
         self._index_path = Path(index_path)
 
     def run(self) -> None:
-        import numpy as np
+        from transcriptionist_v3.application.ai_jobs.embedding_store import (
+            EmbeddingStore,
+            has_legacy_index,
+            migrate_legacy_index,
+        )
         try:
             index_dir = self._index_path.parent
             base_name = self._index_path.stem
-            meta_path = index_dir / f"{base_name}_meta.npy"
-            # 分片格式：只加载 manifest，不加载各分片（检索时按需加载）
-            if meta_path.exists():
-                self.progress.emit(0, 1, "正在加载索引信息...")
-                data = np.load(str(meta_path), allow_pickle=True)
-                meta = data.item() if data.ndim == 0 else {}
-                if isinstance(meta, dict) and "chunk_files" in meta:
-                    out = {
-                        "_chunked": True,
-                        "chunk_files": meta["chunk_files"],
-                        "index_dir": str(index_dir),
-                        "total_count": int(meta.get("total_count", 0)),
-                    }
-                    self.finished.emit(out)
-                    return
-            if not self._index_path.exists():
+            store = EmbeddingStore(index_dir, base_name=base_name)
+            if not store.exists and has_legacy_index(index_dir, base_name):
+                self.progress.emit(0, 1, "正在迁移旧版索引...")
+
+                def on_migrate(done: int, total: int) -> None:
+                    self.progress.emit(done, total, f"正在迁移旧版索引 {done}/{total}...")
+
+                migrate_legacy_index(
+                    index_dir,
+                    base_name,
+                    id_lookup=_lookup_audio_file_ids,
+                    remove_legacy=True,
+                    progress_callback=on_migrate,
+                )
+                store = EmbeddingStore(index_dir, base_name=base_name)
+            if not store.exists or store.count == 0:
                 self.finished.emit({})
                 return
-            self.progress.emit(0, 1, "正在加载 AI 索引...")
-            data = np.load(str(self._index_path), allow_pickle=True)
-            if data.ndim == 0:
-                emb = data.item()
-                if isinstance(emb, dict):
-                    self.finished.emit(emb)
-                else:
-                    self.finished.emit({})
-            else:
-                self.finished.emit({})
+            self.progress.emit(0, 1, "正在加载索引信息...")
+            self.finished.emit(_store_index_info(store))
         except Exception as e:
             logger.error(f"Index load error: {e}")
             self.error.emit(str(e))
 
 
-# 索引分片：单文件超过此条数则拆成多文件 + manifest，便于按需加载与检索
-INDEX_CHUNK_SIZE = 20000
-
-
 class IndexSaveWorker(BaseWorker):
-    """后台保存 AI 索引。超阈值时分片保存（manifest + 多文件）；支持 append 增量追加到分片索引。"""
+    """后台保存 AI 索引到列式存储；append=True 时增量追加，否则整体重写。"""
     def __init__(self, index_path: Path, embeddings: dict, append: bool = False, parent: Optional[QObject] = None):
         super().__init__(parent)
         self._index_path = Path(index_path)
@@ -634,48 +705,22 @@ class IndexSaveWorker(BaseWorker):
         self._append = append
 
     def run(self) -> None:
-        import numpy as np
+        from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore
+        from transcriptionist_v3.application.ai.ann_index import IVFFlatIndex
         try:
             n = len(self._embeddings)
             index_dir = self._index_path.parent
             base_name = self._index_path.stem
-            meta_path = index_dir / f"{base_name}_meta.npy"
-            # 增量追加到已有分片索引
-            if self._append and meta_path.exists():
-                data = np.load(str(meta_path), allow_pickle=True)
-                meta = data.item() if data.ndim == 0 else {}
-                chunk_files = list(meta.get("chunk_files", []))
-                next_idx = len(chunk_files)
-                chunk_path = index_dir / f"{base_name}_{next_idx}.npy"
-                np.save(str(chunk_path), self._embeddings)
-                chunk_files.append(chunk_path.name)
-                meta["chunk_files"] = chunk_files
-                meta["total_count"] = int(meta.get("total_count", 0)) + n
-                np.save(str(meta_path), meta)
-                self.finished.emit(None)
-                return
-            if n <= INDEX_CHUNK_SIZE:
-                self.progress.emit(0, 1, f"正在保存索引 ({n} 条)...")
-                np.save(str(self._index_path), self._embeddings)
-                _remove_chunked_index_files(index_dir, base_name)
-                self.finished.emit(None)
-                return
-            self.progress.emit(0, 1, f"正在分片保存索引 ({n} 条)...")
-            items = list(self._embeddings.items())
-            chunk_files = []
-            for i in range(0, n, INDEX_CHUNK_SIZE):
-                chunk = dict(items[i : i + INDEX_CHUNK_SIZE])
-                chunk_path = index_dir / f"{base_name}_{len(chunk_files)}.npy"
-                np.save(str(chunk_path), chunk)
-                chunk_files.append(chunk_path.name)
-                self.progress.emit(i + len(chunk), n, f"已保存 {min(i + INDEX_CHUNK_SIZE, n)}/{n} 条...")
-            meta = {"version": 1, "chunk_files": chunk_files, "total_count": n}
-            np.save(str(meta_path), meta)
-            if self._index_path.exists():
-                try:
-                    self._index_path.unlink()
-                except Exception:
-                    pass
+            store = EmbeddingStore(index_dir, base_name=base_name)
+            if not self._append:
+                # 整体重写后行号全部变化，旧的 IVF 分配必须一并丢弃
+                store.clear()
+                IVFFlatIndex(index_dir, base_name=base_name).clear()
+            self.progress.emit(0, 1, f"正在保存索引 ({n} 条)...")
+            embeddings = {str(k): v for k, v in self._embeddings.items()}
+            ids = _lookup_audio_file_ids(list(embeddings.keys()))
+            store.append(embeddings, ids=ids)
+            self.progress.emit(1, 1, f"已保存 {n} 条")
             self.finished.emit(None)
         except Exception as e:
             logger.error(f"Index save error: {e}")
@@ -683,20 +728,17 @@ class IndexSaveWorker(BaseWorker):
 
 
 def _remove_chunked_index_files(index_dir: Path, base_name: str) -> None:
-    """删除分片索引相关文件（manifest + 所有分片）。"""
-    import numpy as np
-    meta_path = index_dir / f"{base_name}_meta.npy"
-    if meta_path.exists():
-        try:
-            data = np.load(str(meta_path), allow_pickle=True)
-            meta = data.item() if data.ndim == 0 else {}
-            for f in meta.get("chunk_files", []):
-                p = index_dir / f
-                if p.exists():
-                    p.unlink()
-            meta_path.unlink()
-        except Exception:
-            pass
+    """删除索引相关文件（列式存储 + 旧版 manifest/分片）。"""
+    from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore, remove_legacy_index
+    from transcriptionist_v3.application.ai.semantic_search import invalidate_store_engine
+    from transcriptionist_v3.application.ai.ann_index import IVFFlatIndex
+    try:
+        EmbeddingStore(index_dir, base_name=base_name).clear()
+        IVFFlatIndex(index_dir, base_name=base_name).clear()
+        invalidate_store_engine(index_dir, base_name)
+        remove_legacy_index(index_dir, base_name)
+    except Exception:
+        pass
 
 
 class SearchWorker(BaseWorker):
@@ -719,32 +761,27 @@ class SearchWorker(BaseWorker):
         self._selection_filter = SelectionFilter(selection) if selection else None
 
     def run(self) -> None:
-        import numpy as np
+        from transcriptionist_v3.application.ai.semantic_search import SemanticSearchEngine
         try:
-            results = []
-            norm_text = float(np.linalg.norm(self._text_embed))
-            for path_key, audio_embed in self._audio_embeddings.items():
-                if self.is_cancelled:
-                    return
-                path_str = str(path_key)
-                if self._only_selected:
-                    if self._selection_filter is not None:
-                        if not self._selection_filter.matches(path_str):
-                            continue
-                    elif path_str not in self._selected_set:
-                        continue
-                norm_audio = np.linalg.norm(audio_embed)
-                if norm_audio == 0 or norm_text == 0:
-                    sim = 0.0
-                else:
-                    sim = float(np.dot(self._text_embed, audio_embed) / (norm_text * norm_audio))
-                results.append((path_str, sim))
-            results.sort(key=lambda x: x[1], reverse=True)
+            engine = SemanticSearchEngine.from_dict(
+                {str(k): v for k, v in self._audio_embeddings.items()}
+            )
+            if self.is_cancelled:
+                return
+            mask = self._build_mask(engine)
+            results = engine.search(self._text_embed, top_k=max(1, engine.size), mask=mask)
             self.finished.emit(results)
         except Exception as e:
             logger.error(f"Search error: {e}")
             self.error.emit(str(e))
 
+    def _build_mask(self, engine):
+        if not self._only_selected:
+            return None
+        if self._selection_filter is not None:
+            return engine.build_mask(self._selection_filter.matches)
+        return engine.build_mask(lambda p: p in self._selected_set)
+
 
 class ChunkedSearchWorker(BaseWorker):
     """分片索引检索：按块加载、计算相似度、合并 top-k，避免几十万条一次性进内存。"""
@@ -758,12 +795,14 @@ class ChunkedSearchWorker(BaseWorker):
         selection: Optional[dict] = None,
         top_per_chunk: int = 300,
         max_results: int = 500,
+        base_name: Optional[str] = None,
         parent: Optional[QObject] = None,
     ):
         super().__init__(parent)
         from transcriptionist_v3.application.ai_jobs.selection import SelectionFilter
         self._index_dir = index_dir
         self._chunk_files = chunk_files
+        self._base_name = base_name
         self._text_embed = text_embed
         self._only_selected = only_selected
         self._selected_set = selected_set
@@ -780,6 +819,9 @@ class ChunkedSearchWorker(BaseWorker):
             if norm_text == 0:
                 self.finished.emit([])
                 return
+            if self._base_name:
+                self.finished.emit(self._search_store(index_dir))
+                return
             merged = []
             for chunk_name in self._chunk_files:
                 if self.is_cancelled:
@@ -819,6 +861,99 @@ class ChunkedSearchWorker(BaseWorker):
             logger.error(f"Chunked search error: {e}")
             self.error.emit(str(e))
 
+    def _search_store(self, index_dir: Path) -> list:
+        """列式存储：常驻的预归一化矩阵上一次 GEMV + argpartition 取 top-k。"""
+        from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore
+        from transcriptionist_v3.application.ai.semantic_search import get_store_engine
+        from transcriptionist_v3.application.search_engine.query_orchestrator import QueryObservation
+
+        from transcriptionist_v3.application.ai.ann_index import get_store_ann
+        from transcriptionist_v3.core.config import AppConfig
+
+        store = EmbeddingStore(index_dir, base_name=self._base_name)
+        engine = get_store_engine(store)
+        if self.is_cancelled:
+            return []
+        mask = None
+        if self._only_selected:
+            if self._selection_filter is not None:
+                mask = engine.build_mask(self._selection_filter.matches)
+            else:
+                mask = engine.build_mask(lambda p: p in self._selected_set)
+        ann = None
+        # 只检索选中文件时用精确检索：IVF 只对 nprobe 个倒排表打分，表外的选中文件会被漏掉
+        if (
+            mask is None
+            and AppConfig.get("ai.ann_enabled", True)
+            and engine.size >= int(AppConfig.get("ai.ann_min_rows", 200000))
+        ):
+            try:
+                ann = get_store_ann(store, engine, nprobe=int(AppConfig.get("ai.ann_nprobe", 32)))
+            except Exception as e:
+                logger.warning(f"ANN index unavailable, falling back to exact search: {e}")
+        observation = QueryObservation()
+        searcher = ann if ann is not None else engine
+        results = searcher.search(self._text_embed, top_k=self._max_results, mask=mask, observation=observation)
+        logger.info(
+            f"Semantic search ({'ivf' if ann is not None else 'exact'}) over {engine.size} embeddings: "
+            f"{observation.semantic_count} hits in {observation.semantic_ms:.1f} ms"
+        )
+        return results
+
+
+class HybridSearchWorker(BaseWorker):
+    """
+    后台执行应用层混合检索（文本 + 语义并发、RRF 融合），完成时发出 ``HybridSearchPage``。
+
+    语义一路的 embedding 来源二选一：列式存储（``store=(index_dir, base_name)``，矩阵常驻复用）
+    或内存字典（``embeddings``，同一字典只构建一次矩阵）；都不给时只做文本检索。
+    """
+    def __init__(
+        self,
+        query_text: str,
+        semantic_text: Optional[str] = None,
+        mode: str = "hybrid",
+        top_k: int = 500,
+        page: int = 0,
+        page_size: int = 20,
+        store: Optional[tuple] = None,
+        embeddings: Optional[dict] = None,
+        parent: Optional[QObject] = None,
+    ):
+        super().__init__(parent)
+        self._query_text = query_text
+        self._semantic_text = semantic_text
+        self._mode = mode
+        self._top_k = max(1, int(top_k))
+        self._page = max(0, int(page))
+        self._page_size = max(1, int(page_size))
+        self._store = store
+        self._embeddings = embeddings
+
+    def run(self) -> None:
+        from transcriptionist_v3.application.search_engine.hybrid_search import get_hybrid_search_service
+        try:
+            service = get_hybrid_search_service()
+            if self._store is not None:
+                index_dir, base_name = self._store
+                service.attach_store(index_dir, base_name)
+            elif self._embeddings:
+                service.set_embedding_dict(self._embeddings)
+            if self.is_cancelled:
+                return
+            page = service.search(
+                self._query_text,
+                mode=self._mode,
+                top_k=self._top_k,
+                page=self._page,
+                page_size=self._page_size,
+                semantic_text=self._semantic_text,
+            )
+            self.finished.emit(page)
+        except Exception as e:
+            logger.error(f"Hybrid search error: {e}")
+            self.error.emit(str(e))
+
 
 class CLAPIndexingWorker(BaseWorker):
     """
@@ -891,7 +1026,7 @@ class CLAPIndexingWorker(BaseWorker):
 
 
 class IndexingJobWorker(BaseWorker):
-    """任务化索引构建：分批生成 embedding + 分片持久化 + 可断点恢复。"""
+    """任务化索引构建：分批生成 embedding + 分片持久化 + 可断点恢复（逻辑见 IndexJob）。"""
     def __init__(
         self,
         engine,
@@ -913,163 +1048,30 @@ class IndexingJobWorker(BaseWorker):
         self.job_id = job_id
 
     def run(self) -> None:
-        from sqlalchemy import or_
-        from transcriptionist_v3.infrastructure.database.connection import session_scope
-        from transcriptionist_v3.infrastructure.database.models import AudioFile, Job, IndexShard
-        from transcriptionist_v3.core.config import AppConfig
-        from transcriptionist_v3.application.ai_jobs.selection import apply_selection_filters
-        from transcriptionist_v3.application.ai_jobs.index_writer import ChunkedIndexWriter
-        from transcriptionist_v3.application.ai_jobs.job_constants import (
-            JOB_TYPE_INDEX,
-            JOB_STATUS_RUNNING,
-            JOB_STATUS_PAUSED,
-            JOB_STATUS_FAILED,
-            JOB_STATUS_DONE,
-            FILE_STATUS_DONE,
-            FILE_STATUS_FAILED,
-        )
-        from transcriptionist_v3.application.ai_jobs.job_store import (
-            create_job,
-            start_job,
-            update_job_progress,
-            mark_job_paused,
-            mark_job_failed,
-            mark_job_done,
+        from transcriptionist_v3.application.ai_jobs.index_job import IndexJob
+        from transcriptionist_v3.application.ai_jobs.job_constants import JOB_STATUS_PAUSED
+
+        job = IndexJob(
+            self.engine,
+            self.selection,
+            self.index_dir,
+            self.model_version,
+            batch_size=self.batch_size,
+            chunk_size=self.chunk_size,
+            job_id=self.job_id,
+            progress_callback=self.progress.emit,
+            is_cancelled=lambda: self.is_cancelled,
         )
-
         try:
-            if not self.engine.initialize():
-                self.error.emit("CLAP 模型初始化失败")
-                return
-
-            with session_scope() as session:
-                job = session.get(Job, self.job_id) if self.job_id else None
-                if job is None:
-                    job = create_job(session, JOB_TYPE_INDEX, self.selection, params={"model_version": self.model_version})
-                self.job_id = job.id
-
-                base_query = session.query(AudioFile)
-                base_query = apply_selection_filters(base_query, self.selection)
-                base_query = base_query.filter(
-                    or_(
-                        AudioFile.index_status != FILE_STATUS_DONE,
-                        AudioFile.index_version != self.model_version
-                    )
-                )
-                try:
-                    total = base_query.count()
-                except Exception:
-                    total = int(self.selection.get("count", 0) or 0)
-                total = max(0, int(total or 0))
-                start_job(session, job, total=total)
-                session.commit()
-
-            writer = ChunkedIndexWriter(self.index_dir, base_name="clap_embeddings", chunk_size=self.chunk_size)
-            processed = 0
-            failed = 0
-            last_id = 0
-
-            while True:
-                if self.is_cancelled:
-                    with session_scope() as session:
-                        job = session.get(Job, self.job_id)
-                        if job:
-                            job.checkpoint = {"last_id": last_id}
-                            mark_job_paused(session, job)
-                    return
-
-                with session_scope() as session:
-                    job = session.get(Job, self.job_id)
-                    if job and job.checkpoint:
-                        last_id = int(job.checkpoint.get("last_id", last_id) or last_id)
-
-                    query = session.query(AudioFile)
-                    query = apply_selection_filters(query, self.selection)
-                    query = query.filter(AudioFile.id > last_id)
-                    query = query.filter(
-                        or_(
-                            AudioFile.index_status != FILE_STATUS_DONE,
-                            AudioFile.index_version != self.model_version
-                        )
-                    )
-                    batch = query.order_by(AudioFile.id).limit(self.batch_size).all()
-
-                if not batch:
-                    break
-
-                file_paths = [str(f.file_path) for f in batch]
-
-                # 为索引任务接入 CLAP 内部的分阶段进度（预处理 / GPU 推理），避免长时间无反馈导致“卡死”错觉。
-                # progress_ratio 为当前 batch 内 0.0–1.0 的进度，这里转换为全局文件数进度后通过 BaseWorker.progress 向 UI 汇报。
-                batch_total = len(file_paths)
-                def on_batch_progress(progress_ratio: float, msg: str) -> None:
-                    try:
-                        # 估算当前 batch 已完成的文件数，并折算到全局 processed/total
-                        local_done = int(progress_ratio * batch_total)
-                        current_global = processed + local_done
-                        self.progress.emit(current_global, total, msg)
-                    except Exception:
-                        # 进度更新失败不影响主流程
-                        pass
-
-                results = self.engine.get_audio_embeddings_batch(
-                    file_paths,
-                    batch_size=AppConfig.get("ai.batch_size", 4),
-                    progress_callback=on_batch_progress,
-                )
-
-                shard_path = writer.append(results)
-
-                with session_scope() as session:
-                    job = session.get(Job, self.job_id)
-                    for f in batch:
-                        path_str = str(f.file_path)
-                        if path_str in results:
-                            f.index_status = FILE_STATUS_DONE
-                            f.index_version = self.model_version
-                        else:
-                            f.index_status = FILE_STATUS_FAILED
-                            f.index_version = self.model_version
-                            failed += 1
-                    processed += len(batch)
-                    last_id = batch[-1].id
-
-                    if shard_path:
-                        shard = IndexShard(
-                            job_id=self.job_id,
-                            shard_path=shard_path,
-                            count=len(results),
-                            start_id=batch[0].id,
-                            end_id=batch[-1].id,
-                            model_version=self.model_version,
-                        )
-                        session.add(shard)
-
-                    if job:
-                        update_job_progress(
-                            session,
-                            job,
-                            processed=processed,
-                            failed=failed,
-                            checkpoint={"last_id": last_id},
-                        )
-
-                self.progress.emit(processed, total, f"已处理 {processed}")
-
-            with session_scope() as session:
-                job = session.get(Job, self.job_id)
-                if job:
-                    mark_job_done(session, job)
-
-            self.finished.emit({"job_id": self.job_id, "processed": processed, "failed": failed})
-
+            result = job.run()
         except Exception as e:
-            logger.error(f"Indexing job error: {e}", exc_info=True)
-            with session_scope() as session:
-                job = session.get(Job, self.job_id) if self.job_id else None
-                if job:
-                    mark_job_failed(session, job, str(e))
+            self.job_id = job.job_id
             self.error.emit(str(e))
+            return
+        self.job_id = job.job_id
+        if result.get("status") == JOB_STATUS_PAUSED:
+            return
+        self.finished.emit(result)
 
 
 class ClearTagsJobWorker(BaseWorker):
@@ -2023,272 +2025,48 @@ class TaggingJobWorker(BaseWorker):
         self.job_id = job_id
 
     def run(self) -> None:
-        import numpy as np
-        from pathlib import Path
-        from transcriptionist_v3.infrastructure.database.connection import session_scope
-        from transcriptionist_v3.infrastructure.database.models import AudioFile, AudioFileTag, Job
-        from transcriptionist_v3.application.ai_jobs.selection import SelectionFilter, normalize_path
-        from transcriptionist_v3.application.ai_jobs.job_constants import (
-            JOB_TYPE_TAG,
-            FILE_STATUS_DONE,
-            FILE_STATUS_FAILED,
-        )
-        from transcriptionist_v3.application.ai_jobs.job_store import (
-            create_job,
-            start_job,
-            update_job_progress,
-            mark_job_paused,
-            mark_job_failed,
-            mark_job_done,
+        from transcriptionist_v3.application.ai_jobs.tagging_job import TaggingJob
+        from transcriptionist_v3.application.ai_jobs.job_constants import JOB_STATUS_PAUSED
+
+        job = TaggingJob(
+            self.engine,
+            self.selection,
+            self.chunked_index,
+            self.audio_embeddings,
+            self.tag_list,
+            self.tag_matrix,
+            self.tag_translations,
+            min_confidence=self.min_confidence,
+            tag_version=self.tag_version,
+            job_id=self.job_id,
+            translate_tags=self._translate_tags_batch_sync,
+            progress_callback=self.progress.emit,
+            log_callback=self.log_message.emit,
+            batch_callback=self.batch_completed.emit,
+            is_cancelled=lambda: self.is_cancelled,
         )
-
         try:
-            if not self.engine:
-                self.error.emit("CLAP 引擎未初始化")
-                return
-
-            selection_filter = SelectionFilter(self.selection)
-
-            with session_scope() as session:
-                job = session.get(Job, self.job_id) if self.job_id else None
-                if job is None:
-                    job = create_job(session, JOB_TYPE_TAG, self.selection, params={"tag_version": self.tag_version})
-                self.job_id = job.id
-                total = int(self.selection.get("count", 0) or 0)
-                start_job(session, job, total=total)
-                session.commit()
-
-            processed = 0
-            failed = 0
-            total_count = int(self.selection.get("count", 0) or 0)
-            last_logged_at = [0]  # 每 200 个文件向实时分析发一次日志
-
-            def process_chunk(chunk: dict, batch_updates: list) -> None:
-                nonlocal processed, failed
-                if not chunk:
-                    return
-
-                # 先按 selection 过滤；numpy 加载的 key 可能是 np.str_，统一转成 str 避免 DB 查询不匹配
-                filtered = {}
-                for path_str, emb in chunk.items():
-                    path_str = str(path_str).strip()
-                    if not path_str or not selection_filter.matches(path_str):
-                        continue
-                    filtered[path_str] = emb
-                if not filtered:
-                    return
-
-                # 查询 DB 获取 id 与状态（索引与 DB 可能一种用 / 一种用 \，两种形式都查；分批避免 too many SQL variables）
-                raw_paths = list(filtered.keys())
-                normalized_map = {normalize_path(p): p for p in raw_paths}
-                query_paths = set(raw_paths)
-                for p in raw_paths:
-                    query_paths.add(p.replace("\\", "/"))
-                    query_paths.add(p.replace("/", "\\"))
-                query_path_list = list(query_paths)
-
-                with session_scope() as session:
-                    id_map = {}
-                    for i in range(0, len(query_path_list), SQLITE_IN_BATCH):
-                        batch = query_path_list[i : i + SQLITE_IN_BATCH]
-                        rows = (
-                            session.query(AudioFile.id, AudioFile.file_path, AudioFile.tag_status, AudioFile.tag_version)
-                            .filter(AudioFile.file_path.in_(batch))
-                            .all()
-                        )
-                        for row in rows:
-                            id_map[normalize_path(row.file_path)] = row
-
-                    # 第一遍：收集本 chunk 内所有 (row, top_tags)，以及需要翻译的标签集合（走「设置 -> AI 批量翻译性能」的批次与并发）
-                    pending: list = []
-                    unique_to_translate: set = set()
-                    for norm_path, raw_path in normalized_map.items():
-                        row = id_map.get(norm_path)
-                        if not row:
-                            continue
-                        if row.tag_status == FILE_STATUS_DONE and row.tag_version == self.tag_version:
-                            continue
-                        embedding = filtered.get(raw_path)
-                        if embedding is None:
-                            failed += 1
-                            continue
-                        norm_audio = np.linalg.norm(embedding)
-                        embedding_norm = embedding / norm_audio if norm_audio > 0 else embedding
-                        scores = np.dot(self.tag_matrix, embedding_norm)
-                        above = np.where(scores >= self.min_confidence)[0]
-                        order = np.argsort(scores[above])[::-1] if len(above) else np.array([], dtype=int)
-                        top_indices = above[order][:10]
-                        top_tags = [self.tag_list[idx] for idx in top_indices]
-                        for tag_en in top_tags:
-                            cached = self.tag_translations.get(tag_en)
-                            # 检测无效缓存：如果缓存的翻译 == 原文，说明之前失败，需要重新翻译
-                            if cached is None or cached == tag_en:
-                                if cached == tag_en:
-                                    del self.tag_translations[tag_en]  # 清除无效缓存
-                                unique_to_translate.add(tag_en)
-                        pending.append((row, top_tags))
-
-                    # 批量翻译本 chunk 缺失的标签（使用设置中的批次与并发、当前选中的模型）
-                    if unique_to_translate:
-                        batch_result = self._translate_tags_batch_sync(list(unique_to_translate))
-                        for k, v in batch_result.items():
-                            if v and v != k:
-                                self.tag_translations[k] = v
-
-                    # 第二遍：写库并更新进度
-                    for row, top_tags in pending:
-                        final_tags = [
-                            self.tag_translations.get(tag_en, tag_en) for tag_en in top_tags
-                        ]
-                        session.query(AudioFileTag).filter_by(audio_file_id=row.id).delete()
-                        for tag in final_tags:
-                            session.add(AudioFileTag(audio_file_id=row.id, tag=tag))
-                        session.query(AudioFile).filter_by(id=row.id).update(
-                            {"tag_status": FILE_STATUS_DONE, "tag_version": self.tag_version},
-                            synchronize_session=False
-                        )
-                        batch_updates.append({"file_path": row.file_path, "tags": final_tags})
-                        processed += 1
-                        if total_count > 0 and processed - last_logged_at[0] >= 200:
-                            last_logged_at[0] = processed
-                            self.log_message.emit(f"已处理 {processed}/{total_count} 个文件…")
-                            self.progress.emit(processed, total_count, f"正在打标… {processed}/{total_count}")
-                            if batch_updates:
-                                self.batch_completed.emit(batch_updates.copy())
-
-                    session.commit()
-
-            if self.chunked_index and self.chunked_index.get("_chunked"):
-                index_dir = Path(self.chunked_index.get("index_dir", ""))
-                chunk_files = self.chunked_index.get("chunk_files", [])
-                self.log_message.emit(f"开始打标，共 {total_count} 个文件（每 200 个更新一次实时分析）")
-                for chunk_name in chunk_files:
-                    if self.is_cancelled:
-                        with session_scope() as session:
-                            job = session.get(Job, self.job_id)
-                            if job:
-                                mark_job_paused(session, job)
-                        return
-                    chunk_path = index_dir / chunk_name
-                    if not chunk_path.exists():
-                        continue
-                    data = np.load(str(chunk_path), allow_pickle=True)
-                    chunk = data.item() if data.ndim == 0 else {}
-                    batch_updates: list = []
-                    process_chunk(chunk, batch_updates)
-                    if batch_updates:
-                        self.batch_completed.emit(batch_updates)
-                        self.log_message.emit(f"已更新 {len(batch_updates)} 个文件的标签")
-                    # 每 200 个文件向实时分析页发一次进度，避免“卡住”错觉
-                    if total_count > 0 and processed - last_logged_at[0] >= 200:
-                        last_logged_at[0] = processed
-                        self.log_message.emit(f"已处理 {processed}/{total_count} 个文件…")
-                    self.progress.emit(processed, total_count, f"正在打标… {processed}/{total_count}")
-            else:
-                # 非分片索引：小规模直接处理
-                self.log_message.emit(f"开始打标，共 {total_count} 个文件")
-                batch_updates: list = []
-                process_chunk(self.audio_embeddings, batch_updates)
-                if batch_updates:
-                    self.batch_completed.emit(batch_updates)
-                self.progress.emit(processed, total_count, f"已处理 {processed}/{total_count}")
-
-            with session_scope() as session:
-                job = session.get(Job, self.job_id)
-                if job:
-                    mark_job_done(session, job)
-
-            if processed == 0 and total_count > 0:
-                self.log_message.emit(
-                    "⚠️ 打标成功 0 项。可能原因：① 索引中的路径与当前音效库路径不一致（请先重新「建立索引」）；② 所有文件已用当前标签集打标过。"
-                )
-            self.log_message.emit(f"✅ 打标完成：成功 {processed} 项")
-            self.finished.emit({"job_id": self.job_id, "processed": processed, "failed": failed})
-
+            result = job.run()
         except Exception as e:
-            logger.error(f"Tagging job error: {e}", exc_info=True)
-            with session_scope() as session:
-                job = session.get(Job, self.job_id) if self.job_id else None
-                if job:
-                    mark_job_failed(session, job, str(e))
+            self.job_id = job.job_id
             self.error.emit(str(e))
+            return
+        self.job_id = job.job_id
+        if result.get("status") == JOB_STATUS_PAUSED:
+            return
+        self.finished.emit(result)
 
     def _get_tag_translation_system_prompt(self) -> str:
         """影视音效行业专用提示：批量标签翻译，返回 JSON 格式。"""
-        return """你是一位专业的影视音效标签翻译专家。
+        from transcriptionist_v3.application.ai_jobs.tagging_job import TAG_TRANSLATION_SYSTEM_PROMPT
 
-### 任务
-将给定的英文音效标签列表翻译为极短的中文标签（2~6 个字），用于影视/游戏音效分类。
-
-### 翻译规则
-1. 每个标签翻译为 2~6 个汉字的短词组
-2. 若英文有多义，只取与声音、乐器、动作声、环境声相关的含义
-3. 不要输出解释、科普或完整句子
-
-### 输出格式
-必须返回 JSON 对象：{"translations": [{"original": "英文", "translated": "中文"}, ...]}
-
-### 示例
-输入: ["Truck", "Rain"]
-输出: {"translations": [{"original": "Truck", "translated": "卡车声"}, {"original": "Rain", "translated": "雨声"}]}"""
+        return TAG_TRANSLATION_SYSTEM_PROMPT
 
     def _translate_tags_batch_sync(self, tags: list) -> dict:
-        """
-        批量翻译标签，走「设置 -> AI 批量翻译性能」的批次与并发。
-        使用「设置 -> AI 服务商配置」选中的模型（含本地 Ollama/LM Studio），非 DeepSeek 硬编码。
-        返回 { 英文标签: 中文翻译 }，未翻出的保留英文。
-        """
-        if not tags:
-            return {}
-        from transcriptionist_v3.application.ai_engine.translation_manager import (
-            get_translation_config_from_app,
-            TranslationManager,
-        )
-        import asyncio
+        """批量翻译标签（见 tagging_job.translate_tags_batch），返回 { 英文标签: 中文翻译 }。"""
+        from transcriptionist_v3.application.ai_jobs.tagging_job import translate_tags_batch
 
-        sys_prompt = self._get_tag_translation_system_prompt()
-        config, err = get_translation_config_from_app(system_prompt=sys_prompt)
-        if err or not config:
-            return {t: t for t in tags}
-
-        # 批量翻译标签时需要足够的输出空间：
-        # - 每个标签的 JSON 对象约 {"original": "xxx", "translated": "yyy"} ≈ 50 字符 ≈ 15 tokens
-        # - 40 个标签 ≈ 600 tokens，加上 JSON 结构开销，至少需要 1000+ tokens
-        # - 设置 2048 确保不会被截断导致 JSON 解析失败
-        config.max_tokens = 2048
-        config.temperature = 0.2
-
-        if not TranslationManager.instance().configure(config):
-            return {t: t for t in tags}
-
-        async def _run():
-            result = await TranslationManager.instance().translate_batch(
-                list(tags), use_cache=True, progress_callback=None
-            )
-            if not result.success or not result.data:
-                return {t: t for t in tags}
-            out = {}
-            for r in result.data:
-                orig = getattr(r, "original", None)
-                raw = getattr(r, "translated", None)
-                if orig is None:
-                    continue
-                tr = (str(raw or "").strip().split("\n")[0].strip().strip("。，、；："))[:12] if raw else ""
-                out[orig] = tr if tr else orig
-            return out
-
-        try:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            return loop.run_until_complete(_run())
-        except Exception as e:
-            logger.debug(f"Tag batch translate error: {e}")
-            return {t: t for t in tags}
-        finally:
-            try:
-                loop.close()
-            except Exception:
-                pass
+        return translate_tags_batch(tags)
 
     def _translate_text_sync(self, text: str, target_lang: str = "en") -> str:
         """影视音效场景：单条英文标签 → 简短中文。配置来自「设置 -> AI 服务商」，支持本地 Ollama/LM Studio。"""
@@ -2336,6 +2114,148 @@ class TaggingJobWorker(BaseWorker):
         return first_line if first_line else text
 
 
+class NearDuplicateJobWorker(BaseWorker):
+    """
+    任务化声学近似重复检测：在列式存储的 CLAP embedding 上分块自连接，结果写入 duplicate_groups。
+
+    暂停后恢复会从头重新计算；结果只在任务完成时整体替换，中途停止不影响上一次结果。
+    """
+    log_message = Signal(str)
+
+    def __init__(
+        self,
+        selection: dict,
+        chunked_index: Optional[dict],
+        threshold: float = 0.97,
+        probe_lists: int = 4,
+        job_id: Optional[int] = None,
+        parent: Optional[QObject] = None
+    ):
+        super().__init__(parent)
+        self.selection = selection or {}
+        self.chunked_index = chunked_index or {}
+        self.threshold = float(threshold)
+        self.probe_lists = int(probe_lists)
+        self.job_id = job_id
+
+    def run(self) -> None:
+        import numpy as np
+        from pathlib import Path
+        from transcriptionist_v3.infrastructure.database.connection import session_scope
+        from transcriptionist_v3.infrastructure.database.models import Job, JobItem
+        from transcriptionist_v3.application.ai_jobs.embedding_store import EmbeddingStore
+        from transcriptionist_v3.application.ai_jobs.selection import SelectionFilter
+        from transcriptionist_v3.application.ai_jobs.near_duplicates import (
+            NearDuplicateFinder,
+            build_clusters,
+            resolve_row_ids,
+            save_duplicate_groups,
+        )
+        from transcriptionist_v3.application.ai_jobs.job_constants import (
+            JOB_TYPE_NEAR_DUPLICATES,
+            FILE_STATUS_DONE,
+        )
+        from transcriptionist_v3.application.ai_jobs.job_store import (
+            create_job,
+            start_job,
+            update_job_progress,
+            ensure_job_items_for_paths,
+            mark_job_paused,
+            mark_job_failed,
+            mark_job_done,
+        )
+
+        try:
+            if not self.chunked_index.get("_store"):
+                self.error.emit("近似重复检测需要列式索引，请先重新「建立索引」")
+                return
+
+            store = EmbeddingStore(
+                Path(self.chunked_index.get("index_dir", "")),
+                base_name=self.chunked_index.get("base_name", "clap_embeddings"),
+            )
+            rows = store.live_rows()
+            if self.selection.get("mode") != "all":
+                selection_filter = SelectionFilter(self.selection)
+                store_paths = store.paths()
+                rows = np.asarray(
+                    [r for r in rows.tolist() if selection_filter.matches(store_paths[r])], dtype=np.int64
+                )
+
+            with session_scope() as session:
+                job = session.get(Job, self.job_id) if self.job_id else None
+                if job is None:
+                    job = create_job(
+                        session,
+                        JOB_TYPE_NEAR_DUPLICATES,
+                        self.selection,
+                        params={"threshold": self.threshold, "probe_lists": self.probe_lists},
+                    )
+                self.job_id = job.id
+                if self.selection.get("mode") == "files":
+                    ensure_job_items_for_paths(session, job, self.selection.get("files") or [])
+                start_job(session, job, total=len(rows))
+                session.commit()
+
+            self.log_message.emit(f"开始近似重复检测：{len(rows)} 个文件，相似度阈值 {self.threshold:.2f}")
+
+            def on_progress(done: int, total: int) -> None:
+                self.progress.emit(done, total, f"正在比对… {done}/{total}")
+
+            finder = NearDuplicateFinder(
+                store,
+                rows=rows,
+                threshold=self.threshold,
+                probe_lists=self.probe_lists,
+                progress_callback=on_progress,
+                is_cancelled=lambda: self.is_cancelled,
+            )
+            groups = finder.find()
+            if groups is None:
+                with session_scope() as session:
+                    job = session.get(Job, self.job_id)
+                    if job:
+                        mark_job_paused(session, job)
+                return
+
+            with session_scope() as session:
+                clusters = build_clusters(session, store, groups)
+                # 按选择范围扫描时只替换涉及范围内文件的旧组，其余目录的结果保留
+                scope_ids = None
+                if self.selection.get("mode") != "all":
+                    scope_ids = resolve_row_ids(session, store, rows.tolist()).values()
+                save_duplicate_groups(session, clusters, self.job_id, self.threshold, scope_ids=scope_ids)
+                duplicates = sum(len(c.member_ids) - 1 for c in clusters)
+                job = session.get(Job, self.job_id)
+                if job:
+                    session.query(JobItem).filter(JobItem.job_id == job.id).update(
+                        {"status": FILE_STATUS_DONE}, synchronize_session=False
+                    )
+                    update_job_progress(
+                        session,
+                        job,
+                        processed=len(rows),
+                        checkpoint={"groups": len(clusters), "duplicates": duplicates, "pairs": finder.pairs},
+                    )
+                    mark_job_done(session, job)
+                session.commit()
+
+            self.log_message.emit(
+                f"✅ 近似重复检测完成：{len(clusters)} 组，{duplicates} 个重复文件（音效库搜索 dup:no 可隐藏）"
+            )
+            self.finished.emit(
+                {"job_id": self.job_id, "groups": len(clusters), "duplicates": duplicates, "processed": len(rows)}
+            )
+
+        except Exception as e:
+            logger.error(f"Near-duplicate job error: {e}", exc_info=True)
+            with session_scope() as session:
+                job = session.get(Job, self.job_id) if self.job_id else None
+                if job:
+                    mark_job_failed(session, job, str(e))
+            self.error.emit(str(e))
+
+
 class TaggingWorker(BaseWorker):
     """
     Worker for AI tagging tasks.
@@ -7,7 +7,7 @@ Qt Waveform Preview Widget
 - 支持点击波形跳转播放位置
 
 注意：为控制复杂度和依赖，本组件：
-- 优先使用 librosa，其次 soundfile，最后退回到 wave 仅支持 WAV
+- 波形峰值来自打包波形存储（首次由流式解码器构建，之后直接读取）
 - 若依赖缺失或读取失败，会显示占位提示，不影响主功能
 - 波形加载在后台线程执行，避免阻塞 UI
 """
@@ -52,86 +52,37 @@ class WaveformData:
     @classmethod
     def from_audio_file(cls, file_path: Path, num_samples: int = 400) -> Optional["WaveformData"]:
         """
-        从音频文件提取波形数据（同步版本，仅用于单文件预览）。
-        
-        为了最大限度避免在第三方解码库（librosa/soundfile 等）的 C 扩展里崩溃，
-        这里采用**极简、安全模式**：
-        - 仅对 PCM WAV 文件尝试提取波形（使用标准库 wave + numpy）
-        - 对其它格式（mp3/flac/ogg 等）直接返回 None，只显示“选择音效以预览波形”
+        从音频文件提取波形数据（同步版本，在后台线程调用）。
+
+        读取打包波形存储（infrastructure.cache.waveform_cache）中的峰值金字塔：
+        已缓存时不解码音频；未命中时由流式解码器（soundfile，必要时 ffmpeg）构建并写入存储，
+        支持全部受支持格式且内存占用与文件长度无关。
         """
         if not NUMPY_AVAILABLE:
             return None
 
-        def _build_peaks_from_samples(samples, sample_rate: int) -> Optional["WaveformData"]:
-            if samples is None or sample_rate <= 0:
-                return None
-            if len(samples) == 0:
+        try:
+            from transcriptionist_v3.core.config import AppConfig
+            from transcriptionist_v3.infrastructure.cache.waveform_cache import (
+                compute_peaks,
+                get_waveform_cache,
+            )
+
+            if AppConfig.get("performance.waveform_cache_enabled", True):
+                pyramid = get_waveform_cache().get_or_compute(file_path)
+            else:
+                pyramid = compute_peaks(file_path)
+            if pyramid is None or pyramid.duration <= 0:
                 return None
-
-            duration_ms = int(len(samples) / sample_rate * 1000)
-            if duration_ms <= 0:
+            envelope = pyramid.envelope(num_samples)
+            if envelope is None or envelope.bins == 0:
                 return None
 
-            chunk_size = max(1, len(samples) // num_samples)
-            peaks: List[float] = []
-            for i in range(0, len(samples), chunk_size):
-                chunk = samples[i : i + chunk_size]
-                if len(chunk) > 0:
-                    peak = float(np.abs(chunk).max())
-                    peaks.append(peak)
-
-            max_peak = max(peaks) if peaks else 1.0
+            peaks = np.maximum(np.abs(envelope.minimum), np.abs(envelope.maximum))
+            max_peak = float(peaks.max())
             if max_peak > 0:
-                peaks = [p / max_peak for p in peaks]
-
-            return cls(peaks[:num_samples], duration_ms)
-
-        # 优先尝试 soundfile（支持更多格式）；失败后回退 wave（WAV）
-        try:
-            import soundfile as sf  # type: ignore
-
-            data, sample_rate = sf.read(str(file_path), dtype="float32", always_2d=False)
-            if data is not None:
-                if getattr(data, "ndim", 1) > 1:
-                    samples = data.mean(axis=1)
-                else:
-                    samples = data
-                built = _build_peaks_from_samples(samples, int(sample_rate))
-                if built is not None:
-                    return built
-        except Exception:
-            pass
-
-        try:
-            # 仅使用标准库 wave，避免依赖外部解码器
-            import wave
-            import struct
-
-            with wave.open(str(file_path), "rb") as wav:
-                n_channels = wav.getnchannels()
-                sample_width = wav.getsampwidth()
-                framerate = wav.getframerate()
-                n_frames = wav.getnframes()
-
-                if framerate <= 0 or n_frames <= 0:
-                    return None
-
-                raw_data = wav.readframes(n_frames)
-
-                if sample_width == 1:
-                    fmt = f"{n_frames * n_channels}B"
-                    samples = np.array(struct.unpack(fmt, raw_data), dtype=np.float32) - 128
-                elif sample_width == 2:
-                    fmt = f"{n_frames * n_channels}h"
-                    samples = np.array(struct.unpack(fmt, raw_data), dtype=np.float32)
-                else:
-                    # 其它位深暂不支持，直接放弃波形
-                    return None
-
-                if n_channels > 1:
-                    samples = samples.reshape(-1, n_channels).mean(axis=1)
-
-                return _build_peaks_from_samples(samples, int(framerate))
+                peaks = peaks / max_peak
+            return cls(peaks.astype(float).tolist(), int(pyramid.duration * 1000))
         except Exception as e:
             logger.error(f"WaveformPreview: failed to extract waveform from {file_path}: {e}")
             return None